@@ -0,0 +1,489 @@
+"""
+Контроллеры Sony (DS4/DS5) и Nintendo (Joy-Con/Pro Controller) поверх HID.
+Модуль не зависит от PyQt6: устройство открывается через транспорт из
+hid_transport, поэтому разбор отчётов, батарея и IMU работают и с
+файлом-записью или синтетическим генератором вместо железа. Вибрация и
+подсветка пишутся через controller.output (device_output.DeviceOutput) -
+свой поток на устройство, появляется при подключении.
+
+    python controllers.py synthetic:ds4 --count 100000
+    python controllers.py replay:capture.hidlog
+
+прогоняет отчёты через тот же конвейер (HidBatchReader + ReportStats) с
+максимальной скоростью и печатает пропускную способность в отчётах/с.
+"""
+
+import struct
+import sys
+import threading
+import time
+
+from device_output import DeviceOutput, NintendoOutput, sony_output
+from hid_reports import HidBatchReader, IMU_LAYOUTS, ReportStats, calibrated_layouts
+from hid_transport import (
+    BUS_BLUETOOTH, BUS_USB, NINTENDO_VID, SONY_VID, ReplayTransport, SyntheticTransport, check_synthetic_kind,
+    enumerator_for, make_transport_factory
+)
+from imu_calibration import (
+    CALIBRATION_REPORT_SIZE, DS4_CALIBRATION_BT, DS4_CALIBRATION_USB, DS5_CALIBRATION, SOURCE_USER, SPI_FACTORY_IMU,
+    SPI_IMU_SIZE, SPI_USER_IMU, SPI_USER_IMU_MAGIC, USER_MAGIC, ImuCalibration, default_cache,
+    parse_nintendo_calibration, parse_sony_calibration
+)
+from nintendo_protocol import (
+    INPUT_FULL, SUBCOMMAND_ENABLE_IMU, SUBCOMMAND_ENABLE_VIBRATION, SUBCOMMAND_INPUT_MODE, SUBCOMMAND_SPI_READ,
+    SUBCOMMAND_TIMEOUT, USB_HANDSHAKE, USB_HID_ONLY, USB_REPLY, NintendoInput, parse_reply, subcommand_report,
+    unpack_spi_reply, usb_command
+)
+from rumble import HdRumble, HidRumble, SdlRumble
+
+DEFAULT_TRANSPORT = make_transport_factory()
+# PID -> модель, в порядке предпочтения при подключении без привязки
+SONY_PIDS = {0x09CC: "ds4", 0x05C4: "ds4", 0x0BA0: "ds4", 0x0CE6: "ds5", 0x0DF2: "ds5"}
+NINTENDO_PIDS = {0x2006: "joycon_left", 0x2007: "joycon_right", 0x2009: "pro_controller"}
+
+
+def classify_gamepad(name: str) -> str:
+    # Семейство по имени, которое отдаёт SDL: "sony", "nintendo" или "other"
+    upper = name.upper()
+    if "DUALSHOCK" in upper or "DUALSENSE" in upper or "PS4" in upper or "PS5" in upper or "Wireless" in name:
+        return "sony"
+    if "Pro Controller" in name or "Joy-Con" in name or "Nintendo" in name:
+        return "nintendo"
+    return "other"
+
+
+def is_joycon_right_name(name: str) -> bool:
+    return "Joy-Con (R)" in name or "Joy-Con Right" in name or ("Joy-Con" in name and "L/R" in name)
+
+
+def bind_hid_devices(gamepads, enumerator) -> dict:
+    # instance_id геймпада SDL -> запись HID из перечисления. VID/PID и шина берутся
+    # из GUID SDL; одинаковые геймпады на одном стенде разбираются по порядку
+    # перечисления, каждая запись HID достаётся только одному геймпаду.
+    bound = {}
+    if enumerator is None:
+        return bound
+    used = set()
+    for gp in gamepads:
+        if not gp.get('vid'):
+            continue
+        candidates = [info for info in enumerator.find(gp['vid'], (gp['pid'],)) if info['path'] not in used]
+        if not candidates:
+            continue
+        same_bus = [info for info in candidates if info['bus'] == gp.get('bus')]
+        info = (same_bus or candidates)[0]
+        used.add(info['path'])
+        bound[gp['instance_id']] = info
+    return bound
+
+
+def open_hid_controller(family: str, transport_factory=DEFAULT_TRANSPORT, info=None, cache=None):
+    # -> (контроллер, размер отчёта, раскладки IMU в °/с и g) или (None, 0, None)
+    if family == "sony":
+        controller = DS4Controller(transport_factory)
+        if controller.connect(info):
+            controller.calibrate(cache)
+            return controller, controller.report_size, controller.imu_layouts
+    elif family == "nintendo":
+        controller = NintendoController(transport_factory)
+        if controller.connect(info=info):
+            controller.calibrate(cache)
+            return controller, 49, controller.imu_layouts
+    return None, 0, None
+
+
+def rumble_output(joystick, controller):
+    # Геймпад, открытый по HID со своим выводом, вибрирует только через вывод устройства - его
+    # очередь единственная пишет в устройство; иначе - через SDL
+    if controller is None or controller.device is None or controller.output is None:
+        return SdlRumble(joystick)
+    return HdRumble(controller) if isinstance(controller, NintendoController) else HidRumble(controller)
+
+
+def apply_calibration(controller, family: str, cache=None) -> bool:
+    # Калибровка из кэша или с устройства, иначе номинальная; -> True, если из кэша
+    cache = default_cache() if cache is None else cache
+    calibration = cache.get(controller.vid, controller.pid, controller.serial)
+    cached = calibration is not None
+    if calibration is None:
+        calibration = controller.read_calibration()
+        if calibration is not None:
+            cache.put(controller.vid, controller.pid, controller.serial, calibration)
+    controller.set_calibration(calibration or ImuCalibration.nominal(family))
+    return cached
+
+
+class DS4Controller:
+    def __init__(self, transport_factory=DEFAULT_TRANSPORT):
+        self.transport_factory = transport_factory
+        self.device = None
+        self.vid = 0
+        self.pid = 0
+        self.serial = ""
+        self.path = None
+        self.is_ds4 = False
+        self.is_ds5 = False
+        self.connection_type = "none"
+        self.calibration = None
+        self.imu_layouts = IMU_LAYOUTS["ds4"]
+        self.output = None
+
+    @property
+    def enumerator(self):
+        return enumerator_for(self.transport_factory)
+        
+    def connect(self, info=None):
+        # info - запись перечисления, привязанная к выбранному геймпаду;
+        # без неё берётся первый найденный DS4/DS5
+        self.disconnect()
+        if self.transport_factory is None:
+            return False
+        candidates = [info] if info else self.enumerator.find(SONY_VID, SONY_PIDS)
+        for entry in candidates:
+            ctrl_type = SONY_PIDS.get(entry['product_id']) if entry['vendor_id'] == SONY_VID else None
+            if ctrl_type is None:
+                continue
+            try:
+                self.device = self.transport_factory()
+                self.device.open_path(entry['path'])
+                self.device.set_nonblocking(True)
+                self.vid, self.pid = entry['vendor_id'], entry['product_id']
+                self.serial = entry.get('serial_number') or ""
+                self.path = entry['path']
+                self.is_ds4 = (ctrl_type == "ds4")
+                self.is_ds5 = (ctrl_type == "ds5")
+                self.connection_type = entry['bus']
+                self.output = DeviceOutput(self.device, sony_output(ctrl_type, self.connection_type == BUS_BLUETOOTH))
+                self.set_calibration(None)
+                return True
+            except:
+                self.device = None
+        return False
+        
+    def disconnect(self):
+        if self.output:
+            self.output.stop()
+            self.output = None
+        if self.device:
+            try: self.device.close()
+            except: pass
+            self.device = None
+        self.path = None
+        self.connection_type = "none"
+            
+    def get_battery(self):
+        if not self.device:
+            return None, None
+        try:
+            if self.connection_type == BUS_BLUETOOTH:
+                report = self.device.get_feature_report(0x11, 49)
+                if report and len(report) > 53:
+                    battery_byte = report[53]
+                    level = battery_byte & 0x0F
+                    charging = bool(battery_byte & 0x10)
+                    levels = [0, 10, 40, 60, 80, 100]
+                    return levels[min(level, 5)], charging
+            else:
+                report = self.device.get_feature_report(0x05, 49)
+                if report and len(report) > 42:
+                    battery_byte = report[42]
+                    level = battery_byte & 0x0F
+                    charging = bool(battery_byte & 0x10)
+                    levels = [0, 10, 40, 60, 80, 100]
+                    return levels[min(level, 5)], charging
+        except:
+            pass
+        return None, None
+        
+    @property
+    def kind(self) -> str:
+        return "ds5" if self.is_ds5 else "ds4"
+
+    def set_calibration(self, calibration):
+        self.calibration = calibration
+        self.imu_layouts = calibrated_layouts(IMU_LAYOUTS[self.kind], calibration)
+
+    def calibrate(self, cache=None) -> bool:
+        return apply_calibration(self, self.kind, cache)
+
+    def read_calibration(self):
+        # -> ImuCalibration или None (клон без отчёта калибровки, запись сессии)
+        if not self.device:
+            return None
+        bluetooth = self.connection_type == BUS_BLUETOOTH
+        if self.is_ds5:
+            report_id = DS5_CALIBRATION
+        else:
+            report_id = DS4_CALIBRATION_BT if bluetooth else DS4_CALIBRATION_USB
+        try:
+            data = self.device.get_feature_report(report_id, CALIBRATION_REPORT_SIZE)
+        except (IOError, OSError, ValueError):
+            return None
+        return parse_sony_calibration(data, bluetooth_ds4=bluetooth and self.is_ds4)
+
+    @property
+    def report_size(self) -> int:
+        return 78 if self.connection_type == BUS_BLUETOOTH else 64
+
+    def read_data(self):
+        if not self.device:
+            return None
+        try:
+            data = self.device.read(self.report_size, timeout_ms=5)
+            if data and len(data) >= 60:
+                return data
+        except:
+            pass
+        return None
+
+
+class NintendoController:
+    def __init__(self, transport_factory=DEFAULT_TRANSPORT):
+        self.transport_factory = transport_factory
+        self.device = None
+        self.vid = 0
+        self.pid = 0
+        self.serial = ""
+        self.path = None
+        self.controller_type = "none"
+        self.connection_type = "none"
+        self.packet_counter = 0
+        # Счётчик пакетов берут и подкоманды, и поток вывода устройства
+        self._packet_lock = threading.Lock()
+        self.imu_enabled = False
+        self.full_mode = False
+        self.input = NintendoInput()
+        self.calibration = None
+        self.imu_layouts = IMU_LAYOUTS["nintendo"]
+        self.output = None
+
+    @property
+    def enumerator(self):
+        return enumerator_for(self.transport_factory)
+        
+    def connect(self, pid=None, info=None, full_mode=True):
+        # full_mode=False - для записи сессии: подкоманды некому подтверждать
+        self.disconnect()
+        if self.transport_factory is None:
+            return False
+        candidates = [info] if info else self.enumerator.find(NINTENDO_VID, [pid] if pid else NINTENDO_PIDS)
+        for entry in candidates:
+            ctrl_type = NINTENDO_PIDS.get(entry['product_id']) if entry['vendor_id'] == NINTENDO_VID else None
+            if ctrl_type is None:
+                continue
+            try:
+                self.device = self.transport_factory()
+                self.device.open_path(entry['path'])
+                self.device.set_nonblocking(True)
+                self.vid, self.pid = entry['vendor_id'], entry['product_id']
+                self.serial = entry.get('serial_number') or ""
+                self.path = entry['path']
+                self.controller_type = ctrl_type
+                self.connection_type = entry['bus']
+                self.input.set_type(ctrl_type)
+                self.output = DeviceOutput(self.device, NintendoOutput(self))
+                self.set_calibration(None)
+                if full_mode:
+                    self.start_full_mode()
+                return True
+            except:
+                self.device = None
+        return False
+        
+    def disconnect(self):
+        if self.output:
+            self.output.stop()
+            self.output = None
+        if self.device:
+            try: self.device.close()
+            except: pass
+            self.device = None
+        self.path = None
+        self.imu_enabled = False
+        self.full_mode = False
+        self.controller_type = "none"
+        self.connection_type = "none"
+
+    def next_packet(self) -> int:
+        with self._packet_lock:
+            self.packet_counter = (self.packet_counter + 1) & 0x0F
+            return self.packet_counter
+
+    def usb_handshake(self) -> bool:
+        # Pro Controller по USB молчит о подкомандах до рукопожатия 0x80 0x02
+        try:
+            self.device.write(usb_command(USB_HANDSHAKE))
+            deadline = time.monotonic() + SUBCOMMAND_TIMEOUT
+            while time.monotonic() < deadline:
+                data = self.device.read(49, timeout_ms=20)
+                if data and data[0] == USB_REPLY and len(data) > 1 and data[1] == USB_HANDSHAKE:
+                    self.device.write(usb_command(USB_HID_ONLY))
+                    return True
+                self.input.feed(data)
+        except (IOError, OSError, ValueError):
+            pass
+        return False
+
+    def send_subcommand(self, subcommand: int, args=b"", attempts=3):
+        # -> данные ответа после номера подкоманды или None (нет устройства, NACK, тишина).
+        # Входные отчёты, пришедшие до ответа, идут в состояние кнопок - нажатия не теряются
+        if not self.device:
+            return None
+        for _ in range(attempts):
+            try:
+                self.device.write(subcommand_report(self.next_packet(), subcommand, args))
+                deadline = time.monotonic() + SUBCOMMAND_TIMEOUT
+                while time.monotonic() < deadline:
+                    data = self.device.read(49, timeout_ms=20)
+                    if not data:
+                        continue
+                    self.input.feed(data)
+                    reply = parse_reply(data)
+                    if reply is not None and reply[1] == subcommand:
+                        ack, _, payload = reply
+                        return payload if ack else None
+            except (IOError, OSError, ValueError):
+                return None
+        return None
+
+    def start_full_mode(self) -> bool:
+        # IMU и полный отчёт 0x30: 60 Гц отчётов, по три сэмпла IMU в каждом. Итог - в mode_status(),
+        # печатает его вызывающий: у консольного режима stdout занят JSON
+        if self.controller_type == "pro_controller" and self.connection_type == BUS_USB:
+            self.usb_handshake()
+        self.imu_enabled = self.send_subcommand(SUBCOMMAND_ENABLE_IMU, b'\x01') is not None
+        self.full_mode = self.send_subcommand(SUBCOMMAND_INPUT_MODE, bytes((INPUT_FULL,))) is not None
+        return self.full_mode
+
+    def mode_status(self) -> str:
+        # "" - IMU и полный режим включены, иначе - что не ответило
+        missing = [name for name, ok in (("IMU", self.imu_enabled), ("полный режим", self.full_mode)) if not ok]
+        return f"нет ответа: {', '.join(missing)}" if missing else ""
+
+    def enable_vibration(self, enabled=True) -> bool:
+        return self.send_subcommand(SUBCOMMAND_ENABLE_VIBRATION, b'\x01' if enabled else b'\x00') is not None
+        
+    def get_battery(self):
+        if not self.device:
+            return None, False
+        if self.input.battery is not None:
+            # В полном режиме батарея приходит в каждом отчёте
+            return self.input.battery_level()
+        try:
+            report = self.device.get_feature_report(0x80, 49)
+            if report and len(report) > 5:
+                battery_byte = report[5]
+                level = battery_byte & 0x0F
+                levels = [0, 25, 50, 75, 100]
+                return levels[min(level, 4)], False
+        except:
+            pass
+        return None, False
+        
+    def set_calibration(self, calibration):
+        self.calibration = calibration
+        self.imu_layouts = calibrated_layouts(IMU_LAYOUTS["nintendo"], calibration)
+
+    def calibrate(self, cache=None) -> bool:
+        return apply_calibration(self, "nintendo", cache)
+
+    def read_spi(self, address: int, length: int):
+        payload = self.send_subcommand(SUBCOMMAND_SPI_READ, struct.pack("<IB", address, length))
+        return unpack_spi_reply(payload, address, length) if payload is not None else None
+
+    def read_calibration(self):
+        # Пользовательская калибровка (записана из меню Switch) главнее заводской
+        magic = self.read_spi(SPI_USER_IMU_MAGIC, 2)
+        if magic is not None and tuple(magic) == USER_MAGIC:
+            calibration = parse_nintendo_calibration(self.read_spi(SPI_USER_IMU, SPI_IMU_SIZE), SOURCE_USER)
+            if calibration is not None:
+                return calibration
+        return parse_nintendo_calibration(self.read_spi(SPI_FACTORY_IMU, SPI_IMU_SIZE))
+
+    def read_imu(self):
+        if not self.device:
+            return None
+        try:
+            data = self.device.read(49, timeout_ms=10)
+            return self.decode_imu(data)
+        except:
+            pass
+        return None
+
+    def decode_imu(self, data):
+        # Все три сэмпла отчёта 0x30; кнопки и стики того же отчёта - в self.input
+        self.input.feed(data)
+        samples = self.imu_layouts[0x30].decode_report(data)
+        if not samples:
+            return None
+        gx, gy, gz, ax, ay, az = samples[-1]
+        return {'accel': (ax, ay, az), 'gyro': (gx, gy, gz), 'samples': samples}
+
+
+def benchmark(controller, kind: str, count: int, layouts: dict, report_size: int, decode_input=None) -> dict:
+    # decode_input(report) - разбор кнопок и стиков того же отчёта (Nintendo)
+    reader = HidBatchReader()
+    stats = ReportStats(kind)
+
+    def on_report(data):
+        stats.add(time.perf_counter_ns(), data)
+        if decode_input is not None:
+            decode_input(data)
+
+    reports = samples = 0
+    started = time.perf_counter_ns()
+    while reports < count:
+        samples += reader.drain(controller.device, report_size, layouts, on_report)
+        if not reader.reports:
+            break
+        reports += reader.reports
+    elapsed = (time.perf_counter_ns() - started) / 1e9
+    return {
+        'reports': reports,
+        'samples': samples,
+        'seconds': elapsed,
+        'reports_per_second': reports / elapsed if elapsed else 0.0,
+        'dropped': stats.dropped,
+    }
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Прогон HID-конвейера без железа")
+    parser.add_argument("transport", help="synthetic:ds4 | synthetic:ds5 | synthetic:joycon_right | replay:<файл>")
+    parser.add_argument("--count", type=int, default=100000)
+    args = parser.parse_args(argv)
+    source, _, arg = args.transport.partition(':')
+    if source == "synthetic":
+        try:
+            kind = check_synthetic_kind(arg or "ds4")
+        except ValueError as e:
+            parser.error(str(e))
+        factory = lambda: SyntheticTransport(kind, speed=0, count=args.count)
+    elif source == "replay":
+        factory = lambda: ReplayTransport(arg, speed=0)
+    else:
+        parser.error(f"неизвестный транспорт: {args.transport}")
+    if factory().vid == NINTENDO_VID:
+        controller = NintendoController(factory)
+        if not controller.connect(full_mode=source == "synthetic"):
+            print("Не удалось открыть устройство")
+            return 1
+        controller.calibrate()
+        kind, layouts, size, decode_input = "nintendo", controller.imu_layouts, 49, controller.input.feed
+    else:
+        controller = DS4Controller(factory)
+        if not controller.connect():
+            print("Не удалось открыть устройство")
+            return 1
+        controller.calibrate()
+        kind, layouts, size, decode_input = controller.kind, controller.imu_layouts, controller.report_size, None
+    result = benchmark(controller, kind, args.count, layouts, size, decode_input)
+    controller.disconnect()
+    print(f"{result['reports']} отчётов, {result['samples']} IMU-сэмплов за {result['seconds']:.3f} с: "
+          f"{result['reports_per_second']:.0f} отчётов/с, потеряно {result['dropped']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
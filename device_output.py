@@ -0,0 +1,384 @@
+"""
+Вывод на геймпад - вибрация, световая панель, индикаторы игрока - одним
+потоком на устройство.
+
+Вызывающий (кнопка GUI, узор вибрации) только меняет желаемое состояние:
+DeviceOutput.set(rumble=..., lightbar=..., player_leds=...) возвращается
+сразу. Поток устройства просыпается по изменению, собирает из последнего
+состояния один выходной отчёт и пишет его не чаще interval_ms протокола:
+промежуточные значения (ползунок цвета, кадры свипа) схлопываются в
+последнее, канал HID не забивается. Без изменений отчёт повторяется только
+там, где геймпад сам гасит вывод (HD-вибрация Nintendo). Поле None - вывод
+им не управляет: подсветка не трогает вибрацию SDL и наоборот.
+
+Выходные отчёты (смещения от начала отчёта):
+
+    DS4 USB  0x05, 32 байта: флаги 1, моторы 4-5 (правый - лёгкий), RGB 6-8
+    DS4 BT   0x11, 78 байт: 0xC0 (HID + CRC), те же поля со сдвигом +2, CRC32 74-77
+    DS5 USB  0x02, 48 байт: флаги 1-2, моторы 3-4, индикаторы игрока 44, RGB 45-47
+    DS5 BT   0x31, 78 байт: счётчик, тег 0x10, те же поля со сдвигом +2, CRC32 74-77
+    Nintendo 0x10: HD-вибрация обоих приводов (nintendo_protocol.rumble_report)
+
+CRC32 Bluetooth считается от байта 0xA2 и первых 74 байт отчёта: состояние
+CRC после 0xA2 вычислено заранее, остальное - табличный crc32 из zlib.
+
+    python device_output.py ds5 --bluetooth --seconds 2
+
+заваливает вывод синтетического геймпада изменениями цвета и печатает,
+сколько отчётов дошло до транспорта.
+"""
+
+import colorsys
+import struct
+import sys
+import threading
+import time
+import zlib
+
+from nintendo_protocol import NEUTRAL_RUMBLE, encode_rumble, rumble_report
+
+# Не чаще одного отчёта за интервал: USB принимает отчёт каждые 4 мс, Bluetooth при
+# частом выводе копит задержку входных отчётов. Nintendo - темп его отчётов, 15 мс
+USB_INTERVAL_MS = 4
+BLUETOOTH_INTERVAL_MS = 16
+NINTENDO_INTERVAL_MS = 15
+# Частота HD-вибрации, если узор её не задаёт
+DEFAULT_FREQUENCY_HZ = 160.0
+FIELDS = ("rumble", "lightbar", "player_leds")
+
+SONY_BT_SEED = b'\xa2'
+SONY_BT_SIZE = 78
+_SEED_CRC = zlib.crc32(SONY_BT_SEED)
+
+DS4_OUTPUT_USB = 0x05
+DS4_OUTPUT_BT = 0x11
+DS4_USB_SIZE = 32
+DS4_BT_CONTROL = 0xC0
+DS4_FLAG_MOTOR = 0x01
+DS4_FLAG_LED = 0x02
+
+DS5_OUTPUT_USB = 0x02
+DS5_OUTPUT_BT = 0x31
+DS5_USB_SIZE = 48
+DS5_BT_TAG = 0x10
+DS5_FLAG0_VIBRATION = 0x03           # совместимая вибрация + выбор моторов вместо хаптики
+DS5_FLAG1_LIGHTBAR = 0x04
+DS5_FLAG1_PLAYER_LEDS = 0x10
+DS5_FLAG2_LIGHTBAR_SETUP = 0x02
+DS5_LIGHTBAR_LIGHT_OUT = 0x02        # погасить синюю заставку, иначе цвет не применяется
+# Индикаторы игрока DS5 (5 светодиодов), номер 1-5 - как в консоли
+PLAYER_LED_PATTERNS = (0x00, 0x04, 0x0A, 0x15, 0x1B, 0x1F)
+# Проверка подсветки: (название, RGB, номер игрока); индикаторы игрока есть только у DS5
+LIGHT_TEST_STEPS = (
+    ("Красный", (255, 0, 0), 0), ("Зелёный", (0, 255, 0), 0), ("Синий", (0, 0, 255), 0),
+    ("Белый", (255, 255, 255), 0),
+) + tuple((f"Игрок {n}", (255, 255, 255), n) for n in range(1, 6))
+LIGHT_TEST_STEP_MS = 500
+
+
+def sony_bt_crc(data) -> int:
+    return zlib.crc32(data, _SEED_CRC)
+
+
+def seal_bt_report(report: bytearray) -> bytes:
+    struct.pack_into("<I", report, SONY_BT_SIZE - 4, sony_bt_crc(memoryview(report)[:SONY_BT_SIZE - 4]))
+    return bytes(report)
+
+
+def motor_bytes(rumble) -> tuple:
+    # (левый - тяжёлый, правый - лёгкий) 0..255
+    left, right = rumble[0], rumble[1]
+    return round(min(1.0, max(0.0, left)) * 255), round(min(1.0, max(0.0, right)) * 255)
+
+
+def hue_color(hue: float) -> tuple:
+    r, g, b = colorsys.hsv_to_rgb(hue % 1.0, 1.0, 1.0)
+    return round(r * 255), round(g * 255), round(b * 255)
+
+
+def normalize(key: str, value):
+    # Значение поля из set() в вид, который понимают протоколы; None - поле не управляется
+    if key not in FIELDS:
+        raise ValueError(f"неизвестное поле вывода: {key}")
+    if value is None:
+        return None
+    if key == "rumble":
+        left, right = float(value[0]), float(value[1])
+        frequency = value[2] if len(value) > 2 else None
+        return left, right, frequency
+    if key == "lightbar":
+        return tuple(min(255, max(0, int(c))) for c in value[:3])
+    return int(value) & 0x1F
+
+
+class Ds4Output:
+    def __init__(self, bluetooth=False):
+        self.bluetooth = bluetooth
+        self.interval_ms = BLUETOOTH_INTERVAL_MS if bluetooth else USB_INTERVAL_MS
+
+    def refresh_ms(self, state: dict):
+        # DS4/DS5 держат последнее состояние сами - повторять нечего
+        return None
+
+    def build(self, state: dict) -> bytes:
+        if self.bluetooth:
+            report = bytearray(SONY_BT_SIZE)
+            report[0], report[1] = DS4_OUTPUT_BT, DS4_BT_CONTROL
+            base = 3
+        else:
+            report = bytearray(DS4_USB_SIZE)
+            report[0] = DS4_OUTPUT_USB
+            base = 1
+        rumble = state.get("rumble")
+        if rumble is not None:
+            report[base] |= DS4_FLAG_MOTOR
+            left, right = motor_bytes(rumble)
+            report[base + 3], report[base + 4] = right, left
+        lightbar = state.get("lightbar")
+        if lightbar is not None:
+            report[base] |= DS4_FLAG_LED
+            report[base + 5:base + 8] = bytes(lightbar)
+        return seal_bt_report(report) if self.bluetooth else bytes(report)
+
+
+class Ds5Output(Ds4Output):
+    def __init__(self, bluetooth=False):
+        super().__init__(bluetooth)
+        self.sequence = 0
+        self.lightbar_ready = False
+
+    def build(self, state: dict) -> bytes:
+        if self.bluetooth:
+            report = bytearray(SONY_BT_SIZE)
+            report[0] = DS5_OUTPUT_BT
+            report[1] = self.sequence << 4
+            report[2] = DS5_BT_TAG
+            self.sequence = (self.sequence + 1) & 0x0F
+            base = 3
+        else:
+            report = bytearray(DS5_USB_SIZE)
+            report[0] = DS5_OUTPUT_USB
+            base = 1
+        rumble = state.get("rumble")
+        if rumble is not None:
+            report[base] = DS5_FLAG0_VIBRATION
+            left, right = motor_bytes(rumble)
+            report[base + 2], report[base + 3] = right, left
+        lightbar = state.get("lightbar")
+        if lightbar is not None:
+            if not self.lightbar_ready:
+                report[base + 38] = DS5_FLAG2_LIGHTBAR_SETUP
+                report[base + 41] = DS5_LIGHTBAR_LIGHT_OUT
+                self.lightbar_ready = True
+            report[base + 1] |= DS5_FLAG1_LIGHTBAR
+            report[base + 44:base + 47] = bytes(lightbar)
+        player_leds = state.get("player_leds")
+        if player_leds is not None:
+            report[base + 1] |= DS5_FLAG1_PLAYER_LEDS
+            report[base + 43] = player_leds
+        return seal_bt_report(report) if self.bluetooth else bytes(report)
+
+
+class NintendoOutput:
+    # Только вибрация: индикаторы игрока Joy-Con - подкоманда с ответом, не поток состояния
+    interval_ms = NINTENDO_INTERVAL_MS
+
+    def __init__(self, pad):
+        self.pad = pad
+
+    @property
+    def sides(self) -> tuple:
+        # Один Joy-Con - один привод: играет свою сторону узора
+        return {"joycon_left": ("left",), "joycon_right": ("right",)}.get(self.pad.controller_type, ("left", "right"))
+
+    def refresh_ms(self, state: dict):
+        # HD-вибрация гаснет без повторов: пока моторы крутятся, отчёт повторяется
+        rumble = state.get("rumble")
+        return NINTENDO_INTERVAL_MS if rumble is not None and (rumble[0] > 0 or rumble[1] > 0) else None
+
+    def build(self, state: dict) -> bytes:
+        counter = self.pad.next_packet()
+        rumble = state.get("rumble")
+        if rumble is None or (rumble[0] <= 0 and rumble[1] <= 0):
+            return rumble_report(counter)
+        left, right, frequency = rumble
+        frequency = frequency or DEFAULT_FREQUENCY_HZ
+        sides = self.sides
+        if sides == ("right",):
+            return rumble_report(counter, NEUTRAL_RUMBLE[:4], encode_rumble(frequency, max(left, right)))
+        if sides == ("left",):
+            return rumble_report(counter, encode_rumble(frequency, max(left, right)), NEUTRAL_RUMBLE[4:])
+        return rumble_report(counter, encode_rumble(frequency, left), encode_rumble(frequency, right))
+
+
+def sony_output(kind: str, bluetooth=False):
+    return Ds5Output(bluetooth) if kind == "ds5" else Ds4Output(bluetooth)
+
+
+def parse_sony_output(data):
+    # Разбор выходного отчёта DS4/DS5 (синтетический геймпад, проверка):
+    # -> {"rumble", "lightbar", "player_leds"} или None (чужой отчёт, неверный CRC)
+    data = bytes(data)
+    if not data:
+        return None
+    report_id = data[0]
+    if report_id in (DS4_OUTPUT_BT, DS5_OUTPUT_BT):
+        if len(data) < SONY_BT_SIZE or struct.unpack_from("<I", data, SONY_BT_SIZE - 4)[0] != sony_bt_crc(data[:SONY_BT_SIZE - 4]):
+            return None
+        base = 3
+    elif report_id == DS4_OUTPUT_USB and len(data) >= DS4_USB_SIZE or report_id == DS5_OUTPUT_USB and len(data) >= DS5_USB_SIZE:
+        base = 1
+    else:
+        return None
+    state = {"rumble": None, "lightbar": None, "player_leds": None}
+    if report_id in (DS4_OUTPUT_USB, DS4_OUTPUT_BT):
+        flags = data[base]
+        if flags & DS4_FLAG_MOTOR:
+            state["rumble"] = (data[base + 4] / 255, data[base + 3] / 255)
+        if flags & DS4_FLAG_LED:
+            state["lightbar"] = tuple(data[base + 5:base + 8])
+        return state
+    if data[base] & DS5_FLAG0_VIBRATION:
+        state["rumble"] = (data[base + 3] / 255, data[base + 2] / 255)
+    if data[base + 1] & DS5_FLAG1_LIGHTBAR:
+        state["lightbar"] = tuple(data[base + 44:base + 47])
+    if data[base + 1] & DS5_FLAG1_PLAYER_LEDS:
+        state["player_leds"] = data[base + 43]
+    return state
+
+
+class DeviceOutput:
+    def __init__(self, device, protocol):
+        self.device = device
+        self.protocol = protocol
+        self.state = {}           # желаемое состояние: поле -> значение; пишется последнее
+        self.requests = 0         # вызовов set()
+        self.updates = 0          # записанных изменений состояния
+        self.writes = 0           # всех отчётов, с повторами
+        self.error = None
+        self._dirty = False
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    @property
+    def coalesced(self) -> int:
+        # Изменения, которые заменило следующее до записи
+        return max(0, self.requests - self.updates)
+
+    def start(self):
+        if self._running:
+            return
+        self.error = None
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="device-output", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def set(self, **fields) -> bool:
+        # Поля заменяют ещё не записанные; -> False, если вывод остановлен ошибкой записи
+        changes = {key: normalize(key, value) for key, value in fields.items()}
+        if self.error is not None:
+            return False
+        with self._condition:
+            self.state.update(changes)
+            self.requests += 1
+            self._dirty = True
+            self._condition.notify()
+        if not self._running:
+            self.start()
+        return True
+
+    def _wait(self, last_ns: int) -> bool:
+        # Ждёт изменения или срока повтора; -> False, если вывод остановлен
+        with self._condition:
+            while self._running and not self._dirty:
+                refresh = self.protocol.refresh_ms(self.state)
+                if refresh is None:
+                    self._condition.wait()
+                    continue
+                timeout = (last_ns + refresh * 1_000_000 - time.perf_counter_ns()) / 1e9
+                if timeout <= 0:
+                    break
+                self._condition.wait(timeout)
+            return self._running
+
+    def _write(self, changed: bool):
+        with self._condition:
+            state = dict(self.state)
+            self._dirty = False
+        self.device.write(self.protocol.build(state))
+        self.writes += 1
+        if changed:
+            self.updates += 1
+
+    def _run(self):
+        interval_ns = self.protocol.interval_ms * 1_000_000
+        last_ns = time.perf_counter_ns() - interval_ns
+        try:
+            while self._wait(last_ns):
+                # Ограничение темпа: пока спим, новые set() схлопываются в одно состояние
+                wait_ns = last_ns + interval_ns - time.perf_counter_ns()
+                if wait_ns > 0:
+                    time.sleep(wait_ns / 1e9)
+                self._write(self._dirty)
+                last_ns = time.perf_counter_ns()
+            if self._dirty:
+                # Последнее изменение перед остановкой не теряется
+                self._write(True)
+            rumble = self.state.get("rumble")
+            if rumble is not None and (rumble[0] > 0 or rumble[1] > 0):
+                # Остановка не оставляет моторы крутиться
+                self.state["rumble"] = (0.0, 0.0, None)
+                self._write(False)
+        except (IOError, OSError, ValueError, AttributeError) as e:
+            self.error = str(e)
+        self._running = False
+
+
+def main(argv=None):
+    import argparse
+    from hid_transport import SyntheticTransport
+    parser = argparse.ArgumentParser(description="Нагрузочный прогон вывода на синтетический геймпад")
+    parser.add_argument("kind", choices=("ds4", "ds5"))
+    parser.add_argument("--bluetooth", action="store_true", help="отчёты Bluetooth с CRC32")
+    parser.add_argument("--seconds", type=float, default=2.0)
+    args = parser.parse_args(argv)
+    device = SyntheticTransport(args.kind, speed=0)
+    device.open_path(device.path)
+    output = DeviceOutput(device, sony_output(args.kind, args.bluetooth))
+    started = time.perf_counter()
+    deadline = started + args.seconds
+    hue = 0.0
+    while time.perf_counter() < deadline:
+        # Как ползунок цвета, который тянут без остановки
+        hue += 0.001
+        output.set(lightbar=hue_color(hue), player_leds=PLAYER_LED_PATTERNS[int(hue * 10) % 6])
+    elapsed = time.perf_counter() - started
+    output.stop()
+    last = parse_sony_output(device.written[-1]) if device.written else None
+    print(f"{output.requests} изменений за {elapsed:.2f} с -> {output.writes} отчётов "
+          f"({output.writes / elapsed:.0f}/с), схлопнуто {output.coalesced}")
+    print(f"Последний отчёт: {last}, ожидалось {output.state['lightbar']}")
+    report = bytearray(SONY_BT_SIZE)
+    count = 100000
+    started = time.perf_counter()
+    for _ in range(count):
+        sony_bt_crc(report[:SONY_BT_SIZE - 4])
+    print(f"CRC32: {count / (time.perf_counter() - started):.0f} отчётов/с")
+    return 0 if last is not None and last["lightbar"] == output.state["lightbar"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
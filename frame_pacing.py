@@ -0,0 +1,126 @@
+"""
+Темп работы окна: как часто опрашивать состояние геймпада, IMU, батарею и
+подключения в зависимости от того, видно ли окно и трогают ли геймпад.
+
+    активный - окно видно, ввод меняется: кадр по частоте обновления экрана
+    простой  - окно видно, ввода нет дольше IDLE_AFTER секунд: опрос реже,
+               первое же изменение возвращает активный режим
+    фон      - окно свёрнуто или убрано в трей: только дежурное наблюдение
+
+Для каждого режима считается процессорное время всего процесса (включая
+поток опроса) на секунду реального времени. Пока в режиме не набралось
+MIN_MEASURE_S секунд, цифры нет: сразу после переключения в знаменателе
+микросекунды, и загрузка выходит около 100%.
+"""
+
+import time
+
+PACE_ACTIVE = "active"
+PACE_IDLE = "idle"
+PACE_HIDDEN = "hidden"
+PACE_NAMES = {PACE_ACTIVE: "активный", PACE_IDLE: "простой", PACE_HIDDEN: "фон"}
+IDLE_AFTER = 3.0
+# Сдвиг оси меньше этого - шум стика в покое, а не ввод
+INPUT_DEADBAND = 0.05
+DEFAULT_REFRESH_HZ = 60.0
+MIN_REFRESH_HZ = 30.0
+MAX_REFRESH_HZ = 240.0
+# Меньше этого времени в режиме - загрузка ещё не измерена
+MIN_MEASURE_S = 1.0
+# Интервалы таймеров окна, мс; "state" активного режима берётся от частоты экрана
+ACTIVE_INTERVALS = {"gyro": 50, "battery": 2000, "hotplug": 100, "sessions": 50}
+PACE_INTERVALS = {
+    PACE_IDLE: {"state": 100, "gyro": 250, "battery": 5000, "hotplug": 250, "sessions": 100},
+    PACE_HIDDEN: {"state": 500, "gyro": 1000, "battery": 30000, "hotplug": 1000, "sessions": 500},
+}
+
+
+def frame_interval_ms(refresh_hz) -> int:
+    # Целые мс с округлением вниз: таймер не реже кадра экрана
+    hz = refresh_hz if refresh_hz and refresh_hz > 0 else DEFAULT_REFRESH_HZ
+    hz = max(MIN_REFRESH_HZ, min(MAX_REFRESH_HZ, hz))
+    return max(1, int(1000 / hz))
+
+
+class CpuMeter:
+    def __init__(self, clock=time.monotonic, cpu_clock=time.process_time):
+        self.clock = clock
+        self.cpu_clock = cpu_clock
+        self.mode = None
+        self.wall = {}            # режим -> секунд реального времени
+        self.cpu = {}             # режим -> секунд процессора
+        self.last_wall = clock()
+        self.last_cpu = cpu_clock()
+
+    def switch(self, mode):
+        self.sample()
+        self.mode = mode
+
+    def sample(self):
+        wall, cpu = self.clock(), self.cpu_clock()
+        if self.mode is not None:
+            self.wall[self.mode] = self.wall.get(self.mode, 0.0) + wall - self.last_wall
+            self.cpu[self.mode] = self.cpu.get(self.mode, 0.0) + cpu - self.last_cpu
+        self.last_wall, self.last_cpu = wall, cpu
+
+    def percent(self, mode):
+        # % одного ядра; None, пока в режиме меньше MIN_MEASURE_S секунд
+        wall = self.wall.get(mode, 0.0)
+        if wall < MIN_MEASURE_S:
+            return None
+        return 100.0 * self.cpu.get(mode, 0.0) / wall
+
+    def format(self) -> str:
+        self.sample()
+        parts = []
+        for mode in (PACE_ACTIVE, PACE_IDLE, PACE_HIDDEN):
+            percent = self.percent(mode)
+            if percent is not None:
+                parts.append(f"{PACE_NAMES[mode]} {percent:.1f}%")
+        return "CPU: " + (", ".join(parts) if parts else "нет данных")
+
+
+class FramePacer:
+    def __init__(self, refresh_hz=DEFAULT_REFRESH_HZ, idle_after=IDLE_AFTER, clock=time.monotonic):
+        self.clock = clock
+        self.idle_after = idle_after
+        self.refresh_hz = refresh_hz
+        self.mode = PACE_ACTIVE
+        self.last_input = clock()
+        self.cpu = CpuMeter(clock)
+        self.cpu.switch(PACE_ACTIVE)
+
+    def reset_cpu(self):
+        # Считать заново, например без построения окна при запуске
+        self.cpu = CpuMeter(self.clock)
+        self.cpu.switch(self.mode)
+
+    def set_refresh(self, refresh_hz) -> bool:
+        # -> True, если поменялся интервал кадра
+        before = frame_interval_ms(self.refresh_hz)
+        self.refresh_hz = refresh_hz
+        return frame_interval_ms(refresh_hz) != before
+
+    def intervals(self, mode=None) -> dict:
+        mode = mode or self.mode
+        if mode == PACE_ACTIVE:
+            return dict(ACTIVE_INTERVALS, state=frame_interval_ms(self.refresh_hz))
+        return dict(PACE_INTERVALS[mode])
+
+    def update(self, visible: bool, changed: bool) -> bool:
+        # -> True, если сменился режим и таймеры надо перезапустить
+        now = self.clock()
+        if changed or (visible and self.mode == PACE_HIDDEN):
+            # Окно только что развернули - отвечаем сразу, как на ввод
+            self.last_input = now
+        if not visible:
+            mode = PACE_HIDDEN
+        elif now - self.last_input >= self.idle_after:
+            mode = PACE_IDLE
+        else:
+            mode = PACE_ACTIVE
+        if mode == self.mode:
+            return False
+        self.cpu.switch(mode)
+        self.mode = mode
+        return True
@@ -0,0 +1,299 @@
+"""
+Консольный прогон тестов для автоматических стендов - без PyQt6.
+
+    python gamepad_tester.py --cli [--device 0] [--timeout 30] [--json result.json]
+    python gamepad_cli.py --list
+    python gamepad_cli.py --nintendo [--list]
+
+Находит геймпады через get_all_gamepads, прогоняет те же проверки, что и
+отчёт в GUI (кнопки, стики, триггеры, вибрация, гироскоп), печатает
+результат в JSON и завершается с кодом:
+    0 - все проверки пройдены, 1 - есть непройденные, 2 - нет устройства/ошибка
+
+С --nintendo Joy-Con и Pro Controller открываются напрямую по HID в полном
+режиме 0x30: кнопки, стики и IMU берутся из одних отчётов, SDL не нужен.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame
+
+from controllers import (
+    NINTENDO_PIDS, NintendoController, bind_hid_devices, classify_gamepad, open_hid_controller, rumble_output
+)
+from hid_reports import HidBatchReader
+from hid_transport import NINTENDO_VID, enumerator_for, make_transport_factory
+from input_engine import AcquisitionEngine, DEFAULT_RATE_HZ, get_all_gamepads, init_joystick_subsystem
+from nintendo_protocol import AXES, CONTROLLER_NAMES
+from report_model import CHECKS, TestState, default_checks
+from result_store import SOURCE_CLI, ResultStore
+from rumble import (
+    DEFAULT_PATTERN, PATTERNS, HdRumble, MotorResponse, RumbleScheduler, format_response
+)
+
+EXIT_PASSED = 0
+EXIT_FAILED = 1
+EXIT_ERROR = 2
+# Полный режим Nintendo шлёт отчёт каждые 15 мс: секунда тишины - геймпад пропал
+HID_SILENCE_S = 1.0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="gamepad_tester --cli", description="Gamepad Tester Pro - консольный режим")
+    parser.add_argument("--list", action="store_true", help="показать геймпады и выйти")
+    parser.add_argument("--device", type=int, default=0, help="индекс геймпада (по умолчанию 0)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="сколько секунд ждать прохождения проверок")
+    parser.add_argument("--checks", default=None,
+                        help=f"проверки через запятую из {','.join(CHECKS)}; по умолчанию - все доступные")
+    parser.add_argument("--min-buttons", type=int, default=1, help="сколько разных кнопок нужно нажать")
+    parser.add_argument("--all-buttons", action="store_true", help="требовать нажатия всех кнопок")
+    parser.add_argument("--rate", type=int, default=DEFAULT_RATE_HZ, help="частота опроса, Гц")
+    parser.add_argument("--rumble-pattern", choices=list(PATTERNS), default=DEFAULT_PATTERN,
+                        help="узор вибрации; с IMU по нему меряется отклик моторов")
+    parser.add_argument("--rumble-ms", type=int, default=None, help="длительность включения мотора в узоре, мс")
+    parser.add_argument("--hid", default=None, help="транспорт HID: synthetic:ds4, replay:<файл> (для отладки)")
+    parser.add_argument("--nintendo", action="store_true", help="Joy-Con/Pro Controller напрямую по HID, без SDL")
+    parser.add_argument("--json", dest="json_path", default=None, help="записать результат в файл вместо stdout")
+    parser.add_argument("--store", default=None, help="дописать результат в базу истории (например results.db)")
+    parser.add_argument("--quiet", action="store_true", help="не печатать ход проверки в stderr")
+    return parser.parse_args(argv)
+
+
+def log(args, message: str):
+    if not args.quiet:
+        print(message, file=sys.stderr, flush=True)
+
+
+def select_checks(args, axes: int, imu: bool):
+    # -> кортеж проверок или None, если в --checks есть неизвестные (ошибка уже выдана)
+    if not args.checks:
+        return tuple(default_checks(axes, imu))
+    checks = tuple(c.strip() for c in args.checks.split(',') if c.strip())
+    unknown = [c for c in checks if c not in CHECKS]
+    if unknown:
+        emit(args, {"error": f"unknown checks: {','.join(unknown)}"})
+        return None
+    return checks
+
+
+def run(args) -> int:
+    started = time.perf_counter()
+    try:
+        transport_factory = make_transport_factory(args.hid)
+    except ValueError as e:
+        log(args, f"Ошибка: {e}")
+        emit(args, {"error": str(e)})
+        return EXIT_ERROR
+    if args.nintendo:
+        return run_nintendo(args, started, transport_factory)
+    init_joystick_subsystem()
+    gamepads = get_all_gamepads()
+    if args.list:
+        for gp in gamepads:
+            print(f"{gp['index']}: {gp['name']} ({gp['buttons']} кн., {gp['axes']} осей, {gp['hats']} HAT)")
+        return EXIT_PASSED if gamepads else EXIT_ERROR
+    if args.device >= len(gamepads):
+        result = {"error": "device not found", "devices": len(gamepads)}
+        emit(args, result)
+        return EXIT_ERROR
+    gp = gamepads[args.device]
+    joystick = pygame.joystick.Joystick(gp['index'])
+    joystick.init()
+    family = classify_gamepad(gp['name'])
+    hid_info = bind_hid_devices(gamepads, enumerator_for(transport_factory)).get(gp['instance_id'])
+    controller, report_size, layouts = open_hid_controller(family, transport_factory, hid_info)
+    checks = select_checks(args, gp['axes'], controller is not None)
+    if checks is None:
+        return EXIT_ERROR
+    min_buttons = gp['buttons'] if args.all_buttons else args.min_buttons
+    state = TestState(gp['buttons'], min_buttons, checks)
+    state.on_check = lambda key, passed: log(args, f"  ✅ {key}") if passed and key in state.checks else None
+    engine = AcquisitionEngine(args.rate)
+    engine.set_joystick(joystick)
+    engine.start()
+    reader = HidBatchReader()
+    device = describe_device(gp, controller)
+    startup_ms = (time.perf_counter() - started) * 1000
+    log(args, f"{gp['name']}: проверки {', '.join(checks)} (готов за {startup_ms:.0f} мс)")
+    rumble = start_rumble(args, rumble_output(joystick, controller)) if "vibration" in checks else None
+    deadline = started + args.timeout
+    snapshot = None
+    try:
+        while time.perf_counter() < deadline:
+            snapshot = engine.poll(snapshot)
+            if not engine.connected:
+                log(args, "Геймпад отключён")
+                break
+            if snapshot.frames:
+                state.update_input(snapshot)
+            if controller is not None:
+                reader.drain(controller.device, report_size, layouts)
+                if reader.samples:
+                    state.update_gyro(reader.samples)
+            rumble = poll_rumble(args, state, rumble, reader)
+            if state.all_passed:
+                break
+            time.sleep(0.01)
+    finally:
+        engine.stop()
+        if rumble is not None:
+            rumble[0].stop()
+        if controller is not None:
+            # Вывод устройства при остановке сам гасит моторы
+            controller.disconnect()
+        else:
+            try:
+                joystick.rumble(0, 0, 0)
+            except pygame.error:
+                pass
+    return finish(args, device, state, started, startup_ms)
+
+
+def run_nintendo(args, started: float, transport_factory) -> int:
+    if transport_factory is None:
+        emit(args, {"error": "hidapi not available"})
+        return EXIT_ERROR
+    devices = enumerator_for(transport_factory).find(NINTENDO_VID, NINTENDO_PIDS)
+    if args.list:
+        for n, info in enumerate(devices):
+            print(f"{n}: {CONTROLLER_NAMES[NINTENDO_PIDS[info['product_id']]]} ({info['bus']}, "
+                  f"{info.get('serial_number') or 'без серийного номера'})")
+        return EXIT_PASSED if devices else EXIT_ERROR
+    controller = NintendoController(transport_factory)
+    if args.device >= len(devices) or not controller.connect(info=devices[args.device]):
+        emit(args, {"error": "device not found", "devices": len(devices)})
+        return EXIT_ERROR
+    controller.calibrate()
+    names = controller.input.names
+    gp = {"index": args.device, "name": CONTROLLER_NAMES[controller.controller_type], "buttons": len(names),
+          "axes": AXES, "hats": 0}
+    checks = select_checks(args, AXES, controller.full_mode)
+    if checks is None:
+        controller.disconnect()
+        return EXIT_ERROR
+    min_buttons = gp['buttons'] if args.all_buttons else args.min_buttons
+    state = TestState(gp['buttons'], min_buttons, checks)
+    state.on_check = lambda key, passed: log(args, f"  ✅ {key}") if passed and key in state.checks else None
+    startup_ms = (time.perf_counter() - started) * 1000
+    status = controller.mode_status()
+    log(args, f"{gp['name']} по HID{f' ({status})' if status else ''}: "
+              f"проверки {', '.join(checks)} (готов за {startup_ms:.0f} мс)")
+    rumble = start_rumble(args, HdRumble(controller)) if "vibration" in checks else None
+    reader = HidBatchReader()
+    device = describe_device(gp, controller)
+    snapshot = None
+    deadline = started + args.timeout
+    last_report = time.perf_counter()
+    try:
+        while time.perf_counter() < deadline:
+            # Одна пачка отчётов 0x30: три сэмпла IMU на отчёт и кнопки со стиками из него же
+            reader.drain(controller.device, 49, controller.imu_layouts, controller.input.feed)
+            now = time.perf_counter()
+            if reader.reports:
+                last_report = now
+            elif now - last_report > HID_SILENCE_S:
+                log(args, "Геймпад не отвечает")
+                break
+            if reader.samples:
+                state.update_gyro(reader.samples)
+            rumble = poll_rumble(args, state, rumble, reader)
+            snapshot = controller.input.poll(snapshot)
+            if snapshot.frames:
+                state.update_input(snapshot)
+            if state.all_passed:
+                break
+            time.sleep(0.01)
+    finally:
+        if rumble is not None:
+            rumble[0].stop()
+        controller.disconnect()
+    return finish(args, device, state, started, startup_ms)
+
+
+def start_rumble(args, output):
+    # -> (планировщик, отклик) играющего узора или None, если вибрация не запустилась
+    name, pattern = PATTERNS[args.rumble_pattern]
+    frames = pattern() if args.rumble_ms is None else pattern(on_ms=args.rumble_ms)
+    scheduler = RumbleScheduler(output)
+    if not scheduler.play(frames):
+        log(args, f"Вибрация: {scheduler.error}")
+        return None
+    log(args, f"Вибрация: {name.lower()} - держите геймпад неподвижно")
+    return scheduler, MotorResponse(output.sides)
+
+
+def poll_rumble(args, state: TestState, rumble, reader: HidBatchReader):
+    # Сэмплы пачки - в отклик; после узора - вердикт. С IMU мотор без отклика - брак,
+    # без IMU вибрация засчитывается по тому, что геймпад принял команду
+    if rumble is None:
+        return None
+    scheduler, response = rumble
+    if reader.samples:
+        response.add(reader.samples, reader.stamps, time.perf_counter_ns())
+    if scheduler.running:
+        return rumble
+    result = response.analyze(scheduler.timeline)
+    if scheduler.error:
+        log(args, f"Вибрация: {scheduler.error}")
+    else:
+        for line in format_response(result):
+            log(args, f"  {line}")
+    passed = result["passed"]
+    state.set_vibration(scheduler.accepted if passed is None else passed, result)
+    return None
+
+
+def describe_device(gp: dict, controller) -> dict:
+    # До отключения: disconnect() сбрасывает шину контроллера
+    return {"index": gp['index'], "name": gp['name'], "buttons": gp['buttons'], "axes": gp['axes'],
+            "hats": gp['hats'], "hid_vid": controller.vid if controller else None,
+            "hid_pid": controller.pid if controller else None,
+            "hid_serial": controller.serial if controller else None,
+            "hid_bus": controller.connection_type if controller else None}
+
+
+def finish(args, device: dict, state: TestState, started: float, startup_ms: float) -> int:
+    result = {
+        "device": device,
+        "startup_ms": round(startup_ms, 1),
+        "duration_s": round(time.perf_counter() - started, 3),
+        "date": time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    result.update(state.to_dict())
+    emit(args, result)
+    if args.store:
+        # В базу - только итоги теста; ошибки запуска emit лишь печатает
+        store = ResultStore(args.store)
+        store.add(result, SOURCE_CLI)
+        store.close()
+    return EXIT_PASSED if result["passed"] else EXIT_FAILED
+
+
+def emit(args, result: dict):
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    try:
+        return run(args)
+    except pygame.error as e:
+        print(f"Ошибка pygame: {e}", file=sys.stderr)
+        return EXIT_ERROR
+    finally:
+        pygame.quit()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
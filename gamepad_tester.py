@@ -5,195 +5,77 @@ GitHub: https://github.com/mrSaT13
 """
 
 import sys
+
+if __name__ == "__main__" and "--cli" in sys.argv[1:]:
+    # Консольный режим для стендов: PyQt6 не импортируется вовсе
+    from gamepad_cli import main as cli_main
+    sys.exit(cli_main([arg for arg in sys.argv[1:] if arg != "--cli"]))
+
+from startup_timing import StartupTimer, parse_startup_args
+
+STARTUP = StartupTimer()
+
+import math
 import pygame
+import sqlite3
 import time
+from collections import OrderedDict
+STARTUP.mark("импорт pygame")
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QPushButton, QFrame, QGridLayout, QSlider,
     QScrollArea, QTabWidget, QProgressBar, QGroupBox, QComboBox,
     QSystemTrayIcon, QMenu, QFileDialog
 )
-from PyQt6.QtCore import Qt, QTimer
-from PyQt6.QtGui import QFont, QColor, QIcon, QPixmap, QPainter, QKeySequence, QShortcut, QAction
-
-try:
-    import hid
-    HID_AVAILABLE = True
-except ImportError:
-    HID_AVAILABLE = False
-
-
-class DS4Controller:
-    def __init__(self):
-        self.device = None
-        self.is_ds4 = False
-        self.is_ds5 = False
-        self.connection_type = "none"
-        
-    def connect(self):
-        if not HID_AVAILABLE:
-            return False
-        devices = [(0x054C, 0x09CC, "ds4"), (0x054C, 0x05C4, "ds4"), (0x054C, 0x0BA0, "ds5")]
-        for vid, pid, ctrl_type in devices:
-            try:
-                self.device = hid.device()
-                self.device.open(vid, pid)
-                self.device.set_nonblocking(True)
-                self.is_ds4 = (ctrl_type == "ds4")
-                self.is_ds5 = (ctrl_type == "ds5")
-                self.connection_type = "usb"
-                return True
-            except:
-                self.device = None
-        return False
-        
-    def disconnect(self):
-        if self.device:
-            try: self.device.close()
-            except: pass
-            self.device = None
-        self.connection_type = "none"
-            
-    def get_battery(self):
-        if not self.device:
-            return None, None
-        try:
-            if self.connection_type == "bluetooth":
-                report = self.device.get_feature_report(0x11, 49)
-                if report and len(report) > 53:
-                    battery_byte = report[53]
-                    level = battery_byte & 0x0F
-                    charging = bool(battery_byte & 0x10)
-                    levels = [0, 10, 40, 60, 80, 100]
-                    return levels[min(level, 5)], charging
-            else:
-                report = self.device.get_feature_report(0x05, 49)
-                if report and len(report) > 42:
-                    battery_byte = report[42]
-                    level = battery_byte & 0x0F
-                    charging = bool(battery_byte & 0x10)
-                    levels = [0, 10, 40, 60, 80, 100]
-                    return levels[min(level, 5)], charging
-        except:
-            pass
-        return None, None
-        
-    def read_data(self):
-        if not self.device:
-            return None
-        try:
-            data = self.device.read(78 if self.connection_type == "bluetooth" else 64, timeout_ms=5)
-            if data and len(data) >= 60:
-                return data
-        except:
-            pass
-        return None
+from PyQt6.QtCore import Qt, QEvent, QTimer, QRect, QRectF, QPointF
+from PyQt6.QtGui import (
+    QFont, QColor, QIcon, QImage, QPixmap, QPainter, QPainterPath, QPen, QKeySequence, QShortcut, QAction
+)
+STARTUP.mark("импорт PyQt6")
 
+from frame_pacing import INPUT_DEADBAND, PACE_HIDDEN, PACE_NAMES, FramePacer
+from controllers import (
+    DEFAULT_TRANSPORT, DS4Controller, NintendoController, bind_hid_devices, classify_gamepad, is_joycon_right_name
+)
+from device_output import LIGHT_TEST_STEP_MS, LIGHT_TEST_STEPS, PLAYER_LED_PATTERNS, hue_color
+from hid_reports import HidBatchReader, HidReportMonitor, format_summary, jitter_bin_labels
+from hid_transport import BUS_USB, NINTENDO_VID, SONY_VID, enumerator_for
+from hotplug import HidReconnector, HotplugWatcher
+from imu_calibration import SOURCE_NAMES, ImuCalibration
+from imu_fusion import FUSION_NAMES, FusionEngine, quat_matrix
+from imu_noise import CAPTURE_DURATIONS, NUMPY_AVAILABLE, NoiseCapture, format_noise
+from ir_camera import DEFAULT_RESOLUTION, RESOLUTIONS, IrReplay, IrStream
+from multi_tester import MultiTester, PadSession
+from input_engine import (
+    AcquisitionEngine, InputSnapshot, DEFAULT_RATE_HZ, MAX_BUTTONS, MODE_POLL, MODE_EVENTS, init_joystick_subsystem
+)
+from report_model import CHECKS, TestState, trigger_value
+from rumble import (
+    DEFAULT_PATTERN, PATTERNS, HdRumble, HidRumble, MotorResponse, RumbleScheduler, SdlRumble, format_response,
+    pattern_duration_ms
+)
+from session_record import SessionHidTransport, SessionPlayer, SessionReader, SessionRecorder
+from result_store import (
+    DEFAULT_STORE, SOURCE_STATION, SOURCE_WINDOW, ResultStore, as_record, export_csv, export_json
+)
+from station import (
+    RESULT_PASS, STATION_DONE, STATION_NAMES, STATION_TESTING, STATION_WAITING, STEP_PROMPTS, StationMachine
+)
+STARTUP.mark("модули приложения")
 
-class NintendoController:
-    def __init__(self):
-        self.device = None
-        self.controller_type = "none"
-        
-    def connect(self, pid=None):
-        if not HID_AVAILABLE:
-            return False
-        devices = [(0x057E, 0x2006, "joycon_left"), (0x057E, 0x2007, "joycon_right"), (0x057E, 0x2009, "pro_controller")]
-        for vid, dev_pid, ctrl_type in devices:
-            if pid and pid != dev_pid:
-                continue
-            try:
-                self.device = hid.device()
-                self.device.open(vid, dev_pid)
-                self.device.set_nonblocking(True)
-                self.controller_type = ctrl_type
-                return True
-            except:
-                self.device = None
-        return False
-        
-    def disconnect(self):
-        if self.device:
-            try: self.device.close()
-            except: pass
-            self.device = None
-        self.controller_type = "none"
-        
-    def get_battery(self):
-        if not self.device:
-            return None, False
-        try:
-            report = self.device.get_feature_report(0x80, 49)
-            if report and len(report) > 5:
-                battery_byte = report[5]
-                level = battery_byte & 0x0F
-                levels = [0, 25, 50, 75, 100]
-                return levels[min(level, 4)], False
-        except:
-            pass
-        return None, False
-        
-    def read_imu(self):
-        if not self.device:
-            return None
-        try:
-            data = self.device.read(49, timeout_ms=10)
-            if data and len(data) >= 25:
-                accel_x = int.from_bytes(data[13:15], 'little', signed=True) / 100.0
-                accel_y = int.from_bytes(data[15:17], 'little', signed=True) / 100.0
-                accel_z = int.from_bytes(data[17:19], 'little', signed=True) / 100.0
-                gyro_x = int.from_bytes(data[19:21], 'little', signed=True) / 100.0
-                gyro_y = int.from_bytes(data[21:23], 'little', signed=True) / 100.0
-                gyro_z = int.from_bytes(data[23:25], 'little', signed=True) / 100.0
-                return {'accel': (accel_x, accel_y, accel_z), 'gyro': (gyro_x, gyro_y, gyro_z)}
-        except:
-            pass
-        return None
-        
-    def enable_ir_camera(self):
-        if not self.device or self.controller_type != "joycon_right":
-            return False
-        try:
-            report = bytes([0x01, 0x31, 0x01, 0x40, 0x01])
-            self.device.write(report)
-            return True
-        except:
-            return False
-            
-    def disable_ir_camera(self):
-        if not self.device:
-            return False
-        try:
-            report = bytes([0x01, 0x31, 0x01, 0x40, 0x00])
-            self.device.write(report)
-            return True
-        except:
-            return False
+VIEW_CACHE_SIZE = 4
+RENDER_WIDGETS = "widgets"
+RENDER_CANVAS = "canvas"
+FRAME_COST_FRAMES = 120
 
 
-def get_all_gamepads():
-    gamepads = []
-    try:
-        if not pygame.get_init():
-            pygame.init()
-            pygame.joystick.init()
-        pygame.event.pump()
-        count = pygame.joystick.get_count()
-        for i in range(count):
-            try:
-                joy = pygame.joystick.Joystick(i)
-                if not joy.get_init():
-                    joy.init()
-                name = joy.get_name()
-                buttons = joy.get_numbuttons()
-                axes = joy.get_numaxes()
-                hats = joy.get_numhats()
-                gamepads.append({'index': i, 'name': name, 'buttons': buttons, 'axes': axes, 'hats': hats})
-            except Exception as e:
-                print(f"Gamepad error: {e}")
-    except Exception as e:
-        print(f"get_all_gamepads error: {e}")
-    return gamepads
+def set_style_state(widget, name: str, value):
+    # Переключение заранее описанного в QSS состояния через динамическое свойство:
+    # стиль не парсится заново, Qt только перепривязывает правила виджета.
+    widget.setProperty(name, value)
+    style = widget.style()
+    style.unpolish(widget)
+    style.polish(widget)
 
 
 class BatteryWidget(QFrame):
@@ -249,6 +131,20 @@ class BatteryWidget(QFrame):
 
 
 class ButtonWidget(QFrame):
+    STYLE = """
+        QFrame {
+            background: qlineargradient(x1:0, y1:0, x2:1, y2:1, stop:0 #2a2a3e, stop:1 #3a3a4e);
+            border-radius: 10px;
+            border: 2px solid #4a4a5e;
+        }
+        QFrame[active="true"] {
+            background: qradialgradient(cx:0.5, cy:0.5, radius:0.8, stop:0 #00ff88, stop:1 #1a1a2e);
+            border: 3px solid #00ff88;
+        }
+        QLabel { color: #8888aa; font-size: 12px; font-weight: bold; }
+        QLabel[active="true"] { color: #ffffff; }
+    """
+
     def __init__(self, btn_id: int, parent=None):
         super().__init__(parent)
         self.btn_id = btn_id
@@ -257,45 +153,50 @@ class ButtonWidget(QFrame):
         self.setup_ui()
         
     def setup_ui(self):
-        self.setStyleSheet("""
-            QFrame {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:1, stop:0 #2a2a3e, stop:1 #3a3a4e);
-                border-radius: 10px;
-                border: 2px solid #4a4a5e;
-            }
-        """)
+        self.setProperty("active", False)
+        self.setStyleSheet(self.STYLE)
         layout = QVBoxLayout(self)
         layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.label = QLabel(f"B{self.btn_id}")
         self.label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.label.setStyleSheet("QLabel { color: #8888aa; font-size: 12px; font-weight: bold; }")
+        self.label.setProperty("active", False)
         layout.addWidget(self.label)
         
     def set_active(self, active: bool):
-        if active:
-            self.setStyleSheet("""
-                QFrame {
-                    background: qradialgradient(cx:0.5, cy:0.5, radius:0.8, stop:0 #00ff88, stop:1 #1a1a2e);
-                    border-radius: 10px;
-                    border: 3px solid #00ff88;
-                }
-                QLabel { color: #ffffff; font-size: 12px; font-weight: bold; }
-            """)
-        else:
-            self.setStyleSheet("""
-                QFrame {
-                    background: qlineargradient(x1:0, y1:0, x2:1, y2:1, stop:0 #2a2a3e, stop:1 #3a3a4e);
-                    border-radius: 10px;
-                    border: 2px solid #4a4a5e;
-                }
-                QLabel { color: #8888aa; font-size: 12px; font-weight: bold; }
-            """)
+        active = bool(active)
+        if active == self.is_pressed:
+            return
+        self.is_pressed = active
+        set_style_state(self, "active", active)
+        set_style_state(self.label, "active", active)
+
+    def set_btn_id(self, btn_id: int):
+        # Виджет из пула переиспользуется под другой номер кнопки
+        self.set_active(False)
+        if btn_id != self.btn_id:
+            self.btn_id = btn_id
+            self.label.setText(f"B{btn_id}")
 
 
 class StickWidget(QFrame):
+    INDICATOR_STYLE = """
+        QFrame {
+            background: qradialgradient(cx:0.5, cy:0.5, radius:0.7, stop:0 #00d4ff, stop:1 #0066ff);
+            border-radius: 15px;
+            border: 3px solid #00d4ff;
+        }
+        QFrame[deflected="true"] {
+            background: qradialgradient(cx:0.5, cy:0.5, radius:0.7, stop:0 #00ff88, stop:1 #00aa55);
+            border: 3px solid #00ff88;
+        }
+    """
+
     def __init__(self, title: str, parent=None):
         super().__init__(parent)
         self.title = title
+        self.offset = (0, 0)
+        self.deflected = False
+        self.values_text = ""
         self.setFixedSize(160, 190)
         self.setup_ui()
         
@@ -320,13 +221,8 @@ class StickWidget(QFrame):
         layout.addWidget(self.stick_area, alignment=Qt.AlignmentFlag.AlignCenter)
         self.indicator = QFrame(self.stick_area)
         self.indicator.setFixedSize(30, 30)
-        self.indicator.setStyleSheet("""
-            QFrame {
-                background: qradialgradient(cx:0.5, cy:0.5, radius:0.7, stop:0 #00d4ff, stop:1 #0066ff);
-                border-radius: 15px;
-                border: 3px solid #00d4ff;
-            }
-        """)
+        self.indicator.setProperty("deflected", False)
+        self.indicator.setStyleSheet(self.INDICATOR_STYLE)
         self.indicator.move(45, 45)
         self.indicator.show()
         self.values_label = QLabel("X:0.00 Y:0.00")
@@ -335,26 +231,18 @@ class StickWidget(QFrame):
         layout.addWidget(self.values_label)
         
     def set_values(self, x: float, y: float):
-        offset_x = int(x * 40)
-        offset_y = int(-y * 40)
-        self.indicator.move(45 + offset_x, 45 + offset_y)
-        self.values_label.setText(f"X:{x:+.2f} Y:{y:+.2f}")
-        if abs(x) > 0.1 or abs(y) > 0.1:
-            self.indicator.setStyleSheet("""
-                QFrame {
-                    background: qradialgradient(cx:0.5, cy:0.5, radius:0.7, stop:0 #00ff88, stop:1 #00aa55);
-                    border-radius: 15px;
-                    border: 3px solid #00ff88;
-                }
-            """)
-        else:
-            self.indicator.setStyleSheet("""
-                QFrame {
-                    background: qradialgradient(cx:0.5, cy:0.5, radius:0.7, stop:0 #00d4ff, stop:1 #0066ff);
-                    border-radius: 15px;
-                    border: 3px solid #00d4ff;
-                }
-            """)
+        offset = (int(x * 40), int(-y * 40))
+        if offset != self.offset:
+            self.offset = offset
+            self.indicator.move(45 + offset[0], 45 + offset[1])
+        text = f"X:{x:+.2f} Y:{y:+.2f}"
+        if text != self.values_text:
+            self.values_text = text
+            self.values_label.setText(text)
+        deflected = abs(x) > 0.1 or abs(y) > 0.1
+        if deflected != self.deflected:
+            self.deflected = deflected
+            set_style_state(self.indicator, "deflected", deflected)
 
 
 class TriggerWidget(QFrame):
@@ -391,16 +279,441 @@ class TriggerWidget(QFrame):
         
     def set_value(self, val: float):
         percent = int(val * 100)
+        self.value = val
+        if percent == self.slider.value():
+            return
         self.slider.setValue(percent)
         self.value_label.setText(f"{percent}%")
 
 
+class ControllerView(QWidget):
+    # Вид геймпада для одной раскладки (кнопки/оси/HAT). Между устройствами с
+    # той же раскладкой не пересоздаётся: configure() меняет подписи и
+    # сбрасывает состояние, кнопки при вытеснении из кэша уходят в общий пул.
+    def __init__(self, buttons: int, axes: int, hats: int, button_pool: list, parent=None):
+        super().__init__(parent)
+        self.signature = (buttons, axes, hats)
+        self.button_widgets = {}
+        self.setup_ui(button_pool)
+
+    def setup_ui(self, button_pool: list):
+        buttons, axes, hats = self.signature
+        self.setStyleSheet("background: transparent;")
+        gp_layout = QHBoxLayout(self)
+        gp_layout.setSpacing(25)
+        gp_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        left = QWidget()
+        left.setStyleSheet("background: transparent;")
+        left_layout = QVBoxLayout(left)
+        left_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        left_layout.setSpacing(12)
+        self.left_stick = StickWidget("Левый")
+        self.right_stick = StickWidget("Правый")
+        left_layout.addWidget(self.left_stick)
+        left_layout.addWidget(self.right_stick)
+        gp_layout.addWidget(left)
+        center = QWidget()
+        center.setStyleSheet("background: transparent;")
+        center_layout = QVBoxLayout(center)
+        center_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        center_layout.setSpacing(10)
+        self.name_lbl = QLabel()
+        self.name_lbl.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.name_lbl.setStyleSheet("""
+            QLabel {
+                color: #ffffff; font-size: 13px; font-weight: bold;
+                padding: 6px 12px; background: #1a1a2e; border-radius: 8px; border: 2px solid #3a3a4e;
+            }
+        """)
+        center_layout.addWidget(self.name_lbl)
+        btn_grid = QGridLayout()
+        btn_grid.setSpacing(6)
+        btn_grid.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        cols = 5
+        for i in range(buttons):
+            row = i // cols
+            col = i % cols
+            if button_pool:
+                btn = button_pool.pop()
+                btn.set_btn_id(i)
+            else:
+                btn = ButtonWidget(i)
+            btn_grid.addWidget(btn, row, col)
+            btn.show()
+            self.button_widgets[i] = btn
+        center_layout.addLayout(btn_grid)
+        gp_layout.addWidget(center)
+        right = QWidget()
+        right.setStyleSheet("background: transparent;")
+        right_layout = QVBoxLayout(right)
+        right_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        right_layout.setSpacing(12)
+        self.lt_slider = TriggerWidget("LT", "#ff6b6b")
+        self.rt_slider = TriggerWidget("RT", "#ff6b6b")
+        right_layout.addWidget(self.lt_slider)
+        right_layout.addWidget(self.rt_slider)
+        info_box = QFrame()
+        info_box.setStyleSheet("QFrame { background: #1a1a2e; border-radius: 8px; border: 2px solid #3a3a4e; }")
+        info_layout = QVBoxLayout(info_box)
+        info_layout.setContentsMargins(10, 10, 10, 10)
+        info_layout.setSpacing(4)
+        info_title = QLabel("📊 Инфо")
+        info_title.setStyleSheet("QLabel { color: #00d4ff; font-size: 12px; font-weight: bold; }")
+        info_layout.addWidget(info_title)
+        for text, count in [("Кнопки", buttons), ("Оси", axes), ("HAT", hats)]:
+            lbl = QLabel(f"{text}: {count}")
+            lbl.setStyleSheet("QLabel { color: #8888aa; font-size: 10px; }")
+            info_layout.addWidget(lbl)
+        right_layout.addWidget(info_box)
+        right_layout.addStretch()
+        gp_layout.addWidget(right)
+
+    def configure(self, name: str):
+        self.name_lbl.setText(name)
+        for btn in self.button_widgets.values():
+            btn.set_active(False)
+        self.left_stick.set_values(0.0, 0.0)
+        self.right_stick.set_values(0.0, 0.0)
+        self.lt_slider.set_value(0.0)
+        self.rt_slider.set_value(0.0)
+
+    def set_button(self, btn_id: int, active: bool):
+        widget = self.button_widgets.get(btn_id)
+        if widget is not None:
+            widget.set_active(active)
+
+    def set_sticks(self, lx: float, ly: float, rx: float, ry: float):
+        self.left_stick.set_values(lx, ly)
+        self.right_stick.set_values(rx, ry)
+
+    def set_triggers(self, lt: float, rt: float):
+        self.lt_slider.set_value(lt)
+        self.rt_slider.set_value(rt)
+
+    def set_hats(self, hats):
+        # HAT и IMU в виджетном виде не показываются (IMU - во вкладке "Тесты")
+        pass
+
+    def set_imu(self, sample):
+        pass
+
+    def release(self, button_pool: list):
+        # Кнопки - в пул (не больше, чем кнопок бывает у геймпада), остальное удаляется
+        for btn in self.button_widgets.values():
+            if len(button_pool) < MAX_BUTTONS:
+                btn.setParent(None)
+                button_pool.append(btn)
+        self.button_widgets = {}
+
+
+class ControllerCanvas(QWidget):
+    # Тот же вид геймпада одним виджетом. Неизменная часть (рамки, подписи,
+    # отпущенные кнопки) рисуется один раз в QPixmap; сеттеры помечают грязными
+    # только прямоугольники изменившихся элементов, Qt сводит их в один
+    # paintEvent, который копирует фон и дорисовывает поверх только эти элементы.
+    BUTTON = 54
+    GAP = 6
+    COLS = 5
+    STICK = 110
+    DOT = 26
+    HAT = 60
+    # Полная шкала полос IMU: гироскоп, °/с и акселерометр, g
+    IMU_RANGE = (500.0, 500.0, 500.0, 2.0, 2.0, 2.0)
+    BG = QColor("#141424")
+
+    def __init__(self, buttons: int, axes: int, hats: int, button_pool=None, parent=None):
+        super().__init__(parent)
+        self.signature = (buttons, axes, hats)
+        self.name = ""
+        self.pressed = 0
+        self.sticks = [(0.0, 0.0), (0.0, 0.0)]
+        self.triggers = [0, 0]
+        self.hats = [(0, 0)] * hats
+        self.imu = None
+        self.background = None
+        self.paint_count = 0
+        self.paint_ns = 0
+        self.title_font = QFont()
+        self.title_font.setPixelSize(12)
+        self.title_font.setBold(True)
+        self.small_font = QFont()
+        self.small_font.setPixelSize(9)
+        self.button_path = QPainterPath()
+        self.button_path.addRoundedRect(QRectF(1.5, 1.5, self.BUTTON - 3, self.BUTTON - 3), 10, 10)
+        self.hat_arrow = QPainterPath()
+        self.hat_arrow.moveTo(0, -24)
+        self.hat_arrow.lineTo(9, -10)
+        self.hat_arrow.lineTo(-9, -10)
+        self.hat_arrow.closeSubpath()
+        # Без заливки родителя: фон целиком свой
+        self.setAttribute(Qt.WidgetAttribute.WA_OpaquePaintEvent)
+        self.setup_layout()
+
+    def setup_layout(self):
+        buttons, axes, hats = self.signature
+        b, gap, cols = self.BUTTON, self.GAP, self.COLS
+        left = 20
+        self.stick_rects = []
+        self.stick_dirty = []
+        for k in range(2):
+            top = 30 + k * 180
+            circle = QRect(left, top, self.STICK, self.STICK)
+            self.stick_rects.append(circle)
+            self.stick_dirty.append(QRect(left - 5, top - 5, self.STICK + 10, self.STICK + 32))
+        center = left + self.STICK + 35
+        grid_w = cols * b + (cols - 1) * gap
+        self.name_rect = QRect(center, 10, grid_w, 30)
+        self.button_rects = []
+        for i in range(buttons):
+            row, col = divmod(i, cols)
+            self.button_rects.append(QRect(center + col * (b + gap), 52 + row * (b + gap), b, b))
+        rows = (buttons + cols - 1) // cols
+        y = 52 + rows * (b + gap) + 10
+        self.hat_rects = []
+        for k in range(hats):
+            self.hat_rects.append(QRect(center + k * (self.HAT + gap), y, self.HAT, self.HAT))
+        if hats:
+            y += self.HAT + 16
+        self.imu_rect = QRect(center, y, grid_w, 6 * 16)
+        right = center + grid_w + 35
+        self.trigger_rects = [QRect(right + k * 50, 30, 12, 120) for k in range(2)]
+        self.trigger_dirty = [QRect(right + k * 50 - 16, 26, 44, 144) for k in range(2)]
+        self.info_rect = QRect(right - 10, 190, 110, 90)
+        self.setFixedSize(right + 120, max(360, self.imu_rect.bottom() + 16))
+
+    def configure(self, name: str):
+        self.name = name
+        self.pressed = 0
+        self.sticks = [(0.0, 0.0), (0.0, 0.0)]
+        self.triggers = [0, 0]
+        self.hats = [(0, 0)] * self.signature[2]
+        self.imu = None
+        self.background = None
+        self.update()
+
+    def set_button(self, btn_id: int, active: bool):
+        if btn_id >= len(self.button_rects):
+            return
+        bit = 1 << btn_id
+        if bool(self.pressed & bit) == bool(active):
+            return
+        self.pressed ^= bit
+        self.update(self.button_rects[btn_id])
+
+    def set_sticks(self, lx: float, ly: float, rx: float, ry: float):
+        for k, value in enumerate(((round(lx, 2), round(ly, 2)), (round(rx, 2), round(ry, 2)))):
+            if value != self.sticks[k]:
+                self.sticks[k] = value
+                self.update(self.stick_dirty[k])
+
+    def set_triggers(self, lt: float, rt: float):
+        for k, value in enumerate((int(lt * 100), int(rt * 100))):
+            if value != self.triggers[k]:
+                self.triggers[k] = value
+                self.update(self.trigger_dirty[k])
+
+    def set_hats(self, hats):
+        for k, value in enumerate(hats[:len(self.hat_rects)]):
+            value = tuple(value)
+            if value != self.hats[k]:
+                self.hats[k] = value
+                self.update(self.hat_rects[k])
+
+    def set_imu(self, sample):
+        sample = tuple(round(v, 1 if i < 3 else 2) for i, v in enumerate(sample))
+        if sample != self.imu:
+            self.imu = sample
+            self.update(self.imu_rect)
+
+    def release(self, button_pool: list):
+        # Своих дочерних виджетов нет - отдавать в пул нечего
+        self.background = None
+
+    def render_background(self):
+        buttons, axes, hats = self.signature
+        ratio = self.devicePixelRatioF()
+        pixmap = QPixmap(int(self.width() * ratio), int(self.height() * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(self.BG)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        panel_pen = QPen(QColor("#3a3a4e"), 2)
+        painter.setFont(self.title_font)
+        for k, title in enumerate(("Левый", "Правый")):
+            circle = self.stick_rects[k]
+            painter.setPen(QColor("#00d4ff"))
+            painter.drawText(QRect(circle.left(), circle.top() - 22, circle.width(), 18),
+                             Qt.AlignmentFlag.AlignCenter, title)
+            painter.setPen(QPen(QColor("#3a3a4e"), 3))
+            painter.setBrush(QColor("#1e1e32"))
+            painter.drawEllipse(QRectF(circle).adjusted(1.5, 1.5, -1.5, -1.5))
+        painter.setPen(panel_pen)
+        painter.setBrush(QColor("#1a1a2e"))
+        painter.drawRoundedRect(QRectF(self.name_rect), 8, 8)
+        painter.setPen(QColor("#ffffff"))
+        painter.drawText(self.name_rect, Qt.AlignmentFlag.AlignCenter, self.name)
+        painter.setPen(QPen(QColor("#4a4a5e"), 2))
+        painter.setBrush(QColor("#2e2e42"))
+        for i, rect in enumerate(self.button_rects):
+            painter.save()
+            painter.translate(rect.topLeft())
+            painter.drawPath(self.button_path)
+            painter.restore()
+        painter.setPen(QColor("#8888aa"))
+        for i, rect in enumerate(self.button_rects):
+            painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, f"B{i}")
+        for k, rect in enumerate(self.hat_rects):
+            painter.setPen(QPen(QColor("#4a4a5e"), 2))
+            painter.setBrush(QColor("#1e1e32"))
+            painter.drawEllipse(QRectF(rect).adjusted(1, 1, -1, -1))
+            painter.setPen(QColor("#8888aa"))
+            painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, f"H{k}")
+        painter.setFont(self.small_font)
+        for row, label in enumerate(("Gx", "Gy", "Gz", "Ax", "Ay", "Az")):
+            line = self.imu_row(row)
+            painter.setPen(QColor("#9b59b6") if row < 3 else QColor("#00d4ff"))
+            painter.drawText(QRect(self.imu_rect.left(), line.top() - 2, 24, 14), Qt.AlignmentFlag.AlignVCenter, label)
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(QColor("#1a1a2e"))
+            painter.drawRoundedRect(QRectF(line), 4, 4)
+        painter.setFont(self.title_font)
+        for k, rect in enumerate(self.trigger_rects):
+            painter.setPen(QColor("#ff6b6b"))
+            painter.drawText(QRect(rect.center().x() - 20, rect.top() - 22, 40, 18), Qt.AlignmentFlag.AlignCenter, ("LT", "RT")[k])
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(QColor("#1a1a2e"))
+            painter.drawRoundedRect(QRectF(rect), 4, 4)
+        painter.setPen(panel_pen)
+        painter.setBrush(QColor("#1a1a2e"))
+        painter.drawRoundedRect(QRectF(self.info_rect), 8, 8)
+        painter.setPen(QColor("#00d4ff"))
+        text_rect = self.info_rect.adjusted(10, 8, -10, -8)
+        painter.drawText(text_rect, Qt.AlignmentFlag.AlignTop, "📊 Инфо")
+        painter.setFont(self.small_font)
+        painter.setPen(QColor("#8888aa"))
+        for row, (text, count) in enumerate([("Кнопки", buttons), ("Оси", axes), ("HAT", hats)]):
+            painter.drawText(text_rect.adjusted(0, 24 + row * 16, 0, 0), Qt.AlignmentFlag.AlignTop, f"{text}: {count}")
+        painter.end()
+        return pixmap
+
+    def imu_row(self, row: int) -> QRect:
+        return QRect(self.imu_rect.left() + 28, self.imu_rect.top() + row * 16 + 2, self.imu_rect.width() - 28, 10)
+
+    def paintEvent(self, event):
+        started = time.perf_counter_ns()
+        if self.background is None or self.background.devicePixelRatio() != self.devicePixelRatioF():
+            self.background = self.render_background()
+        dirty = event.rect()
+        painter = QPainter(self)
+        ratio = self.background.devicePixelRatio()
+        source = QRectF(dirty.x() * ratio, dirty.y() * ratio, dirty.width() * ratio, dirty.height() * ratio)
+        painter.drawPixmap(QRectF(dirty), self.background, source)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        pressed = self.pressed
+        if pressed:
+            painter.setFont(self.title_font)
+            while pressed:
+                low = pressed & -pressed
+                pressed ^= low
+                rect = self.button_rects[low.bit_length() - 1]
+                if not rect.intersects(dirty):
+                    continue
+                painter.save()
+                painter.translate(rect.topLeft())
+                painter.setPen(QPen(QColor("#00ff88"), 3))
+                painter.setBrush(QColor("#0d5a3c"))
+                painter.drawPath(self.button_path)
+                painter.restore()
+                painter.setPen(QColor("#ffffff"))
+                painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, f"B{low.bit_length() - 1}")
+        painter.setFont(self.small_font)
+        for k, (x, y) in enumerate(self.sticks):
+            if not self.stick_dirty[k].intersects(dirty):
+                continue
+            circle = self.stick_rects[k]
+            reach = (self.STICK - self.DOT) / 2 - 2
+            center = QPointF(circle.center()) + QPointF(0.5 + x * reach, 0.5 - y * reach)
+            deflected = abs(x) > 0.1 or abs(y) > 0.1
+            color = QColor("#00ff88") if deflected else QColor("#00d4ff")
+            painter.setPen(QPen(color, 3))
+            painter.setBrush(QColor("#00aa55") if deflected else QColor("#0088ff"))
+            painter.drawEllipse(center, self.DOT / 2 - 1.5, self.DOT / 2 - 1.5)
+            painter.setPen(QColor("#8888aa"))
+            painter.drawText(QRect(circle.left() - 10, circle.bottom() + 6, circle.width() + 20, 14),
+                             Qt.AlignmentFlag.AlignCenter, f"X:{x:+.2f} Y:{y:+.2f}")
+        for k, percent in enumerate(self.triggers):
+            if not self.trigger_dirty[k].intersects(dirty):
+                continue
+            rect = self.trigger_rects[k]
+            if percent > 0:
+                height = rect.height() * min(percent, 100) / 100
+                painter.setPen(Qt.PenStyle.NoPen)
+                painter.setBrush(QColor("#ff6b6b"))
+                painter.drawRoundedRect(QRectF(rect.left(), rect.bottom() + 1 - height, rect.width(), height), 4, 4)
+            painter.setPen(QColor("#8888aa"))
+            painter.drawText(QRect(rect.center().x() - 20, rect.bottom() + 4, 40, 14), Qt.AlignmentFlag.AlignCenter, f"{percent}%")
+        for k, (hx, hy) in enumerate(self.hats):
+            rect = self.hat_rects[k]
+            if (hx, hy) == (0, 0) or not rect.intersects(dirty):
+                continue
+            painter.save()
+            painter.translate(QPointF(rect.center()) + QPointF(0.5, 0.5))
+            # SDL: y=+1 - вверх; стрелка по умолчанию смотрит вверх
+            painter.rotate({(0, 1): 0, (1, 1): 45, (1, 0): 90, (1, -1): 135, (0, -1): 180,
+                            (-1, -1): 225, (-1, 0): 270, (-1, 1): 315}.get((hx, hy), 0))
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(QColor("#00ff88"))
+            painter.drawPath(self.hat_arrow)
+            painter.restore()
+        if self.imu and self.imu_rect.intersects(dirty):
+            painter.setPen(Qt.PenStyle.NoPen)
+            for row, value in enumerate(self.imu[:6]):
+                line = self.imu_row(row)
+                half = line.width() / 2
+                width = max(-1.0, min(1.0, value / self.IMU_RANGE[row])) * half
+                painter.setBrush(QColor("#9b59b6") if row < 3 else QColor("#00d4ff"))
+                painter.drawRect(QRectF(line.left() + half + min(width, 0), line.top(), abs(width), line.height()))
+        painter.end()
+        self.paint_ns += time.perf_counter_ns() - started
+        self.paint_count += 1
+
+
+def measure_frame_cost(view, frames=FRAME_COST_FRAMES) -> float:
+    # Средняя цена кадра, в котором меняется всё: сеттеры + синхронная
+    # перерисовка вида со всеми дочерними виджетами, мкс
+    buttons, axes, hats = view.signature
+    started = time.perf_counter_ns()
+    for n in range(frames):
+        phase = n % 2 == 0
+        for i in range(buttons):
+            view.set_button(i, phase == (i % 2 == 0))
+        v = math.sin(n / 7)
+        view.set_sticks(v, -v, -v, v)
+        view.set_triggers(abs(v), 1 - abs(v))
+        view.set_hats([(1 if phase else -1, 0)] * hats)
+        view.set_imu((v * 100, -v * 100, v * 50, v * 30, -v * 30, 64.0))
+        view.repaint()
+    return (time.perf_counter_ns() - started) / frames / 1000
+
+
 class TestReportWidget(QFrame):
-    def __init__(self, parent=None):
+    TEST_TITLES = {
+        "buttons": "🔘 Кнопки",
+        "sticks": "🕹 Сти",
+        "triggers": "🎯 Триггеры",
+        "vibration": "🔊 Вибрация",
+        "gyro": "🌀 Гироскоп",
+    }
+
+    def __init__(self, state: TestState, parent=None):
         super().__init__(parent)
+        self.state = state
+        self.last_shown = None
         self.setup_ui()
-        self.buttons_total = 0
-        self.buttons_pressed_set = set()
+        state.on_check = self.on_check
+        state.on_buttons = self.on_buttons
+        state.on_noise = self.on_noise
+        self.update_score()
         
     def setup_ui(self):
         self.setFixedWidth(260)
@@ -422,7 +735,7 @@ class TestReportWidget(QFrame):
         line.setStyleSheet("QFrame { background: #3a3a4e; }")
         line.setFixedHeight(2)
         layout.addWidget(line)
-        self.btn_total_label = QLabel("🔘 Нажато: 0 / 0")
+        self.btn_total_label = QLabel(f"🔘 Нажато: {len(self.state.buttons_pressed)} / {self.state.buttons_total}")
         self.btn_total_label.setStyleSheet("QLabel { color: #00ff88; font-size: 11px; font-weight: bold; }")
         layout.addWidget(self.btn_total_label)
         self.progress = QProgressBar()
@@ -445,21 +758,15 @@ class TestReportWidget(QFrame):
             }
         """)
         layout.addWidget(self.progress)
-        tests_layout = QVBoxLayout()
-        tests_layout.setSpacing(6)
+        self.tests_layout = QVBoxLayout()
+        self.tests_layout.setSpacing(6)
         self.test_labels = {}
-        tests = [
-            ("buttons", "🔘 Кнопки"),
-            ("sticks", "🕹 Сти"),
-            ("triggers", "🎯 Триггеры"),
-            ("vibration", "🔊 Вибрация"),
-        ]
-        for key, text in tests:
-            lbl = QLabel(f"{text} - ❌")
-            lbl.setStyleSheet("QLabel { color: #ff4757; font-size: 10px; }")
-            tests_layout.addWidget(lbl)
-            self.test_labels[key] = lbl
-        layout.addLayout(tests_layout)
+        for key in self.state.checks:
+            self.add_label(key)
+        layout.addLayout(self.tests_layout)
+        self.noise_label = QLabel()
+        self.noise_label.hide()
+        layout.addWidget(self.noise_label)
         self.status_label = QLabel("❌ Тесты не пройдены")
         self.status_label.setStyleSheet("QLabel { color: #ff4757; font-size: 12px; font-weight: bold; }")
         layout.addWidget(self.status_label)
@@ -469,58 +776,56 @@ class TestReportWidget(QFrame):
         layout.addWidget(self.comment)
         layout.addStretch()
         
-    def update_buttons(self, pressed_ids: list, total: int):
-        self.buttons_total = total
-        for btn_id in pressed_ids:
-            self.buttons_pressed_set.add(btn_id)
-        unique_pressed = len(self.buttons_pressed_set)
-        self.btn_total_label.setText(f"🔘 Нажато: {unique_pressed} / {total}")
-        if unique_pressed > 0:
-            self.test_labels["buttons"].setText("🔘 Кнопки - ✅")
-            self.test_labels["buttons"].setStyleSheet("QLabel { color: #00ff88; font-size: 10px; }")
-        self.calculate_score()
-        
-    def reset_all(self):
-        self.buttons_pressed_set = set()
-        self.btn_total_label.setText(f"🔘 Нажато: 0 / {self.buttons_total}")
-        for key, lbl in self.test_labels.items():
-            lbl.setText(f"{lbl.text().split(' - ')[0]} - ❌")
-            lbl.setStyleSheet("QLabel { color: #ff4757; font-size: 10px; }")
-        self.calculate_score()
-        
-    def set_stick_tested(self, tested: bool):
-        if tested:
-            self.test_labels["sticks"].setText("🕹 Сти - ✅")
-            self.test_labels["sticks"].setStyleSheet("QLabel { color: #00ff88; font-size: 10px; }")
-        self.calculate_score()
-        
-    def set_triggers_tested(self, tested: bool):
-        if tested:
-            self.test_labels["triggers"].setText("🎯 Триггеры - ✅")
-            self.test_labels["triggers"].setStyleSheet("QLabel { color: #00ff88; font-size: 10px; }")
-        self.calculate_score()
-        
-    def set_vibration_tested(self, tested: bool):
-        if tested:
-            self.test_labels["vibration"].setText("🔊 Вибрация - ✅")
-            self.test_labels["vibration"].setStyleSheet("QLabel { color: #00ff88; font-size: 10px; }")
-        self.calculate_score()
-        
-    def set_gyro_tested(self, tested: bool):
-        if tested:
-            self.test_labels["gyro"].setText("🌀 Гироскоп - ✅")
-            self.test_labels["gyro"].setStyleSheet("QLabel { color: #00ff88; font-size: 10px; }")
-        self.calculate_score()
-        
-    def calculate_score(self):
-        passed = 0
-        total = len(self.test_labels)
-        for key, lbl in self.test_labels.items():
-            if "✅" in lbl.text():
-                passed += 1
-        percentage = int((passed / total) * 100) if total > 0 else 0
+    def add_label(self, key: str):
+        lbl = QLabel()
+        self.test_labels[key] = lbl
+        self.tests_layout.addWidget(lbl)
+        self.show_check(key, self.state.passed[key])
+
+    def add_check(self, key: str):
+        if key in self.test_labels:
+            return
+        self.state.set_checks(self.state.checks + (key,))
+        self.add_label(key)
+        self.update_score()
+
+    def show_check(self, key: str, passed: bool):
+        lbl = self.test_labels.get(key)
+        if lbl is None:
+            return
+        lbl.setText(f"{self.TEST_TITLES[key]} - {'✅' if passed else '❌'}")
+        lbl.setStyleSheet(f"QLabel {{ color: {'#00ff88' if passed else '#ff4757'}; font-size: 10px; }}")
+
+    def on_check(self, key: str, passed: bool):
+        self.show_check(key, passed)
+        self.update_score()
+
+    def on_buttons(self, pressed: int, total: int):
+        self.btn_total_label.setText(f"🔘 Нажато: {pressed} / {total}")
+
+    def on_noise(self, result):
+        if result is None:
+            self.noise_label.hide()
+        else:
+            passed = result["passed"]
+            self.noise_label.setText(f"📉 Шум и дрейф - {'✅' if passed else '❌'}")
+            self.noise_label.setToolTip("\n".join(format_noise(result)))
+            self.noise_label.setStyleSheet(f"QLabel {{ color: {'#00ff88' if passed else '#ff4757'}; font-size: 10px; }}")
+            self.noise_label.show()
+        self.update_score()
+
+    def update_score(self):
+        percentage = self.state.score()
+        noise_failed = self.state.noise_failed
+        if (percentage, noise_failed) == self.last_shown:
+            return
+        self.last_shown = (percentage, noise_failed)
         self.progress.setValue(percentage)
-        if percentage >= 100:
+        if noise_failed:
+            self.status_label.setText("❌ Гироскоп не в допуске")
+            self.status_label.setStyleSheet("QLabel { color: #ff4757; font-size: 12px; font-weight: bold; }")
+            self.comment.setText("❌ Шум или дрейф гироскопа в покое вне допуска.")
+        elif percentage >= 100:
             self.status_label.setText("✅ Все тесты пройдены!")
             self.status_label.setStyleSheet("QLabel { color: #00ff88; font-size: 12px; font-weight: bold; }")
             self.comment.setText("🎉 Геймпад полностью исправен!")
@@ -535,10 +840,16 @@ class TestReportWidget(QFrame):
 
 
 class VibrationWidget(QFrame):
-    def __init__(self, joystick, report_widget, parent=None):
+    def __init__(self, joystick, test_state, nintendo=None, ds4=None, parent=None):
         super().__init__(parent)
         self.joystick = joystick
-        self.report_widget = report_widget
+        self.test_state = test_state
+        self.nintendo = nintendo
+        self.ds4 = ds4
+        self.scheduler = None
+        self.response = None      # сэмплы IMU текущего узора; кормит окно
+        self.pattern_timer = QTimer(self)
+        self.pattern_timer.timeout.connect(self.poll_pattern)
         self.setup_ui()
         
     def setup_ui(self):
@@ -583,6 +894,12 @@ class VibrationWidget(QFrame):
         sliders_layout.addLayout(right_layout)
         layout.addLayout(sliders_layout)
         btn_layout = QHBoxLayout()
+        self.pattern_combo = QComboBox()
+        for key, (name, _) in PATTERNS.items():
+            self.pattern_combo.addItem(name, key)
+        self.pattern_combo.setCurrentIndex(self.pattern_combo.findData(DEFAULT_PATTERN))
+        self.pattern_combo.setStyleSheet("QComboBox { color: #ffffff; font-size: 9px; }")
+        btn_layout.addWidget(self.pattern_combo)
         self.test_btn = QPushButton("▶ Тест")
         self.test_btn.setFixedSize(70, 30)
         self.test_btn.setStyleSheet("""
@@ -608,103 +925,92 @@ class VibrationWidget(QFrame):
         self.status.setStyleSheet("QLabel { color: #8888aa; font-size: 10px; }")
         layout.addWidget(self.status)
         
+    def set_status(self, text: str, color: str):
+        self.status.setText(text)
+        self.status.setStyleSheet(f"QLabel {{ color: {color}; font-size: 10px; }}")
+
     def set_joystick(self, joystick):
+        if self.scheduler is not None and isinstance(self.scheduler.output, SdlRumble) and joystick is not self.joystick:
+            self.stop_vibration()
         self.joystick = joystick
+
+    def rumble_output(self):
+        # Joy-Con/Pro Controller по HID - HD-вибрация с частотой, DS4/DS5 по HID - своим выводом
+        # (вместе с подсветкой), остальные - через SDL
+        if self.nintendo and self.nintendo.device and self.nintendo.controller_type != "none":
+            return HdRumble(self.nintendo)
+        if self.ds4 and self.ds4.device and self.ds4.output is not None:
+            return HidRumble(self.ds4)
+        if self.joystick:
+            if not self.joystick.get_init():
+                self.joystick.init()
+            return SdlRumble(self.joystick)
+        return None
         
     def toggle_vibration(self):
-        # ПРОСТОЙ ВАРИАНТ - через pygame (работает у всех)
-        if self.joystick:
-            try:
-                if not self.joystick.get_init():
-                    self.joystick.init()
-                if hasattr(self.joystick, 'rumble'):
-                    left = self.left_motor.value() / 100.0
-                    right = self.right_motor.value() / 100.0
-                    self.joystick.rumble(int(left * 65535), int(right * 65535), 3000)
-                    self.status.setText("✅ Вибрация (3 сек)")
-                    self.status.setStyleSheet("QLabel { color: #00ff88; font-size: 10px; }")
-                    if self.report_widget:
-                        self.report_widget.set_vibration_tested(True)
-                else:
-                    self.status.setText("❌ Нет rumble")
-                    self.status.setStyleSheet("QLabel { color: #ff4757; font-size: 10px; }")
-            except Exception as e:
-                print(f"Vibration error: {e}")
-                self.status.setText(f"❌ Ошибка: {str(e)}")
-                self.status.setStyleSheet("QLabel { color: #ff4757; font-size: 10px; }")
+        self.stop_vibration()
+        output = self.rumble_output()
+        if output is None:
+            self.set_status("❌ Нет геймпада", "#ff4757")
+            return
+        key = self.pattern_combo.currentData()
+        name, pattern = PATTERNS[key]
+        frames = pattern(self.left_motor.value() / 100.0, self.right_motor.value() / 100.0)
+        self.scheduler = RumbleScheduler(output)
+        if not self.scheduler.play(frames):
+            self.set_status(f"❌ {self.scheduler.error}", "#ff4757")
+            self.scheduler = None
+            return
+        self.response = MotorResponse(output.sides)
+        self.pattern_timer.start(50)
+        self.set_status(f"▶ {name}: {pattern_duration_ms(frames) / 1000:.1f} с", "#00d4ff")
+
+    def poll_pattern(self):
+        scheduler = self.scheduler
+        if scheduler is None or scheduler.running:
+            return
+        self.pattern_timer.stop()
+        self.scheduler = None
+        response, self.response = self.response, None
+        result = response.analyze(scheduler.timeline) if response is not None and response.samples else None
+        if scheduler.error:
+            self.set_status(f"❌ Ошибка: {scheduler.error}", "#ff4757")
+            return
+        if result is not None and result["passed"] is not None:
+            # Есть IMU: тест пройден, только если корпус действительно дрожал от каждого мотора
+            if self.test_state:
+                self.test_state.set_vibration(result["passed"], result)
+            self.set_status("\n".join(format_response(result)), "#00ff88" if result["passed"] else "#ff4757")
+            return
+        if self.test_state:
+            self.test_state.set_vibration(scheduler.accepted, result)
+        if scheduler.accepted:
+            self.set_status("⚠ Без IMU отклик не измерен - проверьте на ощупь", "#ffaa00")
         else:
-            self.status.setText("❌ Нет геймпада")
-            self.status.setStyleSheet("QLabel { color: #ff4757; font-size: 10px; }")
+            self.set_status("❌ Геймпад не принял вибрацию", "#ff4757")
             
     def stop_vibration(self):
-        if self.joystick and hasattr(self.joystick, 'rumble'):
-            try:
-                self.joystick.rumble(0, 0, 0)
-                self.status.setText("⏹ Стоп")
-                self.status.setStyleSheet("QLabel { color: #8888aa; font-size: 10px; }")
-            except:
-                pass
+        scheduler = self.scheduler
+        if scheduler is None:
+            return
+        self.scheduler = None
+        self.response = None
+        self.pattern_timer.stop()
+        scheduler.stop()
+        self.set_status("⏹ Стоп", "#8888aa")
 
 
-class GyroWidget(QFrame):
-    def __init__(self, parent=None):
+class LightbarWidget(QFrame):
+    def __init__(self, ds4, parent=None):
         super().__init__(parent)
+        self.ds4 = ds4
+        self.step = None
+        self.step_timer = QTimer(self)
+        self.step_timer.timeout.connect(self.next_step)
+        self.stats_timer = QTimer(self)
+        self.stats_timer.timeout.connect(self.show_stats)
         self.setup_ui()
-        
-    def setup_ui(self):
-        self.setStyleSheet("""
-            QFrame {
-                background: #2a2a3e;
-                border-radius: 15px;
-                border: 2px solid #4a4a5e;
-            }
-        """)
-        layout = QVBoxLayout(self)
-        layout.setContentsMargins(15, 12, 15, 12)
-        layout.setSpacing(10)
-        title = QLabel("🌀 Гироскоп / Акселерометр")
-        title.setStyleSheet("QLabel { color: #9b59b6; font-size: 15px; font-weight: bold; }")
-        layout.addWidget(title)
-        self.visual = QFrame()
-        self.visual.setFixedSize(100, 100)
-        self.visual.setStyleSheet("""
-            QFrame {
-                background: qradialgradient(cx:0.5, cy:0.5, radius:0.7, stop:0 #1a1a2e, stop:1 #2a2a3e);
-                border-radius: 50px;
-                border: 3px solid #4a4a5e;
-            }
-        """)
-        layout.addWidget(self.visual, alignment=Qt.AlignmentFlag.AlignCenter)
-        self.center_dot = QFrame(self.visual)
-        self.center_dot.setFixedSize(12, 12)
-        self.center_dot.setStyleSheet("QFrame { background: #9b59b6; border-radius: 6px; }")
-        self.center_dot.move(44, 44)
-        self.gyro_label = QLabel("Gyro: X:0 Y:0 Z:0")
-        self.gyro_label.setStyleSheet("QLabel { color: #8888aa; font-size: 9px; }")
-        layout.addWidget(self.gyro_label)
-        self.accel_label = QLabel("Accel: X:0 Y:0 Z:0")
-        self.accel_label.setStyleSheet("QLabel { color: #8888aa; font-size: 9px; }")
-        layout.addWidget(self.accel_label)
-        self.status = QLabel("⚠ Требуется DS4/DS5/Joy-Con + hidapi")
-        self.status.setStyleSheet("QLabel { color: #ffaa00; font-size: 9px; }")
-        layout.addWidget(self.status)
-        
-    def set_gyro(self, gx: float, gy: float, gz: float):
-        self.gyro_label.setText(f"Gyro: X:{gx:+.1f} Y:{gy:+.1f} Z:{gz:+.1f}")
-        offset_x = int(gx * 20)
-        offset_y = int(-gy * 20)
-        self.center_dot.move(44 + offset_x, 44 + offset_y)
-        
-    def set_accel(self, ax: float, ay: float, az: float):
-        self.accel_label.setText(f"Accel: X:{ax:+.1f} Y:{ay:+.1f} Z:{az:+.1f}")
 
-
-class IRCameraWidget(QFrame):
-    def __init__(self, nintendo, parent=None):
-        super().__init__(parent)
-        self.nintendo = nintendo
-        self.setup_ui()
-        
     def setup_ui(self):
         self.setStyleSheet("""
             QFrame {
@@ -716,27 +1022,433 @@ class IRCameraWidget(QFrame):
         layout = QVBoxLayout(self)
         layout.setContentsMargins(15, 12, 15, 12)
         layout.setSpacing(10)
-        title = QLabel("📷 ИК-камера")
-        title.setStyleSheet("QLabel { color: #e74c3c; font-size: 15px; font-weight: bold; }")
+        title = QLabel("💡 Подсветка")
+        title.setStyleSheet("QLabel { color: #f1c40f; font-size: 15px; font-weight: bold; }")
         layout.addWidget(title)
-        info = QLabel("Только Joy-Con Right")
+        info = QLabel("DS4/DS5 по HID; индикаторы игрока - только DS5")
         info.setStyleSheet("QLabel { color: #8888aa; font-size: 9px; }")
         layout.addWidget(info)
-        self.camera_view = QFrame()
-        self.camera_view.setFixedSize(120, 90)
-        self.camera_view.setStyleSheet("""
-            QFrame {
-                background: #000000;
-                border-radius: 8px;
-                border: 2px solid #4a4a5e;
+        self.hue_slider = QSlider(Qt.Orientation.Horizontal)
+        self.hue_slider.setRange(0, 359)
+        self.hue_slider.setStyleSheet("""
+            QSlider::groove:horizontal {
+                height: 6px; border-radius: 3px;
+                background: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #ff0000, stop:0.17 #ffff00,
+                    stop:0.33 #00ff00, stop:0.5 #00ffff, stop:0.67 #0000ff, stop:0.83 #ff00ff, stop:1 #ff0000);
             }
+            QSlider::handle:horizontal { background: #ffffff; width: 14px; border-radius: 3px; margin: -4px 0; }
         """)
-        layout.addWidget(self.camera_view, alignment=Qt.AlignmentFlag.AlignCenter)
+        self.hue_slider.valueChanged.connect(self.on_hue)
+        layout.addWidget(self.hue_slider)
         btn_layout = QHBoxLayout()
-        self.on_btn = QPushButton("▶ Вкл")
-        self.on_btn.setFixedSize(70, 30)
-        self.on_btn.setStyleSheet("""
-            QPushButton {
+        self.player_combo = QComboBox()
+        self.player_combo.addItem("Игрок: нет", 0)
+        for number in range(1, len(PLAYER_LED_PATTERNS)):
+            self.player_combo.addItem(f"Игрок {number}", number)
+        self.player_combo.setStyleSheet("QComboBox { color: #ffffff; font-size: 9px; }")
+        self.player_combo.currentIndexChanged.connect(self.on_player)
+        btn_layout.addWidget(self.player_combo)
+        self.test_btn = QPushButton("▶ Тест")
+        self.test_btn.setFixedSize(70, 30)
+        self.test_btn.setStyleSheet("""
+            QPushButton {
+                background: qlineargradient(x1:0, y1:0, x2:0, y2:1, stop:0 #f1c40f, stop:1 #f39c12);
+                color: white; font-size: 11px; font-weight: bold; border-radius: 8px; border: none;
+            }
+        """)
+        self.test_btn.clicked.connect(self.start_test)
+        btn_layout.addWidget(self.test_btn)
+        self.stop_btn = QPushButton("⏹")
+        self.stop_btn.setFixedSize(30, 30)
+        self.stop_btn.setStyleSheet("""
+            QPushButton {
+                background: qlineargradient(x1:0, y1:0, x2:0, y2:1, stop:0 #555566, stop:1 #444455);
+                color: white; font-size: 11px; font-weight: bold; border-radius: 8px; border: none;
+            }
+        """)
+        self.stop_btn.clicked.connect(self.stop_test)
+        btn_layout.addWidget(self.stop_btn)
+        layout.addLayout(btn_layout)
+        self.stats = QLabel("")
+        self.stats.setStyleSheet("QLabel { color: #8888aa; font-size: 9px; }")
+        layout.addWidget(self.stats)
+        self.status = QLabel("Готов")
+        self.status.setStyleSheet("QLabel { color: #8888aa; font-size: 10px; }")
+        layout.addWidget(self.status)
+
+    def set_status(self, text: str, color: str):
+        self.status.setText(text)
+        self.status.setStyleSheet(f"QLabel {{ color: {color}; font-size: 10px; }}")
+
+    def output(self):
+        # Вывод подключённого DS4/DS5 или None (с сообщением в статусе)
+        output = self.ds4.output if self.ds4 and self.ds4.device else None
+        if output is None:
+            self.set_status("❌ Нужен DS4/DS5 по HID", "#ff4757")
+        elif output.error:
+            self.set_status(f"❌ Ошибка вывода: {output.error}", "#ff4757")
+            return None
+        return output
+
+    def send(self, **fields):
+        # Ползунок шлёт изменение на каждый шаг - вывод схлопывает их сам, GUI не ждёт записи
+        output = self.output()
+        if output is None:
+            return False
+        output.set(**fields)
+        if not self.stats_timer.isActive():
+            self.stats_timer.start(250)
+        return True
+
+    def on_hue(self, value: int):
+        if self.step is None:
+            self.send(lightbar=hue_color(value / 360.0))
+
+    def on_player(self, index: int):
+        if self.step is None and self.ds4.is_ds5:
+            self.send(player_leds=PLAYER_LED_PATTERNS[self.player_combo.itemData(index)])
+
+    def start_test(self):
+        self.stop_test()
+        if self.output() is None:
+            return
+        self.step = -1
+        self.next_step()
+        self.step_timer.start(LIGHT_TEST_STEP_MS)
+
+    def next_step(self):
+        steps = LIGHT_TEST_STEPS if self.ds4.is_ds5 else [step for step in LIGHT_TEST_STEPS if not step[2]]
+        self.step += 1
+        if self.step >= len(steps):
+            self.step_timer.stop()
+            self.step = None
+            self.set_status("✅ Проверьте: каждый цвет и индикатор загорался", "#00ff88")
+            return
+        name, color, player = steps[self.step]
+        fields = {"lightbar": color}
+        if self.ds4.is_ds5:
+            fields["player_leds"] = PLAYER_LED_PATTERNS[player]
+        if not self.send(**fields):
+            self.stop_test()
+            return
+        self.set_status(f"▶ {name} ({self.step + 1}/{len(steps)})", "#00d4ff")
+
+    def stop_test(self):
+        self.step_timer.stop()
+        if self.step is not None:
+            self.step = None
+            self.set_status("⏹ Стоп", "#8888aa")
+
+    def show_stats(self):
+        output = self.ds4.output if self.ds4 else None
+        if output is None:
+            self.stats_timer.stop()
+            return
+        self.stats.setText(f"Изменений: {output.requests}, отчётов: {output.writes}, схлопнуто: {output.coalesced}")
+        if not output.running and self.step is None:
+            self.stats_timer.stop()
+
+
+class OrientationView(QWidget):
+    # Корпус геймпада коробкой в перспективе; камера за игроком, чуть сверху
+    HALF = (1.0, 0.6, 0.18)
+    CAMERA_TILT = math.radians(30)
+    FACES = (
+        ((0, 0, 1), (4, 5, 7, 6), "#00d4ff"),
+        ((0, 0, -1), (0, 2, 3, 1), "#3a3a4e"),
+        ((1, 0, 0), (1, 3, 7, 5), "#4a4a5e"),
+        ((-1, 0, 0), (0, 4, 6, 2), "#4a4a5e"),
+        ((0, 1, 0), (2, 6, 7, 3), "#9b59b6"),
+        ((0, -1, 0), (0, 1, 5, 4), "#5a5a7e"),
+    )
+    AXES = (((1.4, 0, 0), "#ff4757"), ((0, 1.4, 0), "#00ff88"), ((0, 0, 1.4), "#ffaa00"))
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setFixedSize(120, 120)
+        self.matrix = quat_matrix((1.0, 0.0, 0.0, 0.0))
+        hx, hy, hz = self.HALF
+        self.corners = [(x * hx, y * hy, z * hz) for z in (-1, 1) for y in (-1, 1) for x in (-1, 1)]
+        self.setAttribute(Qt.WidgetAttribute.WA_OpaquePaintEvent)
+
+    def set_quaternion(self, q):
+        matrix = quat_matrix(q)
+        if matrix != self.matrix:
+            self.matrix = matrix
+            self.update()
+
+    def rotate(self, v):
+        m = self.matrix
+        return (m[0][0] * v[0] + m[0][1] * v[1] + m[0][2] * v[2],
+                m[1][0] * v[0] + m[1][1] * v[1] + m[1][2] * v[2],
+                m[2][0] * v[0] + m[2][1] * v[1] + m[2][2] * v[2])
+
+    def project(self, v):
+        x, y, z = v
+        cos_t, sin_t = math.cos(self.CAMERA_TILT), math.sin(self.CAMERA_TILT)
+        depth = y * cos_t - z * sin_t
+        up = z * cos_t + y * sin_t
+        scale = self.width() * 0.32 * 5.0 / (5.0 + depth)
+        return QPointF(self.width() / 2 + x * scale, self.height() / 2 - up * scale)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor("#1a1a2e"))
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        cos_t, sin_t = math.cos(self.CAMERA_TILT), math.sin(self.CAMERA_TILT)
+        points = [self.project(self.rotate(corner)) for corner in self.corners]
+        painter.setPen(QPen(QColor("#0f0f1a"), 1))
+        for normal, indices, color in self.FACES:
+            nx, ny, nz = self.rotate(normal)
+            # Грань видна, если её нормаль смотрит на камеру (камера глядит вперёд и вниз)
+            facing = -(ny * cos_t - nz * sin_t)
+            if facing <= 0:
+                continue
+            shade = QColor(color).darker(int(100 + (1 - facing) * 80))
+            painter.setBrush(shade)
+            painter.drawPolygon([points[i] for i in indices])
+        center = self.project((0.0, 0.0, 0.0))
+        for axis, color in self.AXES:
+            painter.setPen(QPen(QColor(color), 2))
+            painter.drawLine(center, self.project(self.rotate(axis)))
+
+
+class GyroWidget(QFrame):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setup_ui()
+        
+    def setup_ui(self):
+        self.setStyleSheet("""
+            QFrame {
+                background: #2a2a3e;
+                border-radius: 15px;
+                border: 2px solid #4a4a5e;
+            }
+        """)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(15, 12, 15, 12)
+        layout.setSpacing(10)
+        title = QLabel("🌀 Гироскоп / Акселерометр")
+        title.setStyleSheet("QLabel { color: #9b59b6; font-size: 15px; font-weight: bold; }")
+        layout.addWidget(title)
+        self.orientation = OrientationView()
+        layout.addWidget(self.orientation, alignment=Qt.AlignmentFlag.AlignCenter)
+        fusion_layout = QHBoxLayout()
+        self.fusion_combo = QComboBox()
+        for method, name in FUSION_NAMES.items():
+            self.fusion_combo.addItem(name, method)
+        self.fusion_combo.setStyleSheet("QComboBox { color: #ffffff; font-size: 9px; }")
+        fusion_layout.addWidget(self.fusion_combo)
+        self.level_btn = QPushButton("⟲")
+        self.level_btn.setFixedSize(28, 22)
+        self.level_btn.setToolTip("Сбросить ориентацию по акселерометру")
+        self.level_btn.setStyleSheet("""
+            QPushButton {
+                background: #3a3a4e; color: white; font-size: 11px; border-radius: 6px; border: none;
+            }
+        """)
+        fusion_layout.addWidget(self.level_btn)
+        layout.addLayout(fusion_layout)
+        self.angles_label = QLabel("Крен 0° Тангаж 0° Рыскание 0°")
+        self.angles_label.setStyleSheet("QLabel { color: #00d4ff; font-size: 9px; }")
+        layout.addWidget(self.angles_label)
+        self.fusion_label = QLabel("Слияние: нет данных")
+        self.fusion_label.setStyleSheet("QLabel { color: #8888aa; font-size: 9px; }")
+        layout.addWidget(self.fusion_label)
+        self.gyro_label = QLabel("Gyro: X:0 Y:0 Z:0")
+        self.gyro_label.setStyleSheet("QLabel { color: #8888aa; font-size: 9px; }")
+        layout.addWidget(self.gyro_label)
+        self.accel_label = QLabel("Accel: X:0 Y:0 Z:0")
+        self.accel_label.setStyleSheet("QLabel { color: #8888aa; font-size: 9px; }")
+        layout.addWidget(self.accel_label)
+        self.status = QLabel("⚠ Требуется DS4/DS5/Joy-Con + hidapi")
+        self.status.setStyleSheet("QLabel { color: #ffaa00; font-size: 9px; }")
+        layout.addWidget(self.status)
+        
+    def set_gyro(self, gx: float, gy: float, gz: float):
+        self.gyro_label.setText(f"Gyro: X:{gx:+.1f} Y:{gy:+.1f} Z:{gz:+.1f} °/с")
+
+    def set_orientation(self, fusion: FusionEngine):
+        self.orientation.set_quaternion(fusion.quaternion)
+        roll, pitch, yaw = fusion.euler()
+        self.angles_label.setText(f"Крен {roll:+.0f}° Тангаж {pitch:+.0f}° Рыскание {yaw:+.0f}°")
+        self.fusion_label.setText(f"Слияние: {fusion.rate_hz:.0f} Гц, {fusion.cost_us:.1f} мкс/сэмпл")
+
+    def set_accel(self, ax: float, ay: float, az: float):
+        self.accel_label.setText(f"Accel: X:{ax:+.2f} Y:{ay:+.2f} Z:{az:+.2f} g")
+
+
+class NoiseWidget(QFrame):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setup_ui()
+
+    def setup_ui(self):
+        self.setStyleSheet("""
+            QFrame {
+                background: #2a2a3e;
+                border-radius: 15px;
+                border: 2px solid #4a4a5e;
+            }
+        """)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(15, 12, 15, 12)
+        layout.setSpacing(10)
+        title = QLabel("📉 Шум гироскопа")
+        title.setStyleSheet("QLabel { color: #9b59b6; font-size: 15px; font-weight: bold; }")
+        layout.addWidget(title)
+        info = QLabel("Положите геймпад на стол и не трогайте до конца записи")
+        info.setWordWrap(True)
+        info.setStyleSheet("QLabel { color: #8888aa; font-size: 9px; }")
+        layout.addWidget(info)
+        btn_layout = QHBoxLayout()
+        self.duration_combo = QComboBox()
+        for seconds in CAPTURE_DURATIONS:
+            self.duration_combo.addItem(f"{seconds} с" if seconds < 60 else f"{seconds // 60} мин", seconds)
+        self.duration_combo.setStyleSheet("QComboBox { color: #ffffff; font-size: 9px; }")
+        btn_layout.addWidget(self.duration_combo)
+        self.start_btn = QPushButton("⏺ Запись")
+        self.start_btn.setFixedSize(80, 30)
+        self.start_btn.setStyleSheet("""
+            QPushButton {
+                background: qlineargradient(x1:0, y1:0, x2:0, y2:1, stop:0 #9b59b6, stop:1 #8e44ad);
+                color: white; font-size: 11px; font-weight: bold; border-radius: 8px; border: none;
+            }
+        """)
+        btn_layout.addWidget(self.start_btn)
+        layout.addLayout(btn_layout)
+        self.progress = QProgressBar()
+        self.progress.setRange(0, 100)
+        self.progress.setValue(0)
+        self.progress.setFixedHeight(14)
+        self.progress.setTextVisible(False)
+        self.progress.setStyleSheet("""
+            QProgressBar { background: #1a1a2e; border-radius: 5px; border: none; }
+            QProgressBar::chunk { background: #9b59b6; border-radius: 5px; }
+        """)
+        layout.addWidget(self.progress)
+        self.result_label = QLabel("")
+        self.result_label.setWordWrap(True)
+        self.result_label.setStyleSheet("QLabel { color: #8888aa; font-size: 9px; }")
+        layout.addWidget(self.result_label)
+        self.status = QLabel("Нет записи" if NUMPY_AVAILABLE else "⚠ Требуется numpy")
+        self.status.setStyleSheet(f"QLabel {{ color: {'#8888aa' if NUMPY_AVAILABLE else '#ffaa00'}; font-size: 9px; }}")
+        layout.addWidget(self.status)
+
+    def set_status(self, text: str, color="#8888aa"):
+        self.status.setText(text)
+        self.status.setStyleSheet(f"QLabel {{ color: {color}; font-size: 9px; }}")
+
+    def set_capturing(self, capturing: bool):
+        self.start_btn.setText("⏹ Стоп" if capturing else "⏺ Запись")
+        self.duration_combo.setEnabled(not capturing)
+
+    def set_progress(self, capture: NoiseCapture):
+        self.progress.setValue(int(capture.progress * 100))
+        self.set_status(f"Запись: {capture.elapsed_s:.0f} / {capture.duration_s} с, {capture.count} сэмплов", "#00d4ff")
+
+    def set_result(self, result):
+        if result is None:
+            self.result_label.setText("")
+            return
+        self.result_label.setText("\n".join(format_noise(result)))
+        if result["passed"]:
+            self.set_status("✅ Гироскоп в допуске", "#00ff88")
+        else:
+            self.set_status("❌ Гироскоп вне допуска", "#ff4757")
+
+
+class IrImageView(QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.image = None
+        self.setFixedSize(160, 120)
+
+    def set_image(self, image):
+        self.image = image
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor("#000000"))
+        if self.image is not None:
+            # QImage смотрит прямо в буфер кадра - масштабируется при отрисовке, без копии
+            scale = min(self.width() / self.image.width(), self.height() / self.image.height())
+            width, height = self.image.width() * scale, self.image.height() * scale
+            painter.drawImage(QRectF((self.width() - width) / 2, (self.height() - height) / 2, width, height),
+                              self.image)
+        painter.setPen(QPen(QColor("#e74c3c" if self.image is not None else "#4a4a5e"), 2))
+        painter.drawRect(self.rect().adjusted(1, 1, -1, -1))
+        painter.end()
+
+
+class IRCameraWidget(QFrame):
+    def __init__(self, nintendo, parent=None):
+        super().__init__(parent)
+        self.nintendo = nintendo
+        self.stream = None
+        self.replay = None
+        self.images = []
+        self.shown_frames = 0
+        self.on_start = None
+        self.frame_timer = QTimer(self)
+        self.frame_timer.timeout.connect(self.poll_frame)
+        self.setup_ui()
+        
+    def setup_ui(self):
+        self.setStyleSheet("""
+            QFrame {
+                background: #2a2a3e;
+                border-radius: 15px;
+                border: 2px solid #4a4a5e;
+            }
+        """)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(15, 12, 15, 12)
+        layout.setSpacing(10)
+        title = QLabel("📷 ИК-камера")
+        title.setStyleSheet("QLabel { color: #e74c3c; font-size: 15px; font-weight: bold; }")
+        layout.addWidget(title)
+        info = QLabel("Только Joy-Con Right")
+        info.setStyleSheet("QLabel { color: #8888aa; font-size: 9px; }")
+        layout.addWidget(info)
+        self.camera_view = IrImageView()
+        layout.addWidget(self.camera_view, alignment=Qt.AlignmentFlag.AlignCenter)
+        options_layout = QHBoxLayout()
+        self.resolution_combo = QComboBox()
+        for name in RESOLUTIONS:
+            self.resolution_combo.addItem(name, name)
+        self.resolution_combo.setCurrentIndex(self.resolution_combo.findData(DEFAULT_RESOLUTION))
+        self.resolution_combo.setStyleSheet("QComboBox { color: #ffffff; font-size: 9px; }")
+        options_layout.addWidget(self.resolution_combo)
+        self.record_btn = QPushButton("⏺")
+        self.record_btn.setCheckable(True)
+        self.record_btn.setToolTip("Писать поток в файл .irlog")
+        self.record_btn.setFixedSize(30, 24)
+        self.record_btn.setStyleSheet("""
+            QPushButton {
+                background: #444455; color: white; font-size: 11px; border-radius: 6px; border: none;
+            }
+            QPushButton:checked { background: #e74c3c; }
+        """)
+        options_layout.addWidget(self.record_btn)
+        self.open_btn = QPushButton("📂")
+        self.open_btn.setToolTip("Проиграть запись .irlog")
+        self.open_btn.setFixedSize(30, 24)
+        self.open_btn.setStyleSheet("""
+            QPushButton {
+                background: #444455; color: white; font-size: 11px; border-radius: 6px; border: none;
+            }
+        """)
+        self.open_btn.clicked.connect(self.open_capture)
+        options_layout.addWidget(self.open_btn)
+        layout.addLayout(options_layout)
+        btn_layout = QHBoxLayout()
+        self.on_btn = QPushButton("▶ Вкл")
+        self.on_btn.setFixedSize(70, 30)
+        self.on_btn.setStyleSheet("""
+            QPushButton {
                 background: qlineargradient(x1:0, y1:0, x2:0, y2:1, stop:0 #e74c3c, stop:1 #c0392b);
                 color: white; font-size: 11px; font-weight: bold; border-radius: 8px; border: none;
             }
@@ -757,70 +1469,827 @@ class IRCameraWidget(QFrame):
         self.status = QLabel("Выключена")
         self.status.setStyleSheet("QLabel { color: #8888aa; font-size: 9px; }")
         layout.addWidget(self.status)
+
+    def set_status(self, text: str, color: str):
+        self.status.setText(text)
+        self.status.setStyleSheet(f"QLabel {{ color: {color}; font-size: 9px; }}")
         
     def set_nintendo(self, nintendo):
         self.nintendo = nintendo
+
+    @property
+    def streaming(self) -> bool:
+        return self.stream is not None and self.stream.running
+
+    def attach(self, assembler):
+        # По QImage на каждый из трёх буферов сборщика - кадр показывается без копирования
+        width, height = assembler.width, assembler.height
+        self.images = [QImage(buffer, width, height, width, QImage.Format.Format_Grayscale8)
+                       for buffer in assembler.buffers]
+        self.shown_frames = 0
+        self.camera_view.set_image(None)
+        self.frame_timer.start(10)
         
     def enable_camera(self):
-        if self.nintendo and self.nintendo.controller_type == "joycon_right":
-            success = self.nintendo.enable_ir_camera()
-            if success:
-                self.status.setText("✅ Включена")
-                self.status.setStyleSheet("QLabel { color: #00ff88; font-size: 9px; }")
-                self.camera_view.setStyleSheet("""
-                    QFrame {
-                        background: qradialgradient(cx:0.5, cy:0.5, radius:0.5, stop:0 #330000, stop:1 #000000);
-                        border-radius: 8px;
-                        border: 2px solid #e74c3c;
-                    }
-                """)
-            else:
-                self.status.setText("❌ Ошибка")
-                self.status.setStyleSheet("QLabel { color: #ff4757; font-size: 9px; }")
+        if not self.nintendo or not self.nintendo.device or self.nintendo.controller_type != "joycon_right":
+            self.set_status("❌ Не Joy-Con R", "#ff4757")
+            return
+        record_path = None
+        if self.record_btn.isChecked():
+            record_path, _ = QFileDialog.getSaveFileName(self, "Запись ИК-камеры", "", "IR Capture (*.irlog)")
+            if not record_path:
+                return
+        self.disable_camera()
+        if self.on_start:
+            self.on_start()
+        resolution = self.resolution_combo.currentData()
+        try:
+            self.stream = IrStream(self.nintendo, resolution, record_path)
+        except OSError as e:
+            self.set_status(f"❌ {e}", "#ff4757")
+            return
+        self.attach(self.stream.assembler)
+        self.stream.start()
+        self.set_status(f"⏳ Настройка MCU ({resolution})...", "#ffaa00")
+        print(f"ИК-камера: запуск {resolution}" + (f", запись в {record_path}" if record_path else ""))
+
+    def open_capture(self):
+        filename, _ = QFileDialog.getOpenFileName(self, "Открыть запись ИК-камеры", "", "IR Capture (*.irlog)")
+        if not filename:
+            return
+        self.play_capture(filename)
+
+    def play_capture(self, filename: str):
+        self.disable_camera()
+        try:
+            self.replay = IrReplay(filename)
+        except (OSError, ValueError) as e:
+            self.set_status(f"❌ {e}", "#ff4757")
+            return
+        self.attach(self.replay.assembler)
+        self.replay.start()
+        self.set_status(f"▶ Запись {self.replay.resolution}", "#00ff88")
+
+    def poll_frame(self):
+        source = self.stream or self.replay
+        if source is None:
+            self.frame_timer.stop()
+            return
+        if self.replay is not None:
+            self.replay.pump()
+        assembler = source.assembler
+        index = assembler.take_frame()
+        if index is not None:
+            self.camera_view.set_image(self.images[index])
+            self.shown_frames += 1
+        if self.stream is not None and not self.stream.running:
+            error = self.stream.error
+            self.stop_stream()
+            if error:
+                self.set_status(f"❌ {error}", "#ff4757")
+            return
+        if index is not None:
+            self.set_status(f"✅ {source.resolution}: {assembler.fps:.1f} к/с, кадров {assembler.frames}"
+                            + (f", брошено {assembler.dropped}" if assembler.dropped else ""), "#00ff88")
+
+    def stop_stream(self):
+        stream = self.stream
+        if stream is None:
+            return
+        self.stream = None
+        stream.stop()
+        self.frame_timer.stop()
+        if stream.recorder is not None:
+            print(f"ИК-камера: записано {stream.recorder.count} фрагментов в {stream.recorder.path}")
+        self.set_status("Выключена", "#8888aa")
+        
+    def disable_camera(self):
+        self.stop_stream()
+        if self.replay is not None:
+            self.replay.stop()
+            self.replay = None
+        self.frame_timer.stop()
+        self.camera_view.set_image(None)
+        self.images = []
+        self.set_status("Выключена", "#8888aa")
+
+
+class HistogramView(QWidget):
+    def __init__(self, labels: list, parent=None):
+        super().__init__(parent)
+        self.labels = labels
+        self.counts = [0] * len(labels)
+        self.setFixedSize(220, 90)
+
+    def set_counts(self, counts: list):
+        if counts != self.counts:
+            self.counts = list(counts)
+            self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor("#1a1a2e"))
+        total = max(self.counts) if self.counts else 0
+        n = len(self.counts)
+        if n:
+            bar_width = self.width() / n
+            usable = self.height() - 14
+            painter.setBrush(QColor("#00d4ff"))
+            painter.setPen(Qt.PenStyle.NoPen)
+            for i, count in enumerate(self.counts):
+                if total and count:
+                    h = max(1, int(usable * count / total))
+                    painter.drawRect(int(i * bar_width) + 1, usable - h, max(1, int(bar_width) - 2), h)
+            painter.setPen(QColor("#8888aa"))
+            font = painter.font()
+            font.setPixelSize(8)
+            painter.setFont(font)
+            for i in (0, n // 2, n - 1):
+                painter.drawText(int(i * bar_width), self.height() - 2, self.labels[i])
+        painter.end()
+
+
+class ReportRateWidget(QFrame):
+    def __init__(self, ds4, nintendo, parent=None):
+        super().__init__(parent)
+        self.ds4 = ds4
+        self.nintendo = nintendo
+        self.monitor = None
+        self.last_summary = None
+        self.on_report = None
+        self.on_start = None
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.setup_ui()
+
+    def setup_ui(self):
+        self.setStyleSheet("""
+            QFrame {
+                background: #2a2a3e;
+                border-radius: 15px;
+                border: 2px solid #4a4a5e;
+            }
+        """)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(15, 12, 15, 12)
+        layout.setSpacing(8)
+        title = QLabel("📶 Отчёты HID")
+        title.setStyleSheet("QLabel { color: #00d4ff; font-size: 15px; font-weight: bold; }")
+        layout.addWidget(title)
+        self.rate_label = QLabel("Частота: -- Гц")
+        self.rate_label.setStyleSheet("QLabel { color: #00ff88; font-size: 12px; font-weight: bold; }")
+        layout.addWidget(self.rate_label)
+        self.jitter_label = QLabel("Джиттер: -- мс")
+        self.jitter_label.setStyleSheet("QLabel { color: #8888aa; font-size: 9px; }")
+        layout.addWidget(self.jitter_label)
+        self.drop_label = QLabel("Потери: --")
+        self.drop_label.setStyleSheet("QLabel { color: #8888aa; font-size: 9px; }")
+        layout.addWidget(self.drop_label)
+        self.histogram = HistogramView(jitter_bin_labels())
+        layout.addWidget(self.histogram, alignment=Qt.AlignmentFlag.AlignCenter)
+        btn_layout = QHBoxLayout()
+        self.start_btn = QPushButton("▶ Замер")
+        self.start_btn.setFixedSize(80, 30)
+        self.start_btn.setStyleSheet("""
+            QPushButton {
+                background: qlineargradient(x1:0, y1:0, x2:0, y2:1, stop:0 #00d4ff, stop:1 #0066ff);
+                color: white; font-size: 11px; font-weight: bold; border-radius: 8px; border: none;
+            }
+        """)
+        self.start_btn.clicked.connect(self.start)
+        btn_layout.addWidget(self.start_btn)
+        self.stop_btn = QPushButton("⏹")
+        self.stop_btn.setFixedSize(30, 30)
+        self.stop_btn.setStyleSheet("""
+            QPushButton {
+                background: qlineargradient(x1:0, y1:0, x2:0, y2:1, stop:0 #555566, stop:1 #444455);
+                color: white; font-size: 11px; font-weight: bold; border-radius: 8px; border: none;
+            }
+        """)
+        self.stop_btn.clicked.connect(self.stop)
+        btn_layout.addWidget(self.stop_btn)
+        layout.addLayout(btn_layout)
+        self.status = QLabel("Требуется DS4/DS5/Joy-Con + hidapi")
+        self.status.setStyleSheet("QLabel { color: #8888aa; font-size: 9px; }")
+        layout.addWidget(self.status)
+
+    @property
+    def active(self) -> bool:
+        return self.monitor is not None and self.monitor.running
+
+    def start(self):
+        self.stop()
+        if self.on_start:
+            self.on_start()
+        if self.ds4.device:
+            self.monitor = HidReportMonitor(self.ds4.device, self.ds4.kind, self.ds4.report_size, self.on_report)
+        elif self.nintendo.device:
+            self.monitor = HidReportMonitor(self.nintendo.device, "nintendo", 64, self.on_report)
+        else:
+            self.status.setText("❌ Нет HID-устройства")
+            self.status.setStyleSheet("QLabel { color: #ff4757; font-size: 9px; }")
+            return
+        self.monitor.start()
+        self.refresh_timer.start(500)
+        self.status.setText("⏺ Идёт замер...")
+        self.status.setStyleSheet("QLabel { color: #00ff88; font-size: 9px; }")
+
+    def stop(self):
+        if self.monitor is None:
+            return
+        self.monitor.stop()
+        self.refresh_timer.stop()
+        self.refresh()
+        self.monitor = None
+        self.status.setText("⏹ Замер остановлен")
+        self.status.setStyleSheet("QLabel { color: #8888aa; font-size: 9px; }")
+
+    def refresh(self):
+        if self.monitor is None:
+            return
+        if self.monitor.error:
+            self.status.setText(f"❌ {self.monitor.error}")
+            self.status.setStyleSheet("QLabel { color: #ff4757; font-size: 9px; }")
+        summary = self.monitor.summary()
+        self.last_summary = summary
+        self.rate_label.setText(f"Частота: {summary['rate_hz']:.1f} Гц")
+        self.jitter_label.setText(f"Джиттер: σ {summary['jitter_ms']:.2f} мс, p99 {summary['p99_ms']:.2f} мс")
+        if summary['drop_percent'] is None:
+            self.drop_label.setText(f"Потери: нет счётчика ({summary['received']} отч.)")
+        else:
+            self.drop_label.setText(f"Потери: {summary['dropped']} ({summary['drop_percent']:.2f}%)")
+        self.histogram.set_counts(summary['histogram'])
+
+
+class SessionWidget(QFrame):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.duration_ns = 0
+        self.setup_ui()
+
+    def setup_ui(self):
+        self.setStyleSheet("""
+            QFrame {
+                background: #2a2a3e;
+                border-radius: 15px;
+                border: 2px solid #4a4a5e;
+            }
+        """)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(15, 12, 15, 12)
+        layout.setSpacing(10)
+        title = QLabel("💾 Сессия")
+        title.setStyleSheet("QLabel { color: #f39c12; font-size: 15px; font-weight: bold; }")
+        layout.addWidget(title)
+        btn_layout = QHBoxLayout()
+        self.record_btn = QPushButton("⏺ Запись")
+        self.record_btn.setFixedSize(80, 30)
+        self.record_btn.setStyleSheet("""
+            QPushButton {
+                background: qlineargradient(x1:0, y1:0, x2:0, y2:1, stop:0 #ff6b6b, stop:1 #ee5a5a);
+                color: white; font-size: 11px; font-weight: bold; border-radius: 8px; border: none;
+            }
+        """)
+        btn_layout.addWidget(self.record_btn)
+        self.open_btn = QPushButton("📂 Открыть")
+        self.open_btn.setFixedSize(80, 30)
+        self.open_btn.setStyleSheet("""
+            QPushButton {
+                background: qlineargradient(x1:0, y1:0, x2:0, y2:1, stop:0 #f39c12, stop:1 #e67e22);
+                color: white; font-size: 11px; font-weight: bold; border-radius: 8px; border: none;
+            }
+        """)
+        btn_layout.addWidget(self.open_btn)
+        self.stop_btn = QPushButton("⏹")
+        self.stop_btn.setFixedSize(30, 30)
+        self.stop_btn.setStyleSheet("""
+            QPushButton {
+                background: qlineargradient(x1:0, y1:0, x2:0, y2:1, stop:0 #555566, stop:1 #444455);
+                color: white; font-size: 11px; font-weight: bold; border-radius: 8px; border: none;
+            }
+        """)
+        btn_layout.addWidget(self.stop_btn)
+        layout.addLayout(btn_layout)
+        self.position = QSlider(Qt.Orientation.Horizontal)
+        self.position.setRange(0, 1000)
+        self.position.setEnabled(False)
+        self.position.setStyleSheet("""
+            QSlider::groove:horizontal { background: #1a1a2e; height: 6px; border-radius: 3px; }
+            QSlider::handle:horizontal { background: #f39c12; width: 14px; border-radius: 3px; margin: -4px 0; }
+        """)
+        layout.addWidget(self.position)
+        self.time_label = QLabel("--:-- / --:--")
+        self.time_label.setStyleSheet("QLabel { color: #8888aa; font-size: 9px; }")
+        layout.addWidget(self.time_label)
+        self.status = QLabel("Нет записи")
+        self.status.setStyleSheet("QLabel { color: #8888aa; font-size: 9px; }")
+        layout.addWidget(self.status)
+
+    def set_status(self, text: str, color="#8888aa"):
+        self.status.setText(text)
+        self.status.setStyleSheet(f"QLabel {{ color: {color}; font-size: 9px; }}")
+
+    def set_position(self, position_ns: int, duration_ns: int):
+        self.duration_ns = duration_ns
+        if not self.position.isSliderDown():
+            value = int(position_ns * 1000 / duration_ns) if duration_ns else 0
+            if value != self.position.value():
+                self.position.blockSignals(True)
+                self.position.setValue(value)
+                self.position.blockSignals(False)
+        pos_s = position_ns // 1_000_000_000
+        dur_s = duration_ns // 1_000_000_000
+        self.time_label.setText(f"{pos_s // 60:02d}:{pos_s % 60:02d} / {dur_s // 60:02d}:{dur_s % 60:02d}")
+
+
+class DashboardTile(QFrame):
+    CHECK_ICONS = {"buttons": "🔘", "sticks": "🕹", "triggers": "🎯", "vibration": "🔊", "gyro": "🌀"}
+    STYLE = """
+        QFrame#tile { background: #1a1a2e; border-radius: 12px; border: 2px solid #3a3a4e; }
+        QFrame#tile[result="pass"] { border: 2px solid #00ff88; }
+        QFrame#tile[result="off"] { border: 2px solid #555566; }
+        QLabel { background: transparent; border: none; }
+    """
+
+    def __init__(self, session, parent=None):
+        super().__init__(parent)
+        self.session = session
+        self.shown = None
+        self.setObjectName("tile")
+        self.setFixedSize(250, 160)
+        self.setup_ui()
+        self.refresh()
+
+    def setup_ui(self):
+        self.setProperty("result", "run")
+        self.setStyleSheet(self.STYLE)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(10, 8, 10, 8)
+        layout.setSpacing(5)
+        gp = self.session.gp
+        name = QLabel(gp['name'])
+        name.setToolTip(gp['name'])
+        name.setStyleSheet("QLabel { color: #ffffff; font-size: 12px; font-weight: bold; }")
+        layout.addWidget(name)
+        controller = self.session.controller
+        if controller is not None:
+            hid = f"HID: {controller.connection_type.upper()} {controller.vid:04X}:{controller.pid:04X}"
+            if controller.serial:
+                hid += f" · {controller.serial}"
+        else:
+            hid = "HID: нет (гироскоп не проверяется)"
+        hid_label = QLabel(hid)
+        hid_label.setStyleSheet("QLabel { color: #8888aa; font-size: 9px; }")
+        layout.addWidget(hid_label)
+        self.progress = QProgressBar()
+        self.progress.setRange(0, 100)
+        self.progress.setFixedHeight(16)
+        self.progress.setFormat("%p%")
+        self.progress.setStyleSheet("""
+            QProgressBar { background: #0f0f1a; border-radius: 6px; border: 1px solid #3a3a4e;
+                           text-align: center; font-size: 9px; font-weight: bold; color: #ffffff; }
+            QProgressBar::chunk { background: #00d4ff; border-radius: 5px; }
+        """)
+        layout.addWidget(self.progress)
+        checks_layout = QHBoxLayout()
+        checks_layout.setSpacing(4)
+        self.check_labels = {}
+        for key in self.session.checks:
+            lbl = QLabel(self.CHECK_ICONS[key])
+            lbl.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            checks_layout.addWidget(lbl)
+            self.check_labels[key] = lbl
+        checks_layout.addStretch()
+        layout.addLayout(checks_layout)
+        bottom = QHBoxLayout()
+        self.status = QLabel("")
+        self.status.setStyleSheet("QLabel { color: #8888aa; font-size: 10px; }")
+        bottom.addWidget(self.status, stretch=1)
+        self.rumble_btn = QPushButton("🔊")
+        self.reset_btn = QPushButton("↺")
+        for btn, tip in ((self.rumble_btn, "Проверить вибрацию"), (self.reset_btn, "Сбросить тесты этого геймпада")):
+            btn.setFixedSize(30, 26)
+            btn.setToolTip(tip)
+            btn.setStyleSheet("""
+                QPushButton { background: #2a2a3e; color: white; font-size: 12px; border-radius: 6px; border: 1px solid #4a4a5e; }
+            """)
+            bottom.addWidget(btn)
+        self.rumble_btn.setVisible("vibration" in self.session.checks)
+        self.rumble_btn.clicked.connect(self.on_rumble)
+        self.reset_btn.clicked.connect(self.on_reset)
+        layout.addLayout(bottom)
+
+    def on_rumble(self):
+        self.session.rumble()
+        self.refresh()
+
+    def on_reset(self):
+        self.session.reset()
+        self.refresh()
+
+    def refresh(self):
+        session = self.session
+        state = session.state
+        if not session.connected:
+            result, status = "off", "⚪ Нет сигнала"
+        elif session.passed:
+            result, status = "pass", f"✅ Годен за {session.duration:.1f} с"
+        else:
+            result, status = "run", f"⏳ {int(session.duration)} с"
+        shown = (result, status, state.revision)
+        if shown == self.shown:
+            return
+        if self.shown is None or self.shown[0] != result:
+            set_style_state(self, "result", result)
+        self.shown = shown
+        self.status.setText(status)
+        self.progress.setValue(session.score)
+        for key, lbl in self.check_labels.items():
+            color = "#00ff88" if state.passed[key] else "#ff4757"
+            text = self.CHECK_ICONS[key]
+            if key == "buttons":
+                text += f" {len(state.buttons_pressed)}/{state.buttons_total}"
+            lbl.setText(text)
+            lbl.setStyleSheet(f"QLabel {{ color: {color}; font-size: 11px; font-weight: bold; }}")
+
+
+class DashboardWidget(QFrame):
+    COLUMNS = 4
+
+    def __init__(self, multi, parent=None):
+        super().__init__(parent)
+        self.multi = multi
+        self.tiles = {}           # instance_id -> DashboardTile
+        self.running = False
+        self.setup_ui()
+
+    def setup_ui(self):
+        self.setStyleSheet("QFrame { background: transparent; }")
+        layout = QVBoxLayout(self)
+        layout.setSpacing(12)
+        header = QHBoxLayout()
+        title = QLabel("🎛 Все геймпады")
+        title.setStyleSheet("QLabel { color: #00d4ff; font-size: 16px; font-weight: bold; }")
+        header.addWidget(title)
+        self.summary = QLabel("Тест остановлен")
+        self.summary.setStyleSheet("QLabel { color: #8888aa; font-size: 11px; }")
+        header.addWidget(self.summary, stretch=1)
+        self.start_btn = QPushButton("▶ Тестировать все")
+        self.start_btn.setFixedSize(170, 35)
+        self.start_btn.setStyleSheet("""
+            QPushButton {
+                background: qlineargradient(x1:0, y1:0, x2:0, y2:1, stop:0 #00d4ff, stop:1 #0066ff);
+                color: white; font-size: 12px; font-weight: bold; border-radius: 8px; border: none;
+            }
+        """)
+        header.addWidget(self.start_btn)
+        self.reset_btn = QPushButton("🔄 Сбросить все")
+        self.reset_btn.setFixedSize(140, 35)
+        self.reset_btn.setStyleSheet("""
+            QPushButton {
+                background: qlineargradient(x1:0, y1:0, x2:0, y2:1, stop:0 #ff6b6b, stop:1 #ee5a5a);
+                color: white; font-size: 12px; font-weight: bold; border-radius: 8px; border: none;
+            }
+        """)
+        self.reset_btn.clicked.connect(self.reset_all)
+        header.addWidget(self.reset_btn)
+        layout.addLayout(header)
+        scroll = QScrollArea()
+        scroll.setWidgetResizable(True)
+        scroll.setStyleSheet("QScrollArea { background: transparent; border: none; }")
+        grid_host = QWidget()
+        grid_host.setStyleSheet("background: transparent;")
+        self.grid = QGridLayout(grid_host)
+        self.grid.setSpacing(10)
+        self.grid.setAlignment(Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignLeft)
+        scroll.setWidget(grid_host)
+        layout.addWidget(scroll, stretch=1)
+
+    def set_running(self, running: bool):
+        self.running = running
+        self.start_btn.setText("⏹ Остановить" if running else "▶ Тестировать все")
+        if not running:
+            for tile in self.tiles.values():
+                tile.deleteLater()
+            self.tiles = {}
+        self.refresh_summary()
+
+    def apply_changes(self, added, removed):
+        for session in removed:
+            tile = self.tiles.pop(session.instance_id, None)
+            if tile is not None:
+                self.grid.removeWidget(tile)
+                tile.deleteLater()
+        for session in added:
+            self.tiles[session.instance_id] = DashboardTile(session)
+        if added or removed:
+            # Плитки по порядку подключения, без дыр после отключённых
+            for n, tile in enumerate(self.tiles.values()):
+                self.grid.addWidget(tile, n // self.COLUMNS, n % self.COLUMNS)
+        self.refresh_summary()
+
+    def refresh(self, changed_sessions=()):
+        # Время на плитках идёт и без изменений в проверках - обновляем все,
+        # плитка сама пропускает одинаковое состояние
+        for tile in self.tiles.values():
+            tile.refresh()
+        if changed_sessions:
+            self.refresh_summary()
+
+    def refresh_summary(self):
+        if not self.running:
+            self.summary.setText("Тест остановлен")
+            return
+        sessions = list(self.multi.sessions.values())
+        passed = sum(1 for session in sessions if session.passed)
+        self.summary.setText(f"Геймпадов: {len(sessions)} · годны: {passed}")
+
+    def reset_all(self):
+        self.multi.reset()
+        self.refresh(self.multi.sessions.values())
+
+
+class StationWidget(QFrame):
+    STEP_ICONS = DashboardTile.CHECK_ICONS
+
+    def __init__(self, store_path: str, parent=None):
+        super().__init__(parent)
+        self.store_path = store_path
+        self.running = False
+        self.setup_ui()
+
+    def setup_ui(self):
+        self.setStyleSheet("QFrame { background: transparent; }")
+        layout = QVBoxLayout(self)
+        layout.setSpacing(14)
+        header = QHBoxLayout()
+        title = QLabel("🏭 Стенд")
+        title.setStyleSheet("QLabel { color: #00d4ff; font-size: 16px; font-weight: bold; }")
+        header.addWidget(title)
+        self.path_label = QLabel(f"Результаты: {self.store_path}")
+        self.path_label.setStyleSheet("QLabel { color: #8888aa; font-size: 11px; }")
+        header.addWidget(self.path_label, stretch=1)
+        self.export_btn = QPushButton("📤 Выгрузить")
+        self.export_btn.setFixedSize(120, 35)
+        self.export_btn.setStyleSheet("""
+            QPushButton {
+                background: qlineargradient(x1:0, y1:0, x2:0, y2:1, stop:0 #f39c12, stop:1 #e67e22);
+                color: white; font-size: 12px; font-weight: bold; border-radius: 8px; border: none;
+            }
+        """)
+        self.export_btn.setToolTip("Выгрузить историю стенда в CSV или JSON")
+        header.addWidget(self.export_btn)
+        self.start_btn = QPushButton("▶ Запустить стенд")
+        self.start_btn.setFixedSize(170, 35)
+        self.start_btn.setStyleSheet("""
+            QPushButton {
+                background: qlineargradient(x1:0, y1:0, x2:0, y2:1, stop:0 #00d4ff, stop:1 #0066ff);
+                color: white; font-size: 12px; font-weight: bold; border-radius: 8px; border: none;
+            }
+        """)
+        header.addWidget(self.start_btn)
+        layout.addLayout(header)
+        panel = QFrame()
+        panel.setStyleSheet("QFrame { background: #1a1a2e; border-radius: 15px; border: 2px solid #3a3a4e; }")
+        panel_layout = QVBoxLayout(panel)
+        panel_layout.setContentsMargins(20, 16, 20, 16)
+        panel_layout.setSpacing(10)
+        self.state_label = QLabel("Стенд остановлен")
+        self.state_label.setStyleSheet("QLabel { color: #8888aa; font-size: 22px; font-weight: bold; border: none; }")
+        panel_layout.addWidget(self.state_label)
+        self.prompt_label = QLabel("")
+        self.prompt_label.setStyleSheet("QLabel { color: #ffffff; font-size: 18px; border: none; }")
+        panel_layout.addWidget(self.prompt_label)
+        steps_layout = QHBoxLayout()
+        steps_layout.setSpacing(8)
+        self.step_labels = {}
+        for key in CHECKS:
+            lbl = QLabel(f"{self.STEP_ICONS[key]} {STEP_PROMPTS[key]}")
+            lbl.setStyleSheet("QLabel { color: #555566; font-size: 11px; border: none; }")
+            steps_layout.addWidget(lbl)
+            self.step_labels[key] = lbl
+        steps_layout.addStretch()
+        panel_layout.addLayout(steps_layout)
+        self.result_label = QLabel("")
+        self.result_label.setWordWrap(True)
+        self.result_label.setStyleSheet("QLabel { color: #8888aa; font-size: 12px; border: none; }")
+        panel_layout.addWidget(self.result_label)
+        layout.addWidget(panel)
+        counters = QHBoxLayout()
+        counters.setSpacing(12)
+        self.counter_labels = {}
+        for key, title_text in (("units", "Проверено"), ("pass_rate", "Годных"),
+                                ("units_per_hour", "Штук в час"), ("avg_duration_s", "Среднее время")):
+            box = QFrame()
+            box.setStyleSheet("QFrame { background: #2a2a3e; border-radius: 12px; border: 2px solid #4a4a5e; }")
+            box_layout = QVBoxLayout(box)
+            box_layout.setContentsMargins(14, 10, 14, 10)
+            caption = QLabel(title_text)
+            caption.setStyleSheet("QLabel { color: #8888aa; font-size: 11px; border: none; }")
+            box_layout.addWidget(caption)
+            value = QLabel("0")
+            value.setStyleSheet("QLabel { color: #00ff88; font-size: 20px; font-weight: bold; border: none; }")
+            box_layout.addWidget(value)
+            counters.addWidget(box)
+            self.counter_labels[key] = value
+        layout.addLayout(counters)
+        layout.addStretch()
+
+    def set_running(self, running: bool):
+        self.running = running
+        self.start_btn.setText("⏹ Остановить стенд" if running else "▶ Запустить стенд")
+        if not running:
+            self.state_label.setText("Стенд остановлен")
+            self.state_label.setStyleSheet("QLabel { color: #8888aa; font-size: 22px; font-weight: bold; border: none; }")
+            self.prompt_label.setText("")
+
+    def show_machine(self, machine):
+        state = machine.state
+        color = {STATION_WAITING: "#8888aa", STATION_TESTING: "#00d4ff"}.get(state)
+        result = machine.last_result
+        if state == STATION_DONE:
+            color = "#00ff88" if result["result"] == RESULT_PASS else "#ff4757"
+        text = STATION_NAMES[state]
+        if state == STATION_TESTING:
+            text += f": {machine.session.gp['name']}"
+        self.state_label.setText(text)
+        self.state_label.setStyleSheet(f"QLabel {{ color: {color}; font-size: 22px; font-weight: bold; border: none; }}")
+        step = machine.step
+        if step is not None:
+            left = max(0, machine.step_timeout - (machine.clock() - machine.step_started))
+            prompt = f"{self.STEP_ICONS[step]} {STEP_PROMPTS[step]} ({left:.0f} с)"
+            if step == "buttons":
+                state_model = machine.session.state
+                prompt += f" - {len(state_model.buttons_pressed)} / {state_model.buttons_total}"
+        elif state == STATION_DONE:
+            prompt = "✅ Годен" if result["result"] == RESULT_PASS else f"❌ Брак: {result['reason']}"
         else:
-            self.status.setText("❌ Не Joy-Con R")
-            self.status.setStyleSheet("QLabel { color: #ff4757; font-size: 9px; }")
-        
-    def disable_camera(self):
-        if self.nintendo:
-            self.nintendo.disable_ir_camera()
-            self.status.setText("Выключена")
-            self.status.setStyleSheet("QLabel { color: #8888aa; font-size: 9px; }")
-            self.camera_view.setStyleSheet("""
-                QFrame {
-                    background: #000000;
-                    border-radius: 8px;
-                    border: 2px solid #4a4a5e;
-                }
-            """)
+            prompt = "Подключите геймпад"
+        self.prompt_label.setText(prompt)
+        for index, key in enumerate(CHECKS):
+            if state == STATION_WAITING or key not in machine.steps:
+                color = "#555566"
+            elif key in machine.step_times:
+                color = "#00ff88"
+            elif key == step:
+                color = "#00d4ff"
+            elif key == machine.failed_step:
+                color = "#ff4757"
+            else:
+                color = "#8888aa"
+            self.step_labels[key].setStyleSheet(f"QLabel {{ color: {color}; font-size: 11px; border: none; }}")
+        if result:
+            outcome = "годен" if result["result"] == RESULT_PASS else "брак"
+            self.result_label.setText(
+                f"Последний: №{result['unit']} {result['device']['name']} - {outcome} за {result['duration_s']:.1f} с"
+                + (f" ({result['reason']})" if result['reason'] else ""))
+        stats = machine.stats()
+        self.counter_labels["units"].setText(str(stats["units"]))
+        self.counter_labels["pass_rate"].setText(f"{stats['pass_rate']:.0f}%")
+        self.counter_labels["units_per_hour"].setText(f"{stats['units_per_hour']:.0f}")
+        self.counter_labels["avg_duration_s"].setText(f"{stats['avg_duration_s']:.1f} с")
 
 
 class GamepadTester(QMainWindow):
-    def __init__(self):
+    def __init__(self, startup=None):
         super().__init__()
-        pygame.init()
-        pygame.joystick.init()
+        # Только подсистема джойстиков SDL: звук и остальное из pygame.init() не нужны
+        init_joystick_subsystem()
+        self.startup = startup
+        self.startup_done = False
+        self.on_startup_finished = None
         self.joystick = None
-        self.joystick_index = 0
+        self.current_instance = None
+        self.conn_info = ""
         self.ds4 = DS4Controller()
         self.nintendo = NintendoController()
-        self.button_widgets = {}
-        self.stick_tested = False
-        self.triggers_tested = False
-        self.gyro_tested = False
+        self.view = None
+        self.view_cache = OrderedDict()
+        self.button_pool = []
+        self.renderer = RENDER_WIDGETS
+        self.visual_args = None
+        self.prev_held = 0
+        self.prev_axes = None
+        self.prev_hats = None
+        self.activity_axes = None
+        self.test_state = TestState(checks=("buttons", "sticks", "triggers", "vibration"))
+        self.engine = AcquisitionEngine(DEFAULT_RATE_HZ)
+        self.hotplug = HotplugWatcher(self.engine, [enumerator_for(DEFAULT_TRANSPORT)])
+        self.hid_reconnect = HidReconnector()
+        self.hid_batch = HidBatchReader()
+        self.fusion = FusionEngine()
+        self.recorder = None
+        self.player = None
+        self.input_snapshot = InputSnapshot()
+        self.tray_icon = None
+        # Виджеты вкладок "Тесты" и "О программе" создаются при первом открытии
+        self.vibration_widget = None
+        self.lightbar_widget = None
+        self.gyro_widget = None
+        self.noise_widget = None
+        self.noise_capture = None
+        self.ir_camera_widget = None
+        self.report_rate_widget = None
+        self.session_widget = None
+        self.about_widget = None
+        self.dashboard_widget = None
+        self.multi = None
+        self.station_widget = None
+        self.station = None
+        self.station_refreshed_at = 0.0
+        self.result_store = None
+        self.test_started = time.monotonic()
+        self.ir_camera_available = False
+        # Частота таймеров зависит от того, видно ли окно и трогают ли геймпад
+        self.pacer = FramePacer()
+        self.pacing_label_at = 0.0
         self.setup_ui()
-        self.setup_tray()
-        self.detect_gamepad()
+        self.engine.start()
         self.timer = QTimer()
-        self.timer.timeout.connect(self.update_gamepad_state)
-        self.timer.start(16)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self.on_frame_tick)
         self.battery_timer = QTimer()
         self.battery_timer.timeout.connect(self.update_battery)
-        self.battery_timer.start(2000)
         self.gyro_timer = QTimer()
         self.gyro_timer.timeout.connect(self.update_gyro)
-        self.gyro_timer.start(50)
+        self.hotplug_timer = QTimer()
+        self.hotplug_timer.timeout.connect(self.poll_hotplug)
+        self.dashboard_timer = QTimer()
+        self.dashboard_timer.timeout.connect(self.update_dashboard)
+        self.station_timer = QTimer()
+        self.station_timer.timeout.connect(self.update_station)
+        self.apply_pacing()
         self.setup_shortcuts()
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.startup_done:
+            # Поиск геймпадов (и открытие HID) и трей - уже после первого кадра
+            self.startup_done = True
+            if self.startup:
+                self.startup.mark_first_frame()
+            QTimer.singleShot(0, self.finish_startup)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        screen = self.screen()
+        if screen is not None and self.pacer.set_refresh(screen.refreshRate()):
+            self.apply_pacing()
+        self.refresh_pacing()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.refresh_pacing()
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.Type.WindowStateChange:
+            self.refresh_pacing()
+
+    def window_shown(self) -> bool:
+        return self.isVisible() and not self.isMinimized()
+
+    def refresh_pacing(self, changed=False):
+        if self.pacer.update(self.window_shown(), changed):
+            self.apply_pacing()
+
+    def apply_pacing(self):
+        intervals = self.pacer.intervals()
+        for timer, key in ((self.timer, "state"), (self.gyro_timer, "gyro"),
+                           (self.battery_timer, "battery"), (self.hotplug_timer, "hotplug")):
+            if not timer.isActive() or timer.interval() != intervals[key]:
+                timer.start(intervals[key])
+        for timer in (self.dashboard_timer, self.station_timer):
+            if timer.isActive() and timer.interval() != intervals["sessions"]:
+                timer.start(intervals["sessions"])
+        self.engine.set_watch(self.pacer.mode == PACE_HIDDEN)
+        if self.multi is not None:
+            self.multi.set_watch(self.pacer.mode == PACE_HIDDEN)
+        if self.station is not None and self.station.session is not None:
+            self.station.session.engine.set_watch(self.pacer.mode == PACE_HIDDEN)
+        self.update_pacing_label()
+
+    def update_pacing_label(self):
+        self.pacing_label_at = time.monotonic()
+        self.pacing_label.setText(f"Темп: {PACE_NAMES[self.pacer.mode]} · {self.pacer.cpu.format()}")
+
+    def on_frame_tick(self):
+        changed = self.update_gamepad_state()
+        # Во время записи шума и узора вибрации геймпад лежит без ввода, но очередь HID надо вычитывать часто
+        rumbling = self.vibration_widget is not None and self.vibration_widget.scheduler is not None
+        self.refresh_pacing(changed or self.noise_capture is not None or rumbling)
+        if self.pacer.mode != PACE_HIDDEN and time.monotonic() - self.pacing_label_at >= 1.0:
+            self.update_pacing_label()
+
+    def finish_startup(self):
+        self.detect_gamepad()
+        self.setup_tray()
+        if self.startup:
+            self.startup.mark("геймпады и трей")
+            print(self.startup.format())
+        self.pacer.reset_cpu()
+        if self.on_startup_finished:
+            self.on_startup_finished()
         
     def setup_tray(self):
         if not QSystemTrayIcon.isSystemTrayAvailable():
@@ -868,7 +2337,7 @@ class GamepadTester(QMainWindow):
         shortcut_f1.activated.connect(self.show_help)
         
     def show_help(self):
-        self.tabs.setCurrentIndex(2)
+        self.tabs.setCurrentWidget(self.about_tab)
         
     def setup_ui(self):
         self.setWindowTitle("🎮 Gamepad Tester Pro v12.0")
@@ -926,6 +2395,31 @@ class GamepadTester(QMainWindow):
         """)
         self.device_combo.currentIndexChanged.connect(self.on_device_changed)
         status_layout.addWidget(self.device_combo)
+        self.rate_combo = QComboBox()
+        self.rate_combo.setFixedSize(100, 32)
+        self.rate_combo.setStyleSheet(self.device_combo.styleSheet())
+        for rate in (250, 500, 1000):
+            self.rate_combo.addItem(f"{rate} Гц", rate)
+        self.rate_combo.setCurrentIndex(self.rate_combo.findData(DEFAULT_RATE_HZ))
+        self.rate_combo.setToolTip("Частота опроса геймпада")
+        self.rate_combo.currentIndexChanged.connect(self.on_rate_changed)
+        status_layout.addWidget(self.rate_combo)
+        self.mode_combo = QComboBox()
+        self.mode_combo.setFixedSize(110, 32)
+        self.mode_combo.setStyleSheet(self.device_combo.styleSheet())
+        self.mode_combo.addItem("Опрос", MODE_POLL)
+        self.mode_combo.addItem("События", MODE_EVENTS)
+        self.mode_combo.setToolTip("Опрос всех кнопок и осей или разбор событий SDL")
+        self.mode_combo.currentIndexChanged.connect(self.on_input_mode_changed)
+        status_layout.addWidget(self.mode_combo)
+        self.render_combo = QComboBox()
+        self.render_combo.setFixedSize(110, 32)
+        self.render_combo.setStyleSheet(self.device_combo.styleSheet())
+        self.render_combo.addItem("Виджеты", RENDER_WIDGETS)
+        self.render_combo.addItem("Холст", RENDER_CANVAS)
+        self.render_combo.setToolTip("Отрисовка геймпада: отдельные виджеты или один холст QPainter")
+        self.render_combo.currentIndexChanged.connect(self.on_renderer_changed)
+        status_layout.addWidget(self.render_combo)
         header.addWidget(status_frame)
         self.battery_widget = BatteryWidget()
         self.battery_widget.hide()
@@ -964,19 +2458,105 @@ class GamepadTester(QMainWindow):
         self.content_layout.setSpacing(15)
         scroll.setWidget(self.content)
         self.gamepad_layout.addWidget(scroll, stretch=1)
-        self.test_report = TestReportWidget()
+        self.test_report = TestReportWidget(self.test_state)
         self.gamepad_layout.addWidget(self.test_report)
         self.tabs.addTab(gamepad_tab, "🎮 Геймпад")
-        tests_tab = QWidget()
-        tests_tab.setStyleSheet("background: transparent;")
-        tests_layout = QHBoxLayout(tests_tab)
-        tests_layout.setSpacing(15)
-        self.vibration_widget = VibrationWidget(None, self.test_report)
+        self.tests_tab = QWidget()
+        self.tests_tab.setStyleSheet("background: transparent;")
+        self.tests_layout = QHBoxLayout(self.tests_tab)
+        self.tests_layout.setSpacing(15)
+        self.tabs.addTab(self.tests_tab, "🔊 Тесты")
+        self.dashboard_tab = QWidget()
+        self.dashboard_tab.setStyleSheet("background: transparent;")
+        self.dashboard_layout = QVBoxLayout(self.dashboard_tab)
+        self.dashboard_layout.setContentsMargins(0, 0, 0, 0)
+        self.tabs.addTab(self.dashboard_tab, "🎛 Все геймпады")
+        self.station_tab = QWidget()
+        self.station_tab.setStyleSheet("background: transparent;")
+        self.station_layout = QVBoxLayout(self.station_tab)
+        self.station_layout.setContentsMargins(0, 0, 0, 0)
+        self.tabs.addTab(self.station_tab, "🏭 Стенд")
+        self.about_tab = QWidget()
+        self.about_layout = QVBoxLayout(self.about_tab)
+        self.about_layout.setContentsMargins(0, 0, 0, 0)
+        self.tabs.addTab(self.about_tab, "ℹ О программе")
+        self.tabs.currentChanged.connect(self.on_tab_changed)
+        self.session_timer = QTimer(self)
+        self.session_timer.timeout.connect(self.update_session_position)
+        main_layout.addWidget(self.tabs)
+        reset_layout = QHBoxLayout()
+        frame_cost_btn = QPushButton("⏱ Цена кадра")
+        frame_cost_btn.setFixedSize(140, 40)
+        frame_cost_btn.setStyleSheet("""
+            QPushButton {
+                background: #2a2a3e; color: #00d4ff; font-size: 12px; font-weight: bold;
+                border-radius: 10px; border: 2px solid #3a3a4e;
+            }
+        """)
+        frame_cost_btn.setToolTip("Сравнить цену полного кадра для обоих способов отрисовки")
+        frame_cost_btn.clicked.connect(self.measure_frame_cost)
+        reset_layout.addWidget(frame_cost_btn)
+        self.frame_cost_label = QLabel("")
+        self.frame_cost_label.setStyleSheet("QLabel { color: #8888aa; font-size: 11px; }")
+        reset_layout.addWidget(self.frame_cost_label)
+        self.pacing_label = QLabel("")
+        self.pacing_label.setStyleSheet("QLabel { color: #8888aa; font-size: 11px; }")
+        self.pacing_label.setToolTip("Режим опроса и загрузка процессора в каждом режиме")
+        reset_layout.addWidget(self.pacing_label)
+        reset_layout.addStretch()
+        reset_btn = QPushButton("🔄 Сброс всех тестов")
+        reset_btn.setFixedSize(200, 40)
+        reset_btn.setStyleSheet("""
+            QPushButton {
+                background: qlineargradient(x1:0, y1:0, x2:0, y2:1, stop:0 #ff6b6b, stop:1 #ee5a5a);
+                color: white; font-size: 13px; font-weight: bold; border-radius: 10px; border: none;
+            }
+        """)
+        reset_btn.clicked.connect(self.reset_all)
+        reset_layout.addWidget(reset_btn)
+        main_layout.addLayout(reset_layout)
+
+    def on_tab_changed(self, index):
+        tab = self.tabs.widget(index)
+        if tab is self.tests_tab:
+            self.build_tests_tab()
+        elif tab is self.dashboard_tab:
+            self.build_dashboard_tab()
+        elif tab is self.station_tab:
+            self.build_station_tab()
+        elif tab is self.about_tab:
+            self.build_about_tab()
+
+    def build_tests_tab(self):
+        if self.vibration_widget is not None:
+            return
+        tests_layout = self.tests_layout
+        self.vibration_widget = VibrationWidget(None, self.test_state, self.nintendo, self.ds4)
+        self.lightbar_widget = LightbarWidget(self.ds4)
         self.gyro_widget = GyroWidget()
+        self.gyro_widget.fusion_combo.currentIndexChanged.connect(
+            lambda _: self.fusion.set_method(self.gyro_widget.fusion_combo.currentData()))
+        self.gyro_widget.level_btn.clicked.connect(self.fusion.reset)
+        self.noise_widget = NoiseWidget()
+        self.noise_widget.start_btn.clicked.connect(self.toggle_noise_capture)
+        self.noise_widget.start_btn.setEnabled(NUMPY_AVAILABLE)
         self.ir_camera_widget = IRCameraWidget(self.nintendo)
+        self.report_rate_widget = ReportRateWidget(self.ds4, self.nintendo)
+        self.report_rate_widget.on_report = self.record_hid_report
+        self.report_rate_widget.on_start = self.stop_ir_camera
+        self.ir_camera_widget.on_start = self.stop_report_rate
+        self.session_widget = SessionWidget()
+        self.session_widget.record_btn.clicked.connect(self.start_recording)
+        self.session_widget.open_btn.clicked.connect(self.open_session)
+        self.session_widget.stop_btn.clicked.connect(self.stop_session)
+        self.session_widget.position.valueChanged.connect(self.on_session_seek)
         tests_layout.addWidget(self.vibration_widget)
+        tests_layout.addWidget(self.lightbar_widget)
         tests_layout.addWidget(self.gyro_widget)
+        tests_layout.addWidget(self.noise_widget)
         tests_layout.addWidget(self.ir_camera_widget)
+        tests_layout.addWidget(self.report_rate_widget)
+        tests_layout.addWidget(self.session_widget)
         tests_layout.addStretch()
         shortcuts_label = QLabel("⌨️ F5 - Обновить | Esc - Свернуть | F1 - Помощь")
         shortcuts_label.setStyleSheet("QLabel { color: #00d4ff; font-size: 11px; font-weight: bold; }")
@@ -991,268 +2571,532 @@ class GamepadTester(QMainWindow):
         """)
         export_btn.clicked.connect(self.export_report)
         tests_layout.addWidget(export_btn)
-        self.tabs.addTab(tests_tab, "🔊 Тесты")
-        self.about_widget = AboutWidget()
-        self.tabs.addTab(self.about_widget, "ℹ О программе")
-        main_layout.addWidget(self.tabs)
-        reset_layout = QHBoxLayout()
-        reset_layout.addStretch()
-        reset_btn = QPushButton("🔄 Сброс всех тестов")
-        reset_btn.setFixedSize(200, 40)
-        reset_btn.setStyleSheet("""
-            QPushButton {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1, stop:0 #ff6b6b, stop:1 #ee5a5a);
-                color: white; font-size: 13px; font-weight: bold; border-radius: 10px; border: none;
-            }
-        """)
-        reset_btn.clicked.connect(self.reset_all)
-        reset_layout.addWidget(reset_btn)
-        main_layout.addLayout(reset_layout)
+        self.vibration_widget.set_joystick(self.joystick)
+        self.ir_camera_widget.setVisible(self.ir_camera_available)
+
+    def build_dashboard_tab(self):
+        if self.dashboard_widget is not None:
+            return
+        self.multi = MultiTester(enumerator_for(DEFAULT_TRANSPORT), self.engine.rate_hz)
+        self.dashboard_widget = DashboardWidget(self.multi)
+        self.dashboard_widget.start_btn.clicked.connect(self.toggle_dashboard)
+        self.dashboard_layout.addWidget(self.dashboard_widget)
+
+    def toggle_dashboard(self):
+        if self.dashboard_widget.running:
+            self.stop_dashboard()
+        else:
+            self.start_dashboard()
+
+    def start_dashboard(self):
+        # Свой поток опроса на каждый геймпад; очередь SDL качает основной движок
+        self.stop_station()
+        self.build_dashboard_tab()
+        self.engine.set_shared_pump(True)
+        self.multi.set_watch(self.pacer.mode == PACE_HIDDEN)
+        self.dashboard_widget.set_running(True)
+        self.sync_dashboard()
+        self.dashboard_timer.start(self.pacer.intervals()["sessions"])
+
+    def stop_dashboard(self):
+        if self.multi is None or not self.dashboard_widget.running:
+            return
+        self.dashboard_timer.stop()
+        self.multi.stop()
+        self.engine.set_shared_pump(False)
+        self.dashboard_widget.set_running(False)
+
+    def sync_dashboard(self):
+        if self.dashboard_widget is None or not self.dashboard_widget.running:
+            return
+        added, removed = self.multi.sync(self.hotplug.ordered(), self.hotplug.joystick)
+        self.dashboard_widget.apply_changes(added, removed)
+
+    def update_dashboard(self):
+        changed = self.multi.poll()
+        self.dashboard_widget.refresh(changed)
+        if changed:
+            self.refresh_pacing(True)
+
+    def build_station_tab(self):
+        if self.station_widget is not None:
+            return
+        self.station_widget = StationWidget(DEFAULT_STORE)
+        self.station_widget.start_btn.clicked.connect(self.toggle_station)
+        self.station_widget.export_btn.clicked.connect(lambda: self.export_history(SOURCE_STATION))
+        self.station_layout.addWidget(self.station_widget)
+
+    def open_result_store(self):
+        # База открывается при первом сохранении: запуск окна её не ждёт
+        if self.result_store is None:
+            try:
+                self.result_store = ResultStore(DEFAULT_STORE)
+            except sqlite3.Error as e:
+                print(f"Ошибка базы результатов: {e}")
+        return self.result_store
+
+    def save_result(self, result: dict, source: str):
+        store = self.open_result_store()
+        if store is None:
+            return None
+        try:
+            return store.add(result, source)
+        except sqlite3.Error as e:
+            print(f"Ошибка записи результата: {e}")
+            return None
+
+    def export_history(self, source=None):
+        store = self.open_result_store()
+        if store is None:
+            return
+        filename, selected = QFileDialog.getSaveFileName(self, "Выгрузка истории", "", "CSV (*.csv);;JSON (*.json)")
+        if not filename:
+            return
+        records = store.query(source=source)
+        try:
+            if filename.lower().endswith(".json") or selected.startswith("JSON"):
+                export_json(filename, records)
+            else:
+                export_csv(filename, records)
+            print(f"История выгружена: {filename} ({len(records)} записей)")
+        except OSError as e:
+            print(f"Ошибка выгрузки: {e}")
+
+    def toggle_station(self):
+        if self.station_widget.running:
+            self.stop_station()
+        else:
+            self.start_station()
+
+    def start_station(self):
+        self.stop_dashboard()
+        self.build_station_tab()
+        self.engine.set_shared_pump(True)
+        self.station = StationMachine(self.open_station_session)
+        self.station.on_result = self.on_station_result
+        self.station_widget.set_running(True)
+        self.station_next_unit()
+        self.station_widget.show_machine(self.station)
+        self.station_timer.start(self.pacer.intervals()["sessions"])
+
+    def stop_station(self):
+        if self.station is None:
+            return
+        self.station_timer.stop()
+        self.station.stop()
+        self.station = None
+        self.engine.set_shared_pump(False)
+        self.station_widget.set_running(False)
+
+    def open_station_session(self, gp):
+        # Шаг "кнопки" на стенде - все кнопки геймпада, а не хотя бы одна
+        instance_id = gp['instance_id']
+        hid_info = bind_hid_devices(self.hotplug.ordered(), enumerator_for(DEFAULT_TRANSPORT)).get(instance_id)
+        session = PadSession(gp, self.hotplug.joystick(instance_id), self.engine.rate_hz, DEFAULT_TRANSPORT, hid_info,
+                             min_buttons=gp['buttons'])
+        session.engine.set_watch(self.pacer.mode == PACE_HIDDEN)
+        session.start()
+        return session
+
+    def station_next_unit(self):
+        # Ждём следующий геймпад; если уже подключён - сразу за него
+        for gp in self.hotplug.ordered():
+            if self.station.on_connected(gp):
+                print(f"Стенд: тест {gp['name']} (instance {gp['instance_id']})")
+                # Основной вид и отчёт показывают тот же геймпад с чистого листа
+                index = self.device_combo.findData(gp['instance_id'])
+                if index >= 0 and index != self.device_combo.currentIndex():
+                    self.device_combo.setCurrentIndex(index)
+                self.reset_all()
+                return
+
+    def update_station(self):
+        changed = self.station.tick()
+        now = time.monotonic()
+        if changed or now - self.station_refreshed_at >= 0.5:
+            self.station_refreshed_at = now
+            self.station_widget.show_machine(self.station)
+        if changed:
+            self.refresh_pacing(True)
+
+    def on_station_result(self, result):
+        outcome = "годен" if result["result"] == RESULT_PASS else f"брак ({result['reason']})"
+        print(f"Стенд: №{result['unit']} {result['device']['name']} - {outcome} за {result['duration_s']:.1f} с")
+        self.save_result(result, SOURCE_STATION)
+
+    def build_about_tab(self):
+        if self.about_widget is not None:
+            return
+        self.about_widget = AboutWidget(self.startup.format() if self.startup else None)
+        self.about_layout.addWidget(self.about_widget)
+
+    def set_ir_camera_available(self, available: bool):
+        self.ir_camera_available = available
+        if self.ir_camera_widget:
+            self.ir_camera_widget.set_nintendo(self.nintendo)
+            self.ir_camera_widget.setVisible(available)
+
+    def stop_report_rate(self):
+        if self.report_rate_widget:
+            self.report_rate_widget.stop()
+
+    def stop_ir_camera(self):
+        if self.ir_camera_widget:
+            self.ir_camera_widget.stop_stream()
         
     def on_device_changed(self, index):
         print(f"=== on_device_changed: индекс {index} ===")
-        self.joystick_index = index
-        self.refresh_joystick()
+        if index < 0:
+            return
+        instance_id = self.device_combo.itemData(index)
+        if instance_id is not None:
+            self.select_gamepad(instance_id)
         
-    def refresh_joystick(self):
-        print(f"=== refresh_joystick вызван ===")
-        gamepads = get_all_gamepads()
-        if self.joystick_index < len(gamepads):
-            gp = gamepads[self.joystick_index]
-            print(f"Переключаемся на: {gp['name']}")
-            try:
-                if self.joystick:
-                    self.joystick.quit()
-                self.joystick = pygame.joystick.Joystick(gp['index'])
-                self.joystick.init()
-                name = gp['name']
-                is_ds = "DUALSHOCK" in name.upper() or "DUALSENSE" in name.upper() or "PS4" in name.upper() or "PS5" in name.upper() or "Wireless" in name
-                is_nintendo = "Pro Controller" in name or "Joy-Con" in name or "Nintendo" in name
-                is_joycon_right = "Joy-Con (R)" in name or "Joy-Con Right" in name or ("Joy-Con" in name and "L/R" in name)
-                print(f"  is_ds={is_ds}, is_nintendo={is_nintendo}, is_joycon_right={is_joycon_right}")
-                conn_info = ""
-                if is_ds:
-                    print("  → Отключаем Nintendo, подключаем DS4")
-                    self.nintendo.disconnect()
-                    if self.ds4.connect():
-                        conn_info = " 📶 BT" if self.ds4.connection_type == "bluetooth" else " 🔌 USB"
-                    self.ir_camera_widget.hide()
-                    self.reset_all()
-                elif is_nintendo:
-                    print("  → Отключаем DS4, подключаем Nintendo")
-                    self.ds4.disconnect()
-                    if self.nintendo.connect():
-                        conn_info = " 🎮 Nintendo"
-                        self.ir_camera_widget.set_nintendo(self.nintendo)
-                        if is_joycon_right or self.nintendo.controller_type == "joycon_right":
-                            self.ir_camera_widget.show()
-                        else:
-                            self.ir_camera_widget.hide()
-                    self.reset_all()
-                else:
-                    print("  → Другой геймпад")
-                    self.ds4.disconnect()
-                    self.nintendo.disconnect()
-                    self.ir_camera_widget.hide()
-                    self.reset_all()
-                self.device_combo.setItemText(self.joystick_index, f"✅ {name}{conn_info}")
+    def on_rate_changed(self, index):
+        rate = self.rate_combo.itemData(index)
+        if rate:
+            self.engine.set_rate(rate)
+            if self.multi is not None:
+                self.multi.set_rate(rate)
+
+    def on_renderer_changed(self, index):
+        renderer = self.render_combo.itemData(index)
+        if renderer == self.renderer:
+            return
+        self.renderer = renderer
+        if self.view is not None and self.visual_args:
+            self.create_visual(*self.visual_args)
+
+    def measure_frame_cost(self):
+        if self.view is None or not self.visual_args:
+            self.frame_cost_label.setText("Нет геймпада для замера")
+            return
+        renderer = self.renderer
+        results = []
+        for mode in (RENDER_WIDGETS, RENDER_CANVAS):
+            self.renderer = mode
+            self.create_visual(*self.visual_args)
+            cost = measure_frame_cost(self.view)
+            results.append(f"{self.render_combo.itemText(self.render_combo.findData(mode))} {cost / 1000:.2f} мс")
+        self.renderer = renderer
+        self.create_visual(*self.visual_args)
+        text = "Полный кадр: " + ", ".join(results)
+        self.frame_cost_label.setText(text)
+        print(text)
+
+    def on_input_mode_changed(self, index):
+        mode = self.mode_combo.itemData(index)
+        if mode:
+            self.engine.set_mode(mode)
+
+    def select_gamepad(self, instance_id, reset=True):
+        print(f"=== select_gamepad: {instance_id} ===")
+        self.stop_recording()
+        self.stop_replay()
+        gp = self.hotplug.gamepads.get(instance_id)
+        joystick = self.hotplug.joystick(instance_id)
+        if gp is None or joystick is None:
+            return
+        print(f"Переключаемся на: {gp['name']} ({classify_gamepad(gp['name'])})")
+        try:
+            self.engine.set_joystick(None)
+            self.stop_report_rate()
+            self.stop_ir_camera()
+            self.hid_reconnect.cancel()
+            self.current_instance = instance_id
+            self.joystick = joystick
+            self.engine.set_joystick(joystick)
+            self.conn_info = self.connect_hid(gp)
+            if reset:
+                self.reset_all()
+            self.update_device_labels()
+            if self.vibration_widget:
                 self.vibration_widget.set_joystick(self.joystick)
-                self.create_visual(name, gp['buttons'], gp['axes'], gp['hats'])
-                print("  → Готово!")
-            except Exception as e:
-                print(f"Ошибка refresh_joystick: {e}")
+            self.create_visual(gp['name'], gp['buttons'], gp['axes'], gp['hats'])
+            print("  → Готово!")
+        except Exception as e:
+            print(f"Ошибка select_gamepad: {e}")
+
+    def connect_hid(self, gp, retry=True) -> str:
+        # -> подпись подключения для списка устройств
+        name = gp['name']
+        family = classify_gamepad(name)
+        hid_info = self.bound_hid_device(gp)
+        if family == "sony":
+            self.nintendo.disconnect()
+            self.set_ir_camera_available(False)
+            if self.ds4.connect(hid_info):
+                self.calibrate_imu(self.ds4)
+                return " 📶 BT" if self.ds4.connection_type == "bluetooth" else " 🔌 USB"
+        elif family == "nintendo":
+            self.ds4.disconnect()
+            if self.nintendo.connect(info=hid_info):
+                status = self.nintendo.mode_status()
+                if status:
+                    print(f"  Nintendo: {status}")
+                self.calibrate_imu(self.nintendo)
+                self.set_ir_camera_available(is_joycon_right_name(name) or self.nintendo.controller_type == "joycon_right")
+                return " 🎮 Nintendo"
+            self.set_ir_camera_available(False)
+        else:
+            self.ds4.disconnect()
+            self.nintendo.disconnect()
+            self.set_ir_camera_available(False)
+            return ""
+        if retry:
+            # HID-устройство ещё не появилось (Bluetooth) - повторяем с растущей паузой
+            print("  HID не найден, повторим позже")
+            instance_id = gp['instance_id']
+            self.hid_reconnect.start(lambda: self.retry_hid(instance_id))
+        return ""
+
+    def calibrate_imu(self, controller):
+        started = time.perf_counter()
+        cached = controller.calibrate()
+        source = SOURCE_NAMES[controller.calibration.source]
+        print(f"  → Калибровка IMU: {source}{' (кэш)' if cached else ''} за {(time.perf_counter() - started) * 1000:.1f} мс")
+
+    def retry_hid(self, instance_id) -> bool:
+        gp = self.hotplug.gamepads.get(instance_id)
+        if gp is None or instance_id != self.current_instance or self.player:
+            return True
+        for enumerator in self.hotplug.enumerators:
+            enumerator.invalidate()
+        conn_info = self.connect_hid(gp, retry=False)
+        if not conn_info:
+            return False
+        print(f"HID подключён после {self.hid_reconnect.attempts} попыток: {gp['name']}{conn_info}")
+        self.conn_info = conn_info
+        self.update_device_labels()
+        return True
+
+    def bound_hid_device(self, gp):
+        # Точный HID-путь выбранного геймпада - важно, когда на стенде несколько одинаковых
+        info = bind_hid_devices(self.hotplug.ordered(), enumerator_for(DEFAULT_TRANSPORT)).get(gp['instance_id'])
+        if info:
+            print(f"  HID: {info['path']!r} ({info['bus']}, серийный {info.get('serial_number') or '-'})")
+        return info
+
+    def device_label(self, gp) -> str:
+        if gp['instance_id'] == self.current_instance:
+            return f"✅ {gp['name']}{self.conn_info}"
+        return f"{gp['name']} ({gp['buttons']} кн.)"
+
+    def update_device_labels(self):
+        for i in range(self.device_combo.count()):
+            gp = self.hotplug.gamepads.get(self.device_combo.itemData(i))
+            if gp is not None:
+                self.device_combo.setItemText(i, self.device_label(gp))
                 
     def detect_gamepad(self):
         print("=== detect_gamepad вызван ===")
-        self.device_combo.clear()
-        gamepads = get_all_gamepads()
+        self.stop_recording()
+        self.stop_replay()
+        self.stop_report_rate()
+        self.stop_ir_camera()
+        self.hid_reconnect.cancel()
+        gamepads = self.hotplug.rescan()
+        self.sync_dashboard()
         print(f"Найдено геймпадов: {len(gamepads)}")
         for gp in gamepads:
             print(f"  - {gp['name']}: {gp['buttons']} кн., {gp['axes']} осей")
+        combo = self.device_combo
+        combo.blockSignals(True)
+        combo.clear()
         if not gamepads:
-            self.device_combo.addItem("Нет устройств")
+            combo.addItem("Нет устройств")
+            combo.blockSignals(False)
+            self.release_gamepad()
             self.clear_visual()
-            self.joystick = None
             return
         for gp in gamepads:
-            self.device_combo.addItem(f"{gp['name']} ({gp['buttons']} кн.)")
-        if self.joystick_index < len(gamepads):
-            self.device_combo.setCurrentIndex(self.joystick_index)
-            gp = gamepads[self.joystick_index]
-            self.joystick = pygame.joystick.Joystick(gp['index'])
-            self.joystick.init()
-            name = gp['name']
-            buttons = gp['buttons']
-            axes = gp['axes']
-            hats = self.joystick.get_numhats()
-            is_ds = "DUALSHOCK" in name.upper() or "DUALSENSE" in name.upper() or "PS4" in name.upper() or "PS5" in name.upper() or "Wireless" in name
-            is_nintendo = "Pro Controller" in name or "Joy-Con" in name or "Nintendo" in name
-            is_joycon_right = "Joy-Con (R)" in name or "Joy-Con Right" in name or ("Joy-Con" in name and "L/R" in name)
-            conn_info = ""
-            if is_ds:
-                self.nintendo.disconnect()
-                if self.ds4.connect():
-                    conn_info = " 📶 BT" if self.ds4.connection_type == "bluetooth" else " 🔌 USB"
-                self.ir_camera_widget.hide()
-            elif is_nintendo:
-                self.ds4.disconnect()
-                if self.nintendo.connect():
-                    conn_info = " 🎮 Nintendo"
-                    self.ir_camera_widget.set_nintendo(self.nintendo)
-                    if is_joycon_right or self.nintendo.controller_type == "joycon_right":
-                        self.ir_camera_widget.show()
-                    else:
-                        self.ir_camera_widget.hide()
-            else:
-                self.ds4.disconnect()
-                self.nintendo.disconnect()
-                self.ir_camera_widget.hide()
-            self.device_combo.setItemText(self.joystick_index, f"✅ {name}{conn_info}")
-            self.vibration_widget.set_joystick(self.joystick)
-            self.create_visual(name, buttons, axes, hats)
-        else:
+            combo.addItem(self.device_label(gp), gp['instance_id'])
+        index = max(0, combo.findData(self.current_instance))
+        combo.setCurrentIndex(index)
+        combo.blockSignals(False)
+        self.select_gamepad(combo.itemData(index), reset=False)
+
+    def release_gamepad(self):
+        self.stop_recording()
+        self.stop_report_rate()
+        self.stop_ir_camera()
+        self.hid_reconnect.cancel()
+        self.engine.set_joystick(None)
+        self.ds4.disconnect()
+        self.nintendo.disconnect()
+        self.set_ir_camera_available(False)
+        self.joystick = None
+        self.current_instance = None
+        self.conn_info = ""
+        if self.vibration_widget:
+            self.vibration_widget.set_joystick(None)
+        if self.lightbar_widget:
+            self.lightbar_widget.stop_test()
+
+    def poll_hotplug(self):
+        added, removed = self.hotplug.poll()
+        for gp in removed:
+            self.on_gamepad_removed(gp)
+        for gp in added:
+            self.on_gamepad_added(gp)
+        if added or removed:
+            self.sync_dashboard()
+        if added:
+            # Вместе с джойстиком могло появиться и HID-устройство
+            self.hid_reconnect.retry_now()
+        self.hid_reconnect.poll()
+
+    def on_gamepad_added(self, gp):
+        print(f"Подключён: {gp['name']} (instance {gp['instance_id']})")
+        combo = self.device_combo
+        combo.blockSignals(True)
+        if combo.count() == 1 and combo.itemData(0) is None:
+            combo.clear()
+        combo.addItem(self.device_label(gp), gp['instance_id'])
+        select = self.current_instance is None and not self.player
+        if select:
+            combo.setCurrentIndex(combo.count() - 1)
+        combo.blockSignals(False)
+        if select:
+            self.select_gamepad(gp['instance_id'])
+        if self.station is not None and self.station.state == STATION_WAITING:
+            self.station_next_unit()
+            self.station_widget.show_machine(self.station)
+
+    def on_gamepad_removed(self, gp):
+        print(f"Отключён: {gp['name']} (instance {gp['instance_id']})")
+        if self.station is not None and self.station.on_disconnected(gp['instance_id']):
+            self.station_next_unit()
+            self.station_widget.show_machine(self.station)
+        combo = self.device_combo
+        was_current = gp['instance_id'] == self.current_instance
+        combo.blockSignals(True)
+        index = combo.findData(gp['instance_id'])
+        if index >= 0:
+            combo.removeItem(index)
+        if combo.count() == 0:
+            combo.addItem("Нет устройств")
+        combo.blockSignals(False)
+        if not was_current:
+            return
+        if self.player:
+            # Идёт воспроизведение: движок и HID заняты записью, геймпад просто забываем
             self.joystick = None
+            self.current_instance = None
+            return
+        self.release_gamepad()
+        next_instance = combo.itemData(0)
+        if next_instance is not None:
+            combo.blockSignals(True)
+            combo.setCurrentIndex(0)
+            combo.blockSignals(False)
+            self.select_gamepad(next_instance)
+        else:
+            self.clear_visual()
             
     def clear_visual(self):
-        while self.content_layout.count():
-            item = self.content_layout.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
+        # Виды остаются в кэше, просто ничего не показываем
+        if self.view is not None:
+            self.view.hide()
+            self.view = None
                 
     def create_visual(self, name: str, buttons: int, axes: int, hats: int):
-        self.clear_visual()
-        gp_container = QWidget()
-        gp_container.setStyleSheet("background: transparent;")
-        gp_layout = QHBoxLayout(gp_container)
-        gp_layout.setSpacing(25)
-        gp_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        left = QWidget()
-        left.setStyleSheet("background: transparent;")
-        left_layout = QVBoxLayout(left)
-        left_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        left_layout.setSpacing(12)
-        self.left_stick = StickWidget("Левый")
-        self.right_stick = StickWidget("Правый")
-        left_layout.addWidget(self.left_stick)
-        left_layout.addWidget(self.right_stick)
-        gp_layout.addWidget(left)
-        center = QWidget()
-        center.setStyleSheet("background: transparent;")
-        center_layout = QVBoxLayout(center)
-        center_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        center_layout.setSpacing(10)
-        name_lbl = QLabel(name)
-        name_lbl.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        name_lbl.setStyleSheet("""
-            QLabel {
-                color: #ffffff; font-size: 13px; font-weight: bold;
-                padding: 6px 12px; background: #1a1a2e; border-radius: 8px; border: 2px solid #3a3a4e;
-            }
-        """)
-        center_layout.addWidget(name_lbl)
-        btn_grid = QGridLayout()
-        btn_grid.setSpacing(6)
-        btn_grid.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.button_widgets = {}
-        cols = 5
-        for i in range(buttons):
-            row = i // cols
-            col = i % cols
-            btn = ButtonWidget(i)
-            btn_grid.addWidget(btn, row, col)
-            self.button_widgets[i] = btn
-        center_layout.addLayout(btn_grid)
-        gp_layout.addWidget(center)
-        right = QWidget()
-        right.setStyleSheet("background: transparent;")
-        right_layout = QVBoxLayout(right)
-        right_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        right_layout.setSpacing(12)
-        self.lt_slider = TriggerWidget("LT", "#ff6b6b")
-        self.rt_slider = TriggerWidget("RT", "#ff6b6b")
-        right_layout.addWidget(self.lt_slider)
-        right_layout.addWidget(self.rt_slider)
-        info_box = QFrame()
-        info_box.setStyleSheet("QFrame { background: #1a1a2e; border-radius: 8px; border: 2px solid #3a3a4e; }")
-        info_layout = QVBoxLayout(info_box)
-        info_layout.setContentsMargins(10, 10, 10, 10)
-        info_layout.setSpacing(4)
-        info_title = QLabel("📊 Инфо")
-        info_title.setStyleSheet("QLabel { color: #00d4ff; font-size: 12px; font-weight: bold; }")
-        info_layout.addWidget(info_title)
-        self.info_labels = {}
-        for key, text in [("buttons", "Кнопки"), ("axes", "Оси"), ("hats", "HAT")]:
-            lbl = QLabel(f"{text}: 0")
-            lbl.setStyleSheet("QLabel { color: #8888aa; font-size: 10px; }")
-            info_layout.addWidget(lbl)
-            self.info_labels[key] = lbl
-        self.info_labels["buttons"].setText(f"Кнопки: {buttons}")
-        self.info_labels["axes"].setText(f"Оси: {axes}")
-        self.info_labels["hats"].setText(f"HAT: {hats}")
-        right_layout.addWidget(info_box)
-        right_layout.addStretch()
-        gp_layout.addWidget(right)
-        self.content_layout.addWidget(gp_container)
-        if "gyro" not in self.test_report.test_labels:
-            lbl = QLabel("🌀 Гироскоп - ❌")
-            lbl.setStyleSheet("QLabel { color: #ff4757; font-size: 10px; }")
-            self.test_report.test_labels["gyro"] = lbl
-            self.test_report.layout().addWidget(lbl)
-        self.test_report.update_buttons([], buttons)
+        started = time.perf_counter()
+        key = (buttons, axes, hats, classify_gamepad(name), self.renderer)
+        view = self.view_cache.pop(key, None)
+        cached = view is not None
+        if view is None:
+            while len(self.view_cache) >= VIEW_CACHE_SIZE:
+                _, old = self.view_cache.popitem(last=False)
+                self.content_layout.removeWidget(old)
+                old.release(self.button_pool)
+                old.deleteLater()
+            if self.renderer == RENDER_CANVAS:
+                view = ControllerCanvas(buttons, axes, hats)
+                self.content_layout.addWidget(view, alignment=Qt.AlignmentFlag.AlignCenter)
+            else:
+                view = ControllerView(buttons, axes, hats, self.button_pool)
+                self.content_layout.addWidget(view)
+        self.view_cache[key] = view
+        if self.view is not None and self.view is not view:
+            self.view.hide()
+        view.configure(name)
+        view.show()
+        self.view = view
+        self.visual_args = (name, buttons, axes, hats)
+        self.prev_held = 0
+        self.prev_axes = None
+        self.prev_hats = None
+        self.activity_axes = None
+        self.test_report.add_check("gyro")
+        self.test_state.set_buttons_total(buttons)
+        print(f"  → Вид {'из кэша' if cached else 'создан'} за {(time.perf_counter() - started) * 1000:.1f} мс")
         
-    def update_gamepad_state(self):
-        if not self.joystick:
-            return
-        try:
-            pygame.event.pump()
-            if not self.joystick.get_init():
-                if self.joystick_index < self.device_combo.count():
-                    current_text = self.device_combo.itemText(self.joystick_index)
-                    self.device_combo.setItemText(self.joystick_index, current_text.split(" ")[0] + " ⚪ Отключён")
-                return
+    def update_gamepad_state(self) -> bool:
+        # -> True, если состояние геймпада изменилось с прошлого кадра
+        if not self.joystick and not self.engine.replaying:
+            return False
+        snap = self.engine.poll(self.input_snapshot)
+        if not self.engine.connected:
+            # Ошибка чтения раньше события об отключении
+            gp = self.hotplug.gamepads.get(self.current_instance)
+            index = self.device_combo.findData(self.current_instance)
+            if gp is not None and index >= 0:
+                text = f"{gp['name']} ⚪ Отключён"
+                if self.device_combo.itemText(index) != text:
+                    self.device_combo.setItemText(index, text)
+            return False
+        if snap.seq == 0:
+            return False
+        # held - кнопки, нажатые хотя бы в одном кадре с прошлой перерисовки,
+        # так короткие нажатия видны даже при медленном GUI.
+        # Трогаем только виджеты, чьё состояние изменилось с прошлого кадра.
+        view = self.view
+        if view is None:
+            return False
+        view_buttons = view.signature[0]
+        changed = snap.held ^ self.prev_held
+        dirty = bool(changed)
+        if changed:
+            self.prev_held = snap.held
             pressed_ids = []
-            try:
-                num_buttons = self.joystick.get_numbuttons()
-                for btn_id, widget in self.button_widgets.items():
-                    if btn_id < num_buttons:
-                        pressed = self.joystick.get_button(btn_id)
-                        widget.set_active(pressed)
-                        if pressed:
-                            pressed_ids.append(btn_id)
-            except:
-                pass
-            self.test_report.update_buttons(pressed_ids, self.test_report.buttons_total)
-            try:
-                axes = self.joystick.get_numaxes()
-                if axes >= 4:
-                    lx = self.joystick.get_axis(0)
-                    ly = self.joystick.get_axis(1)
-                    self.left_stick.set_values(lx, ly)
-                    rx = self.joystick.get_axis(2)
-                    ry = self.joystick.get_axis(3)
-                    self.right_stick.set_values(rx, ry)
-                    if not self.stick_tested:
-                        if abs(lx) > 0.3 or abs(ly) > 0.3 or abs(rx) > 0.3 or abs(ry) > 0.3:
-                            self.stick_tested = True
-                            self.test_report.set_stick_tested(True)
-                    if axes >= 6:
-                        lt = self.joystick.get_axis(4)
-                        rt = self.joystick.get_axis(5)
-                        lt_val = max(0, lt) if lt > 0 else (lt + 1) / 2 if lt < 0 else 0
-                        rt_val = max(0, rt) if rt > 0 else (rt + 1) / 2 if rt < 0 else 0
-                        self.lt_slider.set_value(lt_val)
-                        self.rt_slider.set_value(rt_val)
-                        if not self.triggers_tested:
-                            if lt_val > 0.3 or rt_val > 0.3:
-                                self.triggers_tested = True
-                                self.test_report.set_triggers_tested(True)
-            except:
-                pass
-        except:
-            if self.joystick_index < self.device_combo.count():
-                current_text = self.device_combo.itemText(self.joystick_index)
-                self.device_combo.setItemText(self.joystick_index, current_text.split(" ")[0] + " ⚪ Отключён")
-                
+            while changed:
+                low = changed & -changed
+                changed ^= low
+                btn_id = low.bit_length() - 1
+                if btn_id >= view_buttons:
+                    continue
+                pressed = snap.was_held(btn_id)
+                view.set_button(btn_id, pressed)
+                if pressed:
+                    pressed_ids.append(btn_id)
+            if pressed_ids:
+                self.test_state.press_buttons(pressed_ids)
+        if snap.hats != self.prev_hats:
+            self.prev_hats = list(snap.hats)
+            view.set_hats(self.prev_hats)
+            dirty = True
+        axes = snap.axes
+        if axes == self.prev_axes:
+            return dirty
+        self.prev_axes = axes
+        # Дрожание стика в покое не считается вводом, иначе окно не уйдёт в простой
+        moved = self.activity_axes is None or len(axes) != len(self.activity_axes) or any(
+            abs(a - b) > INPUT_DEADBAND for a, b in zip(axes, self.activity_axes))
+        if moved:
+            self.activity_axes = list(axes)
+            dirty = True
+        if len(axes) >= 4:
+            lx, ly, rx, ry = axes[0], axes[1], axes[2], axes[3]
+            view.set_sticks(lx, ly, rx, ry)
+            self.test_state.update_sticks(max(abs(lx), abs(ly), abs(rx), abs(ry)))
+            if len(axes) >= 6:
+                lt_val = trigger_value(axes[4])
+                rt_val = trigger_value(axes[5])
+                view.set_triggers(lt_val, rt_val)
+                self.test_state.update_triggers(max(lt_val, rt_val))
+        return dirty
+
     def update_battery(self):
         if self.ds4.device and self.ds4.connection_type != "none":
             percent, charging = self.ds4.get_battery()
@@ -1264,67 +3108,290 @@ class GamepadTester(QMainWindow):
             if percent is not None:
                 self.battery_widget.update_battery(percent, charging)
                 
+    def read_imu_samples(self, device, report_size: int, layouts: dict, monitor):
+        # Во время замера отчёты читает поток монитора, берём у него последний;
+        # иначе вычитываем всю очередь HID, чтобы показания не отставали
+        if monitor:
+            report = monitor.latest
+            layout = layouts.get(report[0]) if report else None
+            return layout.decode_report(report) if layout else []
+        self.hid_batch.drain(device, report_size, layouts, self.record_hid_report if self.recorder else None)
+        return self.hid_batch.samples
+
     def update_gyro(self):
+        rate_widget = self.report_rate_widget
+        monitor = rate_widget.monitor if rate_widget and rate_widget.active else None
+        if monitor is None and self.ir_camera_widget and self.ir_camera_widget.streaming:
+            # Отчёты 0x31 читает поток ИК-камеры - IMU и кнопки берутся из его последнего отчёта
+            monitor = self.ir_camera_widget.stream
         if self.ds4.device and self.ds4.connection_type != "none":
-            data = self.ds4.read_data()
-            if data and len(data) >= 60:
-                try:
-                    gyro_x = int.from_bytes(data[13:15], 'little', signed=True) / 256.0
-                    gyro_y = int.from_bytes(data[15:17], 'little', signed=True) / 256.0
-                    gyro_z = int.from_bytes(data[17:19], 'little', signed=True) / 256.0
-                    accel_x = int.from_bytes(data[19:21], 'little', signed=True) / 256.0
-                    accel_y = int.from_bytes(data[21:23], 'little', signed=True) / 256.0
-                    accel_z = int.from_bytes(data[23:25], 'little', signed=True) / 256.0
-                    if gyro_x != 0 or gyro_y != 0 or gyro_z != 0:
-                        self.gyro_widget.set_gyro(gyro_x, gyro_y, gyro_z)
-                        self.gyro_widget.set_accel(accel_x, accel_y, accel_z)
-                        self.gyro_widget.status.setText("✅ DS4/DS5 IMU")
-                        self.gyro_widget.status.setStyleSheet("QLabel { color: #00ff88; font-size: 9px; }")
-                        if not self.gyro_tested:
-                            self.gyro_tested = True
-                            self.test_report.set_gyro_tested(True)
-                        return
-                except Exception as e:
-                    print(f"DS4 gyro error: {e}")
+            samples = self.read_imu_samples(self.ds4.device, self.ds4.report_size, self.ds4.imu_layouts, monitor)
+            if samples:
+                gyro_x, gyro_y, gyro_z = samples[-1][:3]
+                if gyro_x != 0 or gyro_y != 0 or gyro_z != 0:
+                    self.feed_fusion(self.ds4.kind, samples, monitor)
+                    self.show_imu_sample(samples[-1], "✅ DS4/DS5 IMU")
+                    return
         if self.nintendo.device and self.nintendo.controller_type != "none":
-            imu_data = self.nintendo.read_imu()
-            if imu_data:
-                gyro = imu_data['gyro']
-                accel = imu_data['accel']
-                self.gyro_widget.set_gyro(gyro[0], gyro[1], gyro[2])
-                self.gyro_widget.set_accel(accel[0], accel[1], accel[2])
-                self.gyro_widget.status.setText("✅ Joy-Con IMU")
-                self.gyro_widget.status.setStyleSheet("QLabel { color: #00ff88; font-size: 9px; }")
-                if not self.gyro_tested:
-                    self.gyro_tested = True
-                    self.test_report.set_gyro_tested(True)
+            samples = self.read_imu_samples(self.nintendo.device, 49, self.nintendo.imu_layouts, monitor)
+            # Батарея Joy-Con приходит в каждом входном отчёте - хватает последнего
+            self.nintendo.input.feed(monitor.latest if monitor else self.hid_batch.latest_report)
+            if samples:
+                self.feed_fusion("nintendo", samples, monitor)
+                self.show_imu_sample(samples[-1], "✅ Joy-Con IMU")
+
+    def feed_fusion(self, family: str, samples, monitor):
+        # Во время замера частоты отчёты забирает монитор и пачки нет - ориентация, запись шума и отклик вибрации стоят
+        if monitor:
+            return
+        self.fusion.set_family(family)
+        self.fusion.feed(samples, self.hid_batch.stamps)
+        if self.gyro_widget and self.gyro_widget.isVisible():
+            self.gyro_widget.set_orientation(self.fusion)
+        if self.noise_capture is not None:
+            self.feed_noise_capture(samples)
+        if self.vibration_widget and self.vibration_widget.response is not None:
+            self.vibration_widget.response.add(samples, self.hid_batch.stamps, time.perf_counter_ns())
+
+    def toggle_noise_capture(self):
+        if self.noise_capture is not None:
+            self.finish_noise_capture()
+            return
+        if not self.ds4.device and not self.nintendo.device:
+            self.noise_widget.set_status("❌ Нет IMU: нужен DS4/DS5/Joy-Con по HID", "#ff4757")
+            return
+        duration = self.noise_widget.duration_combo.currentData()
+        self.noise_capture = NoiseCapture(duration)
+        self.noise_widget.set_result(None)
+        self.noise_widget.set_capturing(True)
+        self.noise_widget.set_progress(self.noise_capture)
+        print(f"Запись шума гироскопа: {duration} с")
+
+    def feed_noise_capture(self, samples):
+        capture = self.noise_capture
+        capture.add(samples, self.hid_batch.stamps)
+        if capture.done:
+            self.finish_noise_capture()
+        elif self.noise_widget.isVisible():
+            self.noise_widget.set_progress(capture)
+
+    def finish_noise_capture(self):
+        capture = self.noise_capture
+        self.noise_capture = None
+        self.noise_widget.set_capturing(False)
+        self.noise_widget.progress.setValue(int(capture.progress * 100))
+        started = time.perf_counter()
+        result = capture.analyze()
+        print(f"Шум гироскопа: {capture.count} сэмплов разобраны за {(time.perf_counter() - started) * 1000:.0f} мс")
+        for line in format_noise(result):
+            print(f"  {line}")
+        self.noise_widget.set_result(result)
+        self.test_state.set_noise(result)
+
+    def show_imu_sample(self, sample, status: str):
+        # Тест гироскопа засчитывается и без открытой вкладки "Тесты"
+        if self.view is not None:
+            self.view.set_imu(sample)
+        if self.gyro_widget:
+            gyro_x, gyro_y, gyro_z, accel_x, accel_y, accel_z = sample
+            self.gyro_widget.set_gyro(gyro_x, gyro_y, gyro_z)
+            self.gyro_widget.set_accel(accel_x, accel_y, accel_z)
+            self.gyro_widget.status.setText(status)
+            self.gyro_widget.status.setStyleSheet("QLabel { color: #00ff88; font-size: 9px; }")
+        self.test_state.update_gyro((sample,))
                     
-    def export_report(self):
-        filename, _ = QFileDialog.getSaveFileName(self, "Экспорт отчёта", "", "Text Files (*.txt)")
+    def record_hid_report(self, data):
+        recorder = self.recorder
+        if recorder is not None:
+            recorder.hid_report(time.perf_counter_ns(), data)
+
+    def start_recording(self):
+        if self.recorder or self.player:
+            return
+        self.build_tests_tab()
+        if not self.joystick:
+            self.session_widget.set_status("❌ Нет геймпада", "#ff4757")
+            return
+        filename, _ = QFileDialog.getSaveFileName(self, "Запись сессии", "", "Gamepad Session (*.gpsession)")
+        if not filename:
+            return
+        try:
+            recorder = SessionRecorder(filename)
+        except OSError as e:
+            self.session_widget.set_status(f"❌ {e}", "#ff4757")
+            return
+        hid_device = self.ds4 if self.ds4.device else self.nintendo if self.nintendo.device else None
+        recorder.meta({
+            'name': self.joystick.get_name(),
+            'buttons': self.engine.num_buttons,
+            'axes': self.engine.num_axes,
+            'hats': self.engine.num_hats,
+            'hid_vid': hid_device.vid if hid_device else 0,
+            'hid_pid': hid_device.pid if hid_device else 0,
+            'connection_type': hid_device.connection_type if hid_device else BUS_USB,
+            'imu_calibration': hid_device.calibration.to_dict() if hid_device and hid_device.calibration else None,
+        })
+        self.recorder = recorder
+        self.engine.recorder = recorder
+        self.session_widget.set_status("⏺ Идёт запись...", "#ff6b6b")
+
+    def stop_recording(self):
+        recorder = self.recorder
+        if recorder is None:
+            return
+        self.engine.recorder = None
+        self.recorder = None
+        recorder.close()
+        self.session_widget.set_status(f"💾 Записано: {recorder.records} записей")
+
+    def open_session(self):
+        filename, _ = QFileDialog.getOpenFileName(self, "Открыть сессию", "", "Gamepad Session (*.gpsession)")
         if filename:
-            try:
-                gp_name = "Неизвестно"
-                gp_index = self.device_combo.currentIndex()
-                if gp_index >= 0 and gp_index < self.device_combo.count():
-                    gp_name = self.device_combo.itemText(gp_index)
-                with open(filename, 'w', encoding='utf-8') as f:
-                    f.write("🎮 Gamepad Tester Pro - Отчёт о тестах\n")
-                    f.write("=" * 50 + "\n\n")
-                    f.write(f"Устройство: {gp_name}\n")
-                    f.write(f"Дата: {time.strftime('%d.%m.%Y %H:%M')}\n\n")
-                    f.write("📊 Результаты тестов:\n")
-                    for key, lbl in self.test_report.test_labels.items():
-                        f.write(f"  {lbl.text()}\n")
-                    f.write(f"\n{self.test_report.status_label.text()}\n")
-                    f.write(f"\n{self.test_report.comment.text()}\n")
-                    f.write("\n" + "=" * 50 + "\n")
-                    f.write("Создано в Gamepad Tester Pro v12.0\n")
-                    f.write("Автор: Alex Software (mrSaT13)\n")
-                    f.write("GitHub: https://github.com/mrSaT13\n")
-                print(f"Отчёт сохранён: {filename}")
-            except Exception as e:
-                print(f"Ошибка экспорта: {e}")
-                
+            self.start_replay(filename)
+
+    def start_replay(self, filename: str):
+        self.stop_recording()
+        self.stop_replay()
+        self.build_tests_tab()
+        try:
+            reader = SessionReader(filename)
+        except (OSError, ValueError) as e:
+            self.session_widget.set_status(f"❌ {e}", "#ff4757")
+            return
+        meta = reader.meta
+        self.stop_report_rate()
+        self.stop_ir_camera()
+        self.engine.set_joystick(None)
+        self.ds4.disconnect()
+        self.nintendo.disconnect()
+        self.player = SessionPlayer(reader)
+        buttons, axes, hats = meta.get('buttons', 0), meta.get('axes', 0), meta.get('hats', 0)
+        self.engine.set_player(self.player, buttons, axes, hats)
+        # HID-отчёты из записи идут через тот же DS4Controller/NintendoController
+        factory = lambda: SessionHidTransport(self.player)
+        if meta.get('hid_vid') == SONY_VID:
+            self.ds4.transport_factory = factory
+            self.ds4.connect()
+        elif meta.get('hid_vid') == NINTENDO_VID:
+            self.nintendo.transport_factory = factory
+            self.nintendo.connect(meta.get('hid_pid'), full_mode=False)
+        if meta.get('imu_calibration'):
+            # У записи нет feature-отчётов и SPI: калибровка берётся из заголовка
+            hid_device = self.ds4 if self.ds4.device else self.nintendo if self.nintendo.device else None
+            if hid_device:
+                hid_device.set_calibration(ImuCalibration.from_dict(meta['imu_calibration']))
+        self.set_ir_camera_available(False)
+        self.reset_all()
+        self.create_visual(f"▶ {meta.get('name', 'Запись')}", buttons, axes, hats)
+        self.session_widget.position.setEnabled(True)
+        self.session_widget.set_status(f"▶ {reader.records} записей", "#00ff88")
+        self.session_timer.start(250)
+
+    def stop_replay(self):
+        player = self.player
+        if player is None:
+            return
+        self.session_timer.stop()
+        self.stop_report_rate()
+        self.stop_ir_camera()
+        self.engine.set_player(None)
+        self.player = None
+        self.ds4.disconnect()
+        self.nintendo.disconnect()
+        self.ds4.transport_factory = DEFAULT_TRANSPORT
+        self.nintendo.transport_factory = DEFAULT_TRANSPORT
+        player.reader.close()
+        self.session_widget.position.setEnabled(False)
+        self.session_widget.set_status("Нет записи")
+
+    def stop_session(self):
+        if self.recorder:
+            self.stop_recording()
+        elif self.player:
+            self.stop_replay()
+            self.detect_gamepad()
+
+    def on_session_seek(self, value):
+        if self.player:
+            self.player.seek(self.player.reader.duration_ns * value // 1000)
+
+    def update_session_position(self):
+        if self.player:
+            self.session_widget.set_position(self.player.position_ns, self.player.reader.duration_ns)
+
+    def current_result(self) -> dict:
+        # Тот же словарь, что у консольного режима и стенда: его пишет история результатов
+        gp = self.hotplug.gamepads.get(self.current_instance) or {}
+        hid_device = self.ds4 if self.ds4.device else self.nintendo if self.nintendo.device else None
+        result = {
+            "device": {"name": gp.get('name', self.device_combo.currentText() or "Неизвестно"),
+                       "instance_id": self.current_instance,
+                       "buttons": gp.get('buttons'), "axes": gp.get('axes'), "hats": gp.get('hats'),
+                       "hid_vid": hid_device.vid if hid_device else None,
+                       "hid_pid": hid_device.pid if hid_device else None,
+                       "hid_serial": hid_device.serial if hid_device else None,
+                       "hid_bus": hid_device.connection_type if hid_device else None},
+            "duration_s": round(time.monotonic() - self.test_started, 3),
+            "date": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        result.update(self.test_state.to_dict())
+        return result
+
+    def export_report(self):
+        filename, selected = QFileDialog.getSaveFileName(self, "Экспорт отчёта", "",
+                                                         "Text Files (*.txt);;CSV (*.csv);;JSON (*.json)")
+        if not filename:
+            return
+        result = self.current_result()
+        result_id = self.save_result(result, SOURCE_WINDOW)
+        try:
+            if filename.lower().endswith(".csv") or selected.startswith("CSV"):
+                export_csv(filename, [as_record(result, SOURCE_WINDOW, result_id)])
+            elif filename.lower().endswith(".json") or selected.startswith("JSON"):
+                export_json(filename, [as_record(result, SOURCE_WINDOW, result_id)])
+            else:
+                self.write_text_report(filename)
+            print(f"Отчёт сохранён: {filename}")
+        except Exception as e:
+            print(f"Ошибка экспорта: {e}")
+
+    def write_text_report(self, filename: str):
+        gp_name = "Неизвестно"
+        gp_index = self.device_combo.currentIndex()
+        if gp_index >= 0 and gp_index < self.device_combo.count():
+            gp_name = self.device_combo.itemText(gp_index)
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write("🎮 Gamepad Tester Pro - Отчёт о тестах\n")
+            f.write("=" * 50 + "\n\n")
+            f.write(f"Устройство: {gp_name}\n")
+            f.write(f"Дата: {time.strftime('%d.%m.%Y %H:%M')}\n\n")
+            f.write("📊 Результаты тестов:\n")
+            for key, lbl in self.test_report.test_labels.items():
+                f.write(f"  {lbl.text()}\n")
+            f.write(f"\n{self.test_report.status_label.text()}\n")
+            f.write(f"\n{self.test_report.comment.text()}\n")
+            if self.test_state.vibration is not None:
+                f.write("\n🔊 Отклик моторов по IMU:\n")
+                for line in format_response(self.test_state.vibration):
+                    f.write(f"  {line}\n")
+            if self.test_state.noise is not None:
+                f.write("\n📉 Шум и дрейф гироскопа:\n")
+                for line in format_noise(self.test_state.noise):
+                    f.write(f"  {line}\n")
+            if self.report_rate_widget:
+                # Вкладка "Тесты" строится при первом открытии - до неё замеров нет
+                if self.report_rate_widget.active:
+                    self.report_rate_widget.refresh()
+                summary = self.report_rate_widget.last_summary
+                if summary:
+                    f.write("\n📶 Отчёты HID:\n")
+                    for line in format_summary(summary):
+                        f.write(f"  {line}\n")
+            f.write("\n" + "=" * 50 + "\n")
+            f.write("Создано в Gamepad Tester Pro v12.0\n")
+            f.write("Автор: Alex Software (mrSaT13)\n")
+            f.write("GitHub: https://github.com/mrSaT13\n")
+
     def keyPressEvent(self, event):
         if event.key() == Qt.Key.Key_F5:
             self.detect_gamepad()
@@ -1332,17 +3399,32 @@ class GamepadTester(QMainWindow):
             self.showMinimized()
             
     def reset_all(self):
-        self.test_report.reset_all()
-        self.stick_tested = False
-        self.triggers_tested = False
-        self.gyro_tested = False
+        self.test_started = time.monotonic()
+        self.test_state.reset()
+        if self.noise_widget is not None and self.noise_capture is None:
+            self.noise_widget.set_result(None)
+            self.noise_widget.progress.setValue(0)
+            self.noise_widget.set_status("Нет записи")
         
     def quit_app(self):
+        if self.vibration_widget:
+            self.vibration_widget.stop_vibration()
+        if self.lightbar_widget:
+            self.lightbar_widget.stop_test()
         if self.joystick:
             try:
                 self.joystick.rumble(0, 0, 0)
             except:
                 pass
+        self.stop_recording()
+        self.stop_replay()
+        self.stop_dashboard()
+        self.stop_station()
+        if self.result_store is not None:
+            self.result_store.close()
+        self.engine.stop()
+        self.stop_report_rate()
+        self.stop_ir_camera()
         self.ds4.disconnect()
         self.nintendo.disconnect()
         pygame.quit()
@@ -1352,8 +3434,9 @@ class GamepadTester(QMainWindow):
 
 
 class AboutWidget(QWidget):
-    def __init__(self, parent=None):
+    def __init__(self, startup_text=None, parent=None):
         super().__init__(parent)
+        self.startup_text = startup_text
         self.setup_ui()
         
     def setup_ui(self):
@@ -1374,6 +3457,11 @@ class AboutWidget(QWidget):
         github_link.setOpenExternalLinks(True)
         github_link.setStyleSheet("QLabel { color: #00d4ff; font-size: 12px; }")
         layout.addWidget(github_link, alignment=Qt.AlignmentFlag.AlignCenter)
+        if self.startup_text:
+            startup = QLabel(f"⏱ {self.startup_text}")
+            startup.setWordWrap(True)
+            startup.setStyleSheet("QLabel { color: #8888aa; font-size: 10px; }")
+            layout.addWidget(startup, alignment=Qt.AlignmentFlag.AlignCenter)
         instr_group = QGroupBox("📖 Инструкция")
         instr_group.setStyleSheet("""
             QGroupBox {
@@ -1443,17 +3531,31 @@ class AboutWidget(QWidget):
 
 
 def main():
+    startup_report, startup_budget = parse_startup_args(sys.argv[1:])
     app = QApplication(sys.argv)
     app.setStyle("Fusion")
     font = QFont("Segoe UI", 10)
     app.setFont(font)
-    window = GamepadTester()
+    STARTUP.mark("QApplication")
+    window = GamepadTester(STARTUP)
+    STARTUP.mark("окно")
+    exit_code = 0
+    if startup_report:
+        def report_startup():
+            nonlocal exit_code
+            print(STARTUP.to_json())
+            if startup_budget is not None and STARTUP.first_frame_ms > startup_budget:
+                print(f"Первый кадр за {STARTUP.first_frame_ms:.0f} мс - больше бюджета {startup_budget:.0f} мс",
+                      file=sys.stderr)
+                exit_code = 1
+            window.quit_app()
+        window.on_startup_finished = report_startup
     window.showMaximized()
     window.raise_()
     window.activateWindow()
     window.setFocus()
     app.processEvents()
-    sys.exit(app.exec())
+    sys.exit(app.exec() or exit_code)
 
 
 if __name__ == "__main__":
@@ -14,6 +14,7 @@ a = Analysis(
         'PyQt6.QtCore',
         'PyQt6.QtGui',
         'hid',
+        'numpy',
     ],
     hookspath=[],
     hooksconfig={},
@@ -0,0 +1,421 @@
+"""
+Анализ потока HID-отчётов: частота отчётов, джиттер интервалов и
+потерянные отчёты по счётчику последовательности DS4/DS5/Joy-Con.
+
+HidBatchReader за один цикл вычитывает все накопившиеся отчёты в
+переиспользуемый буфер и разбирает IMU заранее скомпилированными
+struct.Struct-раскладками - одним проходом по всей пачке. Каждому сэмплу
+ставится метка времени по часам датчика (DS4/DS5) или по номинальному
+шагу сэмплов в отчёте (Joy-Con), а не время тика GUI.
+"""
+
+import copy
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+# Верхние границы корзин гистограммы интервалов, мкс; последняя корзина - всё, что больше
+JITTER_BINS_US = (500, 1000, 2000, 4000, 6000, 8000, 12000, 16000, 24000, 32000)
+INTERVAL_WINDOW = 2048
+STEP_VOTES = 32
+MAX_REPORT_SIZE = 80
+BATCH_CAPACITY = 256
+
+
+class ImuLayout:
+    def __init__(self, report_id: int, offset: int, size: int, samples=1, accel_first=False,
+                 gyro_scale=1.0, accel_scale=1.0, stamp_offset=None, stamp_bits=16, stamp_ns=0.0, sample_ns=0.0):
+        # gyro_scale/accel_scale - отсчётов на °/с и на g; calibrated() заменяет их
+        # калибровкой конкретного геймпада по осям.
+        # stamp_offset - счётчик времени датчика (stamp_bits бит, тик stamp_ns нс);
+        # без него сэмплы идут с номинальным шагом sample_ns
+        self.report_id = report_id
+        self.offset = offset
+        self.size = size
+        self.samples = samples
+        self.accel_first = accel_first
+        self.gyro_bias = (0.0, 0.0, 0.0)
+        self.accel_bias = (0.0, 0.0, 0.0)
+        self.gyro_factor = (1.0 / gyro_scale,) * 3
+        self.accel_factor = (1.0 / accel_scale,) * 3
+        self.stamp_offset = stamp_offset
+        self.stamp_bits = stamp_bits
+        self.stamp_ns = stamp_ns
+        self.sample_ns = sample_ns
+        fields = [(offset, f"{6 * samples}h", 12 * samples)]
+        if stamp_offset is not None:
+            fields.append((stamp_offset, "H" if stamp_bits == 16 else "I", stamp_bits // 8))
+        fields.sort()
+        fmt = "<"
+        position = 0
+        for field_offset, code, length in fields:
+            fmt += f"{field_offset - position}x{code}"
+            position = field_offset + length
+        self.struct = struct.Struct(f"{fmt}{size - position}x")
+        # Индекс метки в распакованном кортеже
+        self.stamp_index = None if stamp_offset is None else 0 if stamp_offset < offset else 6 * samples
+        self.imu_index = 1 if stamp_offset is not None and stamp_offset < offset else 0
+
+    def calibrated(self, calibration):
+        # Копия раскладки, выдающая °/с и g по калибровке (imu_calibration.ImuCalibration)
+        layout = copy.copy(self)
+        layout.gyro_bias = calibration.gyro_bias
+        layout.accel_bias = calibration.accel_bias
+        layout.gyro_factor = tuple(1.0 / v for v in calibration.gyro_scale)
+        layout.accel_factor = tuple(1.0 / v for v in calibration.accel_scale)
+        return layout
+
+    def _convert(self, raw, out: list, ticks=None):
+        gb0, gb1, gb2 = self.gyro_bias
+        gf0, gf1, gf2 = self.gyro_factor
+        ab0, ab1, ab2 = self.accel_bias
+        af0, af1, af2 = self.accel_factor
+        if ticks is not None and self.stamp_index is not None:
+            ticks.append(raw[self.stamp_index])
+        if self.imu_index:
+            raw = raw[self.imu_index:]
+        for i in range(0, 6 * self.samples, 6):
+            if self.accel_first:
+                ax, ay, az, gx, gy, gz = raw[i:i + 6]
+            else:
+                gx, gy, gz, ax, ay, az = raw[i:i + 6]
+            out.append(((gx - gb0) * gf0, (gy - gb1) * gf1, (gz - gb2) * gf2,
+                        (ax - ab0) * af0, (ay - ab1) * af1, (az - ab2) * af2))
+
+    def decode_report(self, data):
+        # Один отчёт (список int от hidapi) -> [(gx, gy, gz, ax, ay, az), ...]
+        if not data or data[0] != self.report_id or len(data) < self.size:
+            return []
+        out = []
+        self._convert(self.struct.unpack_from(bytes(data[:self.size])), out)
+        return out
+
+    def decode_batch(self, view, count: int, out: list, ticks=None):
+        for raw in self.struct.iter_unpack(view[:count * self.size]):
+            self._convert(raw, out, ticks)
+
+
+# Номинальная чувствительность датчиков: °/с и g до чтения калибровки геймпада
+IMU_LAYOUTS = {
+    "ds4": {
+        0x01: ImuLayout(0x01, 13, 64, gyro_scale=16.0, accel_scale=8192.0, stamp_offset=10, stamp_ns=16000 / 3),
+        0x11: ImuLayout(0x11, 15, 78, gyro_scale=16.0, accel_scale=8192.0, stamp_offset=12, stamp_ns=16000 / 3),
+    },
+    "ds5": {
+        0x01: ImuLayout(0x01, 16, 64, gyro_scale=16.0, accel_scale=8192.0, stamp_offset=28, stamp_bits=32,
+                        stamp_ns=1000 / 3),
+        0x31: ImuLayout(0x31, 17, 78, gyro_scale=16.0, accel_scale=8192.0, stamp_offset=29, stamp_bits=32,
+                        stamp_ns=1000 / 3),
+    },
+    "nintendo": {
+        # Три сэмпла за отчёт 0x30 через 5 мс, часов датчика в отчёте нет
+        0x30: ImuLayout(0x30, 13, 49, samples=3, accel_first=True, gyro_scale=13371 / 936, accel_scale=4096.0,
+                        sample_ns=5e6),
+        # 0x31 (ИК-камера): те же 49 байт, дальше данные MCU
+        0x31: ImuLayout(0x31, 13, 49, samples=3, accel_first=True, gyro_scale=13371 / 936, accel_scale=4096.0,
+                        sample_ns=5e6),
+    },
+}
+
+
+def calibrated_layouts(layouts: dict, calibration) -> dict:
+    if calibration is None:
+        return layouts
+    return {report_id: layout.calibrated(calibration) for report_id, layout in layouts.items()}
+
+
+class HidBatchReader:
+    def __init__(self, capacity=BATCH_CAPACITY):
+        self.capacity = capacity
+        self.buffer = bytearray(capacity * MAX_REPORT_SIZE)
+        self.view = memoryview(self.buffer)
+        self.samples = []        # все IMU-сэмплы последней пачки
+        self.stamps = []         # метка времени датчика каждого сэмпла, нс (растёт без переполнений)
+        self.reports = 0         # отчётов в последней пачке
+        self.latest = None       # последний сэмпл (gx, gy, gz, ax, ay, az)
+        self.latest_report = None
+        self.clock_ns = 0.0
+        self._ticks = []
+        self._last_tick = None
+
+    def reset_clock(self):
+        self.clock_ns = 0.0
+        self._last_tick = None
+
+    def _decode(self, layout: ImuLayout, count: int):
+        ticks = self._ticks
+        ticks.clear()
+        before = len(self.samples)
+        layout.decode_batch(self.view, count, self.samples, ticks)
+        stamps = self.stamps
+        clock = self.clock_ns
+        if layout.stamp_index is not None:
+            # Счётчик датчика переполняется (DS4 - каждые ~350 мс): берём приращение по модулю
+            modulo = 1 << layout.stamp_bits
+            tick_ns = layout.stamp_ns
+            last = self._last_tick
+            for tick in ticks:
+                if last is not None:
+                    clock += ((tick - last) % modulo) * tick_ns
+                last = tick
+                stamps.append(clock)
+            self._last_tick = last
+        else:
+            step = layout.sample_ns
+            for _ in range(len(self.samples) - before):
+                clock += step
+                stamps.append(clock)
+        self.clock_ns = clock
+
+    def drain(self, device, report_size: int, layouts: dict, on_report=None) -> int:
+        # Неблокирующее чтение до пустой очереди; отчёты складываются подряд
+        # в буфер с шагом раскладки и разбираются пачкой через iter_unpack
+        self.samples = []
+        self.stamps = []
+        self.reports = 0
+        layout = None
+        count = 0
+        buffer = self.buffer
+        while True:
+            try:
+                data = device.read(report_size)
+            except (IOError, OSError, ValueError):
+                break
+            if not data:
+                break
+            self.reports += 1
+            self.latest_report = data
+            if on_report is not None:
+                on_report(data)
+            report_layout = layouts.get(data[0])
+            if report_layout is None or len(data) < report_layout.size:
+                continue
+            if report_layout is not layout:
+                if layout is not None and count:
+                    self._decode(layout, count)
+                layout = report_layout
+                count = 0
+            offset = count * layout.size
+            buffer[offset:offset + layout.size] = data[:layout.size]
+            count += 1
+            if count == self.capacity:
+                self._decode(layout, count)
+                count = 0
+        if layout is not None and count:
+            self._decode(layout, count)
+        if self.samples:
+            self.latest = self.samples[-1]
+        return len(self.samples)
+
+
+def jitter_bin_labels():
+    labels = []
+    low = 0
+    for high in JITTER_BINS_US:
+        labels.append(f"{low / 1000:g}-{high / 1000:g}")
+        low = high
+    labels.append(f">{low / 1000:g}")
+    return labels
+
+
+def sequence_counter(kind: str, data):
+    # (значение, модуль счётчика, шаг на один отчёт; 0 - шаг определяется по потоку)
+    if not data:
+        return None
+    report_id = data[0]
+    if kind == "ds4":
+        # Байт кнопок 3: биты 2-7 - 6-битный счётчик отчётов
+        if report_id == 0x01 and len(data) > 7:
+            return data[7] >> 2, 64, 1
+        if report_id == 0x11 and len(data) > 9:
+            return data[9] >> 2, 64, 1
+    elif kind == "ds5":
+        if report_id == 0x01 and len(data) > 7:
+            return data[7], 256, 1
+        if report_id == 0x31 and len(data) > 8:
+            return data[8], 256, 1
+    elif kind == "nintendo":
+        # Байт таймера: растёт на фиксированный шаг за отчёт, шаг зависит от режима
+        if report_id in (0x21, 0x30, 0x31, 0x32, 0x33) and len(data) > 1:
+            return data[1], 256, 0
+    return None
+
+
+class ReportStats:
+    def __init__(self, kind: str, window=INTERVAL_WINDOW):
+        self.kind = kind
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        self.received = 0
+        self.dropped = 0
+        self.first_ns = 0
+        self.last_ns = 0
+        self.intervals = array('q', bytes(8 * self.window))
+        self.interval_count = 0
+        self.histogram = [0] * (len(JITTER_BINS_US) + 1)
+        self.counter_supported = False
+        self._prev_counter = None
+        self._step = 0
+        self._step_votes = {}
+        self._nominal_ns = 0.0
+
+    def add(self, timestamp_ns: int, data):
+        interval = 0
+        if self.received:
+            interval = timestamp_ns - self.last_ns
+            self.intervals[self.interval_count % self.window] = interval
+            self.interval_count += 1
+            self.histogram[bisect_left(JITTER_BINS_US, interval // 1000)] += 1
+        else:
+            self.first_ns = timestamp_ns
+        self.last_ns = timestamp_ns
+        self.received += 1
+        counter = sequence_counter(self.kind, data)
+        if counter is not None:
+            self.counter_supported = True
+            self._count_drops(counter, interval)
+        if interval:
+            # Сглаженный номинальный интервал - нужен, чтобы заметить переполнение счётчика.
+            # Обновляется после подсчёта потерь, а провал сдвигает его не больше чем на удвоенный
+            # интервал: иначе сам провал раздувает номинал и полный оборот счётчика не виден
+            nominal = self._nominal_ns
+            if nominal:
+                self._nominal_ns += (min(interval, 2 * nominal) - nominal) / 64
+            else:
+                self._nominal_ns = float(interval)
+
+    def _count_drops(self, counter, interval: int):
+        value, modulo, step = counter
+        prev = self._prev_counter
+        self._prev_counter = value
+        if prev is None:
+            return
+        delta = (value - prev) % modulo
+        if step == 0:
+            step = self._step
+            if not step:
+                if delta:
+                    self._step_votes[delta] = self._step_votes.get(delta, 0) + 1
+                if sum(self._step_votes.values()) >= STEP_VOTES:
+                    self._step = max(self._step_votes, key=self._step_votes.get)
+                return
+        if delta == 0:
+            return
+        missing = round(delta / step) - 1
+        # Счётчик мог обернуться целиком за долгий провал - досчитываем по времени
+        if self._nominal_ns and interval > modulo * self._nominal_ns:
+            missing = max(missing, round(interval / self._nominal_ns) - 1)
+        if missing > 0:
+            self.dropped += missing
+
+    def summary(self) -> dict:
+        n = min(self.interval_count, self.window)
+        result = {
+            'kind': self.kind,
+            'received': self.received,
+            'dropped': self.dropped,
+            'drop_percent': None,
+            'rate_hz': 0.0,
+            'average_rate_hz': 0.0,
+            'mean_interval_ms': 0.0,
+            'jitter_ms': 0.0,
+            'p50_ms': 0.0,
+            'p99_ms': 0.0,
+            'max_ms': 0.0,
+            'histogram': list(self.histogram),
+        }
+        if self.counter_supported:
+            total = self.received + self.dropped
+            result['drop_percent'] = self.dropped * 100.0 / total if total else 0.0
+        if self.received > 1 and self.last_ns > self.first_ns:
+            result['average_rate_hz'] = (self.received - 1) * 1e9 / (self.last_ns - self.first_ns)
+        if n == 0:
+            return result
+        values = sorted(self.intervals[:n])
+        mean = sum(values) / n
+        variance = sum((v - mean) ** 2 for v in values) / n
+        result['rate_hz'] = 1e9 / mean if mean else 0.0
+        result['mean_interval_ms'] = mean / 1e6
+        result['jitter_ms'] = variance ** 0.5 / 1e6
+        result['p50_ms'] = values[n // 2] / 1e6
+        result['p99_ms'] = values[min(n - 1, int(n * 0.99))] / 1e6
+        result['max_ms'] = values[-1] / 1e6
+        return result
+
+
+def format_summary(summary: dict) -> list:
+    lines = [
+        f"Частота отчётов: {summary['rate_hz']:.1f} Гц (среднее {summary['average_rate_hz']:.1f} Гц)",
+        f"Интервал: {summary['mean_interval_ms']:.2f} мс, джиттер (σ) {summary['jitter_ms']:.2f} мс, "
+        f"p50 {summary['p50_ms']:.2f} / p99 {summary['p99_ms']:.2f} / макс {summary['max_ms']:.2f} мс",
+    ]
+    if summary['drop_percent'] is None:
+        lines.append(f"Потери: нет счётчика в отчётах, получено {summary['received']}")
+    else:
+        lines.append(f"Потери: {summary['dropped']} из {summary['received'] + summary['dropped']} "
+                     f"({summary['drop_percent']:.2f}%)")
+    lines.append("Гистограмма интервалов (мс):")
+    for label, count in zip(jitter_bin_labels(), summary['histogram']):
+        lines.append(f"  {label:>8}: {count}")
+    return lines
+
+
+class HidReportMonitor:
+    def __init__(self, device, kind: str, report_size: int, on_report=None):
+        self.device = device
+        self.on_report = on_report
+        self.kind = kind
+        self.report_size = report_size
+        self.stats = ReportStats(kind)
+        self.latest = None
+        self.error = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._running = False
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def start(self):
+        if self._running:
+            return
+        with self._lock:
+            self.stats.reset()
+        self.error = None
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="hid-report-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _run(self):
+        # Блокирующее чтение с таймаутом: каждый отчёт получает свою метку времени
+        # в момент прихода, а не время тика GUI
+        while self._running:
+            try:
+                data = self.device.read(self.report_size, timeout_ms=100)
+            except (IOError, OSError, ValueError) as e:
+                self.error = str(e)
+                self._running = False
+                break
+            if not data:
+                continue
+            timestamp = time.perf_counter_ns()
+            with self._lock:
+                self.stats.add(timestamp, data)
+            self.latest = data
+            if self.on_report is not None:
+                self.on_report(data)
+
+    def summary(self) -> dict:
+        with self._lock:
+            return self.stats.summary()
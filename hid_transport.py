@@ -0,0 +1,615 @@
+"""
+Транспорт HID для контроллеров: настоящий hidapi, воспроизведение отчётов из
+файла и синтетический генератор. Все транспорты повторяют интерфейс
+hid.device (open/read/write/get_feature_report/...), поэтому DS4Controller и
+NintendoController работают с ними одинаково - в том числе без железа.
+
+Формат файла воспроизведения (текст, по строке на запись):
+    # vid=054c pid=09cc bus=usb    - заголовок с VID/PID и шиной (usb/bluetooth)
+    <время_нс> <hex отчёта>        - входной отчёт
+    feature <id> <hex отчёта>      - ответ на get_feature_report(id)
+
+Сам hidapi импортируется только при открытии первого устройства Sony/Nintendo:
+загрузка нативной библиотеки не задерживает старт окна.
+
+HidEnumerator кэширует один проход enumerate() по всем устройствам и
+индексирует его по VID/PID, серийному номеру, интерфейсу и пути; шина
+(USB/Bluetooth) определяется по данным перечисления.
+"""
+
+import math
+import struct
+import threading
+import time
+import weakref
+from importlib.util import find_spec
+
+from device_output import parse_sony_output
+from ir_camera import (
+    FRAGMENT_OFFSET, FRAGMENT_SIZE, IR_REPORT_SIZE, MCU_IR, MCU_REPLY_IR_MODE, MCU_REPLY_MODE, MCU_REPLY_REGISTERS,
+    MCU_REPORT_EMPTY, MCU_REPORT_IR_DATA, MCU_REPORT_STATUS, MCU_REQUEST_IR_DATA, MCU_REQUEST_STATUS, MCU_SET_MODE,
+    MCU_STANDBY, MCU_WRITE, MCU_WRITE_IR_MODE, MCU_WRITE_REGISTERS, RESOLUTIONS, resolution_for_register
+)
+
+HID_AVAILABLE = find_spec("hid") is not None
+_hid = None
+
+SONY_VID = 0x054C
+NINTENDO_VID = 0x057E
+SYNTHETIC_IDS = {
+    "ds4": (SONY_VID, 0x09CC),
+    "ds5": (SONY_VID, 0x0CE6),
+    "joycon_left": (NINTENDO_VID, 0x2006),
+    "joycon_right": (NINTENDO_VID, 0x2007),
+    "pro_controller": (NINTENDO_VID, 0x2009),
+}
+
+BUS_USB = "usb"
+BUS_BLUETOOTH = "bluetooth"
+# bus_type из hid.enumerate() (hidapi >= 0.13)
+HIDAPI_BUS_TYPES = {1: BUS_USB, 2: BUS_BLUETOOTH}
+# Путь Bluetooth HID в Windows содержит GUID службы HID, в macOS/Linux - имя шины
+BLUETOOTH_PATH_MARKERS = ("00001124-0000-1000-8000-00805f9b34fb", "bthenum", "bthledevice", "bluetooth")
+ENUMERATION_TTL = 2.0
+
+
+def load_hid():
+    global _hid, HID_AVAILABLE
+    if _hid is None:
+        try:
+            import hid
+        except (ImportError, OSError) as e:
+            # Модуль есть, но нативная libhidapi не загрузилась
+            HID_AVAILABLE = False
+            raise IOError(f"hidapi недоступен: {e}")
+        _hid = hid
+    return _hid
+
+
+def detect_bus(info: dict) -> str:
+    bus = HIDAPI_BUS_TYPES.get(int(info.get('bus_type') or 0))
+    if bus:
+        return bus
+    path = info.get('path') or b""
+    if isinstance(path, bytes):
+        path = path.decode('utf-8', 'replace')
+    path = path.lower()
+    if any(marker in path for marker in BLUETOOTH_PATH_MARKERS):
+        return BUS_BLUETOOTH
+    # Старый hidapi без bus_type: у Bluetooth-устройства нет номера USB-интерфейса
+    return BUS_USB if info.get('interface_number', -1) >= 0 else BUS_BLUETOOTH
+
+
+def is_gamepad_collection(info: dict) -> bool:
+    # Generic Desktop / Joystick или Game Pad; 0 - платформа не сообщает usage
+    return info.get('usage_page', 0) in (0, 1) and info.get('usage', 0) in (0, 4, 5)
+
+
+def device_info(path: bytes, vid: int, pid: int, serial="", bus=BUS_USB, product="") -> dict:
+    # Запись в формате hid.enumerate() для фейковых транспортов
+    return {
+        'path': path,
+        'vendor_id': vid,
+        'product_id': pid,
+        'serial_number': serial,
+        'interface_number': -1 if bus == BUS_BLUETOOTH else 0,
+        'bus_type': 2 if bus == BUS_BLUETOOTH else 1,
+        'usage_page': 1,
+        'usage': 5,
+        'product_string': product,
+    }
+
+
+class HidEnumerator:
+    def __init__(self, transport_factory, ttl=ENUMERATION_TTL):
+        self.transport_factory = transport_factory
+        self.ttl = ttl
+        self.devices = []
+        self.by_id = {}          # (vid, pid) -> [запись, ...] в порядке путей
+        self.by_serial = {}
+        self.by_path = {}
+        self.enumerations = 0
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._stamp = None
+
+    def refresh(self, force=False) -> list:
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._stamp is not None and now - self._stamp < self.ttl:
+                return self.devices
+            enumerate_devices = getattr(self.transport_factory, 'enumerate', None) or self.transport_factory().enumerate
+            try:
+                entries = enumerate_devices(0, 0)
+            except (IOError, OSError, ValueError):
+                entries = []
+            devices = [dict(info, bus=detect_bus(info)) for info in entries if is_gamepad_collection(info)]
+            devices.sort(key=lambda info: info['path'])
+            by_id, by_serial, by_path = {}, {}, {}
+            for info in devices:
+                by_id.setdefault((info['vendor_id'], info['product_id']), []).append(info)
+                if info.get('serial_number'):
+                    by_serial.setdefault(info['serial_number'], []).append(info)
+                by_path[info['path']] = info
+            self.devices, self.by_id, self.by_serial, self.by_path = devices, by_id, by_serial, by_path
+            self.enumerations += 1
+            self._stamp = now
+            return devices
+
+    def find(self, vid: int, pids, serial=None, interface=None, bus=None) -> list:
+        # Записи с этим VID и любым из pids (в порядке pids)
+        self.refresh()
+        found = []
+        for pid in pids:
+            for info in self.by_id.get((vid, pid), ()):
+                if serial is not None and info.get('serial_number') != serial:
+                    continue
+                if interface is not None and info.get('interface_number') != interface:
+                    continue
+                if bus is not None and info['bus'] != bus:
+                    continue
+                found.append(info)
+        return found
+
+
+_enumerators = weakref.WeakKeyDictionary()
+
+
+def enumerator_for(transport_factory):
+    # Один общий кэш перечисления на фабрику транспорта
+    if transport_factory is None:
+        return None
+    enumerator = _enumerators.get(transport_factory)
+    if enumerator is None:
+        enumerator = HidEnumerator(transport_factory)
+        _enumerators[transport_factory] = enumerator
+    return enumerator
+
+
+class HidapiTransport:
+    def __init__(self):
+        self.device = load_hid().device()
+
+    @staticmethod
+    def enumerate(vid=0, pid=0):
+        return load_hid().enumerate(vid, pid)
+
+    def open(self, vid: int, pid: int, serial=None):
+        if serial:
+            self.device.open(vid, pid, serial)
+        else:
+            self.device.open(vid, pid)
+
+    def open_path(self, path: bytes):
+        self.device.open_path(path)
+
+    def set_nonblocking(self, enabled: bool):
+        self.device.set_nonblocking(enabled)
+
+    def read(self, size: int, timeout_ms=0):
+        return self.device.read(size, timeout_ms=timeout_ms)
+
+    def write(self, data):
+        return self.device.write(data)
+
+    def get_feature_report(self, report_id: int, size: int):
+        return self.device.get_feature_report(report_id, size)
+
+    def send_feature_report(self, data):
+        return self.device.send_feature_report(data)
+
+    def close(self):
+        self.device.close()
+
+
+class _PacedTransport:
+    # Общая часть фейковых устройств: выдача отчётов по расписанию.
+    # speed=1.0 - реальное время, speed=0 - без пауз, максимально быстро.
+    def __init__(self, vid: int, pid: int, speed=1.0, path=b"", bus=BUS_USB):
+        self.vid = vid
+        self.pid = pid
+        self.path = path
+        self.bus = bus
+        self.speed = speed
+        self.nonblocking = False
+        self.opened = False
+        self.written = []
+        self.feature_reports = {}
+        self._start_ns = 0
+
+    def open(self, vid: int, pid: int, serial=None):
+        if (vid, pid) != (self.vid, self.pid):
+            raise IOError("open failed")
+        self.opened = True
+        self._start_ns = time.perf_counter_ns()
+
+    def open_path(self, path):
+        self.open(self.vid, self.pid)
+
+    def enumerate(self, vid=0, pid=0):
+        if (vid and vid != self.vid) or (pid and pid != self.pid):
+            return []
+        return [device_info(self.path, self.vid, self.pid, bus=self.bus)]
+
+    def set_nonblocking(self, enabled: bool):
+        self.nonblocking = bool(enabled)
+
+    def _next_report(self):
+        # -> (время отчёта в нс от начала, данные) или None, если отчёты кончились
+        raise NotImplementedError
+
+    def _consume(self):
+        raise NotImplementedError
+
+    def read(self, size: int, timeout_ms=0):
+        if not self.opened:
+            raise IOError("device not open")
+        pending = self._next_report()
+        if pending is None:
+            return []
+        due_ns, data = pending
+        if self.speed > 0:
+            wait_ns = self._start_ns + int(due_ns / self.speed) - time.perf_counter_ns()
+            if wait_ns > 0:
+                if timeout_ms == 0 and self.nonblocking:
+                    return []
+                limit_ns = timeout_ms * 1_000_000 if timeout_ms > 0 else wait_ns
+                time.sleep(min(wait_ns, limit_ns) / 1e9)
+                if wait_ns > limit_ns:
+                    return []
+        self._consume()
+        return list(data[:size])
+
+    def write(self, data):
+        if not self.opened:
+            raise IOError("device not open")
+        self.written.append(bytes(data))
+        return len(data)
+
+    def get_feature_report(self, report_id: int, size: int):
+        report = self.feature_reports.get(report_id)
+        if report is None:
+            raise IOError("feature report not supported")
+        return list(report[:size])
+
+    def send_feature_report(self, data):
+        return self.write(data)
+
+    def close(self):
+        self.opened = False
+
+
+class ReplayTransport(_PacedTransport):
+    def __init__(self, path: str, speed=1.0, loop=False):
+        vid, pid, bus, reports, features = self.load(path)
+        super().__init__(vid, pid, speed, f"replay:{path}".encode('utf-8'), bus)
+        self.reports = reports
+        self.feature_reports = features
+        self.loop = loop
+        self.position = 0
+        self._loop_offset_ns = 0
+
+    @staticmethod
+    def load(path: str):
+        vid = pid = 0
+        bus = BUS_USB
+        reports = []
+        features = {}
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                if line.startswith('#'):
+                    for token in line[1:].split():
+                        key, _, value = token.partition('=')
+                        if key == 'vid':
+                            vid = int(value, 16)
+                        elif key == 'pid':
+                            pid = int(value, 16)
+                        elif key == 'bus':
+                            bus = value
+                    continue
+                parts = line.split()
+                if parts[0] == 'feature':
+                    features[int(parts[1], 16)] = bytes.fromhex(parts[2])
+                else:
+                    reports.append((int(parts[0]), bytes.fromhex(parts[1])))
+        if reports:
+            base = reports[0][0]
+            reports = [(t - base, data) for t, data in reports]
+        return vid, pid, bus, reports, features
+
+    def _next_report(self):
+        if self.position >= len(self.reports):
+            if not self.loop or not self.reports:
+                return None
+            self._loop_offset_ns += self.reports[-1][0] + 1
+            self.position = 0
+        due_ns, data = self.reports[self.position]
+        return due_ns + self._loop_offset_ns, data
+
+    def _consume(self):
+        self.position += 1
+
+
+class SyntheticTransport(_PacedTransport):
+    def __init__(self, kind: str, rate_hz=None, speed=1.0, count=None):
+        vid, pid = SYNTHETIC_IDS[check_synthetic_kind(kind)]
+        super().__init__(vid, pid, speed, f"synthetic:{kind}".encode('utf-8'))
+        self.kind = kind
+        self.family = "nintendo" if vid == NINTENDO_VID else kind
+        if rate_hz is None:
+            rate_hz = {"ds4": 250, "ds5": 250}.get(self.family, 66.7)
+        self.interval_ns = int(1e9 / rate_hz)
+        self.count = count
+        self.index = 0
+        self.replies = []
+        self.feature_reports = self._feature_reports()
+        # SPI-флеш Nintendo: заводская калибровка IMU, пользовательской нет
+        self.spi = {0x6020: struct.pack("<12h", 0, 0, 0, 16384, 16384, 16384, 0, 0, 0, 13371, 13371, 13371),
+                    0x8026: b'\xff\xff'}
+        # Nintendo до подкоманд: простой отчёт 0x3F без IMU
+        self.input_mode = 0x3F
+        self.imu_enabled = False
+        self.vibration = False
+        self.rumble_amplitude = 0.0
+        # Вывод DS4/DS5: подсветка, индикаторы игрока, отчёты с неверным CRC
+        self.lightbar = None
+        self.player_leds = None
+        self.bad_outputs = 0
+        # MCU с ИК-камерой (только Joy-Con R): режим, запрошенный статус, поток фрагментов
+        self.mcu_mode = 0
+        self.mcu_status = False
+        self.ir_resolution = None
+        self.ir_streaming = False
+        self.ir_next = 0
+        self.ir_sent = 0
+        self.ir_frames = 0
+        self.ir_image = b""
+
+    def _feature_reports(self):
+        if self.family == "nintendo":
+            battery = bytearray(49)
+            battery[5] = 0x04
+            return {0x80: bytes(battery)}
+        # Калибровка IMU (раскладка USB): 16 отсчётов на °/с, 8192 на g; батарея - байт 42
+        calibration = struct.pack("<17h", 0, 0, 0, 8640, -8640, 8640, -8640, 8640, -8640, 540, 540,
+                                  8192, -8192, 8192, -8192, 8192, -8192)
+        report = bytearray(49)
+        report[1:35] = calibration
+        report[42] = 0x05
+        usb = bytearray(37)
+        usb[0] = 0x02
+        usb[1:35] = calibration
+        return {0x05: bytes(report), 0x02: bytes(usb)}
+
+    def write(self, data):
+        written = super().write(data)
+        if self.family != "nintendo":
+            self.sony_output(data)
+            return written
+        if len(data) < 2:
+            return written
+        if data[0] in (0x01, 0x10) and len(data) >= 10:
+            self.rumble_amplitude = self.decode_rumble(bytes(data[2:10])) if self.vibration else 0.0
+        if data[0] == 0x80:
+            # Команды USB Pro Controller: ответ 0x81 с тем же номером
+            if data[1] != 0x04:
+                self.replies.append(bytes((0x81, data[1])) + bytes(47))
+        elif data[0] == 0x01 and len(data) >= 11:
+            self.replies.append(self.subcommand_reply(bytes(data)))
+        elif data[0] == 0x11 and len(data) >= 15:
+            # Запрос MCU: статус в следующем отчёте 0x31 или подтверждение фрагмента ИК-камеры
+            if data[10] == MCU_REQUEST_STATUS:
+                self.mcu_status = True
+            elif data[10] == MCU_REQUEST_IR_DATA and self.mcu_mode == MCU_IR and self.ir_resolution:
+                self.ir_streaming = True
+                if data[12]:
+                    self.ir_next = data[13]
+        return written
+
+    def sony_output(self, data):
+        state = parse_sony_output(data)
+        if state is None:
+            self.bad_outputs += 1
+            return
+        if state["rumble"] is not None:
+            self.rumble_amplitude = max(state["rumble"])
+        if state["lightbar"] is not None:
+            self.lightbar = state["lightbar"]
+        if state["player_leds"] is not None:
+            self.player_leds = state["player_leds"]
+
+    @staticmethod
+    def decode_rumble(rumble: bytes) -> float:
+        # Грубая амплитуда HD-вибрации 0..1 по обоим приводам: верхняя полоса до 0xC8, нижняя 0x40-0x72
+        level = 0.0
+        for side in (rumble[:4], rumble[4:]):
+            level = max(level, (side[1] & 0xFE) / 0xC8, (side[3] - 0x40) / 0x32)
+        return min(1.0, level)
+
+    def subcommand_reply(self, data: bytes) -> bytes:
+        # Ответ отчётом 0x21 перед следующим входным: состояние кнопок, ACK, номер подкоманды, данные
+        subcommand = data[10]
+        argument = data[11] if len(data) > 11 else 0
+        reply = bytearray(self.build_report(self.index)[:13].ljust(49, b'\x00'))
+        reply[0] = 0x21
+        reply[13] = 0x80
+        reply[14] = subcommand
+        if subcommand == 0x10:
+            address, length = struct.unpack_from("<IB", data, 11)
+            chunk = self.spi.get(address, b'\xff' * length)[:length]
+            reply[13] = 0x90
+            reply[15:20] = data[11:16]
+            reply[20:20 + len(chunk)] = chunk
+        elif subcommand == 0x03:
+            self.input_mode = argument
+        elif subcommand == 0x40:
+            self.imu_enabled = bool(argument)
+        elif subcommand == 0x48:
+            self.vibration = bool(argument)
+        elif subcommand == 0x22:
+            self.mcu_mode = MCU_STANDBY if argument else 0
+            self.ir_streaming = False
+        elif subcommand == 0x21:
+            self.mcu_reply(data, reply)
+        return bytes(reply)
+
+    def mcu_reply(self, data: bytes, reply: bytearray):
+        # Настройка MCU подкомандой 0x21: ИК-камера есть только у Joy-Con (R)
+        if self.kind != "joycon_right" or len(data) < 14:
+            reply[13] = 0x00
+            return
+        reply[13] = 0xA0
+        command = data[11]
+        if command == MCU_SET_MODE:
+            self.mcu_mode = data[13]
+            self.ir_streaming = False
+            reply[15] = MCU_REPLY_MODE
+        elif command == MCU_WRITE and data[12] == MCU_WRITE_IR_MODE:
+            self.ir_next = 0
+            reply[15] = MCU_REPLY_IR_MODE
+        elif command == MCU_WRITE and data[12] == MCU_WRITE_REGISTERS:
+            for i in range(min(data[13], 9)):
+                page, register, value = data[14 + 3 * i:17 + 3 * i]
+                if (page, register) == (0x00, 0x2E):
+                    self.ir_resolution = resolution_for_register(value)
+            reply[15] = MCU_REPLY_REGISTERS
+
+    def read(self, size: int, timeout_ms=0):
+        if self.replies and self.opened:
+            return list(self.replies.pop(0)[:size])
+        data = super().read(size, timeout_ms)
+        if data and data[0] == 0x31 and size >= IR_REPORT_SIZE:
+            self.fill_mcu(data)
+        return data
+
+    def fill_mcu(self, report: list):
+        # Данные MCU отчёта 0x31 - при выдаче, а не в build_report: отчёт строится и до срока
+        if self.mcu_status:
+            self.mcu_status = False
+            report[49] = MCU_REPORT_STATUS
+            report[56] = self.mcu_mode
+            return
+        if not self.ir_streaming:
+            report[49] = MCU_REPORT_EMPTY
+            return
+        last = RESOLUTIONS[self.ir_resolution][2]
+        self.ir_sent += 1
+        if self.ir_sent % 101 == 0 and self.ir_next < last:
+            # Изредка фрагмент теряется - приёмник должен запросить его повторно
+            self.ir_next += 1
+        fragment = self.ir_next
+        if fragment == 0 or not self.ir_image:
+            self.ir_image = self._ir_image()
+        report[49] = MCU_REPORT_IR_DATA
+        report[52] = fragment
+        start = fragment * FRAGMENT_SIZE
+        report[FRAGMENT_OFFSET:FRAGMENT_OFFSET + FRAGMENT_SIZE] = self.ir_image[start:start + FRAGMENT_SIZE]
+        self.ir_next = 0 if fragment >= last else fragment + 1
+
+    def _ir_image(self) -> bytes:
+        # Тёмный градиент и яркое пятно, которое ходит по кругу от кадра к кадру
+        width, height = RESOLUTIONS[self.ir_resolution][:2]
+        self.ir_frames += 1
+        angle = self.ir_frames * 0.3
+        cx = width / 2 + width / 4 * math.cos(angle)
+        cy = height / 2 + height / 4 * math.sin(angle)
+        radius2 = (min(width, height) / 6) ** 2
+        background = bytes(x * 48 // width for x in range(width))
+        rows = []
+        for y in range(height):
+            dy2 = (y - cy) ** 2
+            if dy2 >= radius2:
+                rows.append(background)
+                continue
+            half = math.sqrt(radius2 - dy2)
+            left, right = max(0, int(cx - half)), min(width, int(cx + half) + 1)
+            rows.append(background[:left] + b'\xff' * (right - left) + background[right:])
+        return b"".join(rows)
+
+    def _imu(self, n: int):
+        t = n * self.interval_ns / 1e9
+        gyro = (int(800 * math.sin(t * 2.0)), int(600 * math.cos(t * 1.5)), int(300 * math.sin(t)))
+        accel = (int(200 * math.sin(t)), 8192, int(200 * math.cos(t)))
+        return gyro, accel
+
+    def build_report(self, n: int) -> bytes:
+        gyro, accel = self._imu(n)
+        if self.rumble_amplitude and self.family != "nintendo":
+            shake = int(600 * self.rumble_amplitude) * (1 if n % 2 else -1)
+            accel = (accel[0] + shake, accel[1], accel[2] - shake)
+        if self.family == "ds4":
+            report = bytearray(64)
+            report[0] = 0x01
+            report[1:5] = b'\x80\x80\x80\x80'
+            report[5] = 0x08
+            report[7] = (n % 64) << 2
+            struct.pack_into("<H", report, 10, (n * self.interval_ns // 5333) & 0xFFFF)
+            struct.pack_into("<6h", report, 13, *gyro, *accel)
+            return bytes(report)
+        if self.family == "ds5":
+            report = bytearray(64)
+            report[0] = 0x01
+            report[1:5] = b'\x80\x80\x80\x80'
+            report[7] = n % 256
+            report[8] = 0x08
+            struct.pack_into("<6h", report, 16, *gyro, *accel)
+            struct.pack_into("<I", report, 28, (n * self.interval_ns // 333) & 0xFFFFFFFF)
+            return bytes(report)
+        if self.input_mode not in (0x30, 0x31):
+            # Простой отчёт: кнопки, HAT и стики по 16 бит - без IMU
+            return bytes((0x3F, 0x00, 0x00, 0x08)) + b'\x00\x80' * 4
+        # 0x31 - тот же отчёт с местом под данные MCU (заполняет fill_mcu)
+        report = bytearray(IR_REPORT_SIZE if self.input_mode == 0x31 else 49)
+        report[0] = self.input_mode
+        report[1] = (n * 3) % 256
+        report[2] = 0x8E
+        # Кнопки по очереди (каждая ~0.2 с) и оба стика по кругу за 2 с
+        bit = (n // 13) % 24
+        report[3 + bit // 8] = 1 << (bit % 8)
+        angle = n * self.interval_ns / 1e9 * math.pi
+        x, y = 2048 + int(1500 * math.cos(angle)), 2048 + int(1500 * math.sin(angle))
+        stick = bytes((x & 0xFF, (x >> 8) | ((y & 0x0F) << 4), y >> 4))
+        report[6:9] = stick
+        report[9:12] = stick
+        if self.imu_enabled:
+            for i in range(3):
+                gyro, accel = self._imu(n * 3 + i)
+                if self.rumble_amplitude:
+                    # Работающий привод трясёт корпус: акселерометр дрожит от сэмпла к сэмплу
+                    shake = int(600 * self.rumble_amplitude) * (1 if i % 2 else -1)
+                    accel = (accel[0] + shake, accel[1], accel[2] - shake)
+                struct.pack_into("<6h", report, 13 + 12 * i, *accel, *gyro)
+        return bytes(report)
+
+    def _next_report(self):
+        if self.count is not None and self.index >= self.count:
+            return None
+        return self.index * self.interval_ns, self.build_report(self.index)
+
+    def _consume(self):
+        self.index += 1
+
+
+def check_synthetic_kind(kind: str) -> str:
+    if kind not in SYNTHETIC_IDS:
+        raise ValueError(f"неизвестный синтетический геймпад: {kind} (есть: {', '.join(SYNTHETIC_IDS)})")
+    return kind
+
+
+def make_transport_factory(spec=None, speed=1.0):
+    # "" / None -> hidapi (если установлен), "synthetic:ds4", "replay:путь"
+    if not spec:
+        return HidapiTransport if HID_AVAILABLE else None
+    kind, _, arg = spec.partition(':')
+    if kind == "synthetic":
+        # Модель проверяется сразу, а не при первом открытии где-то внутри перечисления
+        arg = check_synthetic_kind(arg or "ds4")
+        return lambda: SyntheticTransport(arg, speed=speed)
+    if kind == "replay":
+        return lambda: ReplayTransport(arg, speed=speed)
+    raise ValueError(f"Неизвестный транспорт: {spec}")
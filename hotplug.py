@@ -0,0 +1,138 @@
+"""
+Подключение и отключение геймпадов на ходу.
+
+HotplugWatcher разбирает события JOYDEVICEADDED/JOYDEVICEREMOVED, которые
+собирает AcquisitionEngine, и ведёт список геймпадов по instance_id SDL
+(индексы устройств после отключения сдвигаются, instance_id - нет). Наружу
+отдаются только изменения, поэтому GUI обновляет одну строку списка, а не
+перестраивает всё. HidReconnector повторяет подключение HID-стороны с
+растущей паузой: по Bluetooth устройство hidapi часто появляется позже, чем
+джойстик SDL.
+"""
+
+import time
+
+import pygame
+
+from input_engine import DEVICE_ADDED, describe_joystick, get_all_gamepads
+
+RECONNECT_MIN_DELAY = 0.25
+RECONNECT_MAX_DELAY = 5.0
+
+
+def close_joystick(joy):
+    try:
+        joy.quit()
+    except pygame.error:
+        pass
+
+
+class HotplugWatcher:
+    def __init__(self, engine, enumerators=()):
+        self.engine = engine
+        self.enumerators = [e for e in enumerators if e is not None]
+        self.gamepads = {}        # instance_id -> описание, как в get_all_gamepads
+        self.joysticks = {}       # instance_id -> pygame.joystick.Joystick
+
+    def rescan(self) -> list:
+        # Полный пересмотр (F5 / старт): события, накопленные до него, уже учтены
+        self.engine.take_device_events()
+        gamepads = get_all_gamepads(pump=not self.engine.pumping)
+        self.gamepads = {}
+        joysticks = {}
+        for gp in gamepads:
+            instance_id = gp['instance_id']
+            self.gamepads[instance_id] = gp
+            joysticks[instance_id] = self.joysticks.pop(instance_id, None) or pygame.joystick.Joystick(gp['index'])
+        # Пропавшие из нового списка - закрыть, иначе SDL держит их открытыми
+        for joy in self.joysticks.values():
+            close_joystick(joy)
+        self.joysticks = joysticks
+        self._invalidate()
+        return gamepads
+
+    def joystick(self, instance_id):
+        return self.joysticks.get(instance_id)
+
+    def ordered(self) -> list:
+        # В порядке подключения - по нему же разбираются одинаковые HID-устройства
+        return [self.gamepads[key] for key in sorted(self.gamepads)]
+
+    def poll(self):
+        # -> (подключённые, отключённые) с прошлого вызова
+        added, removed = [], []
+        events = self.engine.take_device_events()
+        for kind, value in events:
+            if kind == DEVICE_ADDED:
+                try:
+                    joy = pygame.joystick.Joystick(value)
+                    gp = describe_joystick(joy, value)
+                except pygame.error as e:
+                    print(f"Hotplug: устройство {value} не открылось: {e}")
+                    continue
+                instance_id = gp['instance_id']
+                if instance_id in self.gamepads:
+                    continue
+                self.gamepads[instance_id] = gp
+                self.joysticks[instance_id] = joy
+                added.append(gp)
+            else:
+                gp = self.gamepads.pop(value, None)
+                joy = self.joysticks.pop(value, None)
+                if joy is not None:
+                    close_joystick(joy)
+                if gp is not None:
+                    removed.append(gp)
+        if events:
+            self._invalidate()
+        return added, removed
+
+    def _invalidate(self):
+        for enumerator in self.enumerators:
+            enumerator.invalidate()
+
+
+class HidReconnector:
+    def __init__(self, min_delay=RECONNECT_MIN_DELAY, max_delay=RECONNECT_MAX_DELAY):
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.attempt = None
+        self.attempts = 0
+        self.delay = min_delay
+        self.due = 0.0
+
+    @property
+    def active(self) -> bool:
+        return self.attempt is not None
+
+    def start(self, attempt):
+        # attempt() -> True, когда подключились (или повторять больше не нужно)
+        self.attempt = attempt
+        self.attempts = 0
+        self.delay = self.min_delay
+        self.due = time.monotonic() + self.delay
+
+    def retry_now(self):
+        if self.attempt is not None:
+            self.delay = self.min_delay
+            self.due = time.monotonic()
+
+    def cancel(self):
+        self.attempt = None
+
+    def poll(self, now=None) -> bool:
+        if self.attempt is None:
+            return False
+        now = time.monotonic() if now is None else now
+        if now < self.due:
+            return False
+        self.attempts += 1
+        attempt = self.attempt
+        if attempt():
+            if self.attempt is attempt:
+                self.attempt = None
+            return True
+        if self.attempt is attempt:
+            self.delay = min(self.delay * 2, self.max_delay)
+            self.due = now + self.delay
+        return False
@@ -0,0 +1,174 @@
+"""
+Калибровка IMU из самого геймпада: перевод отсчётов АЦП в °/с и g.
+
+    DS4      - feature-отчёт 0x02 (USB) / 0x05 (Bluetooth)
+    DualSense - feature-отчёт 0x05
+    Joy-Con / Pro Controller - SPI-флеш: пользовательская калибровка 0x8026
+               (если записана), иначе заводская 0x6020
+
+Чтение feature-отчёта и SPI занимает десятки-сотни миллисекунд, поэтому
+результат кэшируется на диске по VID/PID и серийному номеру: повторное
+подключение того же геймпада обходится без запросов к устройству. Без
+серийного номера кэш не ведётся - различить два одинаковых геймпада нельзя.
+"""
+
+import json
+import os
+import struct
+import sys
+
+
+def app_dir() -> str:
+    # Рядом с exe сборки PyInstaller, иначе рядом с модулем - кэш не зависит от рабочего каталога
+    if getattr(sys, 'frozen', False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.abspath(__file__))
+
+
+DEFAULT_CACHE = os.path.join(app_dir(), "imu_calibration.json")
+SOURCE_FACTORY = "factory"
+SOURCE_USER = "user"
+SOURCE_NOMINAL = "nominal"
+SOURCE_NAMES = {SOURCE_FACTORY: "заводская", SOURCE_USER: "пользовательская", SOURCE_NOMINAL: "номинальная"}
+# Отсчётов на °/с и на g по паспорту датчиков - без калибровки
+NOMINAL_SCALES = {
+    "ds4": (16.0, 8192.0),
+    "ds5": (16.0, 8192.0),
+    "nintendo": (13371 / 936, 4096.0),
+}
+# Разумные границы отсчётов на единицу: всё, что вне их - мусор клона или пустой флеш
+GYRO_SCALE_RANGE = (4.0, 64.0)
+ACCEL_SCALE_RANGE = (1024.0, 32768.0)
+DS4_CALIBRATION_USB = 0x02
+DS4_CALIBRATION_BT = 0x05
+DS5_CALIBRATION = 0x05
+CALIBRATION_REPORT_SIZE = 41
+SPI_FACTORY_IMU = 0x6020
+SPI_USER_IMU_MAGIC = 0x8026
+SPI_USER_IMU = 0x8028
+SPI_IMU_SIZE = 24
+USER_MAGIC = (0xB2, 0xA1)
+
+
+class ImuCalibration:
+    def __init__(self, gyro_bias, gyro_scale, accel_bias, accel_scale, source=SOURCE_FACTORY):
+        # bias - отсчёты покоя, scale - отсчётов на °/с (гироскоп) и на g (акселерометр), по осям X, Y, Z
+        self.gyro_bias = tuple(float(v) for v in gyro_bias)
+        self.gyro_scale = tuple(float(v) for v in gyro_scale)
+        self.accel_bias = tuple(float(v) for v in accel_bias)
+        self.accel_scale = tuple(float(v) for v in accel_scale)
+        self.source = source
+
+    @classmethod
+    def nominal(cls, family: str):
+        gyro, accel = NOMINAL_SCALES.get(family, NOMINAL_SCALES["ds4"])
+        return cls((0, 0, 0), (gyro,) * 3, (0, 0, 0), (accel,) * 3, SOURCE_NOMINAL)
+
+    @property
+    def valid(self) -> bool:
+        low, high = GYRO_SCALE_RANGE
+        if not all(low <= abs(v) <= high for v in self.gyro_scale):
+            return False
+        low, high = ACCEL_SCALE_RANGE
+        return all(low <= abs(v) <= high for v in self.accel_scale)
+
+    def to_dict(self) -> dict:
+        return {"gyro_bias": list(self.gyro_bias), "gyro_scale": list(self.gyro_scale),
+                "accel_bias": list(self.accel_bias), "accel_scale": list(self.accel_scale), "source": self.source}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(data["gyro_bias"], data["gyro_scale"], data["accel_bias"], data["accel_scale"],
+                   data.get("source", SOURCE_FACTORY))
+
+
+def parse_sony_calibration(data, bluetooth_ds4=False):
+    # Разбор как в драйверах hid-sony/hid-playstation: 17 int16 с байта 1.
+    # Смещение гироскопа в отчёте есть, но датчик уже вычитает его сам - драйверы берут 0
+    if not data or len(data) < 35:
+        return None
+    values = struct.unpack_from("<17h", bytes(data[:35]), 1)
+    biases = values[0:3]
+    if bluetooth_ds4:
+        plus, minus = values[3:6], values[6:9]
+    else:
+        plus, minus = values[3:9:2], values[4:9:2]
+    speed_2x = values[9] + values[10]
+    accel = values[11:17]
+    if speed_2x == 0:
+        return None
+    gyro_scale = [(abs(p - b) + abs(m - b)) / speed_2x for p, m, b in zip(plus, minus, biases)]
+    accel_bias, accel_scale = [], []
+    for axis in range(3):
+        range_2g = accel[2 * axis] - accel[2 * axis + 1]
+        accel_bias.append(accel[2 * axis] - range_2g / 2)
+        accel_scale.append(range_2g / 2)
+    calibration = ImuCalibration((0, 0, 0), gyro_scale, accel_bias, accel_scale, SOURCE_FACTORY)
+    return calibration if calibration.valid else None
+
+
+def parse_nintendo_calibration(data, source=SOURCE_FACTORY):
+    # 12 int16: начало отсчёта и чувствительность акселерометра, затем гироскопа
+    if not data or len(data) < SPI_IMU_SIZE or all(b == 0xFF for b in data[:SPI_IMU_SIZE]):
+        return None
+    values = struct.unpack_from("<12h", bytes(data[:SPI_IMU_SIZE]))
+    accel_origin, accel_sens, gyro_origin, gyro_sens = values[0:3], values[3:6], values[6:9], values[9:12]
+    # Акселерометр: чувствительность задана для 4 g; гироскоп - для 936 °/с
+    accel_scale = [(s - o) / 4 for s, o in zip(accel_sens, accel_origin)]
+    gyro_scale = [(s - o) / 936 for s, o in zip(gyro_sens, gyro_origin)]
+    calibration = ImuCalibration(gyro_origin, gyro_scale, (0, 0, 0), accel_scale, source)
+    return calibration if calibration.valid else None
+
+
+def cache_key(vid: int, pid: int, serial: str):
+    return f"{vid:04x}:{pid:04x}:{serial}" if serial else None
+
+
+class CalibrationCache:
+    def __init__(self, path=DEFAULT_CACHE):
+        self.path = path
+        self.entries = None       # читается при первом обращении
+
+    def _load(self):
+        if self.entries is None:
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+        return self.entries
+
+    def get(self, vid: int, pid: int, serial: str):
+        key = cache_key(vid, pid, serial)
+        if key is None:
+            return None
+        data = self._load().get(key)
+        try:
+            return ImuCalibration.from_dict(data) if data else None
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def put(self, vid: int, pid: int, serial: str, calibration: ImuCalibration):
+        key = cache_key(vid, pid, serial)
+        if key is None:
+            return
+        entries = self._load()
+        entries[key] = calibration.to_dict()
+        # Через временный файл: оборванная запись не портит кэш остальных геймпадов
+        temp = self.path + ".tmp"
+        try:
+            with open(temp, 'w', encoding='utf-8') as f:
+                json.dump(entries, f, indent=1)
+            os.replace(temp, self.path)
+        except OSError as e:
+            print(f"Кэш калибровки не записан: {e}")
+
+
+_default_cache = None
+
+
+def default_cache() -> CalibrationCache:
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = CalibrationCache()
+    return _default_cache
@@ -0,0 +1,209 @@
+"""
+Шум и дрейф гироскопа по длинной записи в покое.
+
+NoiseCapture складывает сэмплы пачек HidBatchReader (°/с, по калибровке
+геймпада) с метками времени датчика в заранее выделенные массивы NumPy -
+за время записи память не растёт и не перевыделяется. analyze_noise считает
+по записи векторными операциями:
+
+    смещение нуля          - среднее по оси, °/с
+    плотность шума (ARW)   - девиация Аллана при τ = 1 с, °/с/√Гц
+    нестабильность нуля    - минимум девиации Аллана / 0.664, °/с
+    дрейф                  - наклон линейного тренда, °/с за минуту
+                             (без поправки на температуру - её геймпады не отдают)
+
+Девиация Аллана - перекрывающаяся, через накопленную сумму угла, на сетке
+τ с шагом в десятую часть декады: 10 минут при 1 кГц считаются за десятые
+доли секунды. Без numpy запись недоступна, остальное приложение работает.
+"""
+
+import math
+from importlib.util import find_spec
+
+NUMPY_AVAILABLE = find_spec("numpy") is not None
+_np = None
+
+# Длительности записи на выбор, с
+CAPTURE_DURATIONS = (30, 60, 120, 300, 600)
+# Запас буфера на частоту сэмплов: DualSense по Bluetooth - до 1 кГц
+MAX_RATE_HZ = 1250
+MIN_SAMPLES = 100
+TAU_STEPS_PER_DECADE = 10
+# σ_min девиации Аллана = 0.664 · B для фликкер-шума нуля
+BIAS_INSTABILITY_FACTOR = 0.664
+# Сэмпл дальше этого от среднего - геймпад двигали, запись не в покое
+MOTION_LIMIT_DPS = 20.0
+# Допуски: по худшей оси
+NOISE_LIMITS = {
+    "bias": 3.0,                # °/с
+    "noise_density": 0.05,      # °/с/√Гц
+    "bias_instability": 0.05,   # °/с
+    "drift": 0.2,               # °/с за минуту
+}
+NOISE_NAMES = {
+    "bias": ("Смещение нуля", "°/с"),
+    "noise_density": ("Плотность шума", "°/с/√Гц"),
+    "bias_instability": ("Нестабильность нуля", "°/с"),
+    "drift": ("Дрейф", "°/с/мин"),
+}
+
+
+def load_numpy():
+    global _np, NUMPY_AVAILABLE
+    if _np is None:
+        try:
+            import numpy
+        except ImportError as e:
+            NUMPY_AVAILABLE = False
+            raise ImportError(f"numpy недоступен: {e}")
+        _np = numpy
+    return _np
+
+
+class NoiseCapture:
+    def __init__(self, duration_s: float, max_rate_hz=MAX_RATE_HZ):
+        np = load_numpy()
+        self.duration_s = duration_s
+        capacity = int(math.ceil(duration_s * max_rate_hz)) + 1
+        self.gyro = np.empty((capacity, 3), dtype=np.float64)
+        self.stamps = np.empty(capacity, dtype=np.int64)
+        self.count = 0
+        self.done = False
+
+    @property
+    def capacity(self) -> int:
+        return len(self.stamps)
+
+    @property
+    def elapsed_s(self) -> float:
+        return (self.stamps[self.count - 1] - self.stamps[0]) / 1e9 if self.count > 1 else 0.0
+
+    @property
+    def progress(self) -> float:
+        return 1.0 if self.done else min(1.0, self.elapsed_s / self.duration_s)
+
+    def add(self, samples, stamps) -> int:
+        # samples - (gx, gy, gz, ax, ay, az), stamps - метки датчика, нс; -> сколько сэмплов принято
+        if self.done or not samples or len(stamps) != len(samples):
+            return 0
+        np = _np
+        start = self.count
+        if start:
+            # Запись кончается ровно на duration_s по часам датчика
+            end_ns = self.stamps[0] + int(self.duration_s * 1e9)
+            taken = int(np.searchsorted(np.asarray(stamps, dtype=np.int64), end_ns, side='right'))
+        else:
+            taken = len(samples)
+        taken = min(taken, self.capacity - start)
+        if taken > 0:
+            self.gyro[start:start + taken] = np.asarray(samples[:taken], dtype=np.float64)[:, :3]
+            self.stamps[start:start + taken] = stamps[:taken]
+            self.count = start + taken
+        if taken < len(samples) or self.count >= self.capacity or self.elapsed_s >= self.duration_s:
+            self.done = True
+        return max(taken, 0)
+
+    def analyze(self):
+        return analyze_noise(self.gyro[:self.count], self.stamps[:self.count])
+
+
+def allan_deviation(gyro, rate_hz: float, steps_per_decade=TAU_STEPS_PER_DECADE) -> tuple:
+    # Перекрывающаяся девиация Аллана: gyro - (N, 3) в °/с -> (τ с, (K, 3) °/с)
+    np = load_numpy()
+    n = len(gyro)
+    # Угол по осям: накопленная сумма с нулём в начале, по столбцу на ось подряд в памяти
+    theta = np.zeros((3, n + 1))
+    np.cumsum(gyro.T, axis=1, out=theta[:, 1:])
+    theta /= rate_hz
+    max_m = n // 2
+    m = np.unique(np.logspace(0, math.log10(max_m), int(math.log10(max_m) * steps_per_decade) + 1)
+                  .astype(np.int64)) if max_m >= 1 else np.ones(0, dtype=np.int64)
+    adev = np.empty((len(m), 3))
+    # Один буфер на все τ: вторые разности считаются на месте, без временных массивов
+    buffer = np.empty((3, n + 1))
+    for i, cluster in enumerate(m):
+        count = n + 1 - 2 * cluster
+        diff = buffer[:, :count]
+        np.add(theta[:, 2 * cluster:], theta[:, :count], out=diff)
+        diff -= theta[:, cluster:cluster + count]
+        diff -= theta[:, cluster:cluster + count]
+        tau = cluster / rate_hz
+        adev[i] = np.sqrt(np.einsum('ij,ij->i', diff, diff) / (2 * tau * tau * count))
+    return m / rate_hz, adev
+
+
+def noise_density(taus, adev):
+    # Значение на τ = 1 с по лог-лог интерполяции; короче - экстраполяция белого шума (наклон -1/2)
+    np = load_numpy()
+    if len(taus) == 0:
+        return np.zeros(3)
+    if taus[0] <= 1.0 <= taus[-1]:
+        log_tau = np.log10(taus)
+        return np.array([10 ** np.interp(0.0, log_tau, np.log10(adev[:, axis])) for axis in range(3)])
+    return adev[0] * np.sqrt(taus[0])
+
+
+def analyze_noise(gyro, stamps) -> dict:
+    # gyro - (N, 3) °/с, stamps - (N,) нс по часам датчика
+    np = load_numpy()
+    n = len(gyro)
+    span_s = (int(stamps[-1]) - int(stamps[0])) / 1e9 if n > 1 else 0.0
+    if n < MIN_SAMPLES or span_s <= 0:
+        return {"samples": n, "duration_s": round(span_s, 3), "passed": False,
+                "reason": f"мало данных: {n} сэмплов"}
+    rate_hz = (n - 1) / span_s
+    bias = gyro.mean(axis=0)
+    # Дальше всё по отклонениям от среднего: сумма угла не набегает, точность не теряется
+    centered = gyro - bias
+    # Пропуски: интервал больше полутора средних - переполнение очереди HID
+    gaps = int(np.count_nonzero(np.diff(stamps) > 1.5 * span_s * 1e9 / (n - 1)))
+    moved = bool(np.abs(centered).max() > MOTION_LIMIT_DPS)
+    # Линейный тренд по МНК: наклон по каждой оси сразу
+    t = (stamps - stamps[0]) / 1e9
+    t -= t.mean()
+    drift = (t @ centered) / (t @ t) * 60.0
+    std = np.sqrt(np.einsum('ij,ij->j', centered, centered) / n)
+    taus, adev = allan_deviation(centered, rate_hz)
+    density = noise_density(taus, adev)
+    instability = adev.min(axis=0) / BIAS_INSTABILITY_FACTOR
+    metrics = {
+        "bias": bias,
+        "noise_density": density,
+        "bias_instability": instability,
+        "drift": drift,
+    }
+    result = {
+        "samples": n,
+        "duration_s": round(span_s, 3),
+        "rate_hz": round(rate_hz, 1),
+        "gaps": gaps,
+        "moved": moved,
+        "std": [round(float(v), 4) for v in std],
+        "allan": {"tau_s": [round(float(v), 6) for v in taus],
+                  "adev": [[round(float(v), 6) for v in row] for row in adev]},
+        "limits": dict(NOISE_LIMITS),
+    }
+    failed = []
+    for key, values in metrics.items():
+        result[key] = [round(float(v), 5) for v in values]
+        if float(np.abs(values).max()) > NOISE_LIMITS[key]:
+            failed.append(key)
+    result["failed"] = failed
+    result["passed"] = not failed and not moved
+    result["reason"] = "геймпад двигали во время записи" if moved else ""
+    return result
+
+
+def format_noise(result: dict) -> list:
+    # Строки для отчёта и виджета: худшая ось против допуска
+    if "bias" not in result:
+        return [f"❌ {result.get('reason', 'нет данных')}"]
+    lines = [f"Запись: {result['duration_s']:.0f} с, {result['samples']} сэмплов, {result['rate_hz']:.0f} Гц"
+             + (f", пропусков {result['gaps']}" if result['gaps'] else "")]
+    for key, (name, unit) in NOISE_NAMES.items():
+        worst = max(abs(v) for v in result[key])
+        mark = "❌" if key in result["failed"] else "✅"
+        lines.append(f"{mark} {name}: {worst:.4f} {unit} (допуск {NOISE_LIMITS[key]} {unit})")
+    if result["moved"]:
+        lines.append(f"❌ {result['reason']}")
+    return lines
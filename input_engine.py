@@ -0,0 +1,486 @@
+"""
+Фоновый сбор данных с геймпада.
+
+AcquisitionEngine в отдельном потоке вызывает pygame.event.pump() и читает
+кнопки/оси/HAT с заданной частотой (250-1000 Гц), складывая кадры с метками
+времени в заранее выделенный кольцевой буфер. GUI забирает только последний
+кадр и фронты кнопок, накопившиеся с прошлого опроса, поэтому точность
+измерений не зависит от частоты перерисовки.
+
+Режим MODE_EVENTS вместо опроса всех кнопок и осей разбирает события SDL
+(JOYBUTTONDOWN/UP, JOYAXISMOTION, JOYHATMOTION) и обновляет только те
+элементы, от которых пришли события; каждое нажатие/отпускание пишется
+отдельным кадром, поэтому нажатие короче такта опроса не теряется.
+
+Кадры можно параллельно писать в SessionRecorder, а при воспроизведении
+записи SessionPlayer подаёт их в тот же кольцевой буфер вместо геймпада.
+
+Очередь SDL разбирает только этот поток, поэтому события подключения и
+отключения (JOYDEVICEADDED/REMOVED) он же складывает в device_events для
+HotplugWatcher; без выбранного геймпада очередь прокачивается реже.
+
+Несколько геймпадов сразу опрашивает несколько движков, но очередь SDL
+качает только один: у остальных pump_events=False, они лишь читают состояние
+своих джойстиков, а основной движок с set_shared_pump(True) прокачивает
+очередь на своей частоте, даже если сам геймпад не опрашивает.
+
+Пока окно скрыто, set_watch(True) снижает частоту опроса до WATCH_RATE_HZ:
+поток не будит процессор сотни раз в секунду ради невидимого окна.
+"""
+
+import os
+import struct
+import threading
+import time
+from array import array
+from collections import deque
+
+import pygame
+
+MAX_BUTTONS = 64
+MAX_AXES = 8
+MAX_HATS = 4
+MIN_RATE_HZ = 250
+MAX_RATE_HZ = 1000
+DEFAULT_RATE_HZ = 500
+WATCH_RATE_HZ = 30
+RING_CAPACITY = 4096
+
+MODE_POLL = "poll"
+MODE_EVENTS = "events"
+JOY_INPUT_EVENTS = (pygame.JOYBUTTONDOWN, pygame.JOYBUTTONUP, pygame.JOYAXISMOTION, pygame.JOYHATMOTION)
+JOY_DEVICE_EVENTS = (pygame.JOYDEVICEADDED, pygame.JOYDEVICEREMOVED)
+DEVICE_ADDED = "added"
+DEVICE_REMOVED = "removed"
+DEVICE_EVENT_BACKLOG = 64
+IDLE_PUMP_NS = 10_000_000
+# Шина в GUID SDL: SDL_HARDWARE_BUS_USB / SDL_HARDWARE_BUS_BLUETOOTH
+SDL_BUS_TYPES = {0x03: "usb", 0x05: "bluetooth"}
+
+
+def init_joystick_subsystem():
+    # Только то, что нужно геймпадам: очередь событий SDL (живёт в видеоподсистеме,
+    # окно не создаётся) и джойстики. Звук, шрифты и прочее pygame.init() не трогаем.
+    os.environ.setdefault("SDL_JOYSTICK_ALLOW_BACKGROUND_EVENTS", "1")
+    if not pygame.display.get_init():
+        pygame.display.init()
+    if not pygame.joystick.get_init():
+        pygame.joystick.init()
+
+
+def parse_joystick_guid(guid: str):
+    # GUID SDL2: шина, CRC имени, VID, 0, PID, 0, версия, драйвер (little-endian)
+    # -> (шина или None, vid, pid); у GUID без VID/PID - (шина, 0, 0)
+    try:
+        raw = bytes.fromhex(guid)
+    except (TypeError, ValueError):
+        return None, 0, 0
+    if len(raw) != 16:
+        return None, 0, 0
+    bus, _, vid, zero1, pid, zero2 = struct.unpack_from("<6H", raw)
+    if zero1 or zero2:
+        return SDL_BUS_TYPES.get(bus), 0, 0
+    return SDL_BUS_TYPES.get(bus), vid, pid
+
+
+def describe_joystick(joy, index: int) -> dict:
+    if not joy.get_init():
+        joy.init()
+    guid = joy.get_guid()
+    bus, vid, pid = parse_joystick_guid(guid)
+    return {'index': index, 'instance_id': joy.get_instance_id(), 'name': joy.get_name(),
+            'buttons': joy.get_numbuttons(), 'axes': joy.get_numaxes(), 'hats': joy.get_numhats(),
+            'guid': guid, 'bus': bus, 'vid': vid, 'pid': pid}
+
+
+def get_all_gamepads(pump=True):
+    # pump=False - очередь SDL уже качает поток движка; второй поток её не трогает
+    gamepads = []
+    try:
+        if not pygame.joystick.get_init():
+            init_joystick_subsystem()
+        if pump:
+            pygame.event.pump()
+        count = pygame.joystick.get_count()
+        for i in range(count):
+            try:
+                gamepads.append(describe_joystick(pygame.joystick.Joystick(i), i))
+            except Exception as e:
+                print(f"Gamepad error: {e}")
+    except Exception as e:
+        print(f"get_all_gamepads error: {e}")
+    return gamepads
+
+
+class InputSnapshot:
+    __slots__ = ("seq", "timestamp_ns", "buttons", "held", "pressed", "released",
+                 "axes", "hats", "frames", "overrun")
+
+    def __init__(self):
+        self.seq = 0
+        self.timestamp_ns = 0
+        self.buttons = 0      # маска кнопок в последнем кадре
+        self.held = 0         # кнопки, нажатые хотя бы в одном кадре с прошлого опроса
+        self.pressed = 0      # фронты 0 -> 1 с прошлого опроса
+        self.released = 0     # фронты 1 -> 0 с прошлого опроса
+        self.axes = []
+        self.hats = []
+        self.frames = 0
+        self.overrun = False  # GUI отстал больше чем на размер буфера
+
+    def is_down(self, btn_id: int) -> bool:
+        return bool((self.buttons >> btn_id) & 1)
+
+    def was_held(self, btn_id: int) -> bool:
+        return bool((self.held >> btn_id) & 1)
+
+
+class FrameRing:
+    def __init__(self, capacity=RING_CAPACITY, max_axes=MAX_AXES, max_hats=MAX_HATS):
+        self.capacity = capacity
+        self.max_axes = max_axes
+        self.max_hats = max_hats
+        self.timestamps = array('q', bytes(8 * capacity))
+        self.buttons = array('Q', bytes(8 * capacity))
+        self.axes = array('f', bytes(4 * capacity * max_axes))
+        self.hats = array('b', bytes(2 * capacity * max_hats))
+        # Количество записанных кадров. Писатель сначала заполняет слот,
+        # потом увеличивает seq - читатель видит только готовые кадры.
+        self.seq = 0
+
+    def push(self, timestamp_ns: int, buttons: int, axes, hats):
+        slot = self.seq % self.capacity
+        self.timestamps[slot] = timestamp_ns
+        self.buttons[slot] = buttons
+        base = slot * self.max_axes
+        for i, value in enumerate(axes):
+            self.axes[base + i] = value
+        base = slot * self.max_hats * 2
+        for i, (hx, hy) in enumerate(hats):
+            self.hats[base + i * 2] = hx
+            self.hats[base + i * 2 + 1] = hy
+        self.seq += 1
+
+    def read_axes(self, slot: int, count: int):
+        base = slot * self.max_axes
+        return self.axes[base:base + count].tolist()
+
+    def read_hats(self, slot: int, count: int):
+        base = slot * self.max_hats * 2
+        raw = self.hats[base:base + count * 2]
+        return [(raw[i * 2], raw[i * 2 + 1]) for i in range(count)]
+
+
+class AcquisitionEngine:
+    def __init__(self, rate_hz=DEFAULT_RATE_HZ, capacity=RING_CAPACITY, mode=MODE_POLL, pump_events=True):
+        self.ring = FrameRing(capacity)
+        self.pump_events = pump_events
+        self.shared_pump = False
+        self.rate_hz = DEFAULT_RATE_HZ
+        self.set_rate(rate_hz)
+        self.mode = mode
+        self.joystick = None
+        self.num_buttons = 0
+        self.num_axes = 0
+        self.num_hats = 0
+        self.connected = False
+        self.measured_rate_hz = 0.0
+        self.watch = False
+        self.recorder = None
+        self.player = None
+        self.device_events = deque(maxlen=DEVICE_EVENT_BACKLOG)
+        self._player_lock = threading.Lock()
+        self._thread = None
+        self._running = False
+        self._last_seq = 0
+        self._last_buttons = 0
+        # Состояние для событийного режима
+        self._seed_needed = True
+        self._instance_id = None
+        self._mask = 0
+        self._axes = []
+        self._hats = []
+        self._ticks_offset_ns = 0
+
+    def set_rate(self, rate_hz: int):
+        self.rate_hz = max(MIN_RATE_HZ, min(MAX_RATE_HZ, int(rate_hz)))
+
+    def set_watch(self, enabled: bool):
+        self.watch = bool(enabled)
+
+    def set_shared_pump(self, enabled: bool):
+        # Очередь SDL нужна движкам без прокачки - качаем на полной частоте
+        self.shared_pump = bool(enabled)
+
+    def set_mode(self, mode: str):
+        if mode not in (MODE_POLL, MODE_EVENTS):
+            raise ValueError(f"Неизвестный режим: {mode}")
+        if mode == MODE_EVENTS and not self.pump_events:
+            raise ValueError("Событийный режим требует своей прокачки очереди SDL")
+        self._seed_needed = True
+        self.mode = mode
+
+    def set_joystick(self, joystick):
+        # Переключение устройства: поток подхватит новую ссылку на следующем
+        # такте, а читатель начнёт с текущей позиции буфера.
+        self.joystick = None
+        if joystick is not None:
+            self.num_buttons = min(joystick.get_numbuttons(), MAX_BUTTONS)
+            self.num_axes = min(joystick.get_numaxes(), MAX_AXES)
+            self.num_hats = min(joystick.get_numhats(), MAX_HATS)
+        else:
+            self.num_buttons = self.num_axes = self.num_hats = 0
+        self._last_seq = self.ring.seq
+        self._last_buttons = 0
+        self._seed_needed = True
+        self.connected = joystick is not None
+        self.joystick = joystick
+
+    def set_player(self, player, num_buttons=0, num_axes=0, num_hats=0):
+        # Воспроизведение записи: кадры берутся из плеера, геймпад не опрашивается
+        with self._player_lock:
+            self.joystick = None
+            self.player = player
+            self.num_buttons = min(num_buttons, MAX_BUTTONS)
+            self.num_axes = min(num_axes, MAX_AXES)
+            self.num_hats = min(num_hats, MAX_HATS)
+            self._last_seq = self.ring.seq
+            self._last_buttons = 0
+            self.connected = player is not None
+
+    @property
+    def replaying(self) -> bool:
+        return self.player is not None
+
+    @property
+    def pumping(self) -> bool:
+        # Поток запущен и сам качает очередь SDL - другим потокам её трогать нельзя
+        return self._running and self.pump_events
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="gamepad-acquisition", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _run(self):
+        next_ns = time.perf_counter_ns()
+        rate_window_start = next_ns
+        rate_window_frames = 0
+        last_pump_ns = 0
+        while self._running:
+            joystick = self.joystick
+            pumped = False
+            if self.player is not None:
+                with self._player_lock:
+                    if self.player is not None:
+                        rate_window_frames += self.player.pump_frames(self.ring)
+            elif joystick is not None:
+                if self.mode == MODE_EVENTS:
+                    rate_window_frames += self._drain_events(joystick)
+                elif self._sample(joystick):
+                    rate_window_frames += 1
+                pumped = True
+            if self.pump_events and (pumped or self.shared_pump or next_ns - last_pump_ns >= IDLE_PUMP_NS):
+                self._collect_device_events(pump=not pumped)
+                last_pump_ns = next_ns
+            if self.watch:
+                period_ns = 1_000_000_000 // WATCH_RATE_HZ
+            elif joystick is None and self.player is None and not self.shared_pump:
+                # Опрашивать нечего - просыпаемся только прокачать очередь SDL
+                period_ns = IDLE_PUMP_NS
+            else:
+                period_ns = 1_000_000_000 // self.rate_hz
+            next_ns += period_ns
+            now = time.perf_counter_ns()
+            if now - rate_window_start >= 1_000_000_000:
+                self.measured_rate_hz = rate_window_frames * 1e9 / (now - rate_window_start)
+                rate_window_start = now
+                rate_window_frames = 0
+            delay = next_ns - now
+            if delay > 0:
+                time.sleep(delay / 1e9)
+            else:
+                # Отстали (например, ОС не дала квант) - не пытаемся догонять пачкой
+                next_ns = now
+
+    def _sample(self, joystick) -> bool:
+        try:
+            if self.pump_events:
+                pygame.event.pump()
+                # В режиме опроса события не нужны - не даём им переполнить очередь SDL
+                pygame.event.clear(JOY_INPUT_EVENTS)
+            if not joystick.get_init():
+                self.connected = False
+                return False
+            timestamp = time.perf_counter_ns()
+            mask = 0
+            for i in range(self.num_buttons):
+                if joystick.get_button(i):
+                    mask |= 1 << i
+            axes = [joystick.get_axis(i) for i in range(self.num_axes)]
+            hats = [joystick.get_hat(i) for i in range(self.num_hats)]
+        except pygame.error:
+            self.connected = False
+            return False
+        if joystick is not self.joystick:
+            return False
+        self._push(timestamp, mask, axes, hats)
+        self.connected = True
+        return True
+
+    def _collect_device_events(self, pump: bool):
+        try:
+            events = pygame.event.get(JOY_DEVICE_EVENTS, pump=pump)
+            if pump:
+                # Сами прокачали - значит, события ввода никто не разбирает, не копим их
+                pygame.event.clear(JOY_INPUT_EVENTS, pump=False)
+        except pygame.error:
+            return
+        for event in events:
+            if event.type == pygame.JOYDEVICEADDED:
+                self.device_events.append((DEVICE_ADDED, event.device_index))
+            else:
+                self.device_events.append((DEVICE_REMOVED, event.instance_id))
+
+    def take_device_events(self) -> list:
+        events = []
+        while self.device_events:
+            events.append(self.device_events.popleft())
+        return events
+
+    def _push(self, timestamp_ns: int, mask: int, axes, hats):
+        self.ring.push(timestamp_ns, mask, axes, hats)
+        recorder = self.recorder
+        if recorder is not None:
+            recorder.joy_frame(timestamp_ns, mask, axes, hats)
+
+    def _seed(self, joystick) -> bool:
+        # Полное состояние один раз при старте режима/смене устройства,
+        # дальше его меняют только события
+        if not self._sample(joystick):
+            return False
+        slot = (self.ring.seq - 1) % self.ring.capacity
+        self._mask = self.ring.buttons[slot]
+        self._axes = self.ring.read_axes(slot, self.num_axes)
+        self._hats = self.ring.read_hats(slot, self.num_hats)
+        try:
+            self._instance_id = joystick.get_instance_id()
+        except (AttributeError, pygame.error):
+            self._instance_id = None
+        self._ticks_offset_ns = time.perf_counter_ns() - pygame.time.get_ticks() * 1_000_000
+        self._seed_needed = False
+        return True
+
+    def _event_time_ns(self, event, fallback: int) -> int:
+        # SDL ставит событию метку в мс от SDL_Init; если pygame её отдаёт,
+        # переводим в шкалу perf_counter_ns, иначе берём время выборки из очереди
+        ticks = getattr(event, "timestamp", None)
+        if ticks is None:
+            return fallback
+        return min(fallback, ticks * 1_000_000 + self._ticks_offset_ns)
+
+    def _drain_events(self, joystick) -> int:
+        if self._seed_needed:
+            return 1 if self._seed(joystick) else 0
+        try:
+            events = pygame.event.get(JOY_INPUT_EVENTS)
+            if not joystick.get_init():
+                self.connected = False
+                return 0
+        except pygame.error:
+            self.connected = False
+            return 0
+        if joystick is not self.joystick:
+            return 0
+        now = time.perf_counter_ns()
+        instance_id = self._instance_id
+        mask = self._mask
+        axes = self._axes
+        hats = self._hats
+        axes_dirty = False
+        axes_time = now
+        pushed = 0
+        for event in events:
+            if instance_id is not None and event.instance_id != instance_id:
+                continue
+            etype = event.type
+            if etype == pygame.JOYAXISMOTION:
+                if event.axis < len(axes):
+                    axes[event.axis] = event.value
+                    axes_dirty = True
+                    axes_time = self._event_time_ns(event, now)
+                continue
+            if etype == pygame.JOYBUTTONDOWN:
+                if event.button >= MAX_BUTTONS:
+                    continue
+                mask |= 1 << event.button
+            elif etype == pygame.JOYBUTTONUP:
+                if event.button >= MAX_BUTTONS:
+                    continue
+                mask &= ~(1 << event.button)
+            elif etype == pygame.JOYHATMOTION:
+                if event.hat >= len(hats):
+                    continue
+                hats[event.hat] = event.value
+            # Каждое нажатие/отпускание - отдельный кадр, чтобы фронты не слились
+            self._push(self._event_time_ns(event, now), mask, axes, hats)
+            axes_dirty = False
+            pushed += 1
+        if axes_dirty:
+            self._push(axes_time, mask, axes, hats)
+            pushed += 1
+        self._mask = mask
+        self.connected = True
+        return pushed
+
+    def poll(self, snapshot=None):
+        # Вызывается из GUI: последний кадр + фронты с прошлого вызова.
+        ring = self.ring
+        seq = ring.seq
+        if snapshot is None:
+            snapshot = InputSnapshot()
+        snapshot.frames = seq - self._last_seq
+        snapshot.overrun = False
+        if seq == 0 or snapshot.frames <= 0:
+            snapshot.pressed = snapshot.released = 0
+            snapshot.held = self._last_buttons
+            snapshot.frames = 0
+            return snapshot
+        first = self._last_seq
+        if seq - first > ring.capacity - 1:
+            first = seq - ring.capacity + 1
+            snapshot.overrun = True
+        prev = self._last_buttons
+        held = pressed = released = 0
+        capacity = ring.capacity
+        buttons = ring.buttons
+        for n in range(first, seq):
+            mask = buttons[n % capacity]
+            held |= mask
+            pressed |= mask & ~prev
+            released |= prev & ~mask
+            prev = mask
+        slot = (seq - 1) % capacity
+        snapshot.seq = seq
+        snapshot.timestamp_ns = ring.timestamps[slot]
+        snapshot.buttons = prev
+        snapshot.held = held
+        snapshot.pressed = pressed
+        snapshot.released = released
+        snapshot.axes = ring.read_axes(slot, self.num_axes)
+        snapshot.hats = ring.read_hats(slot, self.num_hats)
+        # Писатель мог обогнать нас на круг, пока мы читали - тогда данные слота
+        # уже от нового кадра; это допустимо, но отмечаем переполнение.
+        if ring.seq - first > capacity:
+            snapshot.overrun = True
+        self._last_seq = seq
+        self._last_buttons = prev
+        return snapshot
@@ -0,0 +1,499 @@
+"""
+ИК-камера Joy-Con (R): настройка MCU, приём изображения и запись потока.
+
+Камера висит на MCU геймпада. Включение - по шагам:
+
+    1. подкоманда 0x03 0x31   - входной отчёт 0x31 (362 байта) с данными MCU
+    2. подкоманда 0x22 0x01   - разбудить MCU, ждать статус "standby" (1)
+    3. подкоманда 0x21 0x21   - MCU в режим ИК (5), ждать статус 5
+    4. подкоманда 0x21 0x23 01 - режим "изображение" и номер последнего фрагмента
+    5. подкоманда 0x21 0x23 04 - регистры камеры: разрешение, экспозиция, подсветка...
+
+Аргументы подкоманды 0x21 закрываются CRC-8 MCU (полином 0x07). Статус
+MCU запрашивается выходным отчётом 0x11. Кадр приходит фрагментами по 300
+байт (отчёт 0x31, байт 49 = 0x03, номер фрагмента в байте 52, данные с
+байта 59), каждый фрагмент подтверждается отчётом 0x11 0x03; пропущенный
+запрашивается повторно. Раскладка байтов - по открытым разборам протокола
+(jc_toolkit, dekuNukem); на всех ревизиях прошивки не проверялась.
+
+IrFrameAssembler собирает фрагменты прямо в один из трёх заранее выделенных
+буферов кадра (тройная буферизация): поток чтения пишет в свой буфер,
+GUI забирает готовый без копирования и оборачивает его в QImage.
+
+Формат записи .irlog (little-endian) - принятые фрагменты по порядку:
+    заголовок   <4sHHH   b"GPIR", версия, ширина, высота
+    запись      <QB      метка от начала записи, нс; номер фрагмента
+                         + 300 байт данных
+IrReplay проигрывает запись через тот же сборщик кадров - без Joy-Con.
+
+    python ir_camera.py synthetic --frames 10 --record ir.irlog
+    python ir_camera.py replay:ir.irlog
+"""
+
+import struct
+import sys
+import threading
+import time
+
+from nintendo_protocol import (
+    INPUT_FULL, INPUT_MCU, NEUTRAL_RUMBLE, OUTPUT_MCU, SUBCOMMAND_INPUT_MODE, SUBCOMMAND_MCU_CONFIG,
+    SUBCOMMAND_MCU_STATE
+)
+
+MAGIC = b"GPIR"
+VERSION = 1
+HEADER = struct.Struct("<4sHHH")
+RECORD = struct.Struct("<QB")
+IR_REPORT_SIZE = 362
+FRAGMENT_SIZE = 300
+FRAGMENT_OFFSET = 59
+MCU_OUTPUT_SIZE = 48
+# Тип данных MCU в байте 49 отчёта 0x31
+MCU_REPORT_STATUS = 0x01
+MCU_REPORT_IR_DATA = 0x03
+MCU_REPORT_EMPTY = 0xFF
+# Запросы отчёта 0x11 (байт 10)
+MCU_REQUEST_STATUS = 0x01
+MCU_REQUEST_IR_DATA = 0x03
+# Команды подкоманды 0x21 (байт 11) и их ответы (байт 15)
+MCU_SET_MODE = 0x21
+MCU_WRITE = 0x23
+MCU_WRITE_IR_MODE = 0x01
+MCU_WRITE_REGISTERS = 0x04
+MCU_REPLY_MODE = 0x01
+MCU_REPLY_IR_MODE = 0x0B
+MCU_REPLY_REGISTERS = 0x13
+MCU_STANDBY = 0x01
+MCU_IR = 0x05
+IR_MODE_IMAGE = 0x07
+MCU_POLL_ATTEMPTS = 20
+MCU_POLL_S = 0.1
+# Без фрагментов дольше этого подтверждение повторяется - иначе MCU замолкает
+KEEPALIVE_S = 0.1
+MAX_REGISTERS = 9
+# Разрешение -> (ширина, высота, номер последнего фрагмента, значение регистра 0x00/0x2e)
+RESOLUTIONS = {
+    "320x240": (320, 240, 0xFF, 0x00),
+    "160x120": (160, 120, 0x3F, 0x50),
+    "80x60": (80, 60, 0x0F, 0x64),
+    "40x30": (40, 30, 0x03, 0x69),
+}
+DEFAULT_RESOLUTION = "160x120"
+EXPOSURE_US = 300
+DIGITAL_GAIN = 1
+# Регистры камеры после разрешения: (страница, регистр, значение)
+CAMERA_REGISTERS = (
+    (0x01, 0x30, (EXPOSURE_US * 31200 // 1000) & 0xFF),
+    (0x01, 0x31, (EXPOSURE_US * 31200 // 1000) >> 8),
+    (0x01, 0x32, 0x00),                          # ручная экспозиция
+    (0x00, 0x10, 0x00),                          # обе группы ИК-подсветки
+    (0x01, 0x2E, (DIGITAL_GAIN & 0x0F) << 4),
+    (0x01, 0x2F, (DIGITAL_GAIN & 0xF0) >> 4),
+    (0x00, 0x0E, 0x03),                          # фильтр внешнего света
+    (0x01, 0x43, 0xC8),                          # порог белого пикселя
+    (0x00, 0x11, 0x0F),                          # яркость подсветки 1/2
+    (0x00, 0x12, 0x0F),                          # яркость подсветки 3/4
+    (0x00, 0x2D, 0x00),                          # без отражения
+    (0x01, 0x67, 0x01),                          # шумоподавление
+    (0x01, 0x68, 0x23),
+    (0x01, 0x69, 0x44),
+    (0x00, 0x04, 0x32),                          # период обновления
+    (0x00, 0x07, 0x01),                          # применить
+)
+STATE_IDLE = "idle"
+STATE_CONFIGURING = "configuring"
+STATE_STREAMING = "streaming"
+
+_CRC8_TABLE = []
+for _byte in range(256):
+    _crc = _byte
+    for _ in range(8):
+        _crc = ((_crc << 1) ^ 0x07) & 0xFF if _crc & 0x80 else (_crc << 1) & 0xFF
+    _CRC8_TABLE.append(_crc)
+
+
+def mcu_crc8(data) -> int:
+    crc = 0
+    for byte in data:
+        crc = _CRC8_TABLE[crc ^ byte]
+    return crc
+
+
+def resolution_for_register(value: int):
+    for name, (_, _, _, register) in RESOLUTIONS.items():
+        if register == value:
+            return name
+    return None
+
+
+def mcu_config_args(command: int, payload) -> bytes:
+    # Аргументы подкоманды 0x21: команда MCU, 36 байт данных и их CRC
+    body = bytes(payload).ljust(36, b'\x00')
+    return bytes((command,)) + body + bytes((mcu_crc8(body),))
+
+
+def mcu_request_report(counter: int, request: int, args=b"") -> bytes:
+    return (bytes((OUTPUT_MCU, counter & 0x0F)) + NEUTRAL_RUMBLE + bytes((request,)) + bytes(args)).ljust(
+        MCU_OUTPUT_SIZE, b'\x00')
+
+
+def ir_ack_report(counter: int, acked: int, missing=0, resend=False, first=False) -> bytes:
+    # Подтверждение фрагмента; resend - повторить missing. first - самый первый запрос потока
+    report = bytearray(mcu_request_report(counter, MCU_REQUEST_IR_DATA))
+    report[12] = 0x01 if resend else 0x00
+    report[13] = missing
+    report[14] = acked
+    report[47] = 0xFF if first else mcu_crc8(report[11:47])
+    return bytes(report)
+
+
+def register_batches(resolution: str) -> list:
+    registers = ((0x00, 0x2E, RESOLUTIONS[resolution][3]),) + CAMERA_REGISTERS
+    batches = []
+    for start in range(0, len(registers), MAX_REGISTERS):
+        chunk = registers[start:start + MAX_REGISTERS]
+        payload = bytes((MCU_WRITE_REGISTERS, len(chunk))) + b"".join(bytes(entry) for entry in chunk)
+        batches.append(mcu_config_args(MCU_WRITE, payload))
+    return batches
+
+
+def wait_mcu_state(pad, state: int) -> bool:
+    # Опрос статуса MCU отчётом 0x11 до нужного режима; отчёты между делом идут в кнопки
+    for _ in range(MCU_POLL_ATTEMPTS):
+        try:
+            pad.device.write(mcu_request_report(pad.next_packet(), MCU_REQUEST_STATUS))
+            deadline = time.monotonic() + MCU_POLL_S
+            while time.monotonic() < deadline:
+                data = pad.device.read(IR_REPORT_SIZE, timeout_ms=20)
+                if not data:
+                    continue
+                pad.input.feed(data)
+                if data[0] == INPUT_MCU and len(data) > 56 and data[49] == MCU_REPORT_STATUS and data[56] == state:
+                    return True
+        except (IOError, OSError, ValueError):
+            return False
+    return False
+
+
+def configure_camera(pad, resolution: str):
+    # -> None или текст ошибки: на каком шаге MCU не ответил
+    if pad.send_subcommand(SUBCOMMAND_INPUT_MODE, bytes((INPUT_MCU,))) is None:
+        return "нет ответа на режим 0x31"
+    if pad.send_subcommand(SUBCOMMAND_MCU_STATE, b'\x01') is None or not wait_mcu_state(pad, MCU_STANDBY):
+        return "MCU не проснулся"
+    reply = pad.send_subcommand(SUBCOMMAND_MCU_CONFIG, mcu_config_args(MCU_SET_MODE, (0x00, MCU_IR)))
+    if not reply or reply[0] != MCU_REPLY_MODE or not wait_mcu_state(pad, MCU_IR):
+        return "MCU не перешёл в режим ИК"
+    last_fragment = RESOLUTIONS[resolution][2]
+    reply = pad.send_subcommand(SUBCOMMAND_MCU_CONFIG, mcu_config_args(
+        MCU_WRITE, (MCU_WRITE_IR_MODE, IR_MODE_IMAGE, last_fragment, 0x00, 0x05, 0x00, 0x18)))
+    if not reply or reply[0] != MCU_REPLY_IR_MODE:
+        return "камера не приняла режим изображения"
+    for args in register_batches(resolution):
+        reply = pad.send_subcommand(SUBCOMMAND_MCU_CONFIG, args)
+        if not reply or reply[0] != MCU_REPLY_REGISTERS:
+            return "камера не приняла регистры"
+    return None
+
+
+def shutdown_camera(pad):
+    # MCU в standby и сон, геймпад обратно в полный режим 0x30
+    if not pad.device:
+        return
+    pad.send_subcommand(SUBCOMMAND_MCU_CONFIG, mcu_config_args(MCU_SET_MODE, (0x00, MCU_STANDBY)), attempts=1)
+    pad.send_subcommand(SUBCOMMAND_MCU_STATE, b'\x00', attempts=1)
+    pad.send_subcommand(SUBCOMMAND_INPUT_MODE, bytes((INPUT_FULL,)), attempts=1)
+
+
+class IrFrameAssembler:
+    # Фрагменты пишутся сразу в буфер кадра; готовый кадр меняется местами с "готовым"
+    # под замком, GUI меняет "готовый" со своим - ни один буфер не пишется, пока его показывают
+    def __init__(self, width: int, height: int, recorder=None):
+        self.width = width
+        self.height = height
+        self.fragments = width * height // FRAGMENT_SIZE
+        self.buffers = [bytearray(width * height) for _ in range(3)]
+        self.views = [memoryview(buffer) for buffer in self.buffers]
+        self.recorder = recorder
+        self._back, self._ready, self._front = 0, 1, 2
+        self._fresh = False
+        self._lock = threading.Lock()
+        self.expected = 0
+        self.acked = 0
+        self.frames = 0
+        self.dropped = 0          # кадров, брошенных недособранными
+        self.resends = 0
+        self.fps = 0.0
+        self._last_frame_ns = None
+
+    def feed(self, fragment: int, data, offset=FRAGMENT_OFFSET) -> tuple:
+        # -> (resend, missing, acked) для ir_ack_report
+        if fragment == self.expected:
+            start = fragment * FRAGMENT_SIZE
+            target = self.views[self._back][start:start + FRAGMENT_SIZE]
+            if isinstance(data, list):
+                target[:] = bytes(data[offset:offset + FRAGMENT_SIZE])
+            else:
+                target[:] = memoryview(data)[offset:offset + FRAGMENT_SIZE]
+            if self.recorder is not None:
+                self.recorder.add(fragment, target)
+            self.acked = fragment
+            if fragment == self.fragments - 1:
+                self._complete()
+            else:
+                self.expected = fragment + 1
+            return False, 0, fragment
+        if fragment == 0 and fragment < self.expected:
+            # Начался следующий кадр - недособранный пропадает
+            self.dropped += 1
+            self.expected = 0
+            return self.feed(fragment, data, offset)
+        if fragment > self.expected:
+            self.resends += 1
+            return True, self.expected, self.acked
+        # Повтор уже принятого фрагмента - только подтвердить
+        return False, 0, fragment
+
+    def keepalive(self) -> tuple:
+        return False, 0, self.acked
+
+    def restart(self):
+        # Недособранный кадр забывается молча: конец записи при повторе по кругу
+        self.expected = 0
+
+    def _complete(self):
+        now = time.perf_counter_ns()
+        with self._lock:
+            self._back, self._ready = self._ready, self._back
+            self._fresh = True
+        self.expected = 0
+        self.frames += 1
+        if self._last_frame_ns is not None and now > self._last_frame_ns:
+            fps = 1e9 / (now - self._last_frame_ns)
+            self.fps = fps if self.fps == 0.0 else 0.8 * self.fps + 0.2 * fps
+        self._last_frame_ns = now
+
+    def take_frame(self):
+        # -> индекс буфера с новым кадром или None, если нового нет
+        with self._lock:
+            if not self._fresh:
+                return None
+            self._ready, self._front = self._front, self._ready
+            self._fresh = False
+            return self._front
+
+
+class IrCaptureWriter:
+    def __init__(self, path: str, width: int, height: int):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, width, height))
+        self.start_ns = None
+        self.count = 0
+
+    def add(self, fragment: int, chunk):
+        now = time.perf_counter_ns()
+        if self.start_ns is None:
+            self.start_ns = now
+        self.file.write(RECORD.pack(now - self.start_ns, fragment))
+        self.file.write(chunk)
+        self.count += 1
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+
+def load_capture(path: str) -> tuple:
+    # -> (ширина, высота, [(метка нс, номер фрагмента, смещение данных)], данные файла)
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        raise ValueError("файл короче заголовка")
+    magic, version, width, height = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("не запись ИК-камеры")
+    records = []
+    position = HEADER.size
+    step = RECORD.size + FRAGMENT_SIZE
+    while position + step <= len(data):
+        stamp, fragment = RECORD.unpack_from(data, position)
+        records.append((stamp, fragment, position + RECORD.size))
+        position += step
+    return width, height, records, data
+
+
+class IrStream:
+    # Поток чтения отчётов 0x31 - как HidReportMonitor: latest подходит окну для IMU
+    def __init__(self, pad, resolution=DEFAULT_RESOLUTION, record_path=None):
+        width, height = RESOLUTIONS[resolution][:2]
+        self.pad = pad
+        self.device = pad.device
+        self.resolution = resolution
+        self.recorder = IrCaptureWriter(record_path, width, height) if record_path else None
+        self.assembler = IrFrameAssembler(width, height, self.recorder)
+        self.state = STATE_IDLE
+        self.latest = None
+        self.error = None
+        self._thread = None
+        self._running = False
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def start(self):
+        if self._running:
+            return
+        self.error = None
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="ir-camera", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=3.0)
+            self._thread = None
+
+    def _run(self):
+        self.state = STATE_CONFIGURING
+        try:
+            self.error = configure_camera(self.pad, self.resolution)
+            if self.error is None and self._running:
+                self.state = STATE_STREAMING
+                self._stream()
+        except (IOError, OSError, ValueError) as e:
+            self.error = str(e)
+        self._running = False
+        try:
+            shutdown_camera(self.pad)
+        except (IOError, OSError, ValueError):
+            pass
+        if self.recorder is not None:
+            self.recorder.close()
+        self.state = STATE_IDLE
+
+    def _stream(self):
+        device = self.device
+        assembler = self.assembler
+        pad = self.pad
+        device.write(ir_ack_report(pad.next_packet(), 0, first=True))
+        last_write = time.monotonic()
+        while self._running:
+            data = device.read(IR_REPORT_SIZE, timeout_ms=50)
+            ack = None
+            if data:
+                self.latest = data
+                pad.input.feed(data)
+                if data[0] == INPUT_MCU and len(data) >= FRAGMENT_OFFSET + FRAGMENT_SIZE:
+                    if data[49] == MCU_REPORT_IR_DATA:
+                        ack = assembler.feed(data[52], data)
+                    elif data[49] == MCU_REPORT_EMPTY:
+                        ack = assembler.keepalive()
+            now = time.monotonic()
+            if ack is None and now - last_write > KEEPALIVE_S:
+                ack = assembler.keepalive()
+            if ack is not None:
+                resend, missing, acked = ack
+                device.write(ir_ack_report(pad.next_packet(), acked, missing, resend))
+                last_write = now
+
+
+class IrReplay:
+    # Запись .irlog через тот же сборщик; pump() вызывается таймером GUI
+    def __init__(self, path: str, speed=1.0, loop=True, clock=time.perf_counter_ns):
+        width, height, self.records, self.data = load_capture(path)
+        self.path = path
+        self.resolution = f"{width}x{height}"
+        self.assembler = IrFrameAssembler(width, height)
+        self.speed = speed
+        self.loop = loop
+        self.clock = clock
+        self.position = 0
+        self.error = None
+        self._started_ns = None
+        self._offset_ns = 0
+
+    @property
+    def running(self) -> bool:
+        return self._started_ns is not None
+
+    def start(self):
+        self.position = 0
+        self._offset_ns = 0
+        self._started_ns = self.clock()
+
+    def stop(self):
+        self._started_ns = None
+
+    def pump(self) -> int:
+        # Все фрагменты, чьё время подошло; speed=0 - вся запись сразу
+        if self._started_ns is None or not self.records:
+            return 0
+        now = self.clock()
+        fed = 0
+        data = self.data
+        while True:
+            if self.position >= len(self.records):
+                if not self.loop or self.speed <= 0:
+                    self._started_ns = None
+                    break
+                self._offset_ns += self.records[-1][0] + 1
+                self.position = 0
+                self.assembler.restart()
+            stamp, fragment, offset = self.records[self.position]
+            if self.speed > 0 and self._started_ns + (stamp + self._offset_ns) / self.speed > now:
+                break
+            self.assembler.feed(fragment, data, offset)
+            self.position += 1
+            fed += 1
+        return fed
+
+
+def main(argv=None):
+    import argparse
+    from controllers import NintendoController
+    from hid_transport import SyntheticTransport, make_transport_factory
+    parser = argparse.ArgumentParser(description="ИК-камера Joy-Con (R): поток кадров без GUI")
+    parser.add_argument("source", help="hid | synthetic | replay:<файл.irlog>")
+    parser.add_argument("--resolution", choices=list(RESOLUTIONS), default=DEFAULT_RESOLUTION)
+    parser.add_argument("--frames", type=int, default=10)
+    parser.add_argument("--record", help="записать принятые фрагменты в .irlog")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args(argv)
+    started = time.monotonic()
+    if args.source.startswith("replay:"):
+        replay = IrReplay(args.source.partition(':')[2], speed=0)
+        replay.start()
+        replay.pump()
+        assembler = replay.assembler
+        print(f"Запись {replay.resolution}: {len(replay.records)} фрагментов")
+    else:
+        if args.source == "synthetic":
+            factory = lambda: SyntheticTransport("joycon_right", speed=0)
+        else:
+            factory = make_transport_factory()
+        pad = NintendoController(factory)
+        if not pad.connect(0x2007):
+            print("Joy-Con (R) не найден")
+            return 1
+        stream = IrStream(pad, args.resolution, args.record)
+        stream.start()
+        assembler = stream.assembler
+        while stream.running and assembler.frames < args.frames and time.monotonic() - started < args.timeout:
+            time.sleep(0.01)
+        stream.stop()
+        pad.disconnect()
+        if stream.error:
+            print(f"Ошибка: {stream.error}")
+            return 1
+    elapsed = time.monotonic() - started
+    print(f"{assembler.frames} кадров {assembler.width}x{assembler.height} за {elapsed:.2f} с, "
+          f"брошено {assembler.dropped}, повторов фрагментов {assembler.resends}")
+    return 0 if assembler.frames else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
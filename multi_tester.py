@@ -0,0 +1,194 @@
+"""
+Параллельный тест всех подключённых геймпадов.
+
+У каждого геймпада своя PadSession: собственный AcquisitionEngine (поток
+опроса и кольцевой буфер), своя HID-сторона по привязке bind_hid_devices и
+своё состояние проверок report_model.TestState - те же проверки, что у
+консольного режима. Вибрация - узор RumbleScheduler с вердиктом MotorResponse
+по сэмплам IMU той же сессии, как в консольном режиме и вкладке "Тесты";
+геймпад, открытый по HID, вибрирует только через свой вывод устройства. Потоки сессий очередь SDL не трогают (pump_events=False),
+её прокачивает основной движок окна.
+"""
+
+import time
+
+import pygame
+
+from controllers import DEFAULT_TRANSPORT, bind_hid_devices, classify_gamepad, open_hid_controller, rumble_output
+from hid_reports import HidBatchReader
+from input_engine import AcquisitionEngine, DEFAULT_RATE_HZ, InputSnapshot
+from report_model import TestState, default_checks
+from rumble import DEFAULT_PATTERN, PATTERNS, MotorResponse, RumbleScheduler
+
+
+class PadSession:
+    def __init__(self, gp, joystick, rate_hz=DEFAULT_RATE_HZ, transport_factory=DEFAULT_TRANSPORT, hid_info=None,
+                 min_buttons=1):
+        self.gp = gp
+        self.min_buttons = min_buttons
+        self.instance_id = gp['instance_id']
+        self.joystick = joystick
+        self.family = classify_gamepad(gp['name'])
+        self.controller, self.report_size, self.layouts = open_hid_controller(self.family, transport_factory, hid_info)
+        self.checks = default_checks(gp['axes'], self.controller is not None)
+        self.state = TestState(gp['buttons'], min_buttons, self.checks)
+        self.engine = AcquisitionEngine(rate_hz, pump_events=False)
+        self.reader = HidBatchReader()
+        self.snapshot = InputSnapshot()
+        self.rumble_play = None   # (планировщик, отклик) играющего узора
+        self.connected = True
+        self.started = time.monotonic()
+        self.finished = None
+
+    def start(self):
+        self.engine.set_joystick(self.joystick)
+        self.engine.start()
+
+    def stop(self):
+        self.engine.stop()
+        self.stop_rumble()
+        if self.controller is not None:
+            # Вывод устройства при остановке сам гасит моторы
+            self.controller.disconnect()
+            self.controller = None
+        else:
+            try:
+                self.joystick.rumble(0, 0, 0)
+            except pygame.error:
+                pass
+
+    def reset(self):
+        self.state.reset()
+        self.started = time.monotonic()
+        self.finished = None
+
+    def poll(self) -> bool:
+        # -> True, если с прошлого вызова что-то изменилось в проверках
+        before = self.connected, self.state.revision
+        snapshot = self.engine.poll(self.snapshot)
+        self.connected = self.engine.connected
+        if snapshot.frames:
+            self.state.update_input(snapshot)
+        controller = self.controller
+        if controller is not None and controller.device:
+            self.reader.drain(controller.device, self.report_size, self.layouts)
+            if self.reader.samples:
+                self.state.update_gyro(self.reader.samples)
+                if self.rumble_play is not None:
+                    self.rumble_play[1].add(self.reader.samples, self.reader.stamps, time.perf_counter_ns())
+        self.poll_rumble()
+        if self.finished is None and self.passed:
+            self.finished = time.monotonic()
+        return (self.connected, self.state.revision) != before
+
+    def rumble(self, pattern=DEFAULT_PATTERN) -> bool:
+        # -> False, если узор не запустился; вердикт - в poll() после узора
+        self.stop_rumble()
+        output = rumble_output(self.joystick, self.controller)
+        scheduler = RumbleScheduler(output)
+        if not scheduler.play(PATTERNS[pattern][1]()):
+            self.state.set_vibration(False, {"passed": False, "reason": scheduler.error})
+            return False
+        self.rumble_play = scheduler, MotorResponse(output.sides)
+        return True
+
+    def poll_rumble(self):
+        # С IMU мотор без отклика - брак, без IMU вибрация засчитывается по тому, что геймпад принял команду
+        if self.rumble_play is None or self.rumble_play[0].running:
+            return
+        (scheduler, response), self.rumble_play = self.rumble_play, None
+        result = response.analyze(scheduler.timeline)
+        if scheduler.error:
+            result.update(passed=False, reason=scheduler.error)
+        elif result["passed"] is None and not scheduler.accepted:
+            result["reason"] = "геймпад не принял вибрацию"
+        self.state.set_vibration(scheduler.accepted if result["passed"] is None else result["passed"], result)
+
+    def stop_rumble(self):
+        if self.rumble_play is not None:
+            self.rumble_play[0].stop()
+            self.rumble_play = None
+
+    @property
+    def rumbling(self) -> bool:
+        return self.rumble_play is not None
+
+    @property
+    def passed(self) -> bool:
+        return self.state.all_passed
+
+    @property
+    def score(self) -> int:
+        return self.state.score()
+
+    @property
+    def duration(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    def to_dict(self) -> dict:
+        controller = self.controller
+        result = {
+            "device": {"name": self.gp['name'], "instance_id": self.instance_id,
+                       "buttons": self.gp['buttons'], "axes": self.gp['axes'], "hats": self.gp['hats'],
+                       "hid_vid": controller.vid if controller else None,
+                       "hid_pid": controller.pid if controller else None,
+                       "hid_serial": controller.serial if controller else None,
+                       "hid_bus": controller.connection_type if controller else None},
+            "duration_s": round(self.duration, 3),
+        }
+        result.update(self.state.to_dict())
+        return result
+
+
+class MultiTester:
+    def __init__(self, enumerator=None, rate_hz=DEFAULT_RATE_HZ, transport_factory=DEFAULT_TRANSPORT):
+        self.enumerator = enumerator
+        self.rate_hz = rate_hz
+        self.transport_factory = transport_factory
+        self.sessions = {}        # instance_id -> PadSession, в порядке подключения
+        self.watch = False
+
+    def sync(self, gamepads, joystick_for):
+        # gamepads - все подключённые в порядке подключения (HotplugWatcher.ordered),
+        # joystick_for(instance_id) -> открытый джойстик; -> (новые, ушедшие) сессии
+        present = {gp['instance_id'] for gp in gamepads}
+        removed = [self.sessions.pop(key) for key in list(self.sessions) if key not in present]
+        for session in removed:
+            session.stop()
+        added = []
+        new = [gp for gp in gamepads if gp['instance_id'] not in self.sessions]
+        if new:
+            # Привязка по всему списку: занятые пути HID достаются тем же геймпадам
+            bound = bind_hid_devices(gamepads, self.enumerator)
+            for gp in new:
+                joystick = joystick_for(gp['instance_id'])
+                if joystick is None:
+                    continue
+                session = PadSession(gp, joystick, self.rate_hz, self.transport_factory, bound.get(gp['instance_id']))
+                session.engine.set_watch(self.watch)
+                session.start()
+                self.sessions[gp['instance_id']] = session
+                added.append(session)
+        return added, removed
+
+    def poll(self) -> list:
+        return [session for session in self.sessions.values() if session.poll()]
+
+    def set_rate(self, rate_hz: int):
+        self.rate_hz = rate_hz
+        for session in self.sessions.values():
+            session.engine.set_rate(rate_hz)
+
+    def set_watch(self, enabled: bool):
+        self.watch = enabled
+        for session in self.sessions.values():
+            session.engine.set_watch(enabled)
+
+    def reset(self):
+        for session in self.sessions.values():
+            session.reset()
+
+    def stop(self):
+        for session in self.sessions.values():
+            session.stop()
+        self.sessions = {}
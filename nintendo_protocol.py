@@ -0,0 +1,212 @@
+"""
+Протокол Joy-Con / Pro Controller поверх HID, без SDL.
+
+Выходной отчёт 0x01 - подкоманда: счётчик пакетов (0-15), 8 байт вибрации,
+номер подкоманды и аргументы. Ответ приходит входным отчётом 0x21 вперемешку
+с обычными: байт 13 - ACK (старший бит) и тип данных, байт 14 - номер
+подкоманды, дальше данные. Все входные отчёты 0x21/0x30/0x31 начинаются с
+одного и того же состояния: таймер, батарея, кнопки (3 байта) и два стика
+(по 12 бит на ось).
+
+После подкоманд 0x40 (включить IMU) и 0x03 0x30 (полный режим) геймпад шлёт
+отчёт 0x30 каждые 15 мс с тремя сэмплами IMU через 5 мс - 200 Гц IMU; до
+этого идёт простой отчёт 0x3F без IMU. Режим 0x31 - тот же отчёт плюс данные
+MCU (ИК-камера, см. ir_camera).
+
+HD-вибрация: 4 байта на привод (левый Joy-Con - байты 2-5 выходного отчёта,
+правый - 6-9) - частота и амплитуда верхней (81-1252 Гц) и нижней
+(41-626 Гц) полосы. Отчёт 0x10 несёт только вибрацию, без подкоманды.
+"""
+
+import math
+import struct
+
+# Нейтральная вибрация в каждом выходном отчёте
+NEUTRAL_RUMBLE = bytes((0x00, 0x01, 0x40, 0x40, 0x00, 0x01, 0x40, 0x40))
+OUTPUT_SUBCOMMAND = 0x01
+OUTPUT_RUMBLE = 0x10
+OUTPUT_MCU = 0x11
+REPLY_SUBCOMMAND = 0x21
+INPUT_FULL = 0x30
+INPUT_MCU = 0x31
+INPUT_SIMPLE = 0x3F
+# Отчёты с полным состоянием кнопок и стиков в байтах 1-12
+STANDARD_REPORTS = (0x21, 0x30, 0x31, 0x32, 0x33)
+SUBCOMMAND_INPUT_MODE = 0x03
+SUBCOMMAND_SPI_READ = 0x10
+SUBCOMMAND_MCU_CONFIG = 0x21
+SUBCOMMAND_MCU_STATE = 0x22
+SUBCOMMAND_ENABLE_IMU = 0x40
+SUBCOMMAND_ENABLE_VIBRATION = 0x48
+# USB (Pro Controller): рукопожатие и отключение таймаута USB перед подкомандами
+USB_COMMAND = 0x80
+USB_REPLY = 0x81
+USB_HANDSHAKE = 0x02
+USB_HID_ONLY = 0x04
+SUBCOMMAND_TIMEOUT = 0.3
+# Кнопки: (имя, байт отчёта, бит)
+BUTTON_BITS = {
+    "Y": (3, 0x01), "X": (3, 0x02), "B": (3, 0x04), "A": (3, 0x08),
+    "SR(R)": (3, 0x10), "SL(R)": (3, 0x20), "R": (3, 0x40), "ZR": (3, 0x80),
+    "Minus": (4, 0x01), "Plus": (4, 0x02), "RStick": (4, 0x04), "LStick": (4, 0x08),
+    "Home": (4, 0x10), "Capture": (4, 0x20),
+    "Down": (5, 0x01), "Up": (5, 0x02), "Right": (5, 0x04), "Left": (5, 0x08),
+    "SR(L)": (5, 0x10), "SL(L)": (5, 0x20), "L": (5, 0x40), "ZL": (5, 0x80),
+}
+# Кнопки каждой модели по порядку номеров, как их нумерует проверка "buttons"
+BUTTON_LAYOUTS = {
+    "joycon_left": ("Up", "Down", "Left", "Right", "L", "ZL", "SL(L)", "SR(L)", "Minus", "LStick", "Capture"),
+    "joycon_right": ("A", "B", "X", "Y", "R", "ZR", "SL(R)", "SR(R)", "Plus", "RStick", "Home"),
+    "pro_controller": ("A", "B", "X", "Y", "Up", "Down", "Left", "Right", "L", "R", "ZL", "ZR", "Minus", "Plus",
+                       "LStick", "RStick", "Home", "Capture"),
+}
+CONTROLLER_NAMES = {"joycon_left": "Joy-Con (L)", "joycon_right": "Joy-Con (R)", "pro_controller": "Pro Controller"}
+# Номинальные центр и ход стика в отсчётах 12 бит - без чтения калибровки стиков из SPI
+STICK_CENTER = 2048
+STICK_RANGE = 1400
+# Оси как у SDL: стики -1..1 (вверх - минус), ZL/ZR цифровые: -1 отпущен, 1 нажат
+AXES = 6
+BATTERY_LEVELS = (0, 25, 50, 75, 100)
+# Полосы HD-вибрации, Гц; частота ниже HD_RUMBLE_SPLIT_HZ идёт в нижнюю полосу
+HD_RUMBLE_HIGH = (81.75, 1252.0)
+HD_RUMBLE_LOW = (40.875, 626.5)
+HD_RUMBLE_SPLIT_HZ = 160.0
+
+
+def subcommand_report(counter: int, subcommand: int, args=b"", rumble=NEUTRAL_RUMBLE) -> bytes:
+    return bytes((OUTPUT_SUBCOMMAND, counter & 0x0F)) + rumble + bytes((subcommand,)) + bytes(args)
+
+
+def rumble_report(counter: int, left=NEUTRAL_RUMBLE[:4], right=NEUTRAL_RUMBLE[4:]) -> bytes:
+    return bytes((OUTPUT_RUMBLE, counter & 0x0F)) + bytes(left) + bytes(right)
+
+
+def encode_amplitude(amplitude: float) -> int:
+    # Кусочно-логарифмическая шкала амплитуды; 1.0 -> 100 (верхняя полоса 0xC8, нижняя 0x72)
+    amplitude = min(1.0, amplitude)
+    if amplitude <= 0.0:
+        return 0
+    if amplitude > 0.23:
+        return round(math.log2(amplitude * 8.7) * 32)
+    if amplitude > 0.12:
+        return round(math.log2(amplitude * 17) * 16)
+    return max(0, round((math.log2(amplitude) * 32 - 96) / (4 - 2 * amplitude)))
+
+
+def encode_rumble(frequency: float, amplitude: float) -> bytes:
+    # 4 байта одного привода: тон в той полосе, куда попадает частота, вторая полоса молчит
+    high_hz, low_hz, high_amp, low_amp = 320.0, 160.0, 0, 0
+    level = encode_amplitude(amplitude)
+    if frequency >= HD_RUMBLE_SPLIT_HZ:
+        high_hz, high_amp = min(max(frequency, HD_RUMBLE_HIGH[0]), HD_RUMBLE_HIGH[1]), level * 2
+    else:
+        low_hz, low_amp = min(max(frequency, HD_RUMBLE_LOW[0]), HD_RUMBLE_LOW[1]), level // 2
+    high = (round(math.log2(high_hz / 10.0) * 32) - 0x60) * 4
+    low = round(math.log2(low_hz / 10.0) * 32) - 0x40
+    low_amp += 0x40
+    return bytes((high & 0xFF, high_amp + (high >> 8), low + (low_amp >> 8), low_amp & 0xFF))
+
+
+def parse_reply(data):
+    # -> (ack, подкоманда, данные) для отчёта 0x21, иначе None
+    if not data or len(data) < 15 or data[0] != REPLY_SUBCOMMAND:
+        return None
+    return bool(data[13] & 0x80), data[14], bytes(data[15:])
+
+
+def decode_stick(data, offset: int) -> tuple:
+    # 3 байта: X - младшие 12 бит, Y - старшие
+    x = data[offset] | ((data[offset + 1] & 0x0F) << 8)
+    y = (data[offset + 1] >> 4) | (data[offset + 2] << 4)
+    return x, y
+
+
+def stick_axis(raw: int, invert=False) -> float:
+    value = (raw - STICK_CENTER) / STICK_RANGE
+    value = -value if invert else value
+    return max(-1.0, min(1.0, value))
+
+
+class NintendoSnapshot:
+    __slots__ = ("buttons", "held", "axes", "hats", "frames")
+
+    def __init__(self):
+        self.buttons = 0
+        self.held = 0
+        self.axes = []
+        self.hats = []
+        self.frames = 0
+
+
+class NintendoInput:
+    # Кнопки, стики и батарея из входных отчётов; feed() подходит как on_report для HidBatchReader
+    def __init__(self, controller_type="pro_controller"):
+        self.set_type(controller_type)
+
+    def set_type(self, controller_type: str):
+        self.controller_type = controller_type
+        self.names = BUTTON_LAYOUTS.get(controller_type, BUTTON_LAYOUTS["pro_controller"])
+        self.bits = [BUTTON_BITS[name] for name in self.names]
+        self.has_left = controller_type != "joycon_right"
+        self.has_right = controller_type != "joycon_left"
+        self.reset()
+
+    def reset(self):
+        self.buttons = 0
+        self.held = 0
+        self.axes = [0.0, 0.0, 0.0, 0.0, -1.0, -1.0]
+        self.battery = None       # полубайт батареи из последнего отчёта
+        self.reports = 0
+        self.frames = 0           # отчётов с прошлого poll()
+
+    def feed(self, data) -> bool:
+        if not data or len(data) < 12 or data[0] not in STANDARD_REPORTS:
+            return False
+        mask = 0
+        for n, (byte, bit) in enumerate(self.bits):
+            if data[byte] & bit:
+                mask |= 1 << n
+        axes = self.axes
+        if self.has_left:
+            x, y = decode_stick(data, 6)
+            axes[0], axes[1] = stick_axis(x), stick_axis(y, invert=True)
+            axes[4] = 1.0 if data[5] & 0x80 else -1.0
+        if self.has_right:
+            x, y = decode_stick(data, 9)
+            axes[2], axes[3] = stick_axis(x), stick_axis(y, invert=True)
+            axes[5] = 1.0 if data[3] & 0x80 else -1.0
+        self.buttons = mask
+        self.held |= mask
+        self.battery = data[2] >> 4
+        self.reports += 1
+        self.frames += 1
+        return True
+
+    def poll(self, snapshot=None) -> NintendoSnapshot:
+        # Как AcquisitionEngine.poll: held - всё, что нажималось с прошлого вызова
+        if snapshot is None:
+            snapshot = NintendoSnapshot()
+        snapshot.buttons = self.buttons
+        snapshot.held = self.held
+        snapshot.axes = list(self.axes)
+        snapshot.frames = self.frames
+        self.held = self.buttons
+        self.frames = 0
+        return snapshot
+
+    def battery_level(self):
+        # -> (процент, заряжается) или (None, False) до первого отчёта
+        if self.battery is None:
+            return None, False
+        return BATTERY_LEVELS[min(self.battery >> 1, 4)], bool(self.battery & 0x01)
+
+
+def usb_command(command: int) -> bytes:
+    return bytes((USB_COMMAND, command))
+
+
+def unpack_spi_reply(payload: bytes, address: int, length: int):
+    # Ответ 0x10: адрес (4 байта), длина, данные
+    if len(payload) < 5 + length or struct.unpack_from("<I", payload)[0] != address:
+        return None
+    return payload[5:5 + length]
@@ -0,0 +1,177 @@
+"""
+Проверки теста геймпада без Qt: кнопки, стики, триггеры, вибрация, гироскоп.
+Пороги те же, что использует отчёт в GUI, поэтому консольный прогон и окно
+оценивают геймпад одинаково. Запись шума и дрейфа гироскопа (imu_noise) в
+процент не входит, но не прошедшая её - брак.
+"""
+
+STICK_THRESHOLD = 0.3
+TRIGGER_THRESHOLD = 0.3
+GYRO_THRESHOLD = 0.0
+CHECKS = ("buttons", "sticks", "triggers", "vibration", "gyro")
+
+
+def trigger_value(raw: float) -> float:
+    # Триггеры SDL приходят в -1..1 (отпущен = -1), у части драйверов в 0..1
+    return max(0, raw) if raw > 0 else (raw + 1) / 2 if raw < 0 else 0
+
+
+def default_checks(axes: int, imu: bool) -> list:
+    # Всё, что геймпад в состоянии пройти: триггеры - с 6 осями, гироскоп - с HID
+    return [c for c in CHECKS if not (c == "triggers" and axes < 6) and not (c == "gyro" and not imu)]
+
+
+class TestState:
+    # Наблюдаемое состояние проверок: on_check(key, passed), on_buttons(pressed, total) и
+    # on_noise(result) вызываются только на переходах, счёт пройденных ведётся по ходу, а не пересчётом
+    def __init__(self, buttons_total=0, min_buttons=1, checks=CHECKS):
+        self.buttons_total = buttons_total
+        self.min_buttons = min_buttons
+        self.checks = tuple(checks)
+        self.on_check = None
+        self.on_buttons = None
+        self.on_noise = None
+        self.revision = 0         # растёт на каждом переходе - для опроса без колбэков
+        self.reset()
+
+    def reset(self):
+        previous = getattr(self, "passed", {})
+        had_noise = getattr(self, "noise", None) is not None
+        self.buttons_pressed = set()
+        self.passed = dict.fromkeys(CHECKS, False)
+        self.passed_count = 0     # пройдено среди self.checks
+        self.stick_max = 0.0
+        self.trigger_max = 0.0
+        self.gyro_samples = 0
+        self.gyro_max = 0.0
+        self.vibration = None     # итог rumble.MotorResponse.analyze последнего узора
+        self.noise = None         # итог imu_noise.analyze_noise
+        self.revision += 1
+        for key in CHECKS:
+            if previous.get(key) and self.on_check:
+                self.on_check(key, False)
+        if self.on_buttons:
+            self.on_buttons(0, self.buttons_total)
+        if had_noise and self.on_noise:
+            self.on_noise(None)
+
+    def set_checks(self, checks):
+        self.checks = tuple(checks)
+        self.passed_count = sum(1 for key in self.checks if self.passed[key])
+        self.revision += 1
+
+    def set_buttons_total(self, total: int):
+        if total == self.buttons_total:
+            return
+        self.buttons_total = total
+        self.revision += 1
+        if self.on_buttons:
+            self.on_buttons(len(self.buttons_pressed), total)
+
+    def mark(self, key: str):
+        if self.passed[key]:
+            return
+        self.passed[key] = True
+        if key in self.checks:
+            self.passed_count += 1
+        self.revision += 1
+        if self.on_check:
+            self.on_check(key, True)
+
+    def press_buttons(self, btn_ids):
+        before = len(self.buttons_pressed)
+        for btn_id in btn_ids:
+            if btn_id < self.buttons_total:
+                self.buttons_pressed.add(btn_id)
+        count = len(self.buttons_pressed)
+        if count == before:
+            return
+        self.revision += 1
+        if self.on_buttons:
+            self.on_buttons(count, self.buttons_total)
+        if count >= max(1, self.min_buttons):
+            self.mark("buttons")
+
+    def update_sticks(self, deflection: float):
+        if deflection > self.stick_max:
+            self.stick_max = deflection
+        if deflection > STICK_THRESHOLD:
+            self.mark("sticks")
+
+    def update_triggers(self, pull: float):
+        if pull > self.trigger_max:
+            self.trigger_max = pull
+        if pull > TRIGGER_THRESHOLD:
+            self.mark("triggers")
+
+    def update_input(self, snapshot):
+        held = snapshot.held
+        if held:
+            ids = []
+            btn_id = 0
+            while held:
+                if held & 1:
+                    ids.append(btn_id)
+                held >>= 1
+                btn_id += 1
+            self.press_buttons(ids)
+        axes = snapshot.axes
+        if len(axes) >= 4:
+            self.update_sticks(max(abs(axes[0]), abs(axes[1]), abs(axes[2]), abs(axes[3])))
+        if len(axes) >= 6:
+            self.update_triggers(max(trigger_value(axes[4]), trigger_value(axes[5])))
+
+    def update_gyro(self, samples):
+        for gx, gy, gz, _, _, _ in samples:
+            self.gyro_samples += 1
+            magnitude = max(abs(gx), abs(gy), abs(gz))
+            self.gyro_max = max(self.gyro_max, magnitude)
+            if magnitude > GYRO_THRESHOLD:
+                self.mark("gyro")
+
+    def set_vibration(self, ok: bool, response=None):
+        # response - отклик моторов по IMU; без IMU ok значит лишь, что геймпад принял команду
+        if response is not None:
+            self.vibration = response
+            self.revision += 1
+        if ok:
+            self.mark("vibration")
+
+    def set_noise(self, result: dict):
+        self.noise = result
+        self.revision += 1
+        if self.on_noise:
+            self.on_noise(result)
+
+    @property
+    def noise_failed(self) -> bool:
+        return self.noise is not None and not self.noise["passed"]
+
+    @property
+    def all_passed(self) -> bool:
+        return bool(self.checks) and self.passed_count == len(self.checks) and not self.noise_failed
+
+    def score(self, checks=None) -> int:
+        if checks is None or tuple(checks) == self.checks:
+            return int(self.passed_count * 100 / len(self.checks)) if self.checks else 0
+        if not checks:
+            return 0
+        return int(sum(1 for key in checks if self.passed[key]) * 100 / len(checks))
+
+    def to_dict(self, checks=None) -> dict:
+        checks = self.checks if checks is None else checks
+        metrics = {
+            "buttons": {"pressed": sorted(self.buttons_pressed), "total": self.buttons_total},
+            "sticks": {"max_deflection": round(self.stick_max, 3), "threshold": STICK_THRESHOLD},
+            "triggers": {"max_pull": round(self.trigger_max, 3), "threshold": TRIGGER_THRESHOLD},
+            "vibration": {"response": self.vibration} if self.vibration is not None else {},
+            "gyro": {"samples": self.gyro_samples, "max": round(self.gyro_max, 3)},
+        }
+        result = {
+            "score": self.score(checks),
+            "passed": all(self.passed[key] for key in checks) and not self.noise_failed,
+            "checks": {key: dict(passed=self.passed[key], **metrics[key]) for key in checks},
+        }
+        if self.noise is not None:
+            result["gyro_noise"] = self.noise
+        return result
@@ -0,0 +1,224 @@
+"""
+Локальная история результатов в SQLite.
+
+Результат - тот же словарь, что печатает консольный режим и пишет стенд
+(device, passed, score, checks, duration_s, date). В таблицу results
+раскладываются поля для поиска (VID/PID, серийный номер, дата, итог), в
+checks - итог каждой проверки; полный словарь хранится рядом в JSON.
+Индексы по серийному номеру, дате и PID+дате держат выборки вида "весь брак
+PID 0x0BA0 за неделю" быстрыми и на тысячах записей.
+
+    python result_store.py --pid 0x0BA0 --failed --since 2026-10-01 --csv brak.csv
+    python result_store.py --serial AA:BB:CC --json history.json
+"""
+
+import csv
+import json
+import sqlite3
+import sys
+import time
+from datetime import date, datetime
+
+from report_model import CHECKS
+
+DEFAULT_STORE = "results.db"
+SOURCE_WINDOW = "window"
+SOURCE_STATION = "station"
+SOURCE_CLI = "cli"
+CSV_COLUMNS = ("id", "date", "source", "name", "vid", "pid", "serial", "bus", "passed", "score", "duration_s",
+               "failed_step")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    source TEXT NOT NULL,
+    name TEXT,
+    vid INTEGER,
+    pid INTEGER,
+    serial TEXT,
+    bus TEXT,
+    passed INTEGER NOT NULL,
+    score INTEGER,
+    duration_s REAL,
+    failed_step TEXT,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS checks (
+    result_id INTEGER NOT NULL REFERENCES results(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    passed INTEGER NOT NULL,
+    PRIMARY KEY (result_id, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_results_serial ON results(serial, date);
+CREATE INDEX IF NOT EXISTS idx_results_date ON results(date);
+CREATE INDEX IF NOT EXISTS idx_results_pid_date ON results(pid, date);
+CREATE INDEX IF NOT EXISTS idx_checks_name ON checks(name, passed);
+"""
+
+
+def date_bound(value):
+    # '2026-10-01', date или datetime -> строка в формате поля date
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%dT%H:%M:%S')
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Неизвестный тип даты: {type(value).__name__}")
+
+
+def as_record(result: dict, source: str, result_id=None) -> dict:
+    # Запись в том виде, что отдаёт query(), - для выгрузки ещё не сохранённого результата
+    device = result.get("device", {})
+    return {"id": result_id, "date": result.get("date"), "source": source, "name": device.get("name"),
+            "vid": device.get("hid_vid"), "pid": device.get("hid_pid"), "serial": device.get("hid_serial") or None,
+            "bus": device.get("hid_bus"), "passed": bool(result.get("passed")), "score": result.get("score"),
+            "duration_s": result.get("duration_s"), "failed_step": result.get("failed_step"), "result": result}
+
+
+class ResultStore:
+    def __init__(self, path=DEFAULT_STORE):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        if path != ":memory:":
+            # Запись не блокирует чтение истории, синхронизация - на контрольных точках
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("PRAGMA foreign_keys=ON")
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def add(self, result: dict, source=SOURCE_WINDOW) -> int:
+        with self.db:
+            return self._insert(result, source)
+
+    def add_many(self, results, source=SOURCE_WINDOW) -> int:
+        # Одной транзакцией - для импорта пачки старых результатов
+        with self.db:
+            for result in results:
+                self._insert(result, source)
+        return len(results)
+
+    def _insert(self, result: dict, source: str) -> int:
+        device = result.get("device", {})
+        checks = result.get("checks", {})
+        cursor = self.db.execute(
+            "INSERT INTO results (date, source, name, vid, pid, serial, bus, passed, score, duration_s, failed_step,"
+            " data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (result.get("date") or time.strftime('%Y-%m-%dT%H:%M:%S'), source, device.get("name"),
+             device.get("hid_vid"), device.get("hid_pid"), device.get("hid_serial") or None, device.get("hid_bus"),
+             int(bool(result.get("passed"))), result.get("score"), result.get("duration_s"),
+             result.get("failed_step"), json.dumps(result, ensure_ascii=False)))
+        result_id = cursor.lastrowid
+        self.db.executemany(
+            "INSERT INTO checks (result_id, name, passed) VALUES (?, ?, ?)",
+            [(result_id, key, int(bool(check.get("passed")))) for key, check in checks.items()])
+        return result_id
+
+    def query(self, serial=None, vid=None, pid=None, passed=None, failed_check=None, since=None, until=None,
+              source=None, limit=None) -> list:
+        # Все условия через AND; since/until - границы по дате включительно (до until - не включая)
+        where, params = [], []
+        for column, value in (("serial", serial), ("vid", vid), ("pid", pid), ("source", source)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+        if passed is not None:
+            where.append("passed = ?")
+            params.append(int(bool(passed)))
+        if since is not None:
+            where.append("date >= ?")
+            params.append(date_bound(since))
+        if until is not None:
+            where.append("date < ?")
+            params.append(date_bound(until))
+        if failed_check is not None:
+            where.append("id IN (SELECT result_id FROM checks WHERE name = ? AND passed = 0)")
+            params.append(failed_check)
+        sql = "SELECT * FROM results"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY date DESC, id DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return [self._record(row) for row in self.db.execute(sql, params)]
+
+    def count(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    @staticmethod
+    def _record(row) -> dict:
+        record = {key: row[key] for key in CSV_COLUMNS}
+        record["passed"] = bool(record["passed"])
+        record["result"] = json.loads(row["data"])
+        return record
+
+
+def export_csv(path: str, records: list):
+    # Плоская таблица: поля записи + по столбцу на проверку (1/0/пусто)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_COLUMNS + tuple(f"check_{key}" for key in CHECKS))
+        for record in records:
+            checks = record["result"].get("checks", {})
+            row = [record[key] for key in CSV_COLUMNS]
+            row[CSV_COLUMNS.index("passed")] = int(record["passed"])
+            for key in ("vid", "pid"):
+                value = record[key]
+                row[CSV_COLUMNS.index(key)] = f"0x{value:04X}" if value is not None else ""
+            row += [int(checks[key]["passed"]) if key in checks else "" for key in CHECKS]
+            writer.writerow(row)
+
+
+def export_json(path: str, records: list):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump([dict(record["result"], id=record["id"], source=record["source"]) for record in records],
+                  f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+
+def main(argv=None) -> int:
+    import argparse
+    parser = argparse.ArgumentParser(description="Выборка и выгрузка истории результатов")
+    parser.add_argument("--db", default=DEFAULT_STORE, help=f"файл базы (по умолчанию {DEFAULT_STORE})")
+    parser.add_argument("--serial")
+    parser.add_argument("--vid", type=lambda v: int(v, 0))
+    parser.add_argument("--pid", type=lambda v: int(v, 0))
+    parser.add_argument("--failed", action="store_true", help="только брак")
+    parser.add_argument("--passed", action="store_true", help="только годные")
+    parser.add_argument("--failed-check", choices=CHECKS, help="не прошла эта проверка")
+    parser.add_argument("--since", help="с даты, например 2026-10-01")
+    parser.add_argument("--until", help="до даты (не включая)")
+    parser.add_argument("--source", choices=(SOURCE_WINDOW, SOURCE_STATION, SOURCE_CLI))
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--csv", dest="csv_path", help="выгрузить в CSV")
+    parser.add_argument("--json", dest="json_path", help="выгрузить в JSON")
+    args = parser.parse_args(argv)
+    passed = False if args.failed else True if args.passed else None
+    store = ResultStore(args.db)
+    started = time.perf_counter()
+    records = store.query(serial=args.serial, vid=args.vid, pid=args.pid, passed=passed,
+                          failed_check=args.failed_check, since=args.since, until=args.until, source=args.source,
+                          limit=args.limit)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if args.csv_path:
+        export_csv(args.csv_path, records)
+    if args.json_path:
+        export_json(args.json_path, records)
+    if not args.csv_path and not args.json_path:
+        for record in records:
+            ids = f"{record['vid']:04X}:{record['pid']:04X}" if record['pid'] is not None else "----:----"
+            print(f"{record['date']}  {ids}  {record['serial'] or '-':<20} {'годен' if record['passed'] else 'брак':<6}"
+                  f" {record['name']}")
+    print(f"Найдено {len(records)} из {store.count()} за {elapsed_ms:.1f} мс", file=sys.stderr)
+    store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
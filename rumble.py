@@ -0,0 +1,329 @@
+"""
+Вибрация по программе: узоры, планировщик с миллисекундной точностью и
+проверка отклика моторов по акселерометру.
+
+Узор - список кадров RumbleFrame (длительность, амплитуда левого и правого
+мотора 0..1, частота). RumbleScheduler играет его в своём потоке: кадры
+переключаются по абсолютному расписанию от perf_counter, последнюю
+миллисекунду поток досыпает с sleep(0) - ошибка переключения меньше 1 мс и не
+накапливается. Выходы:
+
+    SdlRumble - joystick.rumble() SDL: левый мотор - тяжёлый низкочастотный,
+                правый - лёгкий высокочастотный; частота кадра задаёт их смесь
+    HidRumble - вывод устройства по HID (controller.output): DS4/DS5 -
+                выходным отчётом, схлопнутым с подсветкой
+    HdRumble  - то же для Joy-Con/Pro Controller: HD-вибрация отчётом 0x10 с
+                частотой, повторы держит сам вывод устройства
+
+MotorResponse складывает сэмплы IMU, пришедшие во время узора, со временем по
+часам датчика и после узора сравнивает вибрацию корпуса (СКЗ разности
+соседних сэмплов ускорения) на каждом моторе с паузой перед узором.
+Мотор, отклик которого не отличается от покоя, - брак.
+"""
+
+import math
+import threading
+import time
+
+# Пауза перед узором: по ней меряется фон акселерометра
+LEAD_IN_MS = 400
+# Начало каждого кадра не учитывается - мотор раскручивается, отчёты IMU запаздывают
+SETTLE_MS = 50
+# SDL сам гасит мотор через длительность кадра плюс запас - на случай зависшего потока
+SDL_HOLD_MS = 100
+SPIN_NS = 1_500_000
+# Мотор работает, если вибрация в RESPONSE_RATIO раз выше фона и не меньше MIN_RESPONSE_G
+RESPONSE_RATIO = 2.0
+MIN_RESPONSE_G = 0.01
+MIN_SEGMENT_SAMPLES = 10
+SWEEP_RANGE_HZ = (80.0, 1000.0)
+MOTOR_NAMES = {"left": "Левый", "right": "Правый", "both": "Оба"}
+
+
+class RumbleFrame:
+    __slots__ = ("duration_ms", "left", "right", "frequency")
+
+    def __init__(self, duration_ms: int, left=0.0, right=0.0, frequency=None):
+        # frequency - Гц для HD-вибрации; None - родная частота моторов
+        self.duration_ms = duration_ms
+        self.left = left
+        self.right = right
+        self.frequency = frequency
+
+    @property
+    def silent(self) -> bool:
+        return self.left <= 0.0 and self.right <= 0.0
+
+
+def pulse_pattern(left=1.0, right=1.0, count=6, on_ms=120, off_ms=120) -> list:
+    frames = []
+    for _ in range(count):
+        frames.append(RumbleFrame(on_ms, left, right))
+        frames.append(RumbleFrame(off_ms))
+    return frames
+
+
+def sweep_pattern(left=1.0, right=1.0, on_ms=1600, step_ms=20) -> list:
+    # Частота по логарифму от низкой к высокой за on_ms; для SDL - переход с левого мотора на правый
+    low, high = SWEEP_RANGE_HZ
+    steps = max(1, on_ms // step_ms)
+    return [RumbleFrame(step_ms, left, right, low * (high / low) ** (i / max(1, steps - 1))) for i in range(steps)]
+
+
+def alternate_pattern(left=1.0, right=1.0, count=3, on_ms=300, gap_ms=150) -> list:
+    # Левый и правый моторы по очереди с паузами: отклик каждого меряется отдельно
+    frames = []
+    for _ in range(count):
+        frames += [RumbleFrame(on_ms, left, 0.0), RumbleFrame(gap_ms),
+                   RumbleFrame(on_ms, 0.0, right), RumbleFrame(gap_ms)]
+    return frames
+
+
+PATTERNS = {
+    "alternate": ("Левый/правый", alternate_pattern),
+    "pulses": ("Импульсы", pulse_pattern),
+    "sweep": ("Свип частоты", sweep_pattern),
+}
+DEFAULT_PATTERN = "alternate"
+
+
+def pattern_duration_ms(frames) -> int:
+    return sum(frame.duration_ms for frame in frames)
+
+
+def sweep_position(frequency) -> float:
+    # 0 - низ диапазона свипа, 1 - верх
+    low, high = SWEEP_RANGE_HZ
+    return min(1.0, max(0.0, math.log(frequency / low) / math.log(high / low)))
+
+
+class SdlRumble:
+    sides = ("left", "right")
+
+    def __init__(self, joystick):
+        self.joystick = joystick
+
+    def prepare(self) -> bool:
+        return self.joystick is not None and hasattr(self.joystick, 'rumble')
+
+    def send(self, frame: RumbleFrame) -> bool:
+        low, high = frame.left, frame.right
+        if frame.frequency is not None:
+            position = sweep_position(frame.frequency)
+            low, high = low * (1.0 - position), high * position
+        if low <= 0.0 and high <= 0.0:
+            self.stop()
+            return True
+        return bool(self.joystick.rumble(low, high, frame.duration_ms + SDL_HOLD_MS))
+
+    def stop(self):
+        try:
+            if hasattr(self.joystick, 'stop_rumble'):
+                self.joystick.stop_rumble()
+            else:
+                self.joystick.rumble(0, 0, 0)
+        except Exception:
+            pass
+
+
+class HidRumble:
+    # Кадр только меняет состояние вывода - запись, темп и повторы на потоке устройства
+    def __init__(self, pad):
+        # Один Joy-Con - один привод: играет свою сторону узора
+        self.pad = pad
+        self.sides = {"joycon_left": ("left",), "joycon_right": ("right",)}.get(
+            getattr(pad, 'controller_type', None), ("left", "right"))
+
+    def prepare(self) -> bool:
+        return self.pad.device is not None and self.pad.output is not None
+
+    def send(self, frame: RumbleFrame) -> bool:
+        output = self.pad.output
+        return output is not None and output.set(rumble=(frame.left, frame.right, frame.frequency))
+
+    def stop(self):
+        output = self.pad.output
+        if output is not None:
+            output.set(rumble=(0.0, 0.0, None))
+
+
+class HdRumble(HidRumble):
+    def prepare(self) -> bool:
+        # Подкоманда 0x48 ждёт ответа - вызывается в потоке планировщика, не в GUI
+        return super().prepare() and self.pad.enable_vibration()
+
+
+def sleep_until(deadline_ns: int):
+    # Крупно - sleep, последние SPIN_NS - уступая поток: точность лучше миллисекунды
+    while True:
+        remaining = deadline_ns - time.perf_counter_ns()
+        if remaining <= 0:
+            return
+        time.sleep((remaining - SPIN_NS) / 1e9 if remaining > SPIN_NS else 0)
+
+
+class RumbleScheduler:
+    def __init__(self, output, lead_in_ms=LEAD_IN_MS):
+        self.output = output
+        self.lead_in_ms = lead_in_ms
+        self.timeline = []        # (perf_counter_ns, кадр или None) - фактические переключения
+        self.accepted = False     # выход принял хотя бы один кадр
+        self.max_late_ms = 0.0
+        self.error = None
+        self._thread = None
+        self._running = False
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def play(self, frames) -> bool:
+        # Подготовка выхода (включение вибрации) - уже в потоке: её ошибка придёт в error
+        self.stop()
+        if not frames:
+            self.error = "пустой узор"
+            return False
+        self.timeline = []
+        self.accepted = False
+        self.max_late_ms = 0.0
+        self.error = None
+        self._running = True
+        self._thread = threading.Thread(target=self._run, args=(list(frames),), name="rumble", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _run(self, frames):
+        output = self.output
+        if not output.prepare():
+            self.error = "вибрация не поддерживается"
+            self._running = False
+            return
+        start = time.perf_counter_ns()
+        self.timeline.append((start, None))
+        due = start + self.lead_in_ms * 1_000_000
+        try:
+            for frame in frames:
+                sleep_until(due)
+                if not self._running:
+                    break
+                now = time.perf_counter_ns()
+                self.max_late_ms = max(self.max_late_ms, (now - due) / 1e6)
+                self.accepted = output.send(frame) or self.accepted
+                self.timeline.append((now, frame))
+                due += frame.duration_ms * 1_000_000
+            sleep_until(due)
+        except Exception as e:
+            self.error = str(e)
+        output.stop()
+        self.timeline.append((time.perf_counter_ns(), None))
+        self._running = False
+
+
+class MotorResponse:
+    def __init__(self, sides=("left", "right")):
+        self.sides = tuple(sides)
+        self.times = []           # perf_counter_ns каждого сэмпла
+        self.jerk = []            # |Δa| между соседними сэмплами, g
+        self._previous = None
+
+    @property
+    def samples(self) -> int:
+        return len(self.times)
+
+    def add(self, samples, stamps=None, host_ns=None):
+        # samples - (gx, gy, gz, ax, ay, az) пачки, stamps - часы датчика, нс: время сэмпла
+        # на часах хоста = время пачки минус отставание сэмпла от последнего в пачке
+        if not samples:
+            return
+        if host_ns is None:
+            host_ns = time.perf_counter_ns()
+        timed = stamps is not None and len(stamps) == len(samples)
+        last = stamps[-1] if timed else 0
+        previous = self._previous
+        for i, sample in enumerate(samples):
+            ax, ay, az = sample[3], sample[4], sample[5]
+            if previous is not None:
+                dx, dy, dz = ax - previous[0], ay - previous[1], az - previous[2]
+                self.times.append(host_ns - (last - stamps[i]) if timed else host_ns)
+                self.jerk.append(math.sqrt(dx * dx + dy * dy + dz * dz))
+            previous = (ax, ay, az)
+        self._previous = previous
+
+    def group(self, frame) -> str:
+        if frame is None or frame.silent:
+            return "rest"
+        if len(self.sides) == 1:
+            return self.sides[0]
+        if frame.left > 0 and frame.right > 0:
+            return "both"
+        return "left" if frame.left > 0 else "right"
+
+    def segments(self, timeline) -> list:
+        # Подряд идущие кадры одной группы (свип - десятки коротких кадров) - один отрезок:
+        # SETTLE_MS отсекается только там, где моторы включились или выключились
+        segments = []
+        for (start, frame), (end, _) in zip(timeline, timeline[1:]):
+            key = self.group(frame)
+            if segments and segments[-1][2] == key:
+                segments[-1][1] = end
+            else:
+                segments.append([start + SETTLE_MS * 1_000_000, end, key])
+        return segments
+
+    def analyze(self, timeline) -> dict:
+        # timeline - RumbleScheduler.timeline; каждый сэмпл попадает в отрезок, который тогда играл
+        groups = {"rest": [], "left": [], "right": [], "both": []}
+        segments = self.segments(timeline)
+        position = 0
+        for when, jerk in zip(self.times, self.jerk):
+            while position < len(segments) and segments[position][1] <= when:
+                position += 1
+            if position >= len(segments):
+                break
+            start, _, key = segments[position]
+            if when >= start:
+                groups[key].append(jerk)
+        result = {"samples": self.samples, "rest_samples": len(groups["rest"])}
+        if len(groups["rest"]) < MIN_SEGMENT_SAMPLES:
+            result.update(passed=None, reason="нет данных IMU во время узора")
+            return result
+        baseline = rms(groups["rest"])
+        motors = {}
+        keys = [side for side in self.sides if len(groups[side]) >= MIN_SEGMENT_SAMPLES]
+        if not keys and len(groups["both"]) >= MIN_SEGMENT_SAMPLES:
+            keys = ["both"]
+        for key in keys:
+            level = rms(groups[key])
+            ratio = level / baseline if baseline > 0 else float('inf')
+            motors[key] = {"rms_g": round(level, 4), "ratio": round(min(ratio, 999.0), 2),
+                           "passed": ratio >= RESPONSE_RATIO and level - baseline >= MIN_RESPONSE_G}
+        result["baseline_g"] = round(baseline, 4)
+        result["motors"] = motors
+        if not motors:
+            result.update(passed=None, reason="мало сэмплов IMU на работающих моторах")
+            return result
+        dead = [MOTOR_NAMES[key] for key, motor in motors.items() if not motor["passed"]]
+        result["passed"] = not dead
+        result["reason"] = f"нет отклика: {', '.join(dead)}" if dead else ""
+        return result
+
+
+def rms(values) -> float:
+    return math.sqrt(sum(v * v for v in values) / len(values)) if values else 0.0
+
+
+def format_response(result: dict) -> list:
+    if result.get("passed") is None:
+        return [f"⚠ {result.get('reason', 'нет данных')}"]
+    lines = []
+    for key, motor in result["motors"].items():
+        mark = "✅" if motor["passed"] else "❌"
+        lines.append(f"{mark} {MOTOR_NAMES[key]}: {motor['rms_g']:.3f} g, ×{motor['ratio']:.1f} к фону")
+    lines.append(f"Фон: {result['baseline_g']:.3f} g")
+    return lines
@@ -0,0 +1,334 @@
+"""
+Запись и воспроизведение сессий тестирования.
+
+SessionRecorder дописывает в компактный бинарный файл каждый кадр
+геймпада (кнопки/оси/HAT из AcquisitionEngine) и каждый сырой HID-отчёт
+с метками времени. SessionReader открывает файл через mmap: многочасовые
+записи открываются мгновенно, перемотка идёт по разреженному индексу из
+хвоста файла без загрузки всего файла в память. SessionPlayer подаёт
+кадры обратно в кольцевой буфер движка, а SessionHidTransport - отчёты в
+DS4Controller/NintendoController, то есть через те же пути, что и живое
+устройство.
+
+Формат (little-endian):
+    заголовок   <4sHHq   b"GPTS", версия, резерв, время создания (unix нс)
+    запись      <BBHq    тип, канал, длина данных, метка perf_counter_ns
+                         + данные
+    индекс      <qq * N  (метка, смещение) каждой INDEX_STRIDE-й записи
+    хвост       <qqq4s   смещение индекса, записей в индексе, всего записей, b"GPTE"
+Если запись оборвалась без хвоста, индекс строится сканированием.
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_right
+
+from hid_transport import BUS_USB, device_info
+
+MAGIC = b"GPTS"
+FOOTER_MAGIC = b"GPTE"
+VERSION = 1
+HEADER = struct.Struct("<4sHHq")
+RECORD = struct.Struct("<BBHq")
+FOOTER = struct.Struct("<qqq4s")
+FRAME_HEADER = struct.Struct("<QBB")
+INDEX_STRIDE = 1024
+FLUSH_SIZE = 1 << 16
+
+REC_META = 0
+REC_JOY_FRAME = 1
+REC_HID_REPORT = 2
+
+_frame_structs = {}
+
+
+def _frame_struct(num_axes: int, num_hats: int):
+    key = (num_axes, num_hats)
+    st = _frame_structs.get(key)
+    if st is None:
+        st = struct.Struct(f"<QBB{num_axes}f{num_hats * 2}b")
+        _frame_structs[key] = st
+    return st
+
+
+class SessionRecorder:
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, 0, time.time_ns()))
+        self.offset = HEADER.size
+        self.records = 0
+        self.index = array('q')
+        self._last_frame = None
+        self._buffer = bytearray()
+        self._lock = threading.Lock()
+
+    def _append(self, rtype: int, channel: int, timestamp_ns: int, payload):
+        with self._lock:
+            if self.file is None:
+                return
+            if self.records % INDEX_STRIDE == 0:
+                self.index.append(timestamp_ns)
+                self.index.append(self.offset)
+            self._buffer += RECORD.pack(rtype, channel, len(payload), timestamp_ns)
+            self._buffer += payload
+            self.offset += RECORD.size + len(payload)
+            self.records += 1
+            if len(self._buffer) >= FLUSH_SIZE:
+                self.file.write(self._buffer)
+                self._buffer.clear()
+
+    def meta(self, info: dict, timestamp_ns=None):
+        payload = json.dumps(info, ensure_ascii=False).encode('utf-8')
+        self._append(REC_META, 0, timestamp_ns or time.perf_counter_ns(), payload)
+
+    def joy_frame(self, timestamp_ns: int, buttons: int, axes, hats):
+        # Пишем только кадры, отличающиеся от предыдущего: в покое опрос на
+        # 1000 Гц не раздувает файл
+        frame = (buttons, tuple(axes), tuple(hats))
+        if frame == self._last_frame:
+            return
+        self._last_frame = frame
+        st = _frame_struct(len(axes), len(hats))
+        flat_hats = [v for hat in hats for v in hat]
+        self._append(REC_JOY_FRAME, 0, timestamp_ns, st.pack(buttons, len(axes), len(hats), *axes, *flat_hats))
+
+    def hid_report(self, timestamp_ns: int, data, channel=0):
+        self._append(REC_HID_REPORT, channel, timestamp_ns, bytes(data))
+
+    def close(self):
+        with self._lock:
+            if self.file is None:
+                return
+            self.file.write(self._buffer)
+            self._buffer.clear()
+            index_offset = self.offset
+            self.file.write(self.index.tobytes())
+            self.file.write(FOOTER.pack(index_offset, len(self.index) // 2, self.records, FOOTER_MAGIC))
+            self.file.close()
+            self.file = None
+
+
+class SessionReader:
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        if size < HEADER.size:
+            self._file.close()
+            raise ValueError("Файл сессии повреждён")
+        self.mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, self.created_ns = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError("Это не файл сессии Gamepad Tester")
+        self.data_end = size
+        self.index_ts = array('q')
+        self.index_offsets = array('q')
+        self.records = 0
+        if not self._load_footer(size):
+            self._scan_index()
+        self.meta = {}
+        self.start_ns = self.index_ts[0] if self.index_ts else 0
+        self.end_ns = self._last_timestamp()
+        for rtype, _, _, payload_offset, length in self.iter_records(HEADER.size):
+            if rtype != REC_META:
+                break
+            self.meta.update(json.loads(self.mm[payload_offset:payload_offset + length].decode('utf-8')))
+
+    def _load_footer(self, size: int) -> bool:
+        if size < HEADER.size + FOOTER.size:
+            return False
+        index_offset, count, records, magic = FOOTER.unpack_from(self.mm, size - FOOTER.size)
+        if magic != FOOTER_MAGIC:
+            return False
+        pairs = array('q')
+        pairs.frombytes(self.mm[index_offset:index_offset + count * 16])
+        self.index_ts = pairs[0::2]
+        self.index_offsets = pairs[1::2]
+        self.records = records
+        self.data_end = index_offset
+        return True
+
+    def _scan_index(self):
+        # Запись без хвоста (программа упала) - идём по заголовкам записей
+        offset = HEADER.size
+        n = 0
+        while offset + RECORD.size <= self.data_end:
+            _, _, length, ts = RECORD.unpack_from(self.mm, offset)
+            if offset + RECORD.size + length > self.data_end:
+                break
+            if n % INDEX_STRIDE == 0:
+                self.index_ts.append(ts)
+                self.index_offsets.append(offset)
+            offset += RECORD.size + length
+            n += 1
+        self.records = n
+        self.data_end = offset
+
+    def _last_timestamp(self) -> int:
+        if not self.index_offsets:
+            return 0
+        last = self.start_ns
+        for _, ts, _, _, _ in self.iter_records(self.index_offsets[-1]):
+            last = ts
+        return last
+
+    @property
+    def duration_ns(self) -> int:
+        return self.end_ns - self.start_ns
+
+    def find(self, timestamp_ns: int) -> int:
+        # Смещение записи из индекса, не позже которой начинается timestamp_ns
+        i = bisect_right(self.index_ts, timestamp_ns) - 1
+        return self.index_offsets[i] if i >= 0 else HEADER.size
+
+    def iter_records(self, offset: int):
+        # -> (тип, метка, смещение следующей записи, смещение данных, длина данных)
+        mm = self.mm
+        end = self.data_end
+        unpack = RECORD.unpack_from
+        while offset + RECORD.size <= end:
+            rtype, _, length, ts = unpack(mm, offset)
+            payload = offset + RECORD.size
+            offset = payload + length
+            yield rtype, ts, offset, payload, length
+
+    def decode_frame(self, payload_offset: int):
+        buttons, num_axes, num_hats = FRAME_HEADER.unpack_from(self.mm, payload_offset)
+        values = _frame_struct(num_axes, num_hats).unpack_from(self.mm, payload_offset)
+        axes = values[3:3 + num_axes]
+        raw_hats = values[3 + num_axes:]
+        hats = [(raw_hats[i * 2], raw_hats[i * 2 + 1]) for i in range(num_hats)]
+        return buttons, axes, hats
+
+    def close(self):
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+        self._file.close()
+
+
+class SessionPlayer:
+    def __init__(self, reader: SessionReader, speed=1.0):
+        self.reader = reader
+        self.speed = speed
+        self.paused = False
+        self.generation = 0
+        self._position_ns = 0
+        self._wall_start = time.perf_counter_ns()
+        self._joy_offset = HEADER.size
+        self._joy_generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        return self.position_ns >= self.reader.duration_ns
+
+    @property
+    def position_ns(self) -> int:
+        if self.paused:
+            return self._position_ns
+        elapsed = time.perf_counter_ns() - self._wall_start
+        return min(self.reader.duration_ns, self._position_ns + int(elapsed * self.speed))
+
+    def clock(self) -> int:
+        # Текущее время воспроизведения в шкале меток записи
+        return self.reader.start_ns + self.position_ns
+
+    def seek(self, position_ns: int):
+        with self._lock:
+            self._position_ns = max(0, min(self.reader.duration_ns, position_ns))
+            self._wall_start = time.perf_counter_ns()
+            self.generation += 1
+
+    def set_paused(self, paused: bool):
+        with self._lock:
+            self._position_ns = self.position_ns
+            self._wall_start = time.perf_counter_ns()
+            self.paused = paused
+
+    def pump_frames(self, ring) -> int:
+        # Все кадры геймпада с меткой не позже текущего времени - в кольцевой буфер
+        if self._joy_generation != self.generation:
+            self._joy_generation = self.generation
+            self._joy_offset = self.reader.find(self.clock())
+        now = self.clock()
+        pushed = 0
+        offset = self._joy_offset
+        for rtype, ts, next_offset, payload, _ in self.reader.iter_records(offset):
+            if ts > now:
+                break
+            offset = next_offset
+            if rtype == REC_JOY_FRAME:
+                buttons, axes, hats = self.reader.decode_frame(payload)
+                ring.push(ts, buttons, axes, hats)
+                pushed += 1
+        self._joy_offset = offset
+        return pushed
+
+
+class SessionHidTransport:
+    # Транспорт для controllers: отдаёт записанные HID-отчёты по часам плеера
+    def __init__(self, player: SessionPlayer):
+        self.player = player
+        self.reader = player.reader
+        self.vid = int(self.reader.meta.get('hid_vid', 0))
+        self.pid = int(self.reader.meta.get('hid_pid', 0))
+        self.nonblocking = False
+        self.opened = False
+        self._offset = HEADER.size
+        self._generation = -1
+
+    def open(self, vid: int, pid: int, serial=None):
+        if (vid, pid) != (self.vid, self.pid):
+            raise IOError("open failed")
+        self.opened = True
+
+    def open_path(self, path):
+        self.open(self.vid, self.pid)
+
+    def enumerate(self, vid=0, pid=0):
+        if not self.vid or (vid and vid != self.vid) or (pid and pid != self.pid):
+            return []
+        return [device_info(f"session:{self.reader.path}".encode('utf-8'), self.vid, self.pid,
+                            bus=self.reader.meta.get('connection_type', BUS_USB))]
+
+    def set_nonblocking(self, enabled: bool):
+        self.nonblocking = bool(enabled)
+
+    def read(self, size: int, timeout_ms=0):
+        if not self.opened:
+            raise IOError("device not open")
+        deadline = time.perf_counter_ns() + max(0, timeout_ms) * 1_000_000
+        while True:
+            if self._generation != self.player.generation:
+                self._generation = self.player.generation
+                self._offset = self.reader.find(self.player.clock())
+            now = self.player.clock()
+            for rtype, ts, next_offset, payload, length in self.reader.iter_records(self._offset):
+                if ts > now:
+                    break
+                self._offset = next_offset
+                if rtype == REC_HID_REPORT:
+                    return list(self.reader.mm[payload:payload + min(length, size)])
+            if (self.nonblocking and timeout_ms == 0) or time.perf_counter_ns() >= deadline:
+                return []
+            time.sleep(0.001)
+
+    def write(self, data):
+        return len(data)
+
+    def get_feature_report(self, report_id: int, size: int):
+        raise IOError("feature report not recorded")
+
+    def send_feature_report(self, data):
+        return len(data)
+
+    def close(self):
+        self.opened = False
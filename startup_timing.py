@@ -0,0 +1,62 @@
+"""
+Замер времени запуска окна по этапам: импорты, QApplication, построение
+окна, первый отрисованный кадр и отложенная инициализация после него.
+
+    python gamepad_tester.py --startup-report [--startup-budget=800]
+
+печатает замер в JSON и закрывает окно сразу после отложенной
+инициализации; с бюджетом код выхода 1, если первый кадр появился позже.
+"""
+
+import json
+import time
+
+_PROCESS_START = time.perf_counter()
+
+
+class StartupTimer:
+    def __init__(self, start=_PROCESS_START):
+        self.start = start
+        self.last = start
+        self.stages = []          # (этап, мс на этап)
+        self.first_frame_ms = None
+
+    def mark(self, stage: str):
+        now = time.perf_counter()
+        self.stages.append((stage, (now - self.last) * 1000))
+        self.last = now
+
+    def mark_first_frame(self):
+        if self.first_frame_ms is None:
+            self.mark("первый кадр")
+            self.first_frame_ms = self.total_ms
+
+    @property
+    def total_ms(self) -> float:
+        return (self.last - self.start) * 1000
+
+    def to_dict(self) -> dict:
+        return {
+            "first_frame_ms": round(self.first_frame_ms or 0.0, 1),
+            "total_ms": round(self.total_ms, 1),
+            "stages": [{"stage": stage, "ms": round(ms, 1)} for stage, ms in self.stages],
+        }
+
+    def format(self) -> str:
+        parts = ", ".join(f"{stage} {ms:.0f}" for stage, ms in self.stages)
+        first = self.first_frame_ms if self.first_frame_ms is not None else self.total_ms
+        return f"Запуск: первый кадр за {first:.0f} мс, всего {self.total_ms:.0f} мс ({parts})"
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+
+
+def parse_startup_args(argv):
+    # -> (печатать отчёт и выйти, бюджет первого кадра в мс или None)
+    report = "--startup-report" in argv
+    budget = None
+    for arg in argv:
+        if arg.startswith("--startup-budget="):
+            budget = float(arg.split("=", 1)[1])
+            report = True
+    return report, budget
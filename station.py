@@ -0,0 +1,153 @@
+"""
+Режим стенда: поток геймпадов на линии без ручных нажатий в окне.
+
+StationMachine ждёт подключения, прогоняет по порядку шаги проверки
+(все кнопки, стики, триггеры, вибрация, движение IMU) на отдельной
+PadSession, отдаёт результат в on_result и после отключения геймпада
+ждёт следующий. Состояние меняется только в tick() и обработчиках
+подключения/отключения, модуль от Qt не зависит.
+
+    ожидание -> тест (шаг за шагом) -> результат -> [отключение] -> ожидание
+"""
+
+import time
+
+from report_model import CHECKS
+
+STATION_WAITING = "waiting"
+STATION_TESTING = "testing"
+STATION_DONE = "done"
+STATION_NAMES = {STATION_WAITING: "Ожидание геймпада", STATION_TESTING: "Тест", STATION_DONE: "Отключите геймпад"}
+STEP_PROMPTS = {
+    "buttons": "Нажмите все кнопки",
+    "sticks": "Покрутите оба стика",
+    "triggers": "Выжмите оба триггера",
+    "vibration": "Проверка вибрации",
+    "gyro": "Покачайте геймпад",
+}
+STEP_TIMEOUT = 20.0
+RESULT_PASS = "pass"
+RESULT_FAIL = "fail"
+
+
+class StationMachine:
+    def __init__(self, open_session, step_timeout=STEP_TIMEOUT, clock=time.monotonic):
+        # open_session(gp) -> PadSession со всеми кнопками в проверке "buttons"
+        self.open_session = open_session
+        self.step_timeout = step_timeout
+        self.clock = clock
+        self.on_result = None
+        self.state = STATION_WAITING
+        self.session = None
+        self.steps = []
+        self.step_index = 0
+        self.step_started = 0.0
+        self.step_times = {}      # шаг -> секунд до прохождения
+        self.unit_started = 0.0
+        self.failed_step = None
+        self.last_result = None
+        self.started = clock()
+        self.units = 0
+        self.passed_units = 0
+        self.total_duration = 0.0
+
+    @property
+    def step(self):
+        if self.state != STATION_TESTING or self.step_index >= len(self.steps):
+            return None
+        return self.steps[self.step_index]
+
+    def on_connected(self, gp) -> bool:
+        if self.state != STATION_WAITING:
+            return False
+        self.session = self.open_session(gp)
+        self.steps = [key for key in CHECKS if key in self.session.checks]
+        self.failed_step = None
+        self.step_times = {}
+        self.unit_started = self.clock()
+        self.state = STATION_TESTING
+        self.enter_step(0)
+        return True
+
+    def on_disconnected(self, instance_id) -> bool:
+        session = self.session
+        if session is None or session.instance_id != instance_id:
+            return False
+        if self.state == STATION_TESTING:
+            self.finish(RESULT_FAIL, "геймпад отключён до конца теста")
+        session.stop()
+        self.session = None
+        self.state = STATION_WAITING
+        return True
+
+    def enter_step(self, index: int):
+        self.step_index = index
+        self.step_started = self.clock()
+        if self.step == "vibration" and not self.session.rumble():
+            self.finish(RESULT_FAIL, self.vibration_reason())
+
+    def tick(self) -> bool:
+        # -> True, если продвинулись проверки, сменился шаг или состояние
+        if self.state != STATION_TESTING:
+            return False
+        changed = self.session.poll()
+        passed = self.session.state.passed
+        while self.state == STATION_TESTING and passed[self.step]:
+            changed = True
+            self.step_times[self.step] = round(self.clock() - self.step_started, 3)
+            if self.step_index + 1 >= len(self.steps):
+                self.finish(RESULT_PASS)
+            else:
+                self.enter_step(self.step_index + 1)
+        if self.state == STATION_TESTING and self.step == "vibration" and not self.session.rumbling:
+            # Узор доигран, а вибрация не засчитана - отклик моторов по IMU не прошёл
+            self.finish(RESULT_FAIL, self.vibration_reason())
+            changed = True
+        if self.state == STATION_TESTING and self.clock() - self.step_started > self.step_timeout:
+            self.finish(RESULT_FAIL, f"{STEP_PROMPTS[self.step]}: нет ответа за {self.step_timeout:.0f} с")
+            changed = True
+        return changed
+
+    def vibration_reason(self) -> str:
+        response = self.session.state.vibration or {}
+        return f"{STEP_PROMPTS['vibration']}: {response.get('reason') or 'нет отклика'}"
+
+    def finish(self, outcome: str, reason=""):
+        session = self.session
+        self.failed_step = self.step if outcome == RESULT_FAIL else None
+        duration = self.clock() - self.unit_started
+        self.units += 1
+        self.total_duration += duration
+        if outcome == RESULT_PASS:
+            self.passed_units += 1
+        result = session.to_dict()
+        result.update({
+            "unit": self.units,
+            "result": outcome,
+            "passed": outcome == RESULT_PASS,
+            "failed_step": self.failed_step,
+            "reason": reason,
+            "step_times": dict(self.step_times),
+            "duration_s": round(duration, 3),
+            "date": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        })
+        self.last_result = result
+        self.state = STATION_DONE
+        if self.on_result:
+            self.on_result(result)
+
+    def stats(self) -> dict:
+        hours = (self.clock() - self.started) / 3600
+        return {
+            "units": self.units,
+            "passed": self.passed_units,
+            "pass_rate": 100.0 * self.passed_units / self.units if self.units else 0.0,
+            "avg_duration_s": self.total_duration / self.units if self.units else 0.0,
+            "units_per_hour": self.units / hours if hours > 0 else 0.0,
+        }
+
+    def stop(self):
+        if self.session is not None:
+            self.session.stop()
+            self.session = None
+        self.state = STATION_WAITING
@@ -0,0 +1,138 @@
+"""
+Вывод на геймпад без железа: отчёты DS4/DS5 с CRC32 Bluetooth и
+схлопывание изменений потоком устройства.
+
+    python -m pytest -q test_device_output.py
+"""
+
+import threading
+import zlib
+
+from controllers import NintendoController
+from device_output import (
+    NINTENDO_INTERVAL_MS, SONY_BT_SIZE, DeviceOutput, Ds4Output, Ds5Output, NintendoOutput, parse_sony_output,
+    sony_bt_crc, sony_output
+)
+from nintendo_protocol import NEUTRAL_RUMBLE, OUTPUT_RUMBLE
+
+
+class FakeDevice:
+    def __init__(self, fail=False):
+        self.written = []
+        self.fail = fail
+
+    def write(self, data):
+        if self.fail:
+            raise IOError("write failed")
+        self.written.append(bytes(data))
+        return len(data)
+
+
+class FakePad:
+    def __init__(self, controller_type="pro_controller"):
+        self.controller_type = controller_type
+        self.packets = 0
+
+    def next_packet(self) -> int:
+        self.packets += 1
+        return self.packets & 0x0F
+
+
+def test_bt_crc_covers_seed_byte():
+    data = bytes(range(SONY_BT_SIZE - 4))
+    assert sony_bt_crc(data) == zlib.crc32(b"\xa2" + data)
+
+
+def test_ds4_bluetooth_report_round_trip():
+    report = Ds4Output(bluetooth=True).build({"rumble": (1.0, 0.2, None), "lightbar": (1, 2, 3)})
+    assert len(report) == SONY_BT_SIZE
+    state = parse_sony_output(report)
+    assert state["rumble"] == (1.0, 51 / 255)
+    assert state["lightbar"] == (1, 2, 3)
+    assert state["player_leds"] is None
+    broken = bytearray(report)
+    broken[10] ^= 0x01
+    assert parse_sony_output(broken) is None
+
+
+def test_ds5_bluetooth_sequence_and_lightbar_setup():
+    output = sony_output("ds5", bluetooth=True)
+    assert isinstance(output, Ds5Output)
+    first = output.build({"lightbar": (255, 0, 0), "player_leds": 0x04})
+    second = output.build({"lightbar": (0, 255, 0)})
+    assert (first[1] >> 4, second[1] >> 4) == (0, 1)
+    # Синяя заставка гасится только в первом отчёте с цветом
+    assert first[3 + 41] != 0 and second[3 + 41] == 0
+    assert parse_sony_output(first) == {"rumble": None, "lightbar": (255, 0, 0), "player_leds": 0x04}
+    assert parse_sony_output(second)["lightbar"] == (0, 255, 0)
+    for _ in range(14):
+        output.build({})
+    assert output.build({})[1] >> 4 == 0
+
+
+def test_usb_reports_have_no_crc():
+    report = sony_output("ds4").build({"rumble": (0.0, 1.0)})
+    assert len(report) == 32
+    assert parse_sony_output(report)["rumble"] == (0.0, 1.0)
+
+
+def test_nintendo_refresh_and_sides():
+    protocol = NintendoOutput(FakePad("joycon_right"))
+    assert protocol.refresh_ms({"rumble": (0.5, 0.0, None)}) == NINTENDO_INTERVAL_MS
+    assert protocol.refresh_ms({"rumble": (0.0, 0.0, None)}) is None
+    report = protocol.build({"rumble": (0.5, 0.0, 320.0)})
+    assert report[0] == OUTPUT_RUMBLE and report[1] == 1
+    # Правый Joy-Con: левая половина нейтральна, правая играет
+    assert report[2:6] == NEUTRAL_RUMBLE[:4] and report[6:10] != NEUTRAL_RUMBLE[4:]
+    assert protocol.build({})[2:] == NEUTRAL_RUMBLE
+
+
+def test_packet_counter_shared_between_threads():
+    # Подкоманды и поток вывода берут номера пакетов одновременно - ни один не теряется
+    pad = NintendoController(None)
+    seen = []
+
+    def take():
+        seen.extend(pad.next_packet() for _ in range(1000))
+
+    threads = [threading.Thread(target=take) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert pad.packet_counter == 4000 & 0x0F
+    assert all(seen.count(n) == 250 for n in range(16))
+
+
+def test_changes_coalesce_into_last_state():
+    device = FakeDevice()
+    protocol = Ds4Output()
+    protocol.interval_ms = 200
+    output = DeviceOutput(device, protocol)
+    for n in range(50):
+        assert output.set(lightbar=(n, 0, 0))
+    output.stop()
+    assert output.requests == 50
+    assert 1 <= output.updates <= 2
+    assert output.writes == len(device.written) == output.updates
+    assert output.coalesced == 50 - output.updates
+    assert parse_sony_output(device.written[-1])["lightbar"] == (49, 0, 0)
+
+
+def test_stop_silences_motors():
+    device = FakeDevice()
+    output = DeviceOutput(device, Ds4Output())
+    output.set(rumble=(1.0, 1.0), lightbar=(0, 0, 255))
+    output.stop()
+    last = parse_sony_output(device.written[-1])
+    assert last["rumble"] == (0.0, 0.0)
+    assert last["lightbar"] == (0, 0, 255)
+    assert not output.running
+
+
+def test_write_error_stops_output():
+    output = DeviceOutput(FakeDevice(fail=True), Ds4Output())
+    assert output.set(lightbar=(1, 1, 1))
+    output.stop()
+    assert output.error == "write failed"
+    assert not output.set(lightbar=(2, 2, 2))
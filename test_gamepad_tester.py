@@ -0,0 +1,38 @@
+"""
+Окно без геймпада на offscreen-платформе Qt: то, что работает до открытия
+ленивых вкладок.
+
+    python -m pytest -q test_gamepad_tester.py
+"""
+
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+pytest.importorskip("pygame")
+QtWidgets = pytest.importorskip("PyQt6.QtWidgets")
+
+import gamepad_tester
+
+
+@pytest.fixture
+def window():
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    window = gamepad_tester.GamepadTester()
+    yield window
+    window.quit_app()
+    app.processEvents()
+
+
+def test_text_report_before_tests_tab(window, tmp_path):
+    assert window.report_rate_widget is None
+    path = tmp_path / "report.txt"
+    window.write_text_report(str(path))
+    text = path.read_text(encoding="utf-8")
+    assert "📶 Отчёты HID" not in text
+    assert text.rstrip().endswith("GitHub: https://github.com/mrSaT13")
+    assert window.report_rate_widget is None
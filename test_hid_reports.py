@@ -0,0 +1,155 @@
+"""
+Поток HID-отчётов без устройства: частота, потери и переполнение счётчика,
+пакетное чтение и раскладки IMU.
+
+    python -m pytest -q test_hid_reports.py
+"""
+
+import struct
+
+import pytest
+
+from hid_reports import IMU_LAYOUTS, HidBatchReader, ReportStats
+
+STEP_NS = 4_000_000
+
+
+def ds4_report(counter: int) -> list:
+    # USB-отчёт 0x01: 6-битный счётчик в битах 2-7 байта 7
+    data = [0] * 64
+    data[0] = 0x01
+    data[7] = (counter & 0x3F) << 2
+    return data
+
+
+def nintendo_report(timer: int) -> list:
+    data = [0] * 49
+    data[0] = 0x30
+    data[1] = timer & 0xFF
+    return data
+
+
+class FakeDevice:
+    # Очередь отчётов hidapi: read() без таймаута отдаёт [] на пустой очереди
+    def __init__(self, reports=()):
+        self.reports = list(reports)
+
+    def read(self, size: int, timeout_ms=0):
+        return list(self.reports.pop(0)[:size]) if self.reports else []
+
+
+def imu_report(layout, gyro, accel) -> list:
+    # Сырые отсчёты на месте IMU в раскладке; остальное - нули
+    data = bytearray(layout.size)
+    data[0] = layout.report_id
+    values = (accel + gyro) if layout.accel_first else (gyro + accel)
+    struct.pack_into(f"<{6 * layout.samples}h", data, layout.offset, *(values * layout.samples))
+    return list(data)
+
+
+def feed(stats, counters, start_ns=0, step_ns=STEP_NS, report=ds4_report):
+    for n, counter in enumerate(counters):
+        stats.add(start_ns + n * step_ns, report(counter))
+
+
+def test_rate_and_no_drops():
+    stats = ReportStats("ds4")
+    feed(stats, range(100))
+    summary = stats.summary()
+    assert summary["received"] == 100
+    assert summary["dropped"] == 0
+    assert summary["drop_percent"] == 0.0
+    assert summary["rate_hz"] == pytest.approx(250.0)
+    assert summary["jitter_ms"] == pytest.approx(0.0)
+    assert sum(summary["histogram"]) == 99
+
+
+def test_gap_in_counter_counts_missing_reports():
+    stats = ReportStats("ds4")
+    feed(stats, (0, 1, 2, 5, 6))
+    assert stats.dropped == 2
+    assert stats.summary()["drop_percent"] == pytest.approx(200 / 7)
+
+
+def test_counter_wrap_is_not_a_drop():
+    stats = ReportStats("ds4")
+    feed(stats, (61, 62, 63, 0, 1))
+    assert stats.dropped == 0
+
+
+def test_full_wrap_during_long_gap_counted_by_time():
+    # 100 потерянных отчётов: счётчик по модулю 64 видит лишь 36, остальное - по интервалу
+    stats = ReportStats("ds4")
+    feed(stats, range(40))
+    stats.add(39 * STEP_NS + 100 * STEP_NS, ds4_report(39 + 100))
+    assert stats.dropped == 99
+
+
+def test_nintendo_step_is_learned_before_counting():
+    stats = ReportStats("nintendo")
+    timers = [3 * n for n in range(33)]
+    feed(stats, timers, report=nintendo_report)
+    assert stats.dropped == 0
+    stats.add(33 * STEP_NS, nintendo_report(timers[-1] + 9))
+    assert stats.dropped == 2
+
+
+def test_reports_without_counter():
+    stats = ReportStats("ds4")
+    for n in range(3):
+        stats.add(n * STEP_NS, [0x05] + [0] * 31)
+    summary = stats.summary()
+    assert summary["drop_percent"] is None
+    assert summary["received"] == 3
+    stats.reset()
+    assert stats.summary()["received"] == 0
+
+
+LAYOUT_CASES = [(kind, report_id) for kind, layouts in IMU_LAYOUTS.items() for report_id in layouts]
+
+
+@pytest.mark.parametrize("kind,report_id", LAYOUT_CASES)
+def test_layout_offsets_and_axis_order(kind, report_id):
+    # Соотношения осей не зависят от чувствительности датчика: 1:2:3 у гироскопа, 4:5:6 у акселерометра
+    layout = IMU_LAYOUTS[kind][report_id]
+    samples = layout.decode_report(imu_report(layout, (100, 200, 300), (400, 500, 600)))
+    assert len(samples) == layout.samples
+    for gx, gy, gz, ax, ay, az in samples:
+        assert gx > 0 and ax > 0
+        assert (gy / gx, gz / gx) == pytest.approx((2.0, 3.0))
+        assert (ay / ax, az / ax) == pytest.approx((1.25, 1.5))
+
+
+def test_decode_report_rejects_foreign_and_short():
+    layout = IMU_LAYOUTS["ds4"][0x01]
+    report = imu_report(layout, (1, 2, 3), (4, 5, 6))
+    assert layout.decode_report(report[:layout.size - 1]) == []
+    assert layout.decode_report([0x11] + report[1:]) == []
+    assert layout.decode_report([]) == []
+
+
+def test_drain_reads_everything_in_order():
+    layouts = IMU_LAYOUTS["ds4"]
+    usb, bt = layouts[0x01], layouts[0x11]
+    reports = [imu_report(usb, (n, 2 * n, 3 * n), (4, 5, 6)) for n in range(1, 6)]
+    reports.insert(2, [0x05] + [0] * 31)                 # чужой отчёт - считается, но не разбирается
+    reports.insert(4, reports[0][:20])                   # обрезанный
+    reports.append(imu_report(bt, (7, 8, 9), (1, 1, 1)))  # смена раскладки посреди пачки
+    reader = HidBatchReader(capacity=2)
+    count = reader.drain(FakeDevice(reports), 78, layouts)
+    expected = [sample for report in reports for sample in layouts.get(report[0], usb).decode_report(report)]
+    assert count == 6
+    assert reader.reports == len(reports)
+    assert reader.samples == expected
+    assert reader.latest == expected[-1]
+    assert reader.latest_report == reports[-1]
+
+
+def test_drain_on_empty_queue_keeps_latest():
+    layout = IMU_LAYOUTS["nintendo"][0x30]
+    reader = HidBatchReader()
+    assert reader.drain(FakeDevice([imu_report(layout, (1, 2, 3), (4, 5, 6))]), 49, IMU_LAYOUTS["nintendo"]) == 3
+    latest = reader.latest
+    assert reader.drain(FakeDevice(), 49, IMU_LAYOUTS["nintendo"]) == 0
+    assert reader.samples == [] and reader.reports == 0
+    assert reader.latest == latest
@@ -0,0 +1,55 @@
+"""
+Список геймпадов HotplugWatcher без SDL-устройств: подменные скан и джойстики.
+
+    python -m pytest -q test_hotplug.py
+"""
+
+import os
+
+import pytest
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+pytest.importorskip("pygame")
+
+import hotplug
+
+
+class FakeEngine:
+    pumping = True
+
+    def __init__(self):
+        self.events = []
+
+    def take_device_events(self):
+        events, self.events = self.events, []
+        return events
+
+
+class FakeJoystick:
+    def __init__(self, index):
+        self.index = index
+        self.closed = False
+
+    def quit(self):
+        self.closed = True
+
+
+def pad(instance_id, index):
+    return {"instance_id": instance_id, "index": index, "name": f"pad {instance_id}"}
+
+
+def test_rescan_closes_joysticks_missing_from_scan(monkeypatch):
+    scan = [pad(1, 0), pad(2, 1)]
+    monkeypatch.setattr(hotplug, "get_all_gamepads", lambda pump: list(scan))
+    monkeypatch.setattr(hotplug.pygame.joystick, "Joystick", FakeJoystick)
+    watcher = hotplug.HotplugWatcher(FakeEngine())
+    watcher.rescan()
+    first, second = watcher.joystick(1), watcher.joystick(2)
+    scan[:] = [pad(2, 0), pad(3, 1)]
+    watcher.rescan()
+    assert first.closed and not second.closed
+    # Оставшийся геймпад сохраняет открытый джойстик, новый открывается
+    assert watcher.joystick(2) is second
+    assert watcher.joystick(3).index == 1
+    assert watcher.joystick(1) is None
+    assert [gp['instance_id'] for gp in watcher.ordered()] == [2, 3]
@@ -0,0 +1,112 @@
+"""
+Сборка кадра ИК-камеры из фрагментов: повторы, пропуски, CRC подтверждений.
+
+    python -m pytest -q test_ir_camera.py
+"""
+
+from ir_camera import (
+    FRAGMENT_OFFSET, FRAGMENT_SIZE, MCU_OUTPUT_SIZE, IrCaptureWriter, IrFrameAssembler, ir_ack_report, load_capture,
+    mcu_config_args, mcu_crc8
+)
+
+# 40x30 - четыре фрагмента на кадр
+WIDTH, HEIGHT = 40, 30
+
+
+def fragment_report(fill: int) -> list:
+    # Отчёт 0x31 как список от hidapi: данные фрагмента с FRAGMENT_OFFSET
+    return [0x31] + [0] * (FRAGMENT_OFFSET - 1) + [fill] * FRAGMENT_SIZE
+
+
+class Recorder:
+    def __init__(self):
+        self.fragments = []
+
+    def add(self, fragment: int, chunk):
+        self.fragments.append((fragment, bytes(chunk)))
+
+
+def feed_all(assembler, fragments):
+    return [assembler.feed(n, fragment_report(n + 1)) for n in fragments]
+
+
+def test_crc8():
+    # CRC-8 с полиномом 0x07 без начального значения: контрольное значение для "123456789"
+    assert mcu_crc8(b"123456789") == 0xF4
+    assert mcu_crc8(b"") == 0
+
+
+def test_ack_report_layout():
+    report = ir_ack_report(0x13, acked=5, missing=2, resend=True)
+    assert len(report) == MCU_OUTPUT_SIZE
+    assert report[0] == 0x11 and report[1] == 0x03
+    assert (report[12], report[13], report[14]) == (0x01, 2, 5)
+    assert report[47] == mcu_crc8(report[11:47])
+    assert ir_ack_report(0, acked=0, first=True)[47] == 0xFF
+
+
+def test_config_args_close_with_crc():
+    args = mcu_config_args(0x21, (0x00, 0x05))
+    assert len(args) == 38
+    assert args[0] == 0x21 and args[1:3] == b"\x00\x05"
+    assert args[-1] == mcu_crc8(args[1:37])
+
+
+def test_frame_in_order():
+    assembler = IrFrameAssembler(WIDTH, HEIGHT)
+    assert assembler.fragments == 4
+    assert feed_all(assembler, range(4)) == [(False, 0, n) for n in range(4)]
+    assert assembler.frames == 1 and assembler.expected == 0
+    index = assembler.take_frame()
+    assert index is not None
+    frame = assembler.buffers[index]
+    for n in range(4):
+        assert frame[n * FRAGMENT_SIZE:(n + 1) * FRAGMENT_SIZE] == bytes([n + 1]) * FRAGMENT_SIZE
+    assert assembler.take_frame() is None
+
+
+def test_skipped_fragment_is_requested_again():
+    recorder = Recorder()
+    assembler = IrFrameAssembler(WIDTH, HEIGHT, recorder)
+    assert feed_all(assembler, (0, 1, 3)) == [(False, 0, 0), (False, 0, 1), (True, 2, 1)]
+    assert assembler.resends == 1
+    # Повтор принятого фрагмента только подтверждается
+    assert assembler.feed(1, fragment_report(9)) == (False, 0, 1)
+    assert feed_all(assembler, (2, 3)) == [(False, 0, 2), (False, 0, 3)]
+    assert (assembler.frames, assembler.dropped) == (1, 0)
+    assert [fragment for fragment, _ in recorder.fragments] == [0, 1, 2, 3]
+    assert recorder.fragments[1][1] == bytes([2]) * FRAGMENT_SIZE
+    assert assembler.keepalive() == (False, 0, 3)
+
+
+def test_new_frame_drops_unfinished_one():
+    assembler = IrFrameAssembler(WIDTH, HEIGHT)
+    feed_all(assembler, (0, 1))
+    assert assembler.feed(0, fragment_report(7)) == (False, 0, 0)
+    assert assembler.dropped == 1 and assembler.expected == 1
+    feed_all(assembler, (1, 2, 3))
+    assert assembler.frames == 1
+    assert assembler.buffers[assembler.take_frame()][:FRAGMENT_SIZE] == bytes([7]) * FRAGMENT_SIZE
+
+
+def test_triple_buffer_never_hands_out_the_back_buffer():
+    assembler = IrFrameAssembler(WIDTH, HEIGHT)
+    feed_all(assembler, range(4))
+    shown = assembler.take_frame()
+    feed_all(assembler, range(4))
+    feed_all(assembler, range(2))
+    assert assembler._back != shown
+    assert assembler.take_frame() not in (None, shown, assembler._back)
+
+
+def test_capture_round_trip(tmp_path):
+    path = tmp_path / "ir.irlog"
+    writer = IrCaptureWriter(str(path), WIDTH, HEIGHT)
+    assembler = IrFrameAssembler(WIDTH, HEIGHT, writer)
+    feed_all(assembler, range(4))
+    writer.close()
+    width, height, records, data = load_capture(str(path))
+    assert (width, height) == (WIDTH, HEIGHT)
+    assert [fragment for _, fragment, _ in records] == [0, 1, 2, 3]
+    _, _, offset = records[2]
+    assert data[offset:offset + FRAGMENT_SIZE] == bytes([3]) * FRAGMENT_SIZE
@@ -0,0 +1,41 @@
+"""
+Кодирование HD-вибрации Joy-Con/Pro Controller: полосы, амплитуда, отчёт 0x10.
+
+    python -m pytest -q test_nintendo_protocol.py
+"""
+
+from nintendo_protocol import (
+    HD_RUMBLE_HIGH, HD_RUMBLE_LOW, NEUTRAL_RUMBLE, OUTPUT_RUMBLE, encode_amplitude, encode_rumble, rumble_report
+)
+
+
+def test_silence_is_neutral_rumble():
+    assert encode_rumble(320.0, 0.0) == NEUTRAL_RUMBLE[:4]
+    assert encode_amplitude(0.0) == 0
+    assert encode_amplitude(-1.0) == 0
+
+
+def test_full_amplitude_in_each_band():
+    # 1.0 -> 100: верхняя полоса 0xC8, нижняя 0x72
+    assert encode_amplitude(1.0) == encode_amplitude(5.0) == 100
+    assert encode_rumble(320.0, 1.0) == bytes((0x00, 0xC9, 0x40, 0x40))
+    assert encode_rumble(80.0, 1.0) == bytes((0x00, 0x01, 0x20, 0x72))
+
+
+def test_amplitude_scale_is_monotonic():
+    levels = [encode_amplitude(n / 100) for n in range(1, 101)]
+    assert levels == sorted(levels)
+    assert levels[-1] == 100
+
+
+def test_frequency_is_clamped_to_band():
+    assert encode_rumble(5000.0, 0.5) == encode_rumble(HD_RUMBLE_HIGH[1], 0.5)
+    assert encode_rumble(10.0, 0.5) == encode_rumble(HD_RUMBLE_LOW[0], 0.5)
+
+
+def test_rumble_report():
+    report = rumble_report(17, encode_rumble(160.0, 1.0), NEUTRAL_RUMBLE[4:])
+    assert len(report) == 10
+    assert report[0] == OUTPUT_RUMBLE and report[1] == 1
+    assert report[6:] == NEUTRAL_RUMBLE[4:]
+    assert rumble_report(0)[2:] == NEUTRAL_RUMBLE
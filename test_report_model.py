@@ -0,0 +1,89 @@
+"""
+Наблюдаемое состояние проверок TestState: переходы, счёт и сброс.
+
+    python -m pytest -q test_report_model.py
+"""
+
+# TestState под своим именем pytest принял бы за класс тестов
+from report_model import TestState as PadState
+
+
+def recorder(state):
+    events = []
+    state.on_check = lambda key, passed: events.append(("check", key, passed))
+    state.on_buttons = lambda pressed, total: events.append(("buttons", pressed, total))
+    state.on_noise = lambda result: events.append(("noise", result))
+    return events
+
+
+def test_callbacks_fire_only_on_transitions():
+    state = PadState(4, 2)
+    events = recorder(state)
+    state.update_sticks(0.1)
+    state.update_sticks(0.9)
+    state.update_sticks(1.0)
+    assert events == [("check", "sticks", True)]
+    events.clear()
+    state.press_buttons([0])
+    state.press_buttons([0])
+    state.press_buttons([1, 9])
+    assert events == [("buttons", 1, 4), ("buttons", 2, 4), ("check", "buttons", True)]
+
+
+def test_revision_grows_only_on_change():
+    state = PadState(4)
+    revision = state.revision
+    state.update_triggers(0.1)
+    assert state.revision == revision
+    state.update_triggers(0.8)
+    assert state.revision == revision + 1
+
+
+def test_passed_count_follows_set_checks():
+    state = PadState(4, 1, ("buttons", "sticks"))
+    state.press_buttons([0])
+    state.update_gyro([(5.0, 0.0, 0.0, 0.0, 0.0, 1.0)])
+    assert state.passed_count == 1
+    assert state.score() == 50
+    state.set_checks(("buttons", "sticks", "gyro"))
+    assert state.passed_count == 2
+    assert state.score() == 66
+    state.set_checks(("sticks",))
+    assert state.passed_count == 0
+    assert not state.all_passed
+
+
+def test_reset_notifies_what_was_passed():
+    state = PadState(4, 1)
+    state.press_buttons([0])
+    state.set_vibration(True)
+    state.set_noise({"passed": False})
+    events = recorder(state)
+    state.reset()
+    assert ("check", "buttons", False) in events
+    assert ("check", "vibration", False) in events
+    assert ("check", "sticks", False) not in events
+    assert ("buttons", 0, 4) in events
+    assert ("noise", None) in events
+    assert state.passed_count == 0
+    assert state.vibration is None
+
+
+def test_score_for_subset_of_checks():
+    state = PadState(4, 1)
+    state.press_buttons([0])
+    state.update_sticks(0.9)
+    assert state.score() == 40
+    assert state.score(("buttons", "sticks")) == 100
+    assert state.score(("buttons", "triggers", "gyro", "sticks")) == 50
+    assert state.score(()) == 0
+    assert state.to_dict(("buttons", "sticks"))["passed"]
+
+
+def test_failed_noise_fails_all_passed():
+    state = PadState(4, 1, ("buttons",))
+    state.press_buttons([0])
+    assert state.all_passed
+    state.set_noise({"passed": False})
+    assert not state.all_passed
+    assert not state.to_dict()["passed"]
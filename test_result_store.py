@@ -0,0 +1,75 @@
+"""
+История результатов на базе в памяти: фильтры query() и выгрузка CSV.
+
+    python -m pytest -q test_result_store.py
+"""
+
+import csv
+
+import pytest
+
+from result_store import SOURCE_CLI, SOURCE_STATION, ResultStore, as_record, export_csv
+
+
+def stored_result(serial, pid, passed, date, failed=()):
+    checks = {key: {"passed": key not in failed} for key in ("buttons", "sticks", "gyro")}
+    return {"device": {"name": "pad", "hid_vid": 0x054C, "hid_pid": pid, "hid_serial": serial, "hid_bus": "usb"},
+            "passed": passed, "score": 100 if passed else 66, "checks": checks, "date": date}
+
+
+@pytest.fixture
+def store():
+    store = ResultStore(":memory:")
+    store.add(stored_result("AA", 0x09CC, True, "2026-10-01T10:00:00"))
+    store.add(stored_result("AA", 0x09CC, False, "2026-10-03T10:00:00", failed=("gyro",)), SOURCE_STATION)
+    store.add(stored_result("BB", 0x0BA0, False, "2026-10-05T10:00:00", failed=("sticks",)), SOURCE_CLI)
+    store.add(stored_result("", 0x0BA0, True, "2026-10-07T10:00:00"), SOURCE_STATION)
+    yield store
+    store.close()
+
+
+def test_query_filters(store):
+    assert store.count() == 4
+    assert [r["date"][:10] for r in store.query()] == ["2026-10-07", "2026-10-05", "2026-10-03", "2026-10-01"]
+    assert [r["date"][:10] for r in store.query(serial="AA")] == ["2026-10-03", "2026-10-01"]
+    assert [r["serial"] for r in store.query(pid=0x0BA0)] == [None, "BB"]
+    assert [r["serial"] for r in store.query(passed=False)] == ["BB", "AA"]
+    assert [r["serial"] for r in store.query(failed_check="gyro")] == ["AA"]
+    assert len(store.query(source=SOURCE_STATION)) == 2
+    assert len(store.query(limit=1)) == 1
+
+
+def test_query_date_bounds(store):
+    # since - включительно, until - не включая
+    assert len(store.query(since="2026-10-03T10:00:00")) == 3
+    assert len(store.query(until="2026-10-03T10:00:00")) == 1
+    assert [r["serial"] for r in store.query(pid=0x0BA0, passed=False, since="2026-10-02", until="2026-10-06")] == ["BB"]
+
+
+def test_query_keeps_full_result(store):
+    record = store.query(failed_check="sticks")[0]
+    assert record["passed"] is False
+    assert record["result"]["checks"]["sticks"] == {"passed": False}
+
+
+def test_add_many_and_as_record_match_query():
+    store = ResultStore(":memory:")
+    try:
+        results = [stored_result("CC", 0x0CE6, True, f"2026-10-0{n}T09:00:00") for n in range(1, 4)]
+        assert store.add_many(results, SOURCE_STATION) == 3
+        record = store.query(limit=1)[0]
+        expected = as_record(results[-1], SOURCE_STATION, record["id"])
+        assert record == expected
+    finally:
+        store.close()
+
+
+def test_export_csv(store, tmp_path):
+    path = tmp_path / "history.csv"
+    export_csv(str(path), store.query(serial="AA"))
+    with open(path, encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["passed"] for row in rows] == ["0", "1"]
+    assert rows[0]["pid"] == "0x09CC"
+    assert rows[0]["check_gyro"] == "0" and rows[0]["check_buttons"] == "1"
+    assert rows[0]["check_triggers"] == ""
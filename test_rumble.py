@@ -0,0 +1,114 @@
+"""
+Отклик моторов по акселерометру: сэмплы раскладываются по кадрам узора
+и сравниваются с фоном - без геймпада и без потока планировщика.
+
+    python -m pytest -q test_rumble.py
+"""
+
+import pytest
+
+from rumble import (
+    LEAD_IN_MS, SETTLE_MS, MotorResponse, RumbleFrame, alternate_pattern, pattern_duration_ms, sweep_pattern
+)
+
+MS = 1_000_000
+SAMPLE_NS = 5 * MS
+
+
+def timeline_for(frames, start=0):
+    # Как RumbleScheduler.timeline: пауза, кадры точно по расписанию, конец
+    timeline = [(start, None)]
+    due = start + LEAD_IN_MS * MS
+    for frame in frames:
+        timeline.append((due, frame))
+        due += frame.duration_ms * MS
+    timeline.append((due, None))
+    return timeline
+
+
+def shake(response, timeline, amplitude):
+    # amplitude(кадр) -> размах колебаний ускорения, g; сэмплы через 5 мс по часам хоста
+    end = timeline[-1][0]
+    position = 0
+    sign = 1
+    for now in range(0, end, SAMPLE_NS):
+        while position + 1 < len(timeline) and timeline[position + 1][0] <= now:
+            position += 1
+        sign = -sign
+        response.add([(0.0, 0.0, 0.0, 0.0, 0.0, 1.0 + sign * amplitude(timeline[position][1]))], host_ns=now)
+
+
+def level(left=0.0, right=0.0, rest=0.001):
+    def amplitude(frame):
+        if frame is None or frame.silent:
+            return rest
+        return max(left if frame.left > 0 else 0.0, right if frame.right > 0 else 0.0) or rest
+    return amplitude
+
+
+def test_both_motors_respond():
+    frames = alternate_pattern()
+    timeline = timeline_for(frames)
+    response = MotorResponse()
+    shake(response, timeline, level(left=0.1, right=0.05))
+    result = response.analyze(timeline)
+    assert result["passed"] is True and result["reason"] == ""
+    assert set(result["motors"]) == {"left", "right"}
+    assert result["motors"]["left"]["ratio"] > result["motors"]["right"]["ratio"] > 2
+    assert result["baseline_g"] < 0.01
+
+
+def test_dead_motor_fails():
+    timeline = timeline_for(alternate_pattern())
+    response = MotorResponse()
+    shake(response, timeline, level(left=0.1))
+    result = response.analyze(timeline)
+    assert result["passed"] is False
+    assert result["motors"]["left"]["passed"] and not result["motors"]["right"]["passed"]
+    assert result["reason"] == "нет отклика: Правый"
+
+
+def test_no_imu_gives_no_verdict():
+    timeline = timeline_for(alternate_pattern())
+    result = MotorResponse().analyze(timeline)
+    assert result["passed"] is None
+    assert result["samples"] == 0
+
+
+def test_single_joycon_judges_its_own_side():
+    # Правый Joy-Con играет любой кадр узора своим приводом
+    timeline = timeline_for(alternate_pattern())
+    response = MotorResponse(("right",))
+    shake(response, timeline, level(left=0.1, right=0.1))
+    result = response.analyze(timeline)
+    assert list(result["motors"]) == ["right"]
+    assert result["passed"] is True
+
+
+def test_sweep_frames_merge_into_one_segment():
+    frames = sweep_pattern(on_ms=400, step_ms=20)
+    response = MotorResponse()
+    segments = response.segments(timeline_for(frames))
+    assert [key for _, _, key in segments] == ["rest", "both"]
+    start, end, _ = segments[1]
+    assert end - start == (pattern_duration_ms(frames) - SETTLE_MS) * MS
+
+
+def test_sample_time_from_sensor_clock():
+    # Сэмплы пачки разнесены по часам датчика назад от времени прихода пачки
+    response = MotorResponse()
+    samples = [(0.0, 0.0, 0.0, 0.0, 0.0, z) for z in (1.0, 1.1, 0.9)]
+    response.add(samples, stamps=[0, 5 * MS, 10 * MS], host_ns=100 * MS)
+    assert response.times == [95 * MS, 100 * MS]
+    assert response.jerk == pytest.approx([0.1, 0.2])
+    response.add(samples[:1], host_ns=120 * MS)
+    assert response.samples == 3
+
+
+def test_too_few_samples_on_motor():
+    frames = [RumbleFrame(30, 1.0, 1.0)]
+    timeline = timeline_for(frames)
+    response = MotorResponse()
+    shake(response, timeline, level(left=0.1, right=0.1))
+    result = response.analyze(timeline)
+    assert result["passed"] is None and result["motors"] == {}
@@ -0,0 +1,94 @@
+"""
+Запись сессии и чтение её обратно через mmap - с хвостом-индексом и без него.
+
+    python -m pytest -q test_session_record.py
+"""
+
+import pytest
+
+from session_record import (
+    HEADER, INDEX_STRIDE, REC_HID_REPORT, REC_JOY_FRAME, REC_META, SessionReader, SessionRecorder
+)
+
+
+def write_session(path, reports=3):
+    recorder = SessionRecorder(str(path))
+    recorder.meta({"name": "DualShock 4", "hid_vid": 0x054C}, timestamp_ns=1_000)
+    recorder.joy_frame(2_000, 0b101, [0.5, -1.0], [(0, 1)])
+    recorder.joy_frame(3_000, 0b101, [0.5, -1.0], [(0, 1)])     # тот же кадр - не пишется
+    recorder.joy_frame(4_000, 0b001, [0.25, 0.0], [(-1, 0)])
+    for n in range(reports):
+        recorder.hid_report(5_000 + n * 1_000, [0x01, n & 0xFF, 0x80], channel=1)
+    recorder.close()
+    return recorder
+
+
+def read_all(reader):
+    records = []
+    for rtype, ts, _, payload, length in reader.iter_records(HEADER.size):
+        if rtype == REC_JOY_FRAME:
+            records.append((rtype, ts, reader.decode_frame(payload)))
+        else:
+            records.append((rtype, ts, bytes(reader.mm[payload:payload + length])))
+    return records
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "session.gpts"
+    recorder = write_session(path)
+    assert recorder.records == 6
+    reader = SessionReader(str(path))
+    try:
+        assert reader.records == 6
+        assert reader.meta == {"name": "DualShock 4", "hid_vid": 0x054C}
+        assert (reader.start_ns, reader.end_ns, reader.duration_ns) == (1_000, 7_000, 6_000)
+        records = read_all(reader)
+        assert [rtype for rtype, _, _ in records] == [REC_META, REC_JOY_FRAME, REC_JOY_FRAME] + [REC_HID_REPORT] * 3
+        assert records[1] == (REC_JOY_FRAME, 2_000, (0b101, (0.5, -1.0), [(0, 1)]))
+        assert records[2] == (REC_JOY_FRAME, 4_000, (0b001, (0.25, 0.0), [(-1, 0)]))
+        assert records[-1] == (REC_HID_REPORT, 7_000, bytes((0x01, 2, 0x80)))
+    finally:
+        reader.close()
+
+
+def test_missing_footer_is_rebuilt_by_scan(tmp_path):
+    # Программа упала до close(): хвоста нет, индекс строится проходом по записям
+    path = tmp_path / "full.gpts"
+    recorder = write_session(path, reports=INDEX_STRIDE * 2 + 10)
+    cut = tmp_path / "cut.gpts"
+    cut.write_bytes(path.read_bytes()[:recorder.offset])
+    full, scanned = SessionReader(str(path)), SessionReader(str(cut))
+    try:
+        assert scanned.records == full.records == recorder.records
+        assert list(scanned.index_ts) == list(full.index_ts)
+        assert list(scanned.index_offsets) == list(full.index_offsets)
+        assert scanned.duration_ns == full.duration_ns
+        assert read_all(scanned) == read_all(full)
+    finally:
+        full.close()
+        scanned.close()
+
+
+def test_find_seeks_by_sparse_index(tmp_path):
+    path = tmp_path / "long.gpts"
+    recorder = write_session(path, reports=INDEX_STRIDE * 3)
+    reader = SessionReader(str(path))
+    try:
+        # Каждая INDEX_STRIDE-я запись, начиная с первой
+        assert len(reader.index_ts) == (recorder.records + INDEX_STRIDE - 1) // INDEX_STRIDE
+        assert reader.find(0) == HEADER.size
+        target = reader.index_ts[1] + 500_000
+        _, ts, _, _, _ = next(reader.iter_records(reader.find(target)))
+        assert ts == reader.index_ts[1] <= target
+    finally:
+        reader.close()
+
+
+def test_rejects_foreign_file(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"PK\x03\x04" + bytes(64))
+    with pytest.raises(ValueError):
+        SessionReader(str(path))
+    path.write_bytes(b"GP")
+    with pytest.raises(ValueError):
+        SessionReader(str(path))
@@ -0,0 +1,155 @@
+"""
+Автомат стенда без Qt и геймпадов: подменная сессия и часы.
+
+    python -m pytest -q test_station.py
+"""
+
+from report_model import CHECKS
+from station import RESULT_FAIL, RESULT_PASS, STATION_DONE, STATION_TESTING, STATION_WAITING, StationMachine
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeState:
+    def __init__(self):
+        self.passed = dict.fromkeys(CHECKS, False)
+        self.vibration = None
+
+
+class FakeSession:
+    # Подмена PadSession: шаги проходит тест, вибрация - узор до следующего poll() и вердикт по флагу
+    def __init__(self, instance_id=7, checks=CHECKS, rumble_ok=True, rumble_starts=True):
+        self.instance_id = instance_id
+        self.checks = tuple(checks)
+        self.state = FakeState()
+        self.rumble_ok = rumble_ok
+        self.rumble_starts = rumble_starts
+        self.rumbling = False
+        self.stopped = False
+
+    def poll(self):
+        if not self.rumbling:
+            return False
+        self.rumbling = False
+        self.state.passed["vibration"] = self.rumble_ok
+        self.state.vibration = {"passed": self.rumble_ok, "reason": "" if self.rumble_ok else "нет отклика: Правый"}
+        return True
+
+    def rumble(self):
+        if not self.rumble_starts:
+            self.state.vibration = {"passed": False, "reason": "вибрация не поддерживается"}
+            return False
+        self.rumbling = True
+        return True
+
+    def stop(self):
+        self.stopped = True
+
+    def to_dict(self):
+        return {"device": {"name": "pad", "instance_id": self.instance_id}}
+
+
+def start_station(session, clock, step_timeout=20.0):
+    results = []
+    machine = StationMachine(lambda gp: session, step_timeout=step_timeout, clock=clock)
+    machine.on_result = results.append
+    assert machine.on_connected({"instance_id": session.instance_id})
+    return machine, results
+
+
+def test_walks_steps_in_order_and_passes():
+    clock = Clock()
+    session = FakeSession(checks=("vibration", "sticks", "buttons"))
+    machine, results = start_station(session, clock)
+    # Порядок шагов - как в CHECKS, а не как в сессии
+    assert machine.steps == ["buttons", "sticks", "vibration"]
+    assert machine.state == STATION_TESTING and machine.step == "buttons"
+    assert not machine.on_connected({"instance_id": 8})
+    assert not machine.tick()
+    clock.now += 1.5
+    session.state.passed["buttons"] = True
+    assert machine.tick()
+    assert machine.step == "sticks"
+    clock.now += 0.5
+    session.state.passed["sticks"] = True
+    assert machine.tick()
+    # Узор играет - шаг ждёт вердикта
+    assert machine.step == "vibration" and session.rumbling
+    clock.now += 3.0
+    assert machine.tick()
+    assert machine.state == STATION_DONE
+    result = results[0]
+    assert result["result"] == RESULT_PASS and result["failed_step"] is None
+    assert result["step_times"] == {"buttons": 1.5, "sticks": 0.5, "vibration": 3.0}
+    assert result["duration_s"] == 5.0
+    assert result["device"]["instance_id"] == 7
+    assert not machine.tick()
+    assert machine.on_disconnected(session.instance_id)
+    assert machine.state == STATION_WAITING and session.stopped
+    assert machine.stats()["passed"] == 1
+
+
+def test_step_timeout_fails_unit():
+    clock = Clock()
+    session = FakeSession(checks=("buttons", "sticks"))
+    machine, results = start_station(session, clock, step_timeout=5.0)
+    clock.now += 5.0
+    assert not machine.tick()
+    clock.now += 0.1
+    assert machine.tick()
+    assert results[0]["result"] == RESULT_FAIL
+    assert results[0]["failed_step"] == "buttons"
+    assert machine.stats()["pass_rate"] == 0.0
+
+
+def test_dead_motor_fails_after_pattern():
+    clock = Clock()
+    session = FakeSession(checks=("vibration",), rumble_ok=False)
+    machine, results = start_station(session, clock)
+    assert machine.state == STATION_TESTING and not results
+    assert machine.tick()
+    assert machine.state == STATION_DONE
+    assert results[0]["failed_step"] == "vibration"
+    assert results[0]["reason"] == "Проверка вибрации: нет отклика: Правый"
+
+
+def test_no_rumble_and_unplug_fail_unit():
+    clock = Clock()
+    session = FakeSession(checks=("vibration",), rumble_starts=False)
+    machine, results = start_station(session, clock)
+    assert machine.state == STATION_DONE
+    assert results[-1]["failed_step"] == "vibration"
+    assert results[-1]["reason"] == "Проверка вибрации: вибрация не поддерживается"
+    machine.on_disconnected(session.instance_id)
+    session = FakeSession(checks=("buttons",))
+    machine.open_session = lambda gp: session
+    machine.on_connected({"instance_id": session.instance_id})
+    assert not machine.on_disconnected(999)
+    assert machine.on_disconnected(session.instance_id)
+    assert results[-1]["result"] == RESULT_FAIL
+    assert results[-1]["reason"] == "геймпад отключён до конца теста"
+    assert session.stopped
+
+
+def test_stats_per_hour():
+    clock = Clock()
+    machine = StationMachine(lambda gp: None, clock=clock)
+    assert machine.stats()["units_per_hour"] == 0.0
+    for n, passes in enumerate((True, True, False)):
+        session = FakeSession(instance_id=n, checks=("buttons",))
+        machine.open_session = lambda gp: session
+        machine.on_connected({"instance_id": n})
+        clock.now += 10.0
+        session.state.passed["buttons"] = passes
+        machine.tick()
+        machine.on_disconnected(n)
+    stats = machine.stats()
+    assert (stats["units"], stats["passed"]) == (3, 2)
+    assert stats["avg_duration_s"] == 10.0
+    assert stats["units_per_hour"] == 360.0